@@ -103,6 +103,8 @@ DB_CONFIG: Dict[str, Any] = {
     "autocommit": _get_bool(os.getenv("DB_AUTOCOMMIT", "true"), True),
     "minsize": int(os.getenv("DB_POOL_MIN", "1")),
     "maxsize": int(os.getenv("DB_POOL_MAX", "50")),
+    # Сколько соединений прогреть при старте (0 — столько же, сколько minsize)
+    "warmup": int(os.getenv("DB_POOL_WARMUP", "0")),
 }
 
 # Проверка конфигурации базы данных
@@ -112,6 +114,32 @@ if not IS_CI_ENV and not all(DB_CONFIG[key] for key in ["host", "user", "passwor
 # Совместимость с legacy-конфигом
 DATABASE_CONFIG = DB_CONFIG
 
+# Опциональная read-реплика для тяжёлых аналитических чтений (route="replica").
+# Без DB_REPLICA_HOST все запросы идут в основной пул.
+DB_REPLICA_CONFIG: Dict[str, Any] = {
+    "host": os.getenv("DB_REPLICA_HOST"),
+    "user": os.getenv("DB_REPLICA_USER") or DB_CONFIG["user"],
+    "password": os.getenv("DB_REPLICA_PASSWORD") or DB_CONFIG["password"],
+    "db": os.getenv("DB_REPLICA_NAME") or DB_CONFIG["db"],
+    "port": int(os.getenv("DB_REPLICA_PORT") or DB_CONFIG["port"]),
+    "charset": DB_CONFIG["charset"],
+    "autocommit": True,
+    "minsize": int(os.getenv("DB_REPLICA_POOL_MIN", "1")),
+    "maxsize": int(os.getenv("DB_REPLICA_POOL_MAX", "20")),
+    # Реплика с отставанием больше порога не используется (0 — не проверять отставание)
+    "max_lag_seconds": float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30")),
+    "check_interval_seconds": float(os.getenv("DB_REPLICA_CHECK_INTERVAL_SECONDS", "15")),
+}
+
+# Телеметрия SQL-запросов: off | metrics | verbose (см. app/db/telemetry.py)
+DB_TELEMETRY_CONFIG: Dict[str, Any] = {
+    "mode": os.getenv("DB_QUERY_LOG_MODE", "metrics"),
+    "sample_rate": float(os.getenv("DB_QUERY_LOG_SAMPLE_RATE", "0.01")),
+    "slow_query_ms": float(os.getenv("DB_SLOW_QUERY_MS", "1000")),
+    "slow_log_size": int(os.getenv("DB_SLOW_QUERY_LOG_SIZE", "100")),
+    "slow_acquire_ms": float(os.getenv("DB_POOL_SLOW_ACQUIRE_MS", "200")),
+}
+
 # Параметры для планировщика задач
 REPORT_SEND_TIME = os.getenv("REPORT_SEND_TIME", "18:00")
 
@@ -128,6 +156,65 @@ TASK_QUEUE_CONFIG: Dict[str, Any] = {
     "retry_max_delay": float(os.getenv("TASK_RETRY_MAX_DELAY", "60.0")),
 }
 
+# LM worker: размер чанка CPU-расчета, число параллельных писателей и очередь между ними
+LM_WORKER_CONFIG: Dict[str, Any] = {
+    "score_chunk_size": int(os.getenv("LM_WORKER_SCORE_CHUNK", "50")),
+    "writers": int(os.getenv("LM_WORKER_WRITERS", "2")),
+    "write_queue_size": int(os.getenv("LM_WORKER_WRITE_QUEUE", "4")),
+}
+
+# Backfill LM: размер чанка keyset-прохода и целевая скорость (звонков/с, 0 — без ограничения)
+LM_BACKFILL_CONFIG: Dict[str, Any] = {
+    "chunk_size": int(os.getenv("LM_BACKFILL_CHUNK", "500")),
+    "rows_per_sec": float(os.getenv("LM_BACKFILL_ROWS_PER_SEC", "200")),
+}
+
+# Пул процессов для CPU-части расчета LM в процессе бота (0 — считать в event loop)
+LM_EXECUTOR_CONFIG: Dict[str, Any] = {
+    "process_workers": int(os.getenv("LM_PROCESS_WORKERS", "0")),
+}
+
+# Хиты словаря LM: буфер строк между звонками (0 — писать сразу) и период фонового сброса
+LM_HITS_CONFIG: Dict[str, Any] = {
+    "buffer_rows": int(os.getenv("LM_HITS_BUFFER_ROWS", "0")),
+    "flush_interval_sec": float(os.getenv("LM_HITS_FLUSH_SEC", "5")),
+}
+
+# Write-behind результатов LM в процессе бота: сброс по числу строк или по таймеру,
+# свежие метрики отдаются из кеша cache_ttl_sec секунд
+LM_WRITE_BEHIND_CONFIG: Dict[str, Any] = {
+    "enabled": _get_bool(os.getenv("LM_WRITE_BEHIND", "true"), True),
+    "flush_rows": int(os.getenv("LM_WRITE_BEHIND_ROWS", "500")),
+    "flush_interval_ms": int(os.getenv("LM_WRITE_BEHIND_INTERVAL_MS", "500")),
+    "max_attempts": int(os.getenv("LM_WRITE_BEHIND_MAX_ATTEMPTS", "10")),
+    "max_pending": int(os.getenv("LM_WRITE_BEHIND_MAX_PENDING", "20000")),
+    "cache_size": int(os.getenv("LM_RESULT_CACHE_SIZE", "1000")),
+    "cache_ttl_sec": float(os.getenv("LM_RESULT_CACHE_TTL", "300")),
+}
+
+# Дашборд оператора: сколько запросов секций одного дашборда выполняются одновременно
+# (общий лимит на AnalyticsRepository, чтобы дашборды не выбирали весь пул)
+DASHBOARD_CONFIG: Dict[str, Any] = {
+    "query_concurrency": int(os.getenv("DASHBOARD_QUERY_CONCURRENCY", "5")),
+    # L1-кеш дашбордов в памяти процесса перед operator_dashboards (0 — выключен)
+    "l1_ttl_sec": float(os.getenv("DASHBOARD_L1_TTL_SEC", "60")),
+    "l1_max_entries": int(os.getenv("DASHBOARD_L1_MAX_ENTRIES", "500")),
+    # Дашборды из operator_daily_rollup (миграция 007) вместо агрегации сырых call_scores
+    "use_rollup": _get_bool(os.getenv("DASHBOARD_USE_ROLLUP", "false"), False),
+    # Фоновый прогрев дашбордов: интервал чуть меньше TTL operator_dashboards (5 минут),
+    # сколько дашбордов строится одновременно и через сколько секунд пересобирать без новых звонков
+    "prewarm_enabled": _get_bool(os.getenv("DASHBOARD_PREWARM", "true"), True),
+    "prewarm_interval_sec": int(os.getenv("DASHBOARD_PREWARM_INTERVAL_SEC", "240")),
+    "prewarm_concurrency": int(os.getenv("DASHBOARD_PREWARM_CONCURRENCY", "3")),
+    "prewarm_max_age_sec": float(os.getenv("DASHBOARD_PREWARM_MAX_AGE_SEC", "1800")),
+}
+
+# Матрица весов жалоб (config/lm_weight_matrix.json): как часто проверять mtime файла
+# и подхватывать новые веса без перезапуска (0 — только по команде /lm_weights reload)
+LM_WEIGHTS_CONFIG: Dict[str, Any] = {
+    "reload_interval_sec": float(os.getenv("LM_WEIGHTS_RELOAD_SEC", "30")),
+}
+
 # Уровень логирования
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
@@ -2,7 +2,7 @@
 Модуль работы с базой данных.
 """
 
-from .manager import DatabaseManager
+from .manager import DatabaseManager, DatabaseTransaction, ROUTE_PRIMARY, ROUTE_REPLICA
 from .models import (
     UserRecord, OperatorRecord, CallRecord, CallHistoryRecord,
     ReportRecord, CallMetrics
@@ -10,6 +10,9 @@ from .models import (
 
 __all__ = [
     "DatabaseManager",
+    "DatabaseTransaction",
+    "ROUTE_PRIMARY",
+    "ROUTE_REPLICA",
     "UserRecord",
     "OperatorRecord",
     "CallRecord",
@@ -4,28 +4,130 @@
 
 import asyncio
 import inspect
-import re
 import time
 import aiomysql
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional, Union, Tuple
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Union, Tuple
 
-from app.config import DB_CONFIG
+from app.config import DB_CONFIG, DB_REPLICA_CONFIG
 from app.error_policy import get_retry_config, is_retryable
 from app.errors import DatabaseIntegrationError
+from app.db.pool_metrics import PoolMetrics, is_pool_saturated
+from app.db.pool_metrics import pool_metrics as shared_pool_metrics
+from app.db.query_names import resolve_query_name
+from app.db.statements import prepare_statement
+from app.db.telemetry import QueryTelemetry, query_telemetry
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
 
+ROUTE_PRIMARY = "primary"
+ROUTE_REPLICA = "replica"
+
+
+class DatabaseTransaction:
+    """
+    Набор запросов на одном закреплённом соединении внутри одной транзакции.
+
+    Создаётся через DatabaseManager.transaction(); commit/rollback выполняет менеджер.
+    """
+
+    def __init__(self, manager: "DatabaseManager", connection: Any):
+        self._manager = manager
+        self.connection = connection
+
+    async def execute(
+        self,
+        query: str,
+        params: Optional[Union[Tuple, List, Dict]] = None,
+        fetchone: bool = False,
+        fetchall: bool = False,
+        *,
+        query_name: Optional[str] = None,
+    ) -> Any:
+        """Выполняет запрос в транзакции (без commit)."""
+        query_name = resolve_query_name(query_name)
+        query = self._manager._sanitize_sql(query)
+        telemetry = self._manager.telemetry
+        async with self.connection.cursor() as cursor:
+            start_time = time.perf_counter()
+            try:
+                await cursor.execute(query, params)
+                if fetchone:
+                    row = await cursor.fetchone()
+                    result = row if isinstance(row, dict) else {}
+                elif fetchall:
+                    rows = await cursor.fetchall()
+                    result = rows if isinstance(rows, list) else []
+                else:
+                    result = cursor.rowcount
+            except aiomysql.Error as e:
+                telemetry.record(
+                    query_name,
+                    time.perf_counter() - start_time,
+                    error=True,
+                    query=query,
+                )
+                raise self._manager._wrap_db_error(e, query, params, query_name) from e
+            telemetry.record(query_name, time.perf_counter() - start_time, query=query)
+            return result
+
+    async def execute_many(
+        self,
+        query: str,
+        seq_of_params: Iterable[Union[Tuple, List, Dict]],
+        *,
+        query_name: Optional[str] = None,
+    ) -> int:
+        """
+        Выполняет запрос для набора параметров (cursor.executemany).
+
+        Для простых INSERT ... VALUES драйвер сам склеивает строки в multi-row INSERT.
+        """
+        params_list = list(seq_of_params)
+        if not params_list:
+            return 0
+        query_name = resolve_query_name(query_name)
+        query = self._manager._sanitize_sql(query)
+        telemetry = self._manager.telemetry
+        async with self.connection.cursor() as cursor:
+            start_time = time.perf_counter()
+            try:
+                await cursor.executemany(query, params_list)
+            except aiomysql.Error as e:
+                telemetry.record(
+                    query_name,
+                    time.perf_counter() - start_time,
+                    error=True,
+                    query=query,
+                )
+                raise self._manager._wrap_db_error(e, query, params_list[0], query_name) from e
+            telemetry.record(query_name, time.perf_counter() - start_time, query=query)
+            return cursor.rowcount
+
 
 class DatabaseManager:
     """
     Класс для управления пулом соединений с базой данных и выполнения запросов.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        telemetry: Optional[QueryTelemetry] = None,
+        pool_metrics: Optional[PoolMetrics] = None,
+        replica_config: Optional[Dict[str, Any]] = None,
+    ):
         self.pool: Optional[aiomysql.Pool] = None
         self._lock = asyncio.Lock()
+        self.telemetry = telemetry or query_telemetry
+        self.pool_metrics = pool_metrics or shared_pool_metrics
+        # Read-реплика (опционально): route="replica" в execute_query/execute_with_retry
+        self.replica_config = replica_config if replica_config is not None else DB_REPLICA_CONFIG
+        self.replica_pool: Optional[aiomysql.Pool] = None
+        self.replica_lag_seconds: Optional[float] = None
+        self.replica_fallbacks = 0
+        self._replica_ok = False
+        self._replica_checked_at: Optional[float] = None
     
     @staticmethod
     def _clip_for_log(value: Any, limit: int = 240) -> str:
@@ -38,8 +140,7 @@ class DatabaseManager:
     def _is_admin_action_logs_query(query: Optional[str]) -> bool:
         if not isinstance(query, str):
             return False
-        lowered = " ".join(query.split()).lower()
-        return "admin_action_logs" in lowered and "insert into" in lowered
+        return prepare_statement(query).is_admin_action_log
 
     @classmethod
     def _sanitize_params_for_log(
@@ -91,26 +192,18 @@ class DatabaseManager:
         return "unknown_error"
 
     def _resolve_query_name(self, query_name: Optional[str]) -> str:
-        if query_name:
-            return query_name
-        try:
-            frame = inspect.stack()[3]
-            module = frame.frame.f_globals.get("__name__", "")
-            return f"{module}.{frame.function}"
-        except Exception as exc:
-            logger.debug("Не удалось определить имя запроса: %s", exc, exc_info=True)
-            return "unknown_query"
+        return resolve_query_name(query_name)
 
     @staticmethod
     def _sanitize_sql(query: Optional[str]) -> Optional[str]:
         """
         Горячий фикс: в старых запросах могли остаться обращения к cs.score.
         В MySQL такого столбца нет (есть call_score), поэтому мягко переписываем SQL.
+        Результат кешируется по тексту запроса (app.db.statements.prepare_statement).
         """
-        if not isinstance(query, str) or "score" not in query:
+        if not isinstance(query, str):
             return query
-        pattern = re.compile(r"(?i)\b(cs|call_scores)\.score\b")
-        return pattern.sub(lambda match: f"{match.group(1)}.call_score", query)
+        return prepare_statement(query).sql
 
     def _log_db_error(
         self,
@@ -144,25 +237,56 @@ class DatabaseManager:
         )
         return resolved_category
 
+    def _wrap_db_error(
+        self,
+        error: Exception,
+        query: str,
+        params: Optional[Union[Tuple, List, Dict]],
+        query_name: Optional[str],
+        *,
+        log_error: bool = True,
+    ) -> DatabaseIntegrationError:
+        """Логирует ошибку драйвера и превращает её в DatabaseIntegrationError."""
+        category = self._classify_db_error(*self._extract_db_error_details(error)[1:])
+        if log_error:
+            self._log_db_error(error, query, params, query_name, category)
+        else:
+            logger.debug("DB error без логирования (log_error=False): %s", error)
+        retryable = category in {"connection_error", "timeout"}
+        return DatabaseIntegrationError(
+            f"DB query failed ({category})",
+            user_visible=False,
+            retryable=retryable,
+            details={
+                "query_name": self._resolve_query_name(query_name),
+                "category": category,
+                "error_type": type(error).__name__,
+            },
+        )
+
+    @staticmethod
+    async def _open_pool(config: Dict[str, Any], *, default_maxsize: int) -> aiomysql.Pool:
+        return await aiomysql.create_pool(
+            host=config["host"],
+            port=config["port"],
+            user=config["user"],
+            password=config["password"],
+            db=config["db"],
+            charset=config.get("charset", "utf8mb4"),
+            use_unicode=True,
+            autocommit=config.get("autocommit", True),
+            minsize=config.get("minsize", 1),
+            maxsize=config.get("maxsize", default_maxsize),
+            cursorclass=aiomysql.DictCursor
+        )
+
     async def create_pool(self) -> None:
-        """Создание пула соединений с базой данных."""
+        """Создание пула соединений с базой данных (и read-реплики, если настроена)."""
         async with self._lock:
             if not self.pool:
                 logger.info("Создание пула соединений с БД...")
                 try:
-                    self.pool = await aiomysql.create_pool(
-                        host=DB_CONFIG["host"],
-                        port=DB_CONFIG["port"],
-                        user=DB_CONFIG["user"],
-                        password=DB_CONFIG["password"],
-                        db=DB_CONFIG["db"],
-                        charset=DB_CONFIG.get("charset", "utf8mb4"),
-                        use_unicode=True,
-                        autocommit=DB_CONFIG.get("autocommit", True),
-                        minsize=DB_CONFIG.get("minsize", 1),
-                        maxsize=DB_CONFIG.get("maxsize", 50),
-                        cursorclass=aiomysql.DictCursor
-                    )
+                    self.pool = await self._open_pool(DB_CONFIG, default_maxsize=50)
                     logger.info("Пул соединений с БД успешно создан.")
                 except aiomysql.Error as e:
                     logger.warning("Ошибка при создании пула соединений: %s", e)
@@ -172,9 +296,159 @@ class DatabaseManager:
                         retryable=True,
                         details={"error_type": type(e).__name__},
                     ) from e
+            if not self.replica_pool and self.replica_config.get("host"):
+                try:
+                    self.replica_pool = await self._open_pool(self.replica_config, default_maxsize=20)
+                    logger.info(
+                        "Пул read-реплики создан: %s:%s",
+                        self.replica_config.get("host"),
+                        self.replica_config.get("port"),
+                    )
+                except (aiomysql.Error, OSError) as e:
+                    # Реплика не обязательна: работаем через основной пул.
+                    logger.warning("Read-реплика недоступна, используем основной пул: %s", e)
+                    self.replica_pool = None
+
+    async def _replica_available(self) -> bool:
+        """
+        Можно ли сейчас читать с реплики. Результат проверки отставания
+        кешируется на check_interval_seconds.
+        """
+        now = time.monotonic()
+        interval = float(self.replica_config.get("check_interval_seconds", 15))
+        if self._replica_checked_at is not None and now - self._replica_checked_at < interval:
+            return self._replica_ok
+        # Отмечаем время до проверки, чтобы параллельные запросы не запускали её повторно.
+        self._replica_checked_at = now
+        max_lag = float(self.replica_config.get("max_lag_seconds", 30))
+        if max_lag <= 0:
+            self._replica_ok = True
+            return True
+        try:
+            lag = await self._fetch_replica_lag()
+        except Exception as exc:
+            logger.warning("Не удалось проверить отставание реплики: %s", exc)
+            self._replica_ok = False
+            return False
+        self.replica_lag_seconds = lag
+        self._replica_ok = lag is not None and lag <= max_lag
+        if not self._replica_ok:
+            logger.warning(
+                "Read-реплика отстаёт (%s с при пороге %s с), чтения идут в основной пул",
+                lag,
+                max_lag,
+            )
+        return self._replica_ok
+
+    async def _fetch_replica_lag(self) -> Optional[float]:
+        """
+        Отставание реплики в секундах. None — репликация остановлена.
+        Если сервер не настроен как реплика (SHOW REPLICA STATUS пуст), считаем отставание нулевым.
+        """
+        conn = await self.replica_pool.acquire()
+        try:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute("SHOW REPLICA STATUS")
+                except aiomysql.ProgrammingError:
+                    # MySQL < 8.0.22
+                    await cursor.execute("SHOW SLAVE STATUS")
+                row = await cursor.fetchone()
+        finally:
+            release_result = self.replica_pool.release(conn)
+            if inspect.isawaitable(release_result):
+                await release_result
+        if not row:
+            return 0.0
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return float(lag) if lag is not None else None
+
+    def _mark_replica_unhealthy(self, error: Exception) -> None:
+        """Выключает реплику до следующей проверки (через check_interval_seconds)."""
+        logger.warning("Ошибка соединения с read-репликой, переключаемся на основной пул: %s", error)
+        self._replica_ok = False
+        self._replica_checked_at = time.monotonic()
+
+    async def _pool_for_route(self, route: str) -> Tuple[Any, str]:
+        """Возвращает (пул, фактический маршрут) с fallback на основной пул."""
+        if not self.pool:
+            await self.create_pool()
+        if route == ROUTE_REPLICA and self.replica_pool is not None:
+            if await self._replica_available():
+                return self.replica_pool, ROUTE_REPLICA
+            self.replica_fallbacks += 1
+        return self.pool, ROUTE_PRIMARY
+
+    async def warm_up_pool(self, target: Optional[int] = None) -> int:
+        """
+        Прогревает пул: открывает и проверяет (ping) до target соединений,
+        чтобы первые запросы после деплоя не платили за установку соединения.
+
+        По умолчанию target = DB_POOL_WARMUP или minsize; не больше maxsize.
+        Ошибки прогрева не фатальны: возвращается число готовых соединений.
+        """
+        if not self.pool:
+            await self.create_pool()
+        pool = self.pool
+        minsize = DB_CONFIG.get("minsize", 1)
+        maxsize = DB_CONFIG.get("maxsize", 50)
+        target = target or DB_CONFIG.get("warmup") or minsize
+        target = max(0, min(int(target), maxsize))
+        if not target:
+            return 0
+
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *(pool.acquire() for _ in range(target)),
+            return_exceptions=True,
+        )
+        connections = [conn for conn in results if not isinstance(conn, BaseException)]
+        warmed = 0
+        try:
+            for conn in connections:
+                try:
+                    await conn.ping(reconnect=True)
+                    warmed += 1
+                except Exception as exc:
+                    logger.warning("Прогрев пула: ping не прошёл: %s", exc)
+        finally:
+            for conn in connections:
+                release_result = pool.release(conn)
+                if inspect.isawaitable(release_result):
+                    await release_result
+
+        failed = len(results) - len(connections)
+        logger.info(
+            "Пул соединений прогрет: %s/%s за %.0f мс",
+            warmed,
+            target,
+            (time.perf_counter() - start_time) * 1000.0,
+            extra={"warmed": warmed, "target": target, "acquire_failed": failed},
+        )
+        return warmed
+
+    def pool_snapshot(self) -> Dict[str, Any]:
+        """Метрики пула соединений (для /db_metrics и диагностики)."""
+        snapshot = self.pool_metrics.snapshot(self.pool)
+        replica = self.replica_pool
+        snapshot["replica"] = {
+            "configured": bool(self.replica_config.get("host")),
+            "initialized": replica is not None,
+            "healthy": self._replica_ok if replica is not None else False,
+            "lag_seconds": self.replica_lag_seconds,
+            "fallbacks": self.replica_fallbacks,
+            "size": getattr(replica, "size", None),
+            "free": getattr(replica, "freesize", None),
+        }
+        return snapshot
 
     async def close_pool(self) -> None:
         """Закрытие пула соединений."""
+        if self.replica_pool:
+            self.replica_pool.close()
+            await self.replica_pool.wait_closed()
+            self.replica_pool = None
+            self._replica_checked_at = None
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
@@ -186,19 +460,47 @@ class DatabaseManager:
         await self.close_pool()
 
     @asynccontextmanager
-    async def acquire(self):
+    async def acquire(
+        self,
+        *,
+        query_name: Optional[str] = None,
+        route: str = ROUTE_PRIMARY,
+    ):
         """
         Контекстный менеджер для получения соединения из пула.
+
+        route="replica" берёт соединение из read-реплики, если она настроена
+        и не отстаёт; иначе — из основного пула.
+        Время ожидания соединения и время его удержания (по query_name)
+        учитываются в self.pool_metrics.
         """
-        if not self.pool:
-            await self.create_pool()
+        pool, resolved_route = await self._pool_for_route(route)
         
+        metrics = self.pool_metrics
         conn = None
+        acquired_at = 0.0
         try:
-            conn = await self.pool.acquire()
+            saturated = is_pool_saturated(pool)
+            metrics.acquire_started()
+            wait_start = time.perf_counter()
+            try:
+                conn = await pool.acquire()
+            finally:
+                acquired_at = time.perf_counter()
+                metrics.acquire_finished(
+                    acquired_at - wait_start,
+                    saturated=saturated,
+                    error=conn is None,
+                )
             yield conn
+        except DatabaseIntegrationError as e:
+            if resolved_route == ROUTE_REPLICA and e.details.get("category") == "connection_error":
+                self._mark_replica_unhealthy(e)
+            raise
         except aiomysql.Error as e:
             logger.warning("Ошибка при получении соединения: %s", e)
+            if resolved_route == ROUTE_REPLICA:
+                self._mark_replica_unhealthy(e)
             raise DatabaseIntegrationError(
                 "Failed to acquire DB connection",
                 user_visible=False,
@@ -206,8 +508,13 @@ class DatabaseManager:
                 details={"error_type": type(e).__name__},
             ) from e
         finally:
-            if conn and self.pool:
-                release_result = self.pool.release(conn)
+            if conn is not None:
+                metrics.released(
+                    query_name or resolve_query_name(),
+                    time.perf_counter() - acquired_at,
+                )
+            if conn and pool is not None and pool in (self.pool, self.replica_pool):
+                release_result = pool.release(conn)
                 if inspect.isawaitable(release_result):
                     await release_result
 
@@ -221,6 +528,7 @@ class DatabaseManager:
         commit: bool = False,
         query_name: Optional[str] = None,
         log_error: bool = True,
+        route: str = ROUTE_PRIMARY,
     ) -> Any:
         """
         Выполнение SQL-запроса.
@@ -230,10 +538,13 @@ class DatabaseManager:
             params: Параметры запроса
             fetchone: Вернуть одну запись
             fetchall: Вернуть все записи
+            route: "primary" или "replica" (только для чтений; запросы с commit
+                всегда идут в основной пул)
             
         Returns:
             Результат запроса (dict, list или True)
         """
+        query_name = resolve_query_name(query_name)
         query = self._sanitize_sql(query)
 
         if not query or not query.strip():
@@ -251,68 +562,49 @@ class DatabaseManager:
         if not self.pool:
             await self.create_pool()
             
-        async with self.acquire() as connection:
+        telemetry = self.telemetry
+        if telemetry.should_log_query():
+            logger.info(
+                "[DB] Executing query: %s | params=%s",
+                prepare_statement(query).preview,
+                self._sanitize_params_for_log(params, query=query),
+            )
+
+        if commit:
+            route = ROUTE_PRIMARY
+        async with self.acquire(query_name=query_name, route=route) as connection:
             async with connection.cursor() as cursor:
+                start_time = time.perf_counter()
                 try:
-                    query_preview = " ".join(query.split()) if isinstance(query, str) else str(query)
-                    safe_params = self._sanitize_params_for_log(params, query=query_preview)
-                    logger.info(
-                        "[DB] Executing query: %s | params=%s",
-                        query_preview,
-                        safe_params,
-                    )
-                    start_time = time.time()
                     await cursor.execute(query, params)
-                    elapsed_time = time.time() - start_time
-                    
-                    # Логируем медленные запросы (> 1 сек)
-                    if elapsed_time > 1.0:
-                        logger.warning(f"Медленный запрос ({elapsed_time:.4f} сек): {query}")
-                    else:
-                        logger.debug(f"Запрос выполнен за {elapsed_time:.4f} сек.")
-                
+
                     if fetchone:
-                        result = await cursor.fetchone()
-                        logger.info("[DB] fetchone result=%s", repr(result))
-                        if commit and connection:
-                            await connection.commit()
-                        return result if isinstance(result, dict) else {}
-
-                    if fetchall:
-                        result = await cursor.fetchall()
-                        logger.info(
-                            "[DB] fetchall rows=%s",
-                            len(result) if isinstance(result, list) else 0,
-                        )
-                        if commit and connection:
-                            await connection.commit()
-                        return result if isinstance(result, list) else []
+                        row = await cursor.fetchone()
+                        result = row if isinstance(row, dict) else {}
+                    elif fetchall:
+                        rows = await cursor.fetchall()
+                        result = rows if isinstance(rows, list) else []
+                    else:
+                        result = True
 
                     if commit and connection:
                         await connection.commit()
-                    logger.info(
-                        "[DB] exec ok rowcount=%s lastrowid=%s",
-                        cursor.rowcount,
-                        getattr(cursor, "lastrowid", None),
-                    )
-                    return True
                 except aiomysql.Error as e:
-                    category = self._classify_db_error(*self._extract_db_error_details(e)[1:])
-                    if log_error:
-                        self._log_db_error(e, query, params, query_name, category)
-                    else:
-                        logger.debug("DB error без логирования (log_error=False): %s", e)
-                    retryable = category in {"connection_error", "timeout"}
-                    raise DatabaseIntegrationError(
-                        f"DB query failed ({category})",
-                        user_visible=False,
-                        retryable=retryable,
-                        details={
-                            "query_name": self._resolve_query_name(query_name),
-                            "category": category,
-                            "error_type": type(e).__name__,
-                        },
+                    telemetry.record(
+                        query_name,
+                        time.perf_counter() - start_time,
+                        error=True,
+                        query=query,
+                    )
+                    raise self._wrap_db_error(
+                        e, query, params, query_name, log_error=log_error
                     ) from e
+                telemetry.record(
+                    query_name,
+                    time.perf_counter() - start_time,
+                    query=query,
+                )
+                return result
 
     async def execute_with_retry(
         self,
@@ -325,22 +617,44 @@ class DatabaseManager:
         retries: int = 3,
         base_delay: float = 0.5,
         query_name: Optional[str] = None,
+        route: str = ROUTE_PRIMARY,
     ) -> Any:
         """
         Выполнение SQL-запроса с повторными попытками.
+
+        При route="replica" ошибка соединения с репликой выключает её до следующей
+        проверки, и повтор уходит в основной пул.
         """
+        query_name = resolve_query_name(query_name)
+        return await self._run_with_retry(
+            lambda: self.execute_query(
+                query,
+                params=params,
+                fetchone=fetchone,
+                fetchall=fetchall,
+                commit=commit,
+                query_name=query_name,
+                log_error=False,
+                route=route,
+            ),
+            retries=retries,
+            base_delay=base_delay,
+            query_name=query_name,
+        )
+
+    async def _run_with_retry(
+        self,
+        operation: Callable[[], Awaitable[Any]],
+        *,
+        retries: int,
+        base_delay: float,
+        query_name: Optional[str],
+    ) -> Any:
+        """Общий цикл повторов для одиночных запросов, батчей и транзакций."""
         last_error = None
         for attempt in range(1, retries + 1):
             try:
-                return await self.execute_query(
-                    query,
-                    params=params,
-                    fetchone=fetchone,
-                    fetchall=fetchall,
-                    commit=commit,
-                    query_name=query_name,
-                    log_error=False,
-                )
+                return await operation()
             except Exception as error:
                 is_db_like = isinstance(error, aiomysql.Error) or error.__class__.__module__.startswith("pymysql")
                 if not isinstance(error, DatabaseIntegrationError) and not is_db_like:
@@ -391,6 +705,92 @@ class DatabaseManager:
         if last_error:
             raise last_error
 
+    @asynccontextmanager
+    async def transaction(self, *, query_name: Optional[str] = None):
+        """
+        Транзакция на одном соединении из пула.
+
+        Пример:
+            async with db.transaction() as tx:
+                await tx.execute_many(insert_sql, rows)
+                await tx.execute(update_sql, params)
+
+        COMMIT выполняется при нормальном выходе из блока, ROLLBACK — при исключении.
+        Повторы не выполняются: для них используйте run_in_transaction().
+        """
+        async with self.acquire(query_name=query_name) as connection:
+            try:
+                await connection.begin()
+            except aiomysql.Error as e:
+                raise self._wrap_db_error(e, "BEGIN", None, "db.transaction.begin") from e
+            try:
+                yield DatabaseTransaction(self, connection)
+            except BaseException:
+                try:
+                    await connection.rollback()
+                except Exception as rollback_error:
+                    logger.warning("Не удалось откатить транзакцию: %s", rollback_error)
+                raise
+            try:
+                await connection.commit()
+            except aiomysql.Error as e:
+                raise self._wrap_db_error(e, "COMMIT", None, "db.transaction.commit") from e
+
+    async def run_in_transaction(
+        self,
+        work: Callable[[DatabaseTransaction], Awaitable[Any]],
+        *,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        query_name: Optional[str] = None,
+    ) -> Any:
+        """
+        Выполняет work(tx) в транзакции; при ретраибельной ошибке повторяет
+        транзакцию целиком с той же политикой, что и execute_with_retry.
+        """
+        query_name = resolve_query_name(query_name)
+
+        async def _attempt() -> Any:
+            async with self.transaction(query_name=query_name) as tx:
+                return await work(tx)
+
+        return await self._run_with_retry(
+            _attempt,
+            retries=retries,
+            base_delay=base_delay,
+            query_name=query_name,
+        )
+
+    async def execute_many(
+        self,
+        query: str,
+        seq_of_params: Sequence[Union[Tuple, List, Dict]],
+        *,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        query_name: Optional[str] = None,
+    ) -> int:
+        """
+        Выполняет запрос для набора параметров на одном соединении в одной транзакции.
+
+        Returns:
+            rowcount драйвера (для INSERT — количество затронутых строк)
+        """
+        params_list = list(seq_of_params or [])
+        if not params_list:
+            return 0
+        query_name = resolve_query_name(query_name)
+
+        async def _work(tx: DatabaseTransaction) -> int:
+            return await tx.execute_many(query, params_list, query_name=query_name)
+
+        return await self.run_in_transaction(
+            _work,
+            retries=retries,
+            base_delay=base_delay,
+            query_name=query_name,
+        )
+
     # Поддержка контекстного менеджера для самого класса
     async def __aenter__(self):
         await self.create_pool()
@@ -0,0 +1,120 @@
+"""
+Метрики пула соединений aiomysql.
+
+Собираем в памяти процесса:
+    - гистограмму ожидания acquire() и число «голодных» захватов (пул упёрся в maxsize);
+    - число корутин, ждущих соединение, и пик занятых соединений;
+    - время удержания соединения по query_name.
+Мгновенные значения size/free/in_use читаются из самого пула в snapshot().
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from app.config import DB_TELEMETRY_CONFIG
+from app.db.telemetry import LatencyStats
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+
+def _pool_int(pool: Any, attr: str) -> Optional[int]:
+    value = getattr(pool, attr, None)
+    return value if isinstance(value, int) else None
+
+
+def is_pool_saturated(pool: Any) -> bool:
+    """Свободных соединений нет и новые открыть нельзя — acquire() будет ждать."""
+    free = _pool_int(pool, "freesize")
+    size = _pool_int(pool, "size")
+    maxsize = _pool_int(pool, "maxsize")
+    if free is None or size is None or not maxsize:
+        return False
+    return free == 0 and size >= maxsize
+
+
+class PoolMetrics:
+    """In-memory метрики пула соединений."""
+
+    def __init__(self, *, slow_acquire_ms: float = 200.0) -> None:
+        self.slow_acquire_ms = float(slow_acquire_ms)
+        self.acquire_stats = LatencyStats()
+        self.saturated_acquires = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self._hold_stats: Dict[str, LatencyStats] = {}
+
+    def acquire_started(self) -> None:
+        self.waiting += 1
+        if self.waiting > self.peak_waiting:
+            self.peak_waiting = self.waiting
+
+    def acquire_finished(
+        self,
+        wait_sec: float,
+        *,
+        saturated: bool = False,
+        error: bool = False,
+    ) -> None:
+        self.waiting = max(0, self.waiting - 1)
+        wait_ms = wait_sec * 1000.0
+        self.acquire_stats.add(wait_ms, error=error)
+        if saturated:
+            self.saturated_acquires += 1
+        if not error:
+            self.in_use += 1
+            if self.in_use > self.peak_in_use:
+                self.peak_in_use = self.in_use
+        if wait_ms >= self.slow_acquire_ms:
+            logger.warning(
+                "[DB] Долгое ожидание соединения из пула: %.1f мс (ждут: %s)",
+                wait_ms,
+                self.waiting,
+                extra={"wait_ms": wait_ms, "waiting": self.waiting, "saturated": saturated},
+            )
+
+    def released(self, query_name: str, hold_sec: float) -> None:
+        self.in_use = max(0, self.in_use - 1)
+        stats = self._hold_stats.get(query_name)
+        if stats is None:
+            stats = self._hold_stats[query_name] = LatencyStats()
+        stats.add(hold_sec * 1000.0)
+
+    def snapshot(self, pool: Any = None) -> Dict[str, Any]:
+        """Сводка по пулу: мгновенные значения + накопленные гистограммы."""
+        size = _pool_int(pool, "size")
+        free = _pool_int(pool, "freesize")
+        return {
+            "pool": {
+                "initialized": pool is not None,
+                "minsize": _pool_int(pool, "minsize"),
+                "maxsize": _pool_int(pool, "maxsize"),
+                "size": size,
+                "free": free,
+                "in_use": size - free if size is not None and free is not None else self.in_use,
+                "waiting": self.waiting,
+                "peak_in_use": self.peak_in_use,
+                "peak_waiting": self.peak_waiting,
+            },
+            "acquire": {
+                **self.acquire_stats.as_dict(),
+                "saturated": self.saturated_acquires,
+            },
+            "hold": {name: stats.as_dict() for name, stats in self._hold_stats.items()},
+        }
+
+    def reset(self) -> None:
+        """Сбрасывает накопленные значения (текущие waiting/in_use сохраняются)."""
+        self.acquire_stats = LatencyStats()
+        self.saturated_acquires = 0
+        self.peak_waiting = self.waiting
+        self.peak_in_use = self.in_use
+        self._hold_stats.clear()
+
+
+pool_metrics = PoolMetrics(
+    slow_acquire_ms=DB_TELEMETRY_CONFIG.get("slow_acquire_ms", 200.0),
+)
@@ -0,0 +1,50 @@
+"""
+Дешёвое определение имени SQL-запроса для логов и телеметрии.
+
+Имя берётся (по приоритету):
+    1. из явного query_name;
+    2. из первого фрейма вне слоя БД: sys._getframe + кеш по code object.
+
+inspect.stack() не используется: он читает исходники для каждого фрейма стека.
+"""
+
+from __future__ import annotations
+
+import sys
+from types import CodeType
+from typing import Any, Dict, Optional
+
+UNKNOWN_QUERY_NAME = "unknown_query"
+
+# Модули слоя БД, которые пропускаем при поиске вызывающего кода.
+_SKIP_MODULES = frozenset({"app.db.manager", __name__, "contextlib", "asyncio.tasks"})
+_MAX_FRAME_DEPTH = 12
+
+_CODE_NAMES: Dict[CodeType, str] = {}
+
+
+def _code_name(frame: Any) -> str:
+    code = frame.f_code
+    cached = _CODE_NAMES.get(code)
+    if cached is None:
+        module = frame.f_globals.get("__name__", "")
+        cached = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        _CODE_NAMES[code] = cached
+    return cached
+
+
+def resolve_query_name(query_name: Optional[str] = None) -> str:
+    """Возвращает имя запроса без построения полного стека."""
+    if query_name:
+        return query_name
+    try:
+        frame = sys._getframe(1)
+    except ValueError:  # pragma: no cover - стек короче ожидаемого
+        return UNKNOWN_QUERY_NAME
+    depth = 0
+    while frame is not None and depth < _MAX_FRAME_DEPTH:
+        if frame.f_globals.get("__name__") not in _SKIP_MODULES:
+            return _code_name(frame)
+        frame = frame.f_back
+        depth += 1
+    return UNKNOWN_QUERY_NAME
@@ -7,21 +7,54 @@ Repository для аналитики операторов и расчета ме
 
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+from time import perf_counter
+from typing import Awaitable, List, Dict, Any, Optional, Set, Tuple
 from datetime import date, datetime, timedelta, time
 
-from app.db.manager import DatabaseManager
+from app.config import DASHBOARD_CONFIG
+
+from app.db.manager import DatabaseManager, ROUTE_REPLICA
 from app.db.models import DashboardMetrics, OperatorRecommendation
 from app.db.repositories.call_analytics_repo import CallAnalyticsRepository
+from app.db.repositories.operator_rollup import (
+    OPERATOR_NAME_SQL,
+    OperatorRollupRepository,
+    RollupCounters,
+)
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
 
+EMPTY_DAILY_STATS: Dict[str, Any] = {
+    'accepted_calls': 0,
+    'records': 0,
+    'leads_no_record': 0,
+    'wish_to_record': 0,
+    'conversion_rate': 0.0,
+}
+
+
+def period_bounds(period_type: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """Границы периода дашборда: 'day' — сегодня, 'week' — с понедельника, иначе — с 1-го числа."""
+    today = today or date.today()
+    if period_type == 'day':
+        return today, today
+    if period_type == 'week':
+        return today - timedelta(days=today.weekday()), today
+    return today.replace(day=1), today
+
 
 class AnalyticsRepository:
+    # Тяжёлые агрегации дашборда читаем с реплики (fallback — основной пул)
+    READ_ROUTE = ROUTE_REPLICA
+
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         self.call_analytics_repo = CallAnalyticsRepository(db_manager)
+        self.rollup_repo = OperatorRollupRepository(db_manager)
+        # Общий лимит одновременных запросов секций дашборда к пулу
+        self._section_semaphore = asyncio.Semaphore(max(1, int(DASHBOARD_CONFIG["query_concurrency"])))
 
     @staticmethod
     def _normalize_period(
@@ -86,7 +119,8 @@ class AnalyticsRepository:
                 result = await self.db_manager.execute_query(
                     query,
                     (period_start, period_end, operator_name, operator_name),
-                    fetchone=True
+                    fetchone=True,
+                    route=self.READ_ROUTE
                 )
             else:
                 # Используем данные из call_analytics
@@ -96,35 +130,15 @@ class AnalyticsRepository:
             
             if not result or result.get('accepted_calls', 0) == 0:
                 logger.warning(f"[ANALYTICS] No call data found for {operator_name} in period {date_from}-{date_to}")
-                return {
-                    'accepted_calls': 0,
-                    'records': 0,
-                    'leads_no_record': 0,
-                    'wish_to_record': 0,
-                    'conversion_rate': 0.0
-                }
-            
-            accepted_calls = result.get('accepted_calls', 0)
-            records = result.get('records', 0)
-            leads_no_record = result.get('leads_no_record', 0)
-            wish_to_record = result.get('wish_to_record', 0)
-            
-            # Конверсия = записи / желающие записаться
-            conversion_rate = (records / wish_to_record * 100) if wish_to_record > 0 else 0.0
-            
+                return dict(EMPTY_DAILY_STATS)
+
+            stats = self._daily_stats_from_row(result)
             logger.info(
                 f"[ANALYTICS] Daily stats calculated: "
-                f"calls={accepted_calls}, records={records}, "
-                f"wish_to_record={wish_to_record}, conversion={conversion_rate:.2f}%"
+                f"calls={stats['accepted_calls']}, records={stats['records']}, "
+                f"wish_to_record={stats['wish_to_record']}, conversion={stats['conversion_rate']:.2f}%"
             )
-            
-            return {
-                'accepted_calls': accepted_calls,
-                'records': records,
-                'leads_no_record': leads_no_record,
-                'wish_to_record': wish_to_record,
-                'conversion_rate': round(conversion_rate, 2)
-            }
+            return stats
         
         except Exception as e:
             logger.error(
@@ -132,13 +146,24 @@ class AnalyticsRepository:
                 exc_info=True
             )
             # Возвращаем пустую статистику при ошибке
-            return {
-                'accepted_calls': 0,
-                'records': 0,
-                'leads_no_record': 0,
-                'wish_to_record': 0,
-                'conversion_rate': 0.0
-            }
+            return dict(EMPTY_DAILY_STATS)
+
+    @staticmethod
+    def _daily_stats_from_row(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Базовая статистика из строки агрегата (call_analytics или call_scores)."""
+        if not result or result.get('accepted_calls', 0) == 0:
+            return dict(EMPTY_DAILY_STATS)
+        records = result.get('records', 0)
+        wish_to_record = result.get('wish_to_record', 0)
+        # Конверсия = записи / желающие записаться
+        conversion_rate = (records / wish_to_record * 100) if wish_to_record > 0 else 0.0
+        return {
+            'accepted_calls': result.get('accepted_calls', 0),
+            'records': records,
+            'leads_no_record': result.get('leads_no_record', 0),
+            'wish_to_record': wish_to_record,
+            'conversion_rate': round(conversion_rate, 2)
+        }
 
     # ========================================================================
     # Метрики качества
@@ -189,14 +214,11 @@ class AnalyticsRepository:
             result = await self.db_manager.execute_query(
                 query,
                 (period_start, period_end, operator_name, operator_name),
-                fetchone=True
+                fetchone=True,
+                route=self.READ_ROUTE
             )
             
-            metrics = {
-                'avg_score_all': round(result.get('avg_score_all', 0) or 0, 2),
-                'avg_score_leads': round(result.get('avg_score_leads', 0) or 0, 2),
-                'avg_score_cancel': round(result.get('avg_score_cancel', 0) or 0, 2)
-            }
+            metrics = self._quality_from_row(result)
             
             logger.info(
                 f"[ANALYTICS] Quality metrics: "
@@ -218,6 +240,15 @@ class AnalyticsRepository:
                 'avg_score_cancel': 0.0
             }
 
+    @staticmethod
+    def _quality_from_row(result: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        result = result or {}
+        return {
+            'avg_score_all': round(result.get('avg_score_all', 0) or 0, 2),
+            'avg_score_leads': round(result.get('avg_score_leads', 0) or 0, 2),
+            'avg_score_cancel': round(result.get('avg_score_cancel', 0) or 0, 2)
+        }
+
     # ========================================================================
     # Метрики отмен
     # ========================================================================
@@ -254,9 +285,15 @@ class AnalyticsRepository:
         result = await self.db_manager.execute_query(
             query,
             (period_start, period_end, operator_name, operator_name),
-            fetchone=True
+            fetchone=True,
+            route=self.READ_ROUTE
         )
         
+        return self._cancellations_from_row(result)
+
+    @staticmethod
+    def _cancellations_from_row(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        result = result or {}
         cancel_calls = result.get('cancel_calls', 0) or 0
         reschedule_calls = result.get('reschedule_calls', 0) or 0
         total_cancel_flow = cancel_calls + reschedule_calls
@@ -322,9 +359,15 @@ class AnalyticsRepository:
         result = await self.db_manager.execute_query(
             query,
             (period_start, period_end, operator_name, operator_name),
-            fetchone=True
+            fetchone=True,
+            route=self.READ_ROUTE
         )
         
+        return self._time_from_row(result)
+
+    @staticmethod
+    def _time_from_row(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        result = result or {}
         return {
             'avg_talk_all': int(result.get('avg_talk_all', 0) or 0),
             'total_talk_time': int(result.get('total_talk_time', 0) or 0),
@@ -370,9 +413,15 @@ class AnalyticsRepository:
         result = await self.db_manager.execute_query(
             query,
             (period_start, period_end, operator_name, operator_name),
-            fetchone=True
+            fetchone=True,
+            route=self.READ_ROUTE
         )
         
+        return self._complaints_from_row(result)
+
+    @staticmethod
+    def _complaints_from_row(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        result = result or {}
         return {
             'complaint_calls': result.get('complaint_calls', 0) or 0,
             'avg_score_complaint': round(result.get('avg_score_complaint', 0) or 0, 2)
@@ -400,28 +449,27 @@ class AnalyticsRepository:
         logger.info(f"[ANALYTICS] Building dashboard: operator={operator_name}, period={period_type}")
         
         try:
-            # Определяем период
-            today = date.today()
-            if period_type == 'day':
-                date_from = today
-                date_to = today
-            elif period_type == 'week':
-                date_from = today - timedelta(days=today.weekday())
-                date_to = today
-            else:  # month
-                date_from = today.replace(day=1)
-                date_to = today
+            date_from, date_to = period_bounds(period_type)
             
             logger.debug(f"[ANALYTICS] Period calculated: {date_from} to {date_to}")
+
+            if DASHBOARD_CONFIG["use_rollup"]:
+                dashboards = await self._rollup_dashboards(date_from, date_to, period_type, operator_name)
+                if dashboards:
+                    return dashboards[0]
+                return self._dashboard_from_rows(operator_name, period_type, date_from, date_to, None, None)
             
-            # Собираем все метрики параллельно
+            # Собираем все метрики параллельно (не больше query_concurrency запросов сразу)
             logger.debug(f"[ANALYTICS] Fetching metrics for {operator_name}...")
             
-            stats = await self.get_operator_daily_stats(operator_name, date_from, date_to)
-            quality = await self.get_quality_metrics(operator_name, date_from, date_to)
-            cancellations = await self.get_cancellation_metrics(operator_name, date_from, date_to)
-            time_metrics = await self.get_time_metrics(operator_name, date_from, date_to)
-            complaints = await self.get_complaint_metrics(operator_name, date_from, date_to)
+            started = perf_counter()
+            sections, timings = await self._gather_sections({
+                'stats': self.get_operator_daily_stats(operator_name, date_from, date_to),
+                'quality': self.get_quality_metrics(operator_name, date_from, date_to),
+                'cancellations': self.get_cancellation_metrics(operator_name, date_from, date_to),
+                'time': self.get_time_metrics(operator_name, date_from, date_to),
+                'complaints': self.get_complaint_metrics(operator_name, date_from, date_to),
+            })
             
             # Объединяем в один dict
             dashboard: DashboardMetrics = {
@@ -429,16 +477,18 @@ class AnalyticsRepository:
                 'period_type': period_type,
                 'period_start': date_from.isoformat(),
                 'period_end': date_to.isoformat(),
-                **stats,
-                **quality,
-                **cancellations,
-                **time_metrics,
-                **complaints
+                **sections['stats'],
+                **sections['quality'],
+                **sections['cancellations'],
+                **sections['time'],
+                **sections['complaints']
             }
             
             logger.info(
                 f"[ANALYTICS] Dashboard built successfully for {operator_name}: "
-                f"calls={dashboard.get('accepted_calls')}, conversion={dashboard.get('conversion_rate')}%"
+                f"calls={dashboard.get('accepted_calls')}, conversion={dashboard.get('conversion_rate')}%, "
+                f"total={(perf_counter() - started) * 1000:.1f}ms, "
+                + ", ".join(f"{name}={elapsed:.1f}ms" for name, elapsed in timings.items())
             )
             
             return dashboard
@@ -451,6 +501,38 @@ class AnalyticsRepository:
             # Возвращаем пустой дашборд при критической ошибке
             raise
 
+    async def _gather_sections(
+        self,
+        sections: Dict[str, Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, float]]:
+        """
+        Выполняет независимые секции дашборда одновременно.
+
+        Returns:
+            (результат по секциям, время каждой секции в мс — с ожиданием слота пула)
+
+        Ошибка любой секции пробрасывается после завершения остальных.
+        """
+        timings: Dict[str, float] = {}
+
+        async def _run(name: str, section: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+            started = perf_counter()
+            try:
+                async with self._section_semaphore:
+                    return await section
+            finally:
+                timings[name] = (perf_counter() - started) * 1000
+
+        names = list(sections)
+        results = await asyncio.gather(
+            *(_run(name, section) for name, section in sections.items()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return dict(zip(names, results)), {name: round(timings[name], 1) for name in names}
+
     async def get_live_dashboard_all_operators(
         self,
         period_type: str = 'day',
@@ -458,43 +540,238 @@ class AnalyticsRepository:
     ) -> Tuple[List[DashboardMetrics], int]:
         """
         Получить сводный дашборд по всем операторам.
-        
+
+        Все пять семейств метрик считаются для всех операторов сразу
+        (get_dashboards_for_period), без запросов на каждого оператора.
+        В сводку попадают операторы, у которых были звонки за период.
+
         Returns:
-            Список DashboardMetrics для каждого оператора
+            (DashboardMetrics по операторам в алфавитном порядке, всего операторов)
         """
-        # Получаем список уникальных операторов
-        operator_case = """
-            CASE 
-                WHEN context_type = 'входящий' THEN called_info
-                ELSE caller_info
-            END
+        date_from, date_to = period_bounds(period_type)
+        dashboards = await self.get_dashboards_for_period(date_from, date_to, period_type)
+        total_count = len(dashboards)
+        if limit:
+            dashboards = dashboards[:limit]
+        return dashboards, total_count
+
+    async def get_dashboards_for_period(
+        self,
+        date_from: date,
+        date_to: date,
+        period_type: str = 'day',
+    ) -> List[DashboardMetrics]:
         """
-        query = f"""
-        SELECT DISTINCT
-            {operator_case} as operator_name
+        Дашборды всех операторов за период двумя GROUP BY запросами.
+
+        call_scores дает качество, отмены, время и жалобы (и запасную базовую
+        статистику), call_analytics — базовую статистику, как в
+        get_operator_daily_stats. Поля и их расчет совпадают с
+        get_live_dashboard_single.
+        """
+        if DASHBOARD_CONFIG["use_rollup"]:
+            return await self._rollup_dashboards(date_from, date_to, period_type)
+
+        period_start, period_end = self._normalize_period(date_from, date_to)
+        logger.info(f"[ANALYTICS] Building dashboards for all operators: period={date_from} to {date_to}")
+
+        scores_query = f"""
+        SELECT
+            {OPERATOR_NAME_SQL} AS operator_name,
+            COUNT(*) AS accepted_calls,
+            SUM(CASE WHEN outcome = 'record' AND is_target = 1 THEN 1 ELSE 0 END) AS records,
+            SUM(CASE WHEN outcome = 'lead_no_record' AND is_target = 1 THEN 1 ELSE 0 END) AS leads_no_record,
+            SUM(CASE WHEN outcome IN ('record','lead_no_record') AND is_target = 1 THEN 1 ELSE 0 END) AS wish_to_record,
+            AVG(CASE WHEN call_score IS NOT NULL THEN call_score END) AS avg_score_all,
+            AVG(CASE
+                WHEN call_score IS NOT NULL
+                AND is_target = 1
+                AND outcome IN ('record','lead_no_record')
+                THEN call_score
+            END) AS avg_score_leads,
+            AVG(CASE
+                WHEN call_score IS NOT NULL
+                AND call_category = 'Отмена записи'
+                AND is_target = 1
+                THEN call_score
+            END) AS avg_score_cancel,
+            SUM(CASE WHEN call_category = 'Отмена записи' AND is_target = 1 THEN 1 ELSE 0 END) AS cancel_calls,
+            SUM(CASE WHEN call_category = 'Перенос записи' AND is_target = 1 THEN 1 ELSE 0 END) AS reschedule_calls,
+            AVG(CASE WHEN talk_duration > 10 THEN talk_duration END) AS avg_talk_all,
+            SUM(CASE WHEN talk_duration > 0 THEN talk_duration ELSE 0 END) AS total_talk_time,
+            AVG(CASE
+                WHEN talk_duration > 10
+                AND call_category = 'Запись на услугу (успешная)'
+                THEN talk_duration
+            END) AS avg_talk_record,
+            AVG(CASE
+                WHEN talk_duration > 10
+                AND call_category = 'Навигация'
+                THEN talk_duration
+            END) AS avg_talk_navigation,
+            AVG(CASE
+                WHEN talk_duration > 10
+                AND call_category = 'Спам, реклама'
+                THEN talk_duration
+            END) AS avg_talk_spam,
+            SUM(CASE WHEN call_category = 'Жалоба' AND is_target = 1 THEN 1 ELSE 0 END) AS complaint_calls,
+            AVG(CASE WHEN call_category = 'Жалоба' AND is_target = 1 THEN call_score END) AS avg_score_complaint
         FROM call_scores
-        HAVING operator_name IS NOT NULL 
+        WHERE call_date BETWEEN %s AND %s
+          AND call_type = 'принятый'
+        GROUP BY operator_name
+        HAVING operator_name IS NOT NULL
            AND operator_name != ''
-        ORDER BY operator_name
         """
-        
-        operators_result = await self.db_manager.execute_query(query, fetchall=True)
-        if not operators_result:
-            return [], 0
+        analytics_query = """
+        SELECT
+            operator_name,
+            COUNT(*) AS accepted_calls,
+            SUM(CASE WHEN is_target = 1 AND outcome = 'record' THEN 1 ELSE 0 END) AS records,
+            SUM(CASE WHEN is_target = 1 AND outcome = 'lead_no_record' THEN 1 ELSE 0 END) AS leads_no_record,
+            SUM(CASE WHEN is_target = 1 AND outcome IN ('record', 'lead_no_record') THEN 1 ELSE 0 END) AS wish_to_record
+        FROM call_analytics
+        WHERE call_date BETWEEN %s AND %s
+          AND operator_name IS NOT NULL
+          AND operator_name != ''
+        GROUP BY operator_name
+        """
+
+        score_rows = await self.db_manager.execute_query(
+            scores_query,
+            (period_start, period_end),
+            fetchall=True,
+            query_name="analytics.dashboard_all.call_scores",
+            route=self.READ_ROUTE,
+        ) or []
+        scores_by_operator = {row['operator_name']: row for row in score_rows}
+
+        try:
+            analytics_rows = await self.db_manager.execute_query(
+                analytics_query,
+                (period_start, period_end),
+                fetchall=True,
+                query_name="analytics.dashboard_all.call_analytics",
+                route=self.READ_ROUTE,
+            ) or []
+            stats_by_operator: Optional[Dict[str, Dict[str, Any]]] = {
+                row['operator_name']: row for row in analytics_rows
+            }
+        except Exception as e:
+            # Как в get_operator_daily_stats: без call_analytics берем статистику из call_scores
+            logger.warning(f"[ANALYTICS] call_analytics unavailable, falling back to call_scores: {e}")
+            stats_by_operator = None
+
+        operators = set(scores_by_operator)
+        if stats_by_operator is not None:
+            operators.update(stats_by_operator)
 
-        total_count = len(operators_result)
-        if limit:
-            operators_result = operators_result[:limit]
-        
-        # Получаем дашборд для каждого оператора
         dashboards: List[DashboardMetrics] = []
-        for row in operators_result:
-            operator_name = row.get('operator_name')
-            if operator_name:
-                dashboard = await self.get_live_dashboard_single(operator_name, period_type)
-                dashboards.append(dashboard)
-        
-        return dashboards, total_count
+        for operator_name in sorted(operators):
+            scores = scores_by_operator.get(operator_name)
+            stats_row = scores if stats_by_operator is None else stats_by_operator.get(operator_name)
+            dashboards.append(
+                self._dashboard_from_rows(operator_name, period_type, date_from, date_to, stats_row, scores)
+            )
+
+        logger.info(f"[ANALYTICS] Dashboards built for {len(dashboards)} operators")
+        return dashboards
+
+    async def get_call_scores_watermark(self) -> int:
+        """Последний call_scores.id (точка отсчета для get_operators_with_new_calls)."""
+        row = await self.db_manager.execute_query(
+            "SELECT MAX(id) AS max_id FROM call_scores",
+            fetchone=True,
+            route=self.READ_ROUTE,
+        )
+        return int((row or {}).get('max_id') or 0)
+
+    async def get_operators_with_new_calls(self, after_id: int) -> Tuple[Set[str], int]:
+        """
+        Операторы, у которых появились принятые звонки в call_scores после after_id.
+
+        Returns:
+            (имена операторов, новый watermark)
+        """
+        query = f"""
+        SELECT
+            {OPERATOR_NAME_SQL} AS operator_name,
+            MAX(id) AS max_id
+        FROM call_scores
+        WHERE id > %s
+          AND call_type = 'принятый'
+        GROUP BY operator_name
+        """
+        rows = await self.db_manager.execute_query(
+            query,
+            (after_id,),
+            fetchall=True,
+            route=self.READ_ROUTE,
+        ) or []
+        operators = {row['operator_name'] for row in rows if row.get('operator_name')}
+        watermark = max([after_id, *(int(row.get('max_id') or 0) for row in rows)])
+        return operators, watermark
+
+    async def _rollup_dashboards(
+        self,
+        date_from: date,
+        date_to: date,
+        period_type: str,
+        operator_name: Optional[str] = None,
+    ) -> List[DashboardMetrics]:
+        """
+        Дашборды из operator_daily_rollup: сумма дневных строк (не больше 31 на оператора).
+
+        Закрытые дни берутся из rollup, текущий день — из call_scores теми же
+        ячейками, что пишет rollup (он еще дописывается). Базовая статистика
+        здесь считается по call_scores, как запасной путь get_operator_daily_stats.
+        """
+        today = date.today()
+        totals: Dict[str, RollupCounters] = {}
+
+        def _add(rows: Dict[Tuple[str, date], RollupCounters]) -> None:
+            for (name, _), counters in rows.items():
+                totals.setdefault(name, RollupCounters()).add(counters)
+
+        closed_to = min(date_to, today - timedelta(days=1))
+        if date_from <= closed_to:
+            _add(await self.rollup_repo.load(date_from, closed_to, operator_name))
+        if date_to >= today:
+            _add(await self.rollup_repo.compute(
+                max(date_from, today), date_to, operator_name, route=self.READ_ROUTE
+            ))
+
+        dashboards: List[DashboardMetrics] = []
+        for name in sorted(totals):
+            row = totals[name].as_aggregate_row()
+            dashboards.append(self._dashboard_from_rows(name, period_type, date_from, date_to, row, row))
+        logger.info(
+            f"[ANALYTICS] Dashboards built from rollup for {len(dashboards)} operators: "
+            f"period={date_from} to {date_to}"
+        )
+        return dashboards
+
+    def _dashboard_from_rows(
+        self,
+        operator_name: str,
+        period_type: str,
+        date_from: date,
+        date_to: date,
+        stats_row: Optional[Dict[str, Any]],
+        scores_row: Optional[Dict[str, Any]],
+    ) -> DashboardMetrics:
+        """Дашборд из строки базовой статистики и строки агрегатов call_scores."""
+        return {
+            'operator_name': operator_name,
+            'period_type': period_type,
+            'period_start': date_from.isoformat(),
+            'period_end': date_to.isoformat(),
+            **self._daily_stats_from_row(stats_row),
+            **self._quality_from_row(scores_row),
+            **self._cancellations_from_row(scores_row),
+            **self._time_from_row(scores_row),
+            **self._complaints_from_row(scores_row),
+        }
 
     # ========================================================================
     # Звонки для рекомендаций
@@ -548,7 +825,8 @@ class AnalyticsRepository:
         result = await self.db_manager.execute_query(
             query,
             (period_start, period_end, operator_name, operator_name, limit),
-            fetchall=True
+            fetchall=True,
+            route=self.READ_ROUTE
         )
         
         return result or []
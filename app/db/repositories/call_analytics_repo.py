@@ -13,7 +13,7 @@ import traceback
 from typing import List, Dict, Any, Optional
 from datetime import date, datetime, time
 
-from app.db.manager import DatabaseManager
+from app.db.manager import DatabaseManager, ROUTE_REPLICA
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
@@ -27,7 +27,11 @@ class CallAnalyticsRepository:
     - Агрегаций по операторам
     - Тяжелых выборок для дашбордов
     - Статистики за периоды
+
+    Чтения идут в read-реплику (READ_ROUTE), если она настроена.
     """
+
+    READ_ROUTE = ROUTE_REPLICA
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
@@ -90,7 +94,8 @@ class CallAnalyticsRepository:
             results = await self.db.execute_with_retry(
                 query,
                 params=(operator_name, period_start, period_end),
-                fetchall=True
+                fetchall=True,
+                route=self.READ_ROUTE
             ) or []
             
             logger.info(f"[CALL_ANALYTICS] Found {len(results)} calls")
@@ -140,7 +145,8 @@ class CallAnalyticsRepository:
             results = await self.db.execute_with_retry(
                 query,
                 params=(period_start, period_end),
-                fetchall=True
+                fetchall=True,
+                route=self.READ_ROUTE
             ) or []
             
             logger.info(f"[CALL_ANALYTICS] Found {len(results)} total calls")
@@ -196,7 +202,7 @@ class CallAnalyticsRepository:
                 params = (history_id,)
             
             result = await self.db.execute_with_retry(
-                query, params=params, fetchone=True
+                query, params=params, fetchone=True, route=self.READ_ROUTE
             )
             
             if result:
@@ -259,7 +265,8 @@ class CallAnalyticsRepository:
             result = await self.db.execute_with_retry(
                 query,
                 params=(operator_name, period_start, period_end),
-                fetchone=True
+                fetchone=True,
+                route=self.READ_ROUTE
             )
             
             if not result:
@@ -357,7 +364,7 @@ class CallAnalyticsRepository:
                 params = None
             
             results = await self.db.execute_with_retry(
-                query, params=params, fetchall=True
+                query, params=params, fetchall=True, route=self.READ_ROUTE
             ) or []
             
             operators = [row['operator_name'] for row in results if row.get('operator_name')]
@@ -408,7 +415,7 @@ class CallAnalyticsRepository:
             """
             
             result = await self.db.execute_with_retry(
-                query, params=tuple(params) if params else None, fetchone=True
+                query, params=tuple(params) if params else None, fetchone=True, route=self.READ_ROUTE
             )
             
             count = result.get('count', 0) if result else 0
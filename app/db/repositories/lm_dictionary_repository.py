@@ -2,7 +2,8 @@
 Репозиторий для словарей и срабатываний LM rule-engine.
 """
 
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from datetime import datetime, timedelta
 
 from app.db.manager import DatabaseManager
@@ -10,6 +11,108 @@ from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
 
+LM_HIT_COLUMNS = (
+    "history_id", "dict_code", "term", "match_type", "weight",
+    "hit_count", "snippet", "dict_version", "detected_at",
+)
+LM_HIT_ROW_PLACEHOLDER = "(" + ", ".join(["%s"] * len(LM_HIT_COLUMNS)) + ")"
+LM_HIT_UPSERT_TEMPLATE = """
+        INSERT INTO lm_dictionary_hits (
+            history_id, dict_code, term, match_type, weight,
+            hit_count, snippet, dict_version, detected_at
+        ) VALUES {values} AS new
+        ON DUPLICATE KEY UPDATE
+            match_type = new.match_type,
+            weight = new.weight,
+            hit_count = new.hit_count,
+            snippet = new.snippet,
+            detected_at = new.detected_at
+        """
+LM_HIT_CHUNK_SIZE = 500
+
+HitRow = Tuple[Any, ...]
+HitKey = Tuple[int, str, str, str]
+# Хиты одного звонка по одному словарю: (history_id, dict_code, dict_version)
+HitScope = Tuple[int, str, str]
+
+
+def hit_key(row: HitRow) -> HitKey:
+    """Уникальный ключ строки lm_dictionary_hits: (history_id, dict_code, term, dict_version)."""
+    return row[0], row[1], row[2], row[7]
+
+
+def hit_scope(row: HitRow) -> HitScope:
+    return row[0], row[1], row[7]
+
+
+def stale_hit_deletes(
+    scopes: Iterable[HitScope],
+    rows: Sequence[HitRow],
+    chunk_size: int = LM_HIT_CHUNK_SIZE,
+) -> Iterator[Tuple[str, Tuple[Any, ...]]]:
+    """
+    DELETE-запросы для хитов пересчитанных звонков, термов которых нет в rows.
+
+    Звонки группируются по (dict_code, dict_version) и режутся на пачки по
+    chunk_size; для звонка без новых хитов удаляются все его строки.
+    """
+    kept: Dict[Tuple[str, str], Set[Tuple[int, str]]] = defaultdict(set)
+    for row in rows:
+        kept[(row[1], row[7])].add((row[0], row[2]))
+    grouped: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for history_id, dict_code, dict_version in sorted(set(scopes)):
+        grouped[(dict_code, dict_version)].append(history_id)
+
+    for (dict_code, dict_version), history_ids in grouped.items():
+        for offset in range(0, len(history_ids), chunk_size):
+            ids = history_ids[offset:offset + chunk_size]
+            id_set = set(ids)
+            keep = sorted(pair for pair in kept[(dict_code, dict_version)] if pair[0] in id_set)
+            query = (
+                "DELETE FROM lm_dictionary_hits "
+                "WHERE dict_code = %s AND dict_version = %s "
+                f"AND history_id IN ({', '.join(['%s'] * len(ids))})"
+            )
+            params: List[Any] = [dict_code, dict_version, *ids]
+            if keep:
+                query += f" AND (history_id, term) NOT IN ({', '.join(['(%s, %s)'] * len(keep))})"
+                params.extend(value for pair in keep for value in pair)
+            yield query, tuple(params)
+
+
+def build_hit_rows(
+    history_id: int,
+    dict_code: str,
+    hits: Optional[List[Dict[str, Any]]],
+    dict_version: str,
+) -> List[HitRow]:
+    """Строки lm_dictionary_hits (порядок колонок — LM_HIT_COLUMNS) из хитов словаря."""
+    rows: List[HitRow] = []
+    for hit in hits or ():
+        if not hit.get("term"):
+            continue
+        detected_raw = hit.get("detected_at")
+        if isinstance(detected_raw, str):
+            try:
+                detected_at = datetime.fromisoformat(detected_raw)
+            except ValueError:
+                detected_at = datetime.utcnow()
+        else:
+            detected_at = detected_raw or datetime.utcnow()
+
+        rows.append((
+            history_id,
+            dict_code,
+            hit.get("term"),
+            hit.get("match_type", "phrase"),
+            int(hit.get("weight") or 0),
+            int(hit.get("hit_count") or 1),
+            hit.get("snippet"),
+            dict_version,
+            detected_at,
+        ))
+    return rows
+
 
 class LMDictionaryRepository:
     """Работа с lm_dictionary_terms и lm_dictionary_hits."""
@@ -61,62 +164,66 @@ class LMDictionaryRepository:
         hits: List[Dict[str, Any]],
         dict_version: str,
     ) -> None:
-        """Сохраняет факты срабатывания словаря для звонка."""
-        if not hits:
-            return
-
-        insert_query = """
-            INSERT INTO lm_dictionary_hits (
+        """Сохраняет факты срабатывания словаря для звонка (заменяя прежний набор термов)."""
+        rows = build_hit_rows(history_id, dict_code, hits, dict_version)
+        try:
+            await self.save_hit_rows(rows, replace_scopes=[(history_id, dict_code, dict_version)])
+        except Exception:
+            logger.exception(
+                "Не удалось сохранить словарные хиты history_id=%s (hits=%s)",
                 history_id,
-                dict_code,
-                term,
-                match_type,
-                weight,
-                hit_count,
-                snippet,
-                dict_version,
-                detected_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s
+                len(rows),
             )
+
+    async def save_hit_rows(
+        self,
+        rows: Sequence[HitRow],
+        *,
+        replace_scopes: Optional[Iterable[HitScope]] = None,
+        chunk_size: int = LM_HIT_CHUNK_SIZE,
+    ) -> int:
         """
+        Идемпотентно пишет хиты одного или многих звонков multi-row upsert'ом.
 
-        for hit in hits:
-            if not hit.get("term"):
-                continue
-            detected_raw = hit.get("detected_at")
-            if isinstance(detected_raw, str):
-                try:
-                    detected_at = datetime.fromisoformat(detected_raw)
-                except ValueError:
-                    detected_at = datetime.utcnow()
-            else:
-                detected_at = detected_raw or datetime.utcnow()
-
-            params = (
-                history_id,
-                dict_code,
-                hit.get("term"),
-                hit.get("match_type", "phrase"),
-                int(hit.get("weight") or 0),
-                int(hit.get("hit_count") or 1),
-                hit.get("snippet"),
-                dict_version,
-                detected_at,
-            )
-            try:
+        Ключ — (history_id, dict_code, term, dict_version): повторный расчет
+        обновляет существующую строку, а не добавляет новую.
+
+        replace_scopes — пересчитанные звонки (history_id, dict_code, dict_version):
+        их строки с термами не из rows удаляются в той же транзакции, что и upsert,
+        чтобы lm_dictionary_hits совпадал с последним расчетом.
+
+        Returns:
+            Количество отправленных строк
+        """
+        chunk_size = max(1, int(chunk_size or LM_HIT_CHUNK_SIZE))
+        scopes = list(replace_scopes or ())
+        if not scopes:
+            for query, params in self._upsert_chunks(rows, chunk_size):
                 await self.db_manager.execute_with_retry(
-                    insert_query,
+                    query,
                     params,
                     commit=True,
-                    query_name="lm_dictionary.save_hit",
-                )
-            except Exception:
-                logger.exception(
-                    "Не удалось сохранить словарный хит history_id=%s term=%s",
-                    history_id,
-                    hit.get("term"),
+                    query_name="lm_dictionary.save_hits",
                 )
+            return len(rows)
+
+        async def _work(tx) -> int:
+            for query, params in stale_hit_deletes(scopes, rows, chunk_size):
+                await tx.execute(query, params, query_name="lm_dictionary.delete_stale_hits")
+            for query, params in self._upsert_chunks(rows, chunk_size):
+                await tx.execute(query, params, query_name="lm_dictionary.save_hits")
+            return len(rows)
+
+        return await self.db_manager.run_in_transaction(_work, query_name="lm_dictionary.save_hits")
+
+    @staticmethod
+    def _upsert_chunks(rows: Sequence[HitRow], chunk_size: int) -> Iterator[Tuple[str, Tuple[Any, ...]]]:
+        for offset in range(0, len(rows), chunk_size):
+            chunk = rows[offset:offset + chunk_size]
+            query = LM_HIT_UPSERT_TEMPLATE.format(
+                values=", ".join([LM_HIT_ROW_PLACEHOLDER] * len(chunk))
+            )
+            yield query, tuple(param for row in chunk for param in row)
 
     async def get_recent_hits(
         self,
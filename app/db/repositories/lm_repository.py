@@ -11,7 +11,7 @@ from zoneinfo import ZoneInfo
 import json
 import aiomysql
 
-from app.db.manager import DatabaseManager
+from app.db.manager import DatabaseManager, ROUTE_REPLICA
 from app.db.models import LMValueRecord
 from app.logging_config import get_watchdog_logger
 from app.utils.periods import calculate_period_bounds
@@ -61,6 +61,36 @@ LOSS_EXCLUDED_CATEGORIES = (
 )
 
 
+LM_VALUE_COLUMNS = (
+    "history_id", "call_score_id", "metric_code", "metric_group",
+    "value_numeric", "value_label", "value_json",
+    "lm_version", "calc_profile", "calc_method", "calc_source",
+    "calculated_at",
+)
+LM_VALUE_ROW_PLACEHOLDER = "(" + ", ".join(["%s"] * len(LM_VALUE_COLUMNS)) + ")"
+LM_VALUE_UPSERT_TEMPLATE = """
+        INSERT INTO lm_value (
+            history_id, call_score_id, metric_code, metric_group,
+            value_numeric, value_label, value_json,
+            lm_version, calc_profile, calc_method, calc_source,
+            calculated_at
+        ) VALUES {values} AS new
+        ON DUPLICATE KEY UPDATE
+            call_score_id = new.call_score_id,
+            value_numeric = new.value_numeric,
+            value_label = new.value_label,
+            value_json = new.value_json,
+            lm_version = new.lm_version,
+            calc_profile = new.calc_profile,
+            calc_method = new.calc_method,
+            calc_source = new.calc_source,
+            calculated_at = new.calculated_at,
+            updated_at = CURRENT_TIMESTAMP
+        """
+# Ограничение размера одного multi-row INSERT (max_allowed_packet, длина SQL).
+LM_BULK_CHUNK_SIZE = 500
+
+
 class LMRepository:
     """Репозиторий для работы с таблицей lm_value."""
     
@@ -99,43 +129,20 @@ class LMRepository:
         Returns:
             ID созданной или обновленной записи
         """
-        # Validate: at least one value must be provided
-        if value_numeric is None and value_label is None and value_json is None:
-            raise ValueError(f"At least one value must be provided for metric {metric_code}")
-        
-        value_numeric = self._sanitize_value_numeric(value_numeric, metric_code, history_id)
-        # Convert value_json to JSON string if provided
-        value_json_str = json.dumps(value_json) if value_json else None
-        
-        query = """
-        INSERT INTO lm_value (
-            history_id, call_score_id, metric_code, metric_group,
-            value_numeric, value_label, value_json,
-            lm_version, calc_profile, calc_method, calc_source,
-            calculated_at
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        ) AS new
-        ON DUPLICATE KEY UPDATE
-            call_score_id = new.call_score_id,
-            value_numeric = new.value_numeric,
-            value_label = new.value_label,
-            value_json = new.value_json,
-            lm_version = new.lm_version,
-            calc_profile = new.calc_profile,
-            calc_method = new.calc_method,
-            calc_source = new.calc_source,
-            calculated_at = new.calculated_at,
-            updated_at = CURRENT_TIMESTAMP
-        """
-        
-        calculated_at = datetime.utcnow()
-        params = (
-            history_id, call_score_id, metric_code, metric_group,
-            value_numeric, value_label, value_json_str,
-            lm_version, calc_profile, calc_method, calc_source,
-            calculated_at
+        params = self._build_lm_value_params(
+            history_id=history_id,
+            metric_code=metric_code,
+            metric_group=metric_group,
+            lm_version=lm_version,
+            calc_method=calc_method,
+            value_numeric=value_numeric,
+            value_label=value_label,
+            value_json=value_json,
+            call_score_id=call_score_id,
+            calc_source=calc_source,
+            calc_profile=calc_profile,
         )
+        query = LM_VALUE_UPSERT_TEMPLATE.format(values=LM_VALUE_ROW_PLACEHOLDER)
         
         try:
             result = await self.db_manager.execute_with_retry(query, params)
@@ -181,11 +188,15 @@ class LMRepository:
         raise RuntimeError(f"Failed to save LM value for {metric_code}")
 
     @staticmethod
-    def _sanitize_value_numeric(
+    def normalize_value_numeric(
         value_numeric: Optional[float],
         metric_code: str,
         history_id: int,
     ) -> Optional[float]:
+        """
+        Приводит value_numeric к виду, в котором он хранится в lm_value
+        (DECIMAL(10,4), диапазон по типу метрики); None для NaN/Infinity/мусора.
+        """
         if value_numeric is None:
             return None
         try:
@@ -217,21 +228,140 @@ class LMRepository:
         value = value.quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
         return float(value)
 
+    # Прежнее имя
+    _sanitize_value_numeric = normalize_value_numeric
+
+    @classmethod
+    def _build_lm_value_params(
+        cls,
+        history_id: int,
+        metric_code: str,
+        metric_group: str,
+        lm_version: str,
+        calc_method: str,
+        value_numeric: Optional[float] = None,
+        value_label: Optional[str] = None,
+        value_json: Optional[Dict[str, Any]] = None,
+        call_score_id: Optional[int] = None,
+        calc_source: Optional[str] = None,
+        calc_profile: str = "default_v1",
+        calculated_at: Optional[datetime] = None,
+    ) -> Tuple[Any, ...]:
+        """Валидирует значение метрики и собирает параметры строки lm_value."""
+        # Validate: at least one value must be provided
+        if value_numeric is None and value_label is None and value_json is None:
+            raise ValueError(f"At least one value must be provided for metric {metric_code}")
+
+        value_numeric = cls.normalize_value_numeric(value_numeric, metric_code, history_id)
+        # Convert value_json to JSON string if provided
+        value_json_str = json.dumps(value_json) if value_json else None
+
+        return (
+            history_id, call_score_id, metric_code, metric_group,
+            value_numeric, value_label, value_json_str,
+            lm_version, calc_profile, calc_method, calc_source,
+            calculated_at or datetime.utcnow(),
+        )
+
+    async def save_lm_values_bulk(
+        self,
+        values: List[Dict[str, Any]],
+        *,
+        chunk_size: int = LM_BULK_CHUNK_SIZE,
+    ) -> List[Dict[str, Any]]:
+        """
+        Сохраняет метрики LM multi-row upsert'ом без повторных SELECT id.
+
+        Все строки одного чанка уходят одним INSERT ... VALUES (...), (...)
+        ON DUPLICATE KEY UPDATE, то есть атомарно и за один round trip.
+        Подходит как для метрик одного звонка, так и для батча звонков воркера.
+
+        Args:
+            values: Список словарей с полями для save_lm_value
+            chunk_size: Максимум строк в одном INSERT
+
+        Returns:
+            Статус по каждой входной строке (в исходном порядке):
+            {"history_id", "metric_code", "status": "saved"|"invalid"|"failed", "error"?}
+        """
+        statuses: List[Dict[str, Any]] = []
+        pending: List[Tuple[int, Tuple[Any, ...]]] = []
+        calculated_at = datetime.utcnow()
+
+        for idx, value_data in enumerate(values or []):
+            status: Dict[str, Any] = {
+                "history_id": value_data.get("history_id") if isinstance(value_data, dict) else None,
+                "metric_code": value_data.get("metric_code") if isinstance(value_data, dict) else None,
+                "status": "invalid",
+            }
+            statuses.append(status)
+            try:
+                params = self._build_lm_value_params(**{"calculated_at": calculated_at, **value_data})
+            except (TypeError, ValueError, KeyError) as exc:
+                logger.warning(
+                    "Skipping LM payload #%s because of invalid input: %s",
+                    idx,
+                    exc,
+                )
+                status["error"] = str(exc)
+                continue
+            pending.append((idx, params))
+
+        chunk_size = max(1, int(chunk_size or LM_BULK_CHUNK_SIZE))
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            query = LM_VALUE_UPSERT_TEMPLATE.format(
+                values=", ".join([LM_VALUE_ROW_PLACEHOLDER] * len(chunk))
+            )
+            flat_params = tuple(param for _, row_params in chunk for param in row_params)
+            try:
+                await self.db_manager.execute_with_retry(
+                    query,
+                    flat_params,
+                    commit=True,
+                    query_name="lm_value.bulk_upsert",
+                )
+            except Exception as exc:
+                logger.error(
+                    "Failed to bulk upsert %s LM values (chunk offset=%s): %s",
+                    len(chunk),
+                    offset,
+                    exc,
+                )
+                for idx, _ in chunk:
+                    statuses[idx]["status"] = "failed"
+                    statuses[idx]["error"] = str(exc)
+                continue
+            for idx, _ in chunk:
+                statuses[idx]["status"] = "saved"
+
+        saved = sum(1 for status in statuses if status["status"] == "saved")
+        logger.info("Bulk saved %s/%s LM values", saved, len(statuses))
+        return statuses
+
     async def save_lm_values_batch(
         self,
-        values: List[Dict[str, Any]]
+        values: List[Dict[str, Any]],
+        *,
+        bulk: bool = False,
     ) -> int:
         """
         Пакетное сохранение метрик LM.
         
         Args:
             values: Список словарей с полями для save_lm_value
+            bulk: Писать одним multi-row upsert (см. save_lm_values_bulk)
+                  вместо построчного save_lm_value
             
         Returns:
             Количество сохраненных записей
         """
         if not values:
             return 0
+
+        if bulk:
+            statuses = await self.save_lm_values_bulk(values)
+            return sum(1 for status in statuses if status["status"] == "saved")
         
         saved_count = 0
         for idx, value_data in enumerate(values):
@@ -352,6 +482,7 @@ class LMRepository:
             query,
             tuple(params),
             fetchall=True,
+            route=ROUTE_REPLICA,
         ) or []
         return rows
 
@@ -400,6 +531,7 @@ class LMRepository:
             query,
             tuple(params),
             fetchone=True,
+            route=ROUTE_REPLICA,
         ) or {}
         return row
 
@@ -694,6 +826,7 @@ class LMRepository:
                 flag_query,
                 tuple(LM_FLAG_METRICS) + (start_date,),
                 fetchall=True,
+                route=ROUTE_REPLICA,
             ) or []
             for row in flag_rows:
                 bucket = ensure_period(row)
@@ -1224,6 +1357,106 @@ class LMRepository:
         logger.info(f"Deleted LM values for history_id={history_id}")
         return result if result else 0
 
+    async def delete_lm_metrics(self, history_id: int, metric_codes: List[str]) -> int:
+        """
+        Удаляет отдельные метрики звонка (устаревшие после пересчета).
+
+        Returns:
+            Количество удаленных строк (rowcount DELETE)
+        """
+        if not metric_codes:
+            return 0
+        placeholders = ", ".join(["%s"] * len(metric_codes))
+        query = f"DELETE FROM lm_value WHERE history_id = %s AND metric_code IN ({placeholders})"
+        params = (history_id, *metric_codes)
+
+        # execute_with_retry на запись возвращает True, а не rowcount
+        async def _work(tx) -> int:
+            return await tx.execute(query, params, query_name="lm_incremental.delete_stale")
+
+        result = await self.db_manager.run_in_transaction(_work, query_name="lm_incremental.delete_stale")
+        return result if result else 0
+
+    async def get_lm_value_snapshot(self, history_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Текущие строки lm_value набора звонков (только поля, сравниваемые при пересчете)."""
+        if not history_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(history_ids))
+        query = f"""
+            SELECT history_id, call_score_id, metric_code, metric_group,
+                   value_numeric, value_label, value_json,
+                   lm_version, calc_profile, calc_method
+            FROM lm_value
+            WHERE history_id IN ({placeholders})
+        """
+        rows = await self.db_manager.execute_with_retry(
+            query,
+            tuple(history_ids),
+            fetchall=True,
+            query_name="lm_incremental.snapshot",
+        ) or []
+        snapshot: Dict[int, List[Dict[str, Any]]] = {}
+        for row in rows:
+            snapshot.setdefault(row["history_id"], []).append(dict(row))
+        return snapshot
+
+    async def get_input_fingerprints(self, history_ids: List[int]) -> Dict[int, str]:
+        """Сохраненные отпечатки входов LM: {history_id: fingerprint}."""
+        if not history_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(history_ids))
+        rows = await self.db_manager.execute_with_retry(
+            f"SELECT history_id, fingerprint FROM lm_input_fingerprint WHERE history_id IN ({placeholders})",
+            tuple(history_ids),
+            fetchall=True,
+            query_name="lm_incremental.fingerprints",
+        ) or []
+        return {row["history_id"]: row["fingerprint"] for row in rows}
+
+    async def save_input_fingerprints(
+        self,
+        fingerprints: Dict[int, str],
+        lm_version: str,
+        *,
+        chunk_size: int = LM_BULK_CHUNK_SIZE,
+    ) -> None:
+        """Upsert отпечатков входов после успешной записи метрик."""
+        items = list(fingerprints.items())
+        chunk_size = max(1, int(chunk_size or LM_BULK_CHUNK_SIZE))
+        for offset in range(0, len(items), chunk_size):
+            chunk = items[offset:offset + chunk_size]
+            query = f"""
+                INSERT INTO lm_input_fingerprint (history_id, fingerprint, lm_version)
+                VALUES {", ".join(["(%s, %s, %s)"] * len(chunk))} AS new
+                ON DUPLICATE KEY UPDATE
+                    fingerprint = new.fingerprint,
+                    lm_version = new.lm_version,
+                    updated_at = CURRENT_TIMESTAMP
+            """
+            params = tuple(
+                param
+                for history_id, fingerprint in chunk
+                for param in (history_id, fingerprint, lm_version)
+            )
+            await self.db_manager.execute_with_retry(
+                query,
+                params,
+                commit=True,
+                query_name="lm_incremental.save_fingerprints",
+            )
+
+    async def delete_input_fingerprints(self, history_ids: List[int]) -> None:
+        """Сбрасывает отпечатки входов: следующий инкрементальный прогон пересчитает звонки."""
+        if not history_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(history_ids))
+        await self.db_manager.execute_with_retry(
+            f"DELETE FROM lm_input_fingerprint WHERE history_id IN ({placeholders})",
+            tuple(history_ids),
+            commit=True,
+            query_name="lm_incremental.delete_fingerprints",
+        )
+
     async def get_metric_statistics(
         self,
         metric_code: str,
@@ -1327,6 +1560,117 @@ class LMRepository:
         await self.db_manager.execute_with_retry(
             query, (lm_version, calc_profile, last_date, last_id), commit=True
         )
+
+    async def get_recent_calls_for_lm(
+        self,
+        since_timestamp: int,
+        limit: int,
+        *,
+        only_missing: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Недавние звонки из call_history для расчета LM.
+
+        only_missing=True отбирает одним anti-join только звонки без единой строки
+        lm_value — вместо проверки get_lm_values_by_call на каждый history_id.
+        """
+        query = """
+            SELECT ch.*
+            FROM call_history ch
+            WHERE ch.context_start_time >= %s
+        """
+        if only_missing:
+            query += """
+              AND NOT EXISTS (
+                  SELECT 1 FROM lm_value lv WHERE lv.history_id = ch.history_id
+              )
+            """
+        query += " ORDER BY ch.context_start_time DESC LIMIT %s"
+        rows = await self.db_manager.execute_with_retry(
+            query,
+            (since_timestamp, limit),
+            fetchall=True,
+            query_name="lm_worker.recent_calls",
+        ) or []
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _history_range_filter(
+        after_id: int,
+        start_timestamp: Optional[int],
+        end_timestamp: Optional[int],
+    ) -> Tuple[str, List[Any]]:
+        clauses = ["ch.history_id > %s"]
+        params: List[Any] = [after_id]
+        if start_timestamp is not None:
+            clauses.append("ch.context_start_time >= %s")
+            params.append(start_timestamp)
+        if end_timestamp is not None:
+            clauses.append("ch.context_start_time <= %s")
+            params.append(end_timestamp)
+        return " AND ".join(clauses), params
+
+    async def get_history_chunk(
+        self,
+        after_id: int,
+        limit: int,
+        *,
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Следующая страница call_history по ключу history_id (keyset, без OFFSET).
+
+        Стоимость страницы не растет с номером: MySQL начинает с индекса PK сразу
+        после after_id.
+        """
+        where, params = self._history_range_filter(after_id, start_timestamp, end_timestamp)
+        query = f"""
+            SELECT ch.*
+            FROM call_history ch
+            WHERE {where}
+            ORDER BY ch.history_id ASC
+            LIMIT %s
+        """
+        rows = await self.db_manager.execute_with_retry(
+            query,
+            (*params, limit),
+            fetchall=True,
+            query_name="lm_backfill.history_chunk",
+        ) or []
+        return [dict(row) for row in rows]
+
+    async def count_history_range(
+        self,
+        after_id: int = 0,
+        *,
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+    ) -> int:
+        """Сколько звонков call_history осталось в диапазоне после after_id (для ETA)."""
+        where, params = self._history_range_filter(after_id, start_timestamp, end_timestamp)
+        row = await self.db_manager.execute_with_retry(
+            f"SELECT COUNT(*) AS cnt FROM call_history ch WHERE {where}",
+            tuple(params),
+            fetchone=True,
+            query_name="lm_backfill.count_range",
+        )
+        return int((row or {}).get("cnt") or 0)
+
+    async def get_call_scores_map(self, history_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Строки call_scores для набора звонков: {history_id: row}."""
+        if not history_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(history_ids))
+        query = f"SELECT * FROM call_scores WHERE history_id IN ({placeholders})"
+        rows = await self.db_manager.execute_with_retry(
+            query,
+            tuple(history_ids),
+            fetchall=True,
+            query_name="lm_worker.call_scores",
+        ) or []
+        return {row["history_id"]: dict(row) for row in rows}
+
     async def get_call_info(self, history_id: int) -> Optional[Dict[str, Any]]:
         """Получает базовую информацию о звонке (номер, дата)."""
         query = "SELECT history_id, caller_number, context_start_time_dt FROM call_history WHERE history_id = %s"
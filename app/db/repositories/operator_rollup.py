@@ -0,0 +1,406 @@
+# Файл: app/db/repositories/operator_rollup.py
+
+"""
+Repository дневных агрегатов операторов (operator_daily_rollup).
+
+Строка rollup — аддитивные счетчики оператора за день: количества звонков,
+суммы оценок и времени разговора, разбивка по outcome/call_category. Метрики
+за период — сумма строк за дни периода, средние — сумма / количество, поэтому
+они совпадают с агрегатом по сырым call_scores (те же условия, что в
+AnalyticsRepository).
+"""
+
+from __future__ import annotations
+
+import json
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.db.manager import DatabaseManager, ROUTE_PRIMARY, ROUTE_REPLICA
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+# Оператор звонка: входящий — called_info, исходящий — caller_info
+# (то же условие, что и в WHERE запросов по одному оператору)
+OPERATOR_NAME_SQL = """
+    CASE
+        WHEN context_type = 'входящий' THEN called_info
+        WHEN context_type = 'исходящий' THEN caller_info
+    END
+"""
+
+LEAD_OUTCOMES = ('record', 'lead_no_record')
+CANCEL_CATEGORY = 'Отмена записи'
+RESCHEDULE_CATEGORY = 'Перенос записи'
+COMPLAINT_CATEGORY = 'Жалоба'
+# call_category -> префикс счетчиков длинных разговоров
+TALK_CATEGORIES = {
+    'Запись на услугу (успешная)': 'record',
+    'Навигация': 'navigation',
+    'Спам, реклама': 'spam',
+}
+
+# Ячейки: оператор × день × (outcome, call_category, is_target) — из них
+# собираются все счетчики строки rollup
+CELLS_SQL = f"""
+    SELECT
+        {OPERATOR_NAME_SQL} AS operator_name,
+        DATE(call_date) AS call_day,
+        outcome,
+        call_category,
+        is_target,
+        COUNT(*) AS calls,
+        COUNT(call_score) AS scored_calls,
+        COALESCE(SUM(call_score), 0) AS score_sum,
+        SUM(CASE WHEN talk_duration > 0 THEN talk_duration ELSE 0 END) AS talk_time,
+        SUM(CASE WHEN talk_duration > 10 THEN 1 ELSE 0 END) AS long_talks,
+        SUM(CASE WHEN talk_duration > 10 THEN talk_duration ELSE 0 END) AS long_talk_time
+    FROM call_scores
+    WHERE call_date BETWEEN %s AND %s
+      AND call_type = 'принятый'
+      {{operator_filter}}
+    GROUP BY operator_name, call_day, outcome, call_category, is_target
+    HAVING operator_name IS NOT NULL
+       AND operator_name != ''
+"""
+
+OPERATOR_FILTER_SQL = """
+      AND (
+          (context_type = 'входящий' AND called_info = %s)
+          OR (context_type = 'исходящий' AND caller_info = %s)
+      )
+"""
+
+RollupKey = Tuple[str, date]
+
+
+@dataclass
+class RollupCounters:
+    """Аддитивные счетчики оператора за день (или сумма за период)."""
+
+    accepted_calls: int = 0
+    target_calls: int = 0
+    records: int = 0
+    leads_no_record: int = 0
+    wish_to_record: int = 0
+    scored_calls: int = 0
+    score_sum: float = 0.0
+    lead_scored_calls: int = 0
+    lead_score_sum: float = 0.0
+    cancel_calls: int = 0
+    cancel_scored_calls: int = 0
+    cancel_score_sum: float = 0.0
+    reschedule_calls: int = 0
+    complaint_calls: int = 0
+    complaint_scored_calls: int = 0
+    complaint_score_sum: float = 0.0
+    talk_time: int = 0
+    long_talks: int = 0
+    long_talk_time: int = 0
+    record_long_talks: int = 0
+    record_long_talk_time: int = 0
+    navigation_long_talks: int = 0
+    navigation_long_talk_time: int = 0
+    spam_long_talks: int = 0
+    spam_long_talk_time: int = 0
+    outcome_counts: Counter = field(default_factory=Counter)
+    category_counts: Counter = field(default_factory=Counter)
+
+    def add_cell(self, cell: Dict[str, Any]) -> None:
+        """Добавляет ячейку CELLS_SQL (один outcome/call_category/is_target)."""
+        calls = int(cell.get('calls') or 0)
+        scored = int(cell.get('scored_calls') or 0)
+        score_sum = float(cell.get('score_sum') or 0)
+        long_talks = int(cell.get('long_talks') or 0)
+        long_talk_time = int(cell.get('long_talk_time') or 0)
+        outcome = cell.get('outcome') or ''
+        category = cell.get('call_category') or ''
+        is_target = int(cell.get('is_target') or 0) == 1
+
+        self.accepted_calls += calls
+        self.scored_calls += scored
+        self.score_sum += score_sum
+        self.talk_time += int(cell.get('talk_time') or 0)
+        self.long_talks += long_talks
+        self.long_talk_time += long_talk_time
+        self.outcome_counts[outcome] += calls
+        self.category_counts[category] += calls
+
+        prefix = TALK_CATEGORIES.get(category)
+        if prefix:
+            setattr(self, f'{prefix}_long_talks', getattr(self, f'{prefix}_long_talks') + long_talks)
+            setattr(self, f'{prefix}_long_talk_time', getattr(self, f'{prefix}_long_talk_time') + long_talk_time)
+
+        if not is_target:
+            return
+        self.target_calls += calls
+        if outcome == 'record':
+            self.records += calls
+        elif outcome == 'lead_no_record':
+            self.leads_no_record += calls
+        if outcome in LEAD_OUTCOMES:
+            self.wish_to_record += calls
+            self.lead_scored_calls += scored
+            self.lead_score_sum += score_sum
+        if category == CANCEL_CATEGORY:
+            self.cancel_calls += calls
+            self.cancel_scored_calls += scored
+            self.cancel_score_sum += score_sum
+        elif category == RESCHEDULE_CATEGORY:
+            self.reschedule_calls += calls
+        elif category == COMPLAINT_CATEGORY:
+            self.complaint_calls += calls
+            self.complaint_scored_calls += scored
+            self.complaint_score_sum += score_sum
+
+    def add(self, other: "RollupCounters") -> None:
+        for counter in fields(self):
+            setattr(self, counter.name, getattr(self, counter.name) + getattr(other, counter.name))
+
+    def as_aggregate_row(self) -> Dict[str, Any]:
+        """Строка в формате GROUP BY-запросов AnalyticsRepository (AVG → sum / count, NULL → None)."""
+
+        def _avg(total: float, count: int) -> Optional[float]:
+            return total / count if count else None
+
+        return {
+            'accepted_calls': self.accepted_calls,
+            'records': self.records,
+            'leads_no_record': self.leads_no_record,
+            'wish_to_record': self.wish_to_record,
+            'avg_score_all': _avg(self.score_sum, self.scored_calls),
+            'avg_score_leads': _avg(self.lead_score_sum, self.lead_scored_calls),
+            'avg_score_cancel': _avg(self.cancel_score_sum, self.cancel_scored_calls),
+            'cancel_calls': self.cancel_calls,
+            'reschedule_calls': self.reschedule_calls,
+            'avg_talk_all': _avg(self.long_talk_time, self.long_talks),
+            'total_talk_time': self.talk_time,
+            'avg_talk_record': _avg(self.record_long_talk_time, self.record_long_talks),
+            'avg_talk_navigation': _avg(self.navigation_long_talk_time, self.navigation_long_talks),
+            'avg_talk_spam': _avg(self.spam_long_talk_time, self.spam_long_talks),
+            'complaint_calls': self.complaint_calls,
+            'avg_score_complaint': _avg(self.complaint_score_sum, self.complaint_scored_calls),
+        }
+
+    def diff(self, other: "RollupCounters", *, tolerance: float = 1e-6) -> Dict[str, Tuple[Any, Any]]:
+        """Поля, которые расходятся с other: {поле: (self, other)}."""
+        mismatches: Dict[str, Tuple[Any, Any]] = {}
+        for counter in fields(self):
+            mine, theirs = getattr(self, counter.name), getattr(other, counter.name)
+            if isinstance(mine, Counter):
+                mine, theirs = +mine, +theirs  # без нулевых ключей
+                if mine != theirs:
+                    mismatches[counter.name] = (dict(mine), dict(theirs))
+            elif abs(mine - theirs) > tolerance * max(1.0, abs(mine), abs(theirs)):
+                mismatches[counter.name] = (mine, theirs)
+        return mismatches
+
+
+COUNTER_COLUMNS: Tuple[str, ...] = tuple(
+    counter.name for counter in fields(RollupCounters) if counter.name not in ('outcome_counts', 'category_counts')
+)
+
+INSERT_SQL = f"""
+    INSERT INTO operator_daily_rollup (
+        operator_name, call_day, {', '.join(COUNTER_COLUMNS)}, outcome_counts, category_counts, refreshed_at
+    ) VALUES (
+        %s, %s, {', '.join(['%s'] * len(COUNTER_COLUMNS))}, %s, %s, NOW()
+    )
+"""
+
+
+def fold_cells(cells: Iterable[Dict[str, Any]]) -> Dict[RollupKey, RollupCounters]:
+    """Ячейки CELLS_SQL → счетчики по (оператор, день)."""
+    rollup: Dict[RollupKey, RollupCounters] = {}
+    for cell in cells:
+        call_day = cell['call_day']
+        if isinstance(call_day, datetime):
+            call_day = call_day.date()
+        elif isinstance(call_day, str):
+            call_day = date.fromisoformat(call_day)
+        key = (cell['operator_name'], call_day)
+        counters = rollup.get(key)
+        if counters is None:
+            counters = rollup[key] = RollupCounters()
+        counters.add_cell(cell)
+    return rollup
+
+
+def counters_from_row(row: Dict[str, Any]) -> RollupCounters:
+    """Строка operator_daily_rollup → RollupCounters."""
+    counters = RollupCounters()
+    for column in COUNTER_COLUMNS:
+        default = getattr(counters, column)
+        setattr(counters, column, type(default)(row.get(column) or 0))
+    for column in ('outcome_counts', 'category_counts'):
+        value = row.get(column) or {}
+        if isinstance(value, (str, bytes)):
+            value = json.loads(value)
+        setattr(counters, column, Counter({key: int(count) for key, count in value.items()}))
+    return counters
+
+
+def contiguous_ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Дни → отрезки подряд идущих дат [(с, по), ...]."""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class OperatorRollupRepository:
+    """
+    Чтение/запись operator_daily_rollup и ячеек call_scores для его расчета.
+
+    Ячейки для записи rollup читаются с основного пула (реплика может отставать),
+    для дашбордов — с READ_ROUTE.
+    """
+
+    READ_ROUTE = ROUTE_REPLICA
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    async def fetch_cells(
+        self,
+        date_from: date,
+        date_to: date,
+        operator_name: Optional[str] = None,
+        *,
+        route: str = ROUTE_PRIMARY,
+    ) -> List[Dict[str, Any]]:
+        """Ячейки CELLS_SQL за дни [date_from, date_to] (опционально — одного оператора)."""
+        params: Tuple[Any, ...] = (
+            datetime.combine(date_from, time.min),
+            datetime.combine(date_to, time.max),
+        )
+        operator_filter = ''
+        if operator_name:
+            operator_filter = OPERATOR_FILTER_SQL
+            params += (operator_name, operator_name)
+        rows = await self.db.execute_query(
+            CELLS_SQL.format(operator_filter=operator_filter),
+            params,
+            fetchall=True,
+            query_name="operator_rollup.cells",
+            route=route,
+        )
+        return rows or []
+
+    async def compute(
+        self,
+        date_from: date,
+        date_to: date,
+        operator_name: Optional[str] = None,
+        *,
+        route: str = ROUTE_PRIMARY,
+    ) -> Dict[RollupKey, RollupCounters]:
+        """Счетчики по (оператор, день), посчитанные по сырым call_scores."""
+        return fold_cells(await self.fetch_cells(date_from, date_to, operator_name, route=route))
+
+    async def load(
+        self,
+        date_from: date,
+        date_to: date,
+        operator_name: Optional[str] = None,
+        *,
+        route: Optional[str] = None,
+    ) -> Dict[RollupKey, RollupCounters]:
+        """Сохраненные строки rollup за дни [date_from, date_to]."""
+        query = "SELECT * FROM operator_daily_rollup WHERE call_day BETWEEN %s AND %s"
+        params: Tuple[Any, ...] = (date_from, date_to)
+        if operator_name:
+            query += " AND operator_name = %s"
+            params += (operator_name,)
+        rows = await self.db.execute_query(
+            query,
+            params,
+            fetchall=True,
+            query_name="operator_rollup.load",
+            route=route or self.READ_ROUTE,
+        ) or []
+        result: Dict[RollupKey, RollupCounters] = {}
+        for row in rows:
+            call_day = row['call_day']
+            if isinstance(call_day, datetime):
+                call_day = call_day.date()
+            result[(row['operator_name'], call_day)] = counters_from_row(row)
+        return result
+
+    async def replace_days(
+        self,
+        date_from: date,
+        date_to: date,
+        rollup: Dict[RollupKey, RollupCounters],
+    ) -> int:
+        """
+        Заменяет строки rollup за дни [date_from, date_to] одной транзакцией.
+
+        Операторы, у которых звонков в эти дни больше нет, из rollup удаляются.
+        """
+        rows = [
+            (
+                operator_name,
+                call_day,
+                *(getattr(counters, column) for column in COUNTER_COLUMNS),
+                json.dumps(dict(+counters.outcome_counts), ensure_ascii=False),
+                json.dumps(dict(+counters.category_counts), ensure_ascii=False),
+            )
+            for (operator_name, call_day), counters in sorted(rollup.items())
+            if date_from <= call_day <= date_to
+        ]
+
+        async def _work(tx) -> int:
+            await tx.execute(
+                "DELETE FROM operator_daily_rollup WHERE call_day BETWEEN %s AND %s",
+                (date_from, date_to),
+                query_name="operator_rollup.delete_days",
+            )
+            if rows:
+                await tx.execute_many(INSERT_SQL, rows, query_name="operator_rollup.insert")
+            return len(rows)
+
+        return await self.db.run_in_transaction(_work, query_name="operator_rollup.replace_days")
+
+    async def touched_days_since(self, since: datetime, history_timestamp_field: str = "ch.created_at") -> List[date]:
+        """
+        Дни звонков, строки которых появились или переоценены после since.
+
+        history_timestamp_field — поле call_history, по которому ведет watermark
+        CallAnalyticsSyncService; переоценка ловится по call_scores.score_date.
+        Два условия — две ветки UNION, чтобы каждая шла диапазоном по своему
+        индексу (idx_ch_created, idx_score_date), а не сканом всего join'а.
+        """
+        query = f"""
+            SELECT DATE(cs.call_date) AS call_day
+            FROM call_history ch
+            INNER JOIN call_scores cs ON cs.history_id = ch.history_id
+            WHERE {history_timestamp_field} >= %s
+              AND cs.call_date IS NOT NULL
+            UNION
+            SELECT DATE(cs.call_date) AS call_day
+            FROM call_scores cs
+            INNER JOIN call_history ch ON ch.history_id = cs.history_id
+            WHERE cs.score_date >= %s
+              AND cs.call_date IS NOT NULL
+        """
+        rows = await self.db.execute_query(
+            query,
+            (since, since),
+            fetchall=True,
+            query_name="operator_rollup.touched_days",
+        ) or []
+        days = []
+        for row in rows:
+            call_day = row.get('call_day')
+            if isinstance(call_day, datetime):
+                call_day = call_day.date()
+            if call_day:
+                days.append(call_day)
+        return sorted(days)
@@ -9,6 +9,7 @@ from datetime import datetime
 import json
 
 from app.db.manager import DatabaseManager
+from app.db.statements import cached_template
 from app.db.models import OperatorRecord, CallMetrics
 from app.logging_config import get_watchdog_logger
 from app.core.roles import ROLE_NAME_TO_ID
@@ -268,6 +269,7 @@ class OperatorRepository:
         return columns
 
     @staticmethod
+    @cached_template()
     def _build_call_scores_query(
         base_select: List[str],
         optional_columns: List[str],
@@ -456,6 +458,36 @@ class OperatorRepository:
             result.append(record)
         return result
 
+    async def get_dashboard_operator_names(self) -> List[str]:
+        """
+        Возвращает имена операторов (как в call_scores) для прогрева дашбордов.
+
+        Имя хранится только в UsersTelegaBot.operator_name; оператор берется из
+        users (extension IS NOT NULL, как в get_approved_operators) и сопоставляется
+        с записью бота по user_id или extension.
+        """
+        query = """
+            SELECT DISTINCT
+                t.telegram_id,
+                t.operator_name
+            FROM users u
+            JOIN UsersTelegaBot t
+                ON t.user_id = u.user_id OR t.extension = u.extension
+            WHERE u.extension IS NOT NULL
+              AND t.operator_name IS NOT NULL
+              AND t.operator_name <> ''
+        """
+        rows = await self.db_manager.execute_with_retry(
+            query,
+            params=(),
+            fetchall=True,
+        ) or []
+        return sorted({
+            row["operator_name"]
+            for row in rows
+            if row.get("operator_name") and not self._is_dev_account(row)
+        })
+
     async def get_operator_info_by_user_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Получает информацию об операторе по user_id."""
         query = """
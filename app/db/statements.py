@@ -0,0 +1,107 @@
+"""
+Кеш подготовленных SQL-текстов.
+
+prepare_statement() один раз на текст запроса выполняет переписывание cs.score → cs.call_score;
+повторные вызовы — поиск в словаре. Длинные тексты (multi-row VALUES, IN-списки
+переменной длины) почти не повторяются, поэтому в кеш не попадают. Однострочное
+превью для подробного лога строится только по запросу (PreparedStatement.preview).
+cached_template() кеширует результат функций, собирающих SQL из фрагментов, чтобы
+одинаковые варианты запроса давали один и тот же объект строки (и попадали в кеш выше).
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from typing import Any, Callable, Dict, NamedTuple, TypeVar
+
+STATEMENT_CACHE_SIZE = 2048
+# Тексты длиннее этого порога переписываются без кеширования
+STATEMENT_CACHE_MAX_LENGTH = 4096
+TEMPLATE_CACHE_SIZE = 128
+
+_SCORE_COLUMN_PATTERN = re.compile(r"(?i)\b(cs|call_scores)\.score\b")
+_INSERT_INTO_PATTERN = re.compile(r"(?i)\binsert\s+into\b")
+
+F = TypeVar("F", bound=Callable[..., str])
+
+
+class PreparedStatement(NamedTuple):
+    sql: str
+    is_admin_action_log: bool
+
+    @property
+    def preview(self) -> str:
+        """Однострочное превью SQL (нужно только для подробного лога)."""
+        return " ".join(self.sql.split())
+
+
+def _rewrite_score_column(query: str) -> str:
+    """
+    Горячий фикс: в старых запросах могли остаться обращения к cs.score.
+    В MySQL такого столбца нет (есть call_score), поэтому мягко переписываем SQL.
+    """
+    if "score" not in query:
+        return query
+    return _SCORE_COLUMN_PATTERN.sub(lambda match: f"{match.group(1)}.call_score", query)
+
+
+def _prepare(query: str) -> PreparedStatement:
+    sql = _rewrite_score_column(query)
+    return PreparedStatement(
+        sql=sql,
+        is_admin_action_log=(
+            "admin_action_logs" in sql.lower() and _INSERT_INTO_PATTERN.search(sql) is not None
+        ),
+    )
+
+
+_prepare_cached = functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)(_prepare)
+
+
+def prepare_statement(query: str) -> PreparedStatement:
+    """Возвращает переписанный SQL (кешируется по тексту, кроме длинных запросов)."""
+    if len(query) > STATEMENT_CACHE_MAX_LENGTH:
+        return _prepare(query)
+    return _prepare_cached(query)
+
+
+prepare_statement.cache_info = _prepare_cached.cache_info  # type: ignore[attr-defined]
+prepare_statement.cache_clear = _prepare_cached.cache_clear  # type: ignore[attr-defined]
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def cached_template(maxsize: int = TEMPLATE_CACHE_SIZE) -> Callable[[F], F]:
+    """
+    Декоратор для функций-сборщиков SQL: результат кешируется по значениям аргументов
+    (списки/множества приводятся к неизменяемым типам).
+    """
+
+    def decorator(func: F) -> F:
+        cache: Dict[Any, str] = {}
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> str:
+            key = (_freeze(args), _freeze(kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+            result = func(*args, **kwargs)
+            if len(cache) >= maxsize:
+                cache.clear()
+            cache[key] = result
+            return result
+
+        wrapper.cache_clear = cache.clear  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
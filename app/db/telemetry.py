@@ -0,0 +1,184 @@
+"""
+Телеметрия SQL-запросов.
+
+Счётчики и гистограммы латентности по query_name хранятся в памяти процесса.
+В режиме по умолчанию (metrics) горячий путь не форматирует строк и не пишет в лог:
+в лог попадают только медленные запросы (и без параметров/строк результата).
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config import DB_TELEMETRY_CONFIG
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+TELEMETRY_MODES = ("off", "metrics", "verbose")
+
+# Верхние границы корзин гистограммы, мс. Последняя корзина — "больше 5 с".
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_BUCKET_LABELS: Tuple[str, ...] = tuple(f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS) + ("gt_5000ms",)
+
+
+class LatencyStats:
+    """Счётчик + гистограмма латентности (общий для запросов и пула соединений)."""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float, *, error: bool = False) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        if error:
+            self.errors += 1
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(_BUCKET_LABELS, self.buckets)),
+        }
+
+
+class QueryTelemetry:
+    """
+    In-memory телеметрия запросов.
+
+    Режимы:
+        off      — ничего не собираем;
+        metrics  — счётчики, гистограммы и журнал медленных запросов (по умолчанию);
+        verbose  — как metrics + выборочное (sample_rate) INFO-логирование запросов.
+    """
+
+    def __init__(
+        self,
+        mode: str = "metrics",
+        *,
+        sample_rate: float = 0.0,
+        slow_query_ms: float = 1000.0,
+        slow_log_size: int = 100,
+    ) -> None:
+        self.mode = "metrics"
+        self.sample_rate = 0.0
+        self.slow_query_ms = float(slow_query_ms)
+        self._stats: Dict[str, LatencyStats] = {}
+        self._slow_queries: Deque[Dict[str, Any]] = deque(maxlen=max(1, int(slow_log_size)))
+        self.set_mode(mode, sample_rate=sample_rate)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def set_mode(
+        self,
+        mode: str,
+        *,
+        sample_rate: Optional[float] = None,
+        slow_query_ms: Optional[float] = None,
+    ) -> None:
+        """Переключает режим телеметрии на лету."""
+        normalized = (mode or "").strip().lower()
+        if normalized not in TELEMETRY_MODES:
+            raise ValueError(f"Unknown telemetry mode: {mode!r}")
+        self.mode = normalized
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        if slow_query_ms is not None:
+            self.slow_query_ms = max(0.0, float(slow_query_ms))
+
+    def should_log_query(self) -> bool:
+        """Нужно ли логировать текущий запрос целиком (только verbose + сэмплирование)."""
+        if self.mode != "verbose" or self.sample_rate <= 0.0:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(
+        self,
+        query_name: str,
+        elapsed_sec: float,
+        *,
+        error: bool = False,
+        query: Optional[str] = None,
+    ) -> None:
+        """Учитывает выполненный запрос. query нужен только для журнала медленных запросов."""
+        if self.mode == "off":
+            return
+        elapsed_ms = elapsed_sec * 1000.0
+        stats = self._stats.get(query_name)
+        if stats is None:
+            stats = self._stats[query_name] = LatencyStats()
+        stats.add(elapsed_ms, error=error)
+        if elapsed_ms >= self.slow_query_ms:
+            self._capture_slow(query_name, elapsed_ms, query)
+
+    def _capture_slow(self, query_name: str, elapsed_ms: float, query: Optional[str]) -> None:
+        preview = " ".join(query.split())[:500] if isinstance(query, str) else None
+        self._slow_queries.append(
+            {
+                "query_name": query_name,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "sql": preview,
+                "at": time.time(),
+            }
+        )
+        logger.warning(
+            "[DB] Медленный запрос %s: %.1f мс",
+            query_name,
+            elapsed_ms,
+            extra={"query_name": query_name, "elapsed_ms": elapsed_ms, "sql": preview},
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает статистику по всем query_name."""
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def snapshot_by_owner(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Агрегирует статистику по владельцу запроса: для имени
+        "app.db.repositories.users.UserRepository.get_user" владелец —
+        "app.db.repositories.users.UserRepository".
+        """
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for name, stats in self._stats.items():
+            owner = name.rsplit(".", 1)[0] if "." in name else name
+            bucket = grouped.setdefault(owner, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            bucket["count"] += stats.count
+            bucket["errors"] += stats.errors
+            bucket["total_ms"] = round(bucket["total_ms"] + stats.total_ms, 3)
+            bucket["max_ms"] = round(max(bucket["max_ms"], stats.max_ms), 3)
+        return grouped
+
+    def slow_queries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Последние медленные запросы (новые в конце)."""
+        items = list(self._slow_queries)
+        return items[-limit:] if limit else items
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self._slow_queries.clear()
+
+
+query_telemetry = QueryTelemetry(
+    DB_TELEMETRY_CONFIG.get("mode", "metrics"),
+    sample_rate=DB_TELEMETRY_CONFIG.get("sample_rate", 0.0),
+    slow_query_ms=DB_TELEMETRY_CONFIG.get("slow_query_ms", 1000.0),
+    slow_log_size=DB_TELEMETRY_CONFIG.get("slow_log_size", 100),
+)
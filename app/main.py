@@ -15,6 +15,7 @@ import signal
 import os
 import re
 import time
+from datetime import datetime
 from typing import Callable, Optional
 from pathlib import Path
 from collections import OrderedDict
@@ -26,8 +27,9 @@ from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, TypeH
 from telegram.request import HTTPXRequest
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from app.config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+from app.config import DASHBOARD_CONFIG, LM_WRITE_BEHIND_CONFIG, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
 from app.error_policy import resolve_user_message, should_alert
 from app.errors import AppError, TelegramIntegrationError
 from app.logging_config import (
@@ -61,6 +63,8 @@ from app.services.weekly_quality import WeeklyQualityService
 from app.services.call_export import CallExportService
 from app.services.reports import ReportService
 from app.services.lm_service import LMService
+from app.services.lm_executor import create_lm_executor, shutdown_lm_executor
+from app.services.lm_write_behind import LMWriteBehind
 
 # Хендлеры
 from app.telegram.handlers.auth import setup_auth_handlers
@@ -452,6 +456,7 @@ async def main():
     db_manager = DatabaseManager()
     await db_manager.create_pool()
     logger.info("Пул соединений с БД создан.")
+    await db_manager.warm_up_pool()
     await validate_schema(db_manager)
 
     stop_event = asyncio.Event()
@@ -474,7 +479,14 @@ async def main():
         permissions_manager = PermissionsManager(db_manager)
         lm_repo = LMRepository(db_manager)
         dictionary_repo = LMDictionaryRepository(db_manager)
-        lm_service = LMService(lm_repo, dictionary_repository=dictionary_repo)
+        lm_executor = create_lm_executor()
+        lm_write_behind = LMWriteBehind(lm_repo) if LM_WRITE_BEHIND_CONFIG["enabled"] else None
+        lm_service = LMService(
+            lm_repo,
+            dictionary_repository=dictionary_repo,
+            executor=lm_executor,
+            write_behind=lm_write_behind,
+        )
         user_repo = UserRepository(db_manager)
         call_lookup_service = CallLookupService(db_manager, lm_repo)
         yandex_disk_client = YandexDiskClient.from_env()
@@ -652,7 +664,12 @@ async def main():
 
         # Инициализация сервиса синхронизации аналитики
         from app.services.call_analytics_sync import CallAnalyticsSyncService
-        analytics_sync_service = CallAnalyticsSyncService(db_manager)
+        from app.services.operator_rollup import OperatorRollupService
+        # Дневные агрегаты обновляются вместе с синхронизацией, если дашборды читают rollup
+        analytics_sync_service = CallAnalyticsSyncService(
+            db_manager,
+            rollup_service=OperatorRollupService(db_manager) if DASHBOARD_CONFIG["use_rollup"] else None,
+        )
 
         async def run_analytics_sync():
             logger.info("Запуск плановой синхронизации аналитики...")
@@ -666,6 +683,30 @@ async def main():
             id='analytics_sync',
             replace_existing=True
         )
+
+        if DASHBOARD_CONFIG["prewarm_enabled"]:
+            # Прогрев использует кеш и репозиторий обработчика дашборда: тапы попадают в тот же L1
+            from app.services.dashboard_prewarm import DashboardPrewarmService
+            dashboard_prewarm_service = DashboardPrewarmService(
+                operator_repo,
+                dashboard_handler.analytics_repo,
+                dashboard_handler.cache_service,
+            )
+
+            async def run_dashboard_prewarm():
+                await dashboard_prewarm_service.run()
+
+            # Чуть раньше истечения TTL кеша дашбордов; первый прогон сразу после старта
+            scheduler.add_job(
+                safe_job,
+                args=('dashboard_prewarm', run_dashboard_prewarm),
+                trigger=IntervalTrigger(seconds=DASHBOARD_CONFIG["prewarm_interval_sec"]),
+                id='dashboard_prewarm',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                next_run_time=datetime.now(),
+            )
         await application.initialize()
         await application.start()
 
@@ -726,6 +767,12 @@ async def main():
 
         if 'yandex_disk_cache' in locals() and yandex_disk_cache:
             await yandex_disk_cache.close()
+        if 'lm_write_behind' in locals() and lm_write_behind is not None:
+            await lm_write_behind.close()
+        if 'lm_service' in locals() and lm_service.hit_writer is not None:
+            await lm_service.hit_writer.close()
+        if 'lm_executor' in locals():
+            shutdown_lm_executor(lm_executor)
         await db_manager.close()
         logger.info("Бот остановлен.")
         
@@ -12,7 +12,7 @@ import json
 from typing import Optional, Dict, Any
 from datetime import datetime
 
-from app.db.manager import DatabaseManager
+from app.db.manager import DatabaseManager, DatabaseTransaction
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
@@ -48,20 +48,34 @@ class AdminActionLogger:
         }
         return json.dumps(trimmed, ensure_ascii=False)
     
-    async def _get_user_pk_by_telegram_id(self, telegram_id: int) -> Optional[int]:
+    async def _get_user_pk_by_telegram_id(
+        self,
+        telegram_id: int,
+        tx: Optional[DatabaseTransaction] = None,
+        *,
+        query_name: Optional[str] = None,
+    ) -> Optional[int]:
         """
         Получить UsersTelegaBot.id (PK) по Telegram user_id.
         
         Args:
             telegram_id: Telegram user ID (user_id в таблице)
+            tx: транзакция, в которой выполнить поиск (ошибки не глушатся,
+                чтобы run_in_transaction мог повторить транзакцию целиком)
+            query_name: имя запроса для телеметрии
             
         Returns:
             UsersTelegaBot.id (PK) или None
         """
+        query = "SELECT id FROM UsersTelegaBot WHERE user_id = %s"
+        if tx is not None:
+            result = await tx.execute(
+                query, (telegram_id,), fetchone=True, query_name=query_name
+            )
+            return result.get('id') if result else None
         try:
-            query = "SELECT id FROM UsersTelegaBot WHERE user_id = %s"
             result = await self.db.execute_with_retry(
-                query, params=(telegram_id,), fetchone=True
+                query, params=(telegram_id,), fetchone=True, query_name=query_name
             )
             return result.get('id') if result else None
         except Exception as e:
@@ -105,53 +119,64 @@ class AdminActionLogger:
             f"on telegram_id={target_telegram_id}"
         )
         
-        try:
-            # Получаем UsersTelegaBot.id (PK) для actor и target
-            actor_pk = await self._get_user_pk_by_telegram_id(actor_telegram_id)
-            if not actor_pk:
-                logger.warning(
-                    f"[ADMIN_LOG] Cannot find actor UsersTelegaBot.id "
-                    f"for telegram_id={actor_telegram_id}"
-                )
-                # Записываем в payload для отладки
-                if payload is None:
-                    payload = {}
-                payload['_actor_telegram_id_fallback'] = actor_telegram_id
-            
+        payload = dict(payload) if payload else None
+        result: Dict[str, Any] = {}
+
+        async def _write(tx) -> bool:
+            # Поиск PK и INSERT выполняем на одном соединении и в одной транзакции.
+            result.clear()
+            actor_pk = await self._get_user_pk_by_telegram_id(
+                actor_telegram_id, tx, query_name="admin_action_logs.actor_pk"
+            )
             target_pk = None
             if target_telegram_id:
-                target_pk = await self._get_user_pk_by_telegram_id(target_telegram_id)
-                if not target_pk:
-                    logger.warning(
-                        f"[ADMIN_LOG] Cannot find target UsersTelegaBot.id "
-                        f"for telegram_id={target_telegram_id}"
-                    )
-                    if payload is None:
-                        payload = {}
-                    payload['_target_telegram_id_fallback'] = target_telegram_id
-            
+                target_pk = await self._get_user_pk_by_telegram_id(
+                    target_telegram_id, tx, query_name="admin_action_logs.target_pk"
+                )
+            result.update(actor_pk=actor_pk, target_pk=target_pk)
+
             # Если actor_pk не найден, не записываем (нарушит FK constraint)
             if not actor_pk:
-                logger.error(f"[ADMIN_LOG] Actor not found, cannot log action")
                 return False
-            
+
+            row_payload = payload
+            if target_telegram_id and not target_pk:
+                row_payload = dict(payload or {})
+                row_payload['_target_telegram_id_fallback'] = target_telegram_id
+
             query = """
                 INSERT INTO admin_action_logs 
                 (actor_id, target_id, action, payload_json, created_at)
                 VALUES (%s, %s, %s, %s, NOW())
             """
-            
-            payload_json = self._serialize_payload(payload)
-            
-            await self.db.execute_with_retry(
+            await tx.execute(
                 query,
-                params=(actor_pk, target_pk, action, payload_json),
-                commit=True
+                (actor_pk, target_pk, action, self._serialize_payload(row_payload)),
+                query_name="admin_action_logs.insert",
+            )
+            return True
+
+        try:
+            written = await self.db.run_in_transaction(
+                _write,
+                query_name="admin_action_logs.log_action",
             )
+            if target_telegram_id and not result.get("target_pk"):
+                logger.warning(
+                    f"[ADMIN_LOG] Cannot find target UsersTelegaBot.id "
+                    f"for telegram_id={target_telegram_id}"
+                )
+            if not written:
+                logger.warning(
+                    f"[ADMIN_LOG] Cannot find actor UsersTelegaBot.id "
+                    f"for telegram_id={actor_telegram_id}"
+                )
+                logger.error(f"[ADMIN_LOG] Actor not found, cannot log action")
+                return False
             
             logger.info(
                 f"[ADMIN_LOG] Action '{action}' logged: "
-                f"actor_id={actor_pk}, target_id={target_pk}"
+                f"actor_id={result.get('actor_pk')}, target_id={result.get('target_pk')}"
             )
             return True
             
@@ -8,12 +8,15 @@ ETL Service для синхронизации call_scores → call_analytics.
 """
 
 
-from typing import Optional, Set
+from typing import TYPE_CHECKING, Optional, Set
 from datetime import date, datetime, timedelta
 
-from app.db.manager import DatabaseManager
+from app.db.manager import DatabaseManager, ROUTE_REPLICA
 from app.logging_config import get_watchdog_logger
 
+if TYPE_CHECKING:
+    from app.services.operator_rollup import OperatorRollupService
+
 logger = get_watchdog_logger(__name__)
 
 
@@ -23,11 +26,17 @@ class CallAnalyticsSyncService:
     
     Режимы:
     - Полное заполнение (первый запуск)
-    - Инкрементальное обновление (cron)
+    - Инкрементальное обновление (cron); если передан rollup_service, после него
+      от того же watermark обновляется operator_daily_rollup
     """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        rollup_service: Optional["OperatorRollupService"] = None,
+    ):
         self.db = db_manager
+        self.rollup_service = rollup_service
         self._schema_checked: bool = False
         self._schema_valid: bool = False
         self._history_timestamp_field: str = "ch.created_at"
@@ -65,7 +74,7 @@ class CallAnalyticsSyncService:
                 )
             """
             
-            count_result = await self.db.execute_with_retry(count_query, fetchone=True)
+            count_result = await self.db.execute_with_retry(count_query, fetchone=True, route=ROUTE_REPLICA)
             total_count = count_result.get('count', 0) if count_result else 0
             
             logger.info(f"[ETL] Found {total_count} calls to sync")
@@ -229,6 +238,9 @@ class CallAnalyticsSyncService:
             # MySQL cursor.rowcount для INSERT
             inserted = result if isinstance(result, int) else 0
             stats['inserted'] = inserted
+
+            if self.rollup_service is not None:
+                stats['rollup'] = await self._refresh_rollup(history_since_point)
             
             stats['end_time'] = datetime.now()
             stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
@@ -245,6 +257,17 @@ class CallAnalyticsSyncService:
             stats['errors'] += 1
             return stats
     
+    async def _refresh_rollup(self, since: datetime) -> dict:
+        """Обновляет дневные агрегаты операторов; ошибка не прерывает синхронизацию."""
+        try:
+            return await self.rollup_service.refresh_since(
+                since,
+                history_timestamp_field=self._history_timestamp_field,
+            )
+        except Exception as e:
+            logger.error(f"[ETL] Error refreshing operator rollup: {e}", exc_info=True)
+            return {'errors': 1}
+
     async def _sync_batch(self, offset: int, limit: int) -> dict:
         """
         Синхронизировать один batch звонков.
@@ -334,12 +357,12 @@ class CallAnalyticsSyncService:
         try:
             # Количество в call_scores
             cs_query = "SELECT COUNT(*) as count FROM call_scores"
-            cs_result = await self.db.execute_with_retry(cs_query, fetchone=True)
+            cs_result = await self.db.execute_with_retry(cs_query, fetchone=True, route=ROUTE_REPLICA)
             cs_count = cs_result.get('count', 0) if cs_result else 0
             
             # Количество в call_analytics
             ca_query = "SELECT COUNT(*) as count FROM call_analytics"
-            ca_result = await self.db.execute_with_retry(ca_query, fetchone=True)
+            ca_result = await self.db.execute_with_retry(ca_query, fetchone=True, route=ROUTE_REPLICA)
             ca_count = ca_result.get('count', 0) if ca_result else 0
             
             # Количество несинхронизированных
@@ -351,7 +374,7 @@ class CallAnalyticsSyncService:
                     WHERE ca.call_scores_id = cs.id
                 )
             """
-            missing_result = await self.db.execute_with_retry(missing_query, fetchone=True)
+            missing_result = await self.db.execute_with_retry(missing_query, fetchone=True, route=ROUTE_REPLICA)
             missing_count = missing_result.get('count', 0) if missing_result else 0
             
             # Последняя синхронизированная запись
@@ -359,7 +382,7 @@ class CallAnalyticsSyncService:
                 SELECT MAX(created_at) as last_sync
                 FROM call_analytics
             """
-            last_result = await self.db.execute_with_retry(last_query, fetchone=True)
+            last_result = await self.db.execute_with_retry(last_query, fetchone=True, route=ROUTE_REPLICA)
             last_sync = last_result.get('last_sync') if last_result else None
             
             status = {
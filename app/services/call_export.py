@@ -13,8 +13,10 @@ from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font
 from openpyxl.utils import get_column_letter
 
-from app.db.manager import DatabaseManager
+from app.db.manager import DatabaseManager, ROUTE_REPLICA
+from app.db.statements import cached_template
 from app.logging_config import get_watchdog_logger
+from app.services.subscores import SUBSCORE_KEYS, parse_subscores
 
 logger = get_watchdog_logger(__name__)
 
@@ -48,6 +50,11 @@ HEADERS = (
     "Категория причины",
     "Источник",
     "Оценка качества (0–10)",
+    "Инициативность (0–10)",
+    "Вежливость (0–10)",
+    "Информативность (0–10)",
+    "Соблюдение скрипта (0–10)",
+    "Удовлетворенность (0–10)",
     "Дата/время оценки",
 )
 
@@ -164,6 +171,7 @@ class CallExportService:
                     params=(start, end),
                     fetchall=True,
                     query_name="call_export.fetch_calls",
+                    route=ROUTE_REPLICA,
                 )
                 return [dict(row) for row in (result or [])]
             except Exception as exc:
@@ -203,6 +211,7 @@ class CallExportService:
             params=(start, end),
             fetchall=True,
             query_name="call_export.fetch_calls",
+            route=ROUTE_REPLICA,
         )
         return [dict(row) for row in (result or [])]
 
@@ -237,6 +246,7 @@ class CallExportService:
         return columns
 
     @staticmethod
+    @cached_template()
     def _build_export_query(
         base_select: List[str],
         optional_columns: List[str],
@@ -293,6 +303,7 @@ class CallExportService:
                 continue
             score_date = row.get("score_date")
             goal = self._resolve_goal(row)
+            subscores = parse_subscores(row.get("result"))
             values = [
                 call_date.date(),
                 call_date.time(),
@@ -319,6 +330,7 @@ class CallExportService:
                 self._normalize_label(row.get("refusal_category_label")),
                 self._normalize_label(row.get("utm_source_by_number")) or "не указано",
                 row.get("call_score"),
+                *(subscores.get(key) for key in SUBSCORE_KEYS),
                 score_date,
             ]
             for idx, value in enumerate(values, start=1):
@@ -363,7 +375,12 @@ class CallExportService:
             23: 18,
             24: 20,
             25: 24,
-            26: 24,
+            26: 16,
+            27: 16,
+            28: 16,
+            29: 16,
+            30: 16,
+            31: 24,
         }
         for column, width in column_widths.items():
             ws.column_dimensions[get_column_letter(column)].width = width
@@ -12,6 +12,7 @@ from typing import Any, Dict, List, Optional, Tuple
 from app.config import DB_CONFIG
 from app.db.manager import DatabaseManager
 from app.db.repositories.lm_repository import LMRepository
+from app.db.statements import cached_template
 from app.db.utils_schema import has_column
 from app.logging_config import get_watchdog_logger
 
@@ -177,6 +178,51 @@ class CallLookupService:
             
         return _as_datetime_range(start_date, end_date)
 
+    @staticmethod
+    @cached_template()
+    def _build_lookup_query(
+        history_pk: str,
+        record_url_select: str,
+        scores_join_available: bool,
+    ) -> str:
+        score_columns = "NULL AS score, NULL AS transcript"
+        score_join = ""
+        if scores_join_available:
+            score_columns = "cs.call_score AS score, cs.transcript"
+            score_join = f"LEFT JOIN call_scores cs ON cs.history_id = ch.{history_pk}"
+
+        caller_expr = _normalize_phone_sql(
+            "COALESCE(ch.caller_number, ch.caller_info, '')"
+        )
+        called_expr = _normalize_phone_sql(
+            "COALESCE(ch.called_number, ch.called_info, '')"
+        )
+
+        return f"""
+            SELECT
+                ch.{history_pk} AS history_id,
+                COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) AS call_time,
+                ch.caller_info,
+                ch.caller_number,
+                ch.called_info,
+                ch.called_number,
+                ch.talk_duration,
+                {record_url_select} AS record_url,
+                ch.recording_id,
+                {score_columns}
+            FROM call_history ch
+            {score_join}
+            WHERE (
+                {called_expr} COLLATE utf8mb4_general_ci LIKE CAST(%s AS CHAR CHARACTER SET utf8mb4)
+                OR {caller_expr} COLLATE utf8mb4_general_ci LIKE CAST(%s AS CHAR CHARACTER SET utf8mb4)
+            )
+            AND COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) BETWEEN %s AND %s
+            AND COALESCE(ch.talk_duration, 0) >= 10
+            GROUP BY ch.{history_pk}
+            ORDER BY COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) DESC
+            LIMIT %s OFFSET %s
+        """
+
     async def lookup_calls(
         self,
         *,
@@ -214,12 +260,8 @@ class CallLookupService:
         record_url_select = "ch.record_url" if record_url_exists else "NULL"
         history_pk = await self._get_history_pk_column()
         scores_join_available = await self._has_call_scores_history()
-        score_columns = "NULL AS score, NULL AS transcript"
-        score_join = ""
         score_result_select = "NULL"
         if scores_join_available:
-            score_columns = "cs.call_score AS score, cs.transcript"
-            score_join = f"LEFT JOIN call_scores cs ON cs.history_id = ch.{history_pk}"
             score_result_exists = await has_column(
                 self.db_manager,
                 "call_scores",
@@ -229,38 +271,12 @@ class CallLookupService:
             if score_result_exists:
                 score_result_select = "cs.result"
 
-        caller_expr = _normalize_phone_sql(
-            "COALESCE(ch.caller_number, ch.caller_info, '')"
-        )
-        called_expr = _normalize_phone_sql(
-            "COALESCE(ch.called_number, ch.called_info, '')"
+        query = self._build_lookup_query(
+            history_pk,
+            record_url_select,
+            scores_join_available,
         )
 
-        query = f"""
-            SELECT
-                ch.{history_pk} AS history_id,
-                COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) AS call_time,
-                ch.caller_info,
-                ch.caller_number,
-                ch.called_info,
-                ch.called_number,
-                ch.talk_duration,
-                {record_url_select} AS record_url,
-                ch.recording_id,
-                {score_columns}
-            FROM call_history ch
-            {score_join}
-            WHERE (
-                {called_expr} COLLATE utf8mb4_general_ci LIKE CAST(%s AS CHAR CHARACTER SET utf8mb4)
-                OR {caller_expr} COLLATE utf8mb4_general_ci LIKE CAST(%s AS CHAR CHARACTER SET utf8mb4)
-            )
-            AND COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) BETWEEN %s AND %s
-            AND COALESCE(ch.talk_duration, 0) >= 10
-            GROUP BY ch.{history_pk}
-            ORDER BY COALESCE(ch.context_start_time_dt, FROM_UNIXTIME(ch.context_start_time)) DESC
-            LIMIT %s OFFSET %s
-        """
-
         params = (
             normalized_like,
             normalized_like,
@@ -3,19 +3,86 @@
 """
 Dashboard Cache Service для работы с operator_dashboards.
 
-Кеширует метрики дашборда с TTL для ускорения загрузки.
-БД уже содержит таблицу operator_dashboards.
+Кеш двухуровневый:
+- L1 — TTL/LRU в памяти процесса по ключу (оператор, period_type, period_start):
+  повторный тап по дашборду не ходит в MySQL;
+- L2 — таблица operator_dashboards с TTL cache_ttl_minutes (общая для процессов).
+
+get_or_build() объединяет одновременные промахи по одному ключу (single-flight):
+дашборд строится один раз, остальные ждут тот же результат.
+invalidate_cache() чистит оба уровня.
 """
 
+import asyncio
+import time
 import traceback
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 from datetime import datetime, date
 
+from app.config import DASHBOARD_CONFIG
 from app.db.manager import DatabaseManager
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
 
+CacheKey = Tuple[str, str, str]
+DashboardBuilder = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+def _cache_key(operator_name: str, period_type: str, period_start: date) -> CacheKey:
+    return operator_name, period_type, period_start.isoformat()
+
+
+class DashboardL1Cache:
+    """TTL/LRU-кеш дашбордов в памяти процесса."""
+
+    def __init__(self, ttl_sec: float, max_entries: int):
+        self.ttl_sec = max(0.0, float(ttl_sec))
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, dashboard = entry
+        if time.monotonic() - stored_at > self.ttl_sec:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return dict(dashboard)
+
+    def touch(self, key: CacheKey) -> bool:
+        """Продлевает TTL записи (данные не изменились). False — записи нет или она истекла."""
+        dashboard = self.get(key)
+        if dashboard is None:
+            return False
+        self.put(key, dashboard)
+        return True
+
+    def put(self, key: CacheKey, dashboard: Dict[str, Any]) -> None:
+        if not self.ttl_sec:
+            return
+        self._entries[key] = time.monotonic(), dict(dashboard)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, operator_name: Optional[str] = None, period_type: Optional[str] = None) -> int:
+        stale = [
+            key
+            for key in self._entries
+            if (operator_name is None or key[0] == operator_name)
+            and (period_type is None or key[1] == period_type)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
 
 class DashboardCacheService:
     """Сервис кеширования дашбордов операторов."""
@@ -23,7 +90,79 @@ class DashboardCacheService:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.cache_ttl_minutes = 5  # TTL кеша
-    
+        self.l1 = DashboardL1Cache(
+            DASHBOARD_CONFIG["l1_ttl_sec"],
+            DASHBOARD_CONFIG["l1_max_entries"],
+        )
+        self._inflight: Dict[CacheKey, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    async def get_or_build(
+        self,
+        operator_name: str,
+        period_type: str,
+        period_start: date,
+        period_end: date,
+        builder: DashboardBuilder,
+        *,
+        refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Дашборд из L1 → L2 → builder() (с записью в оба уровня).
+
+        refresh=True пропускает чтение кеша, но одновременные запросы того же
+        ключа по-прежнему получают один общий результат.
+        """
+        key = _cache_key(operator_name, period_type, period_start)
+        if not refresh:
+            cached = self.l1.get(key)
+            if cached is not None:
+                logger.debug(f"[CACHE] L1 HIT: {key}")
+                return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.debug(f"[CACHE] Joining in-flight build: {key}")
+            return dict(await asyncio.shield(inflight))
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            dashboard = await self._load_or_build(
+                key, operator_name, period_type, period_start, period_end, builder, refresh
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Помечаем ошибку полученной: ожидающих может не быть, вызывающему она пробрасывается
+            future.exception()
+            raise
+        else:
+            future.set_result(dashboard)
+            return dict(dashboard)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load_or_build(
+        self,
+        key: CacheKey,
+        operator_name: str,
+        period_type: str,
+        period_start: date,
+        period_end: date,
+        builder: DashboardBuilder,
+        refresh: bool,
+    ) -> Dict[str, Any]:
+        if not refresh:
+            cached = await self._get_l2(operator_name, period_type, period_start)
+            if cached is not None:
+                self.l1.put(key, cached)
+                return cached
+        dashboard = await builder()
+        await self.save_dashboard_cache(operator_name, period_type, period_start, period_end, dashboard)
+        return dashboard
+
     async def get_cached_dashboard(
         self,
         operator_name: str,
@@ -31,11 +170,27 @@ class DashboardCacheService:
         period_start: date
     ) -> Optional[Dict[str, Any]]:
         """
-        Получить закешированный дашборд из operator_dashboards.
+        Получить закешированный дашборд: сначала L1, затем operator_dashboards.
         
         Returns:
             Dict с метриками или None если кеш устарел/отсутствует
         """
+        key = _cache_key(operator_name, period_type, period_start)
+        cached = self.l1.get(key)
+        if cached is not None:
+            return cached
+        cached = await self._get_l2(operator_name, period_type, period_start)
+        if cached is not None:
+            self.l1.put(key, cached)
+        return cached
+
+    async def _get_l2(
+        self,
+        operator_name: str,
+        period_type: str,
+        period_start: date
+    ) -> Optional[Dict[str, Any]]:
+        """Дашборд из operator_dashboards (None — нет свежей записи)."""
         logger.info(
             f"[CACHE] Getting cached dashboard: operator={operator_name}, "
             f"period={period_type}, start={period_start}"
@@ -86,7 +241,7 @@ class DashboardCacheService:
             
             if result:
                 logger.info(f"[CACHE] HIT: Found cached dashboard from {result.get('cached_at')}")
-                return dict(result)
+                return self._dashboard_from_row(result)
             else:
                 logger.info(f"[CACHE] MISS: No valid cache found")
                 return None
@@ -119,6 +274,8 @@ class DashboardCacheService:
             f"[CACHE] Saving dashboard: operator={operator_name}, "
             f"period={period_type}, start={period_start}"
         )
+        # L1 обновляем сразу: даже если запись в таблицу не удалась, свежий дашборд уже есть
+        self.l1.put(_cache_key(operator_name, period_type, period_start), metrics)
         
         try:
             query = """
@@ -186,7 +343,7 @@ class DashboardCacheService:
                 metrics.get('total_calls', 0),
                 metrics.get('accepted_calls', 0),
                 metrics.get('missed_calls', 0),
-                metrics.get('records', 0),
+                metrics.get('records', metrics.get('records_count', 0)),
                 metrics.get('leads_no_record', 0),
                 metrics.get('wish_to_record', 0),
                 metrics.get('conversion_rate', 0.0),
@@ -218,33 +375,33 @@ class DashboardCacheService:
     
     async def invalidate_cache(
         self,
-        operator_name: str,
+        operator_name: Optional[str] = None,
         period_type: Optional[str] = None
     ) -> bool:
         """
-        Инвалидировать кеш для оператора.
+        Инвалидировать кеш (оба уровня).
         
         Args:
-            operator_name: Имя оператора
+            operator_name: Имя оператора; если не указан — все операторы
             period_type: Если указан - только этот тип периода, иначе все
         """
-        logger.info(f"[CACHE] Invalidating cache for {operator_name}, period={period_type}")
+        logger.info(f"[CACHE] Invalidating cache for {operator_name or 'all operators'}, period={period_type}")
+        self.l1.invalidate(operator_name, period_type)
         
         try:
+            conditions = []
+            params: Tuple[Any, ...] = ()
+            if operator_name:
+                conditions.append("operator_name = %s")
+                params += (operator_name,)
             if period_type:
-                query = """
-                    DELETE FROM operator_dashboards
-                    WHERE operator_name = %s AND period_type = %s
-                """
-                params = (operator_name, period_type)
-            else:
-                query = """
-                    DELETE FROM operator_dashboards
-                    WHERE operator_name = %s
-                """
-                params = (operator_name,)
+                conditions.append("period_type = %s")
+                params += (period_type,)
+            query = "DELETE FROM operator_dashboards"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
             
-            await self.db.execute_with_retry(query, params=params, commit=True)
+            await self.db.execute_with_retry(query, params=params or None, commit=True)
             
             logger.info(f"[CACHE] Cache invalidated successfully")
             return True
@@ -255,6 +412,70 @@ class DashboardCacheService:
             )
             return False
     
+    async def fresh_operators(self, period_type: str, period_start: date) -> Set[str]:
+        """Операторы, у которых дашборд периода есть в operator_dashboards и не истек."""
+        query = """
+            SELECT operator_name
+            FROM operator_dashboards
+            WHERE period_type = %s
+              AND period_start = %s
+              AND cached_at >= DATE_SUB(NOW(), INTERVAL %s MINUTE)
+        """
+        try:
+            rows = await self.db.execute_with_retry(
+                query,
+                params=(period_type, period_start, self.cache_ttl_minutes),
+                fetchall=True,
+            ) or []
+        except Exception as e:
+            logger.error(f"[CACHE] Error listing fresh dashboards: {e}\n{traceback.format_exc()}")
+            return set()
+        return {row['operator_name'] for row in rows if row.get('operator_name')}
+
+    async def touch(self, operator_names: Iterable[str], period_type: str, period_start: date) -> int:
+        """
+        Продлевает TTL дашбордов без пересборки (у операторов не было новых звонков).
+
+        Returns:
+            Количество обновленных строк operator_dashboards
+        """
+        names = sorted(set(operator_names))
+        if not names:
+            return 0
+        for name in names:
+            self.l1.touch(_cache_key(name, period_type, period_start))
+        placeholders = ", ".join(["%s"] * len(names))
+        query = f"""
+            UPDATE operator_dashboards
+            SET cached_at = NOW()
+            WHERE period_type = %s
+              AND period_start = %s
+              AND operator_name IN ({placeholders})
+        """
+        params = (period_type, period_start, *names)
+
+        # execute_with_retry на запись возвращает True, а не rowcount
+        async def _work(tx) -> int:
+            return await tx.execute(query, params, query_name="dashboard_cache.touch")
+
+        try:
+            result = await self.db.run_in_transaction(_work, query_name="dashboard_cache.touch")
+        except Exception as e:
+            logger.error(f"[CACHE] Error touching cache: {e}\n{traceback.format_exc()}")
+            return 0
+        return result if isinstance(result, int) else 0
+
+    @staticmethod
+    def _dashboard_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Строка operator_dashboards → формат get_live_dashboard_single."""
+        dashboard = dict(row)
+        dashboard.setdefault('records', dashboard.get('records_count', 0))
+        for field in ('period_start', 'period_end'):
+            value = dashboard.get(field)
+            if isinstance(value, (date, datetime)):
+                dashboard[field] = value.isoformat()
+        return dashboard
+
     async def cleanup_old_cache(self, days: int = 7) -> bool:
         """
         Очистить устаревший кеш старше N дней.
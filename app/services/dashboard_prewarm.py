@@ -0,0 +1,153 @@
+# Файл: app/services/dashboard_prewarm.py
+
+"""
+Фоновый прогрев дашбордов операторов.
+
+Задача планировщика (см. main) запускается чуть раньше истечения TTL кеша
+operator_dashboards и для каждого оператора из get_dashboard_operator_names и
+каждого периода (day/week/month):
+- пересобирает дашборд, если у оператора появились новые звонки, дашборда нет
+  в кеше или он собран дольше prewarm_max_age_sec назад;
+- иначе только продлевает TTL кеша (данные не изменились).
+
+Сборка идет через DashboardCacheService.get_or_build, поэтому одновременный тап
+пользователя не строит тот же дашборд второй раз. Параллельно строится не
+больше prewarm_concurrency дашбордов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import DASHBOARD_CONFIG
+from app.db.repositories.analytics import AnalyticsRepository, period_bounds
+from app.db.repositories.operators import OperatorRepository
+from app.logging_config import get_watchdog_logger
+from app.services.dashboard_cache import DashboardCacheService
+
+logger = get_watchdog_logger(__name__)
+
+PREWARM_PERIODS: Tuple[str, ...] = ('day', 'week', 'month')
+
+
+class DashboardPrewarmService:
+    """Прогрев кеша дашбордов для всех активных операторов."""
+
+    def __init__(
+        self,
+        operator_repo: OperatorRepository,
+        analytics_repo: AnalyticsRepository,
+        cache_service: DashboardCacheService,
+        *,
+        concurrency: Optional[int] = None,
+        max_age_sec: Optional[float] = None,
+    ):
+        self.operator_repo = operator_repo
+        self.analytics_repo = analytics_repo
+        self.cache_service = cache_service
+        self.concurrency = max(1, int(concurrency or DASHBOARD_CONFIG["prewarm_concurrency"]))
+        if max_age_sec is None:
+            max_age_sec = DASHBOARD_CONFIG["prewarm_max_age_sec"]
+        self.max_age_sec = float(max_age_sec)
+        # call_scores.id, до которого новые звонки уже учтены (None — первый прогон)
+        self._watermark: Optional[int] = None
+        # (оператор, период, начало периода) -> monotonic время последней сборки
+        self._built_at: Dict[Tuple[str, str, str], float] = {}
+
+    async def run(self) -> Dict[str, int]:
+        """Один прогон прогрева. Returns: статистика (built, touched, errors, operators)."""
+        started = time.monotonic()
+        stats = {'operators': 0, 'built': 0, 'touched': 0, 'errors': 0}
+
+        operators = await self._operator_names()
+        stats['operators'] = len(operators)
+        if not operators:
+            logger.info("[PREWARM] No operators to warm up")
+            return stats
+        changed = await self._changed_operators()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        current_periods = set()
+        for period in PREWARM_PERIODS:
+            date_from, date_to = period_bounds(period)
+            current_periods.add((period, date_from.isoformat()))
+            fresh = await self.cache_service.fresh_operators(period, date_from)
+            to_build: List[str] = []
+            to_touch: List[str] = []
+            for name in operators:
+                if self._needs_build(name, period, date_from.isoformat(), fresh, changed):
+                    to_build.append(name)
+                else:
+                    to_touch.append(name)
+
+            stats['touched'] += await self.cache_service.touch(to_touch, period, date_from)
+            results = await asyncio.gather(
+                *(self._build(semaphore, name, period, date_from, date_to) for name in to_build)
+            )
+            stats['built'] += sum(1 for ok in results if ok)
+            stats['errors'] += sum(1 for ok in results if not ok)
+
+        # Прошедшие периоды больше не прогреваются
+        self._built_at = {key: value for key, value in self._built_at.items() if key[1:] in current_periods}
+        logger.info(
+            "[PREWARM] Done in %.1fs: operators=%s, built=%s, touched=%s, errors=%s",
+            time.monotonic() - started,
+            stats['operators'],
+            stats['built'],
+            stats['touched'],
+            stats['errors'],
+        )
+        return stats
+
+    def _needs_build(
+        self,
+        operator_name: str,
+        period: str,
+        period_start: str,
+        fresh: Set[str],
+        changed: Optional[Set[str]],
+    ) -> bool:
+        if changed is None or operator_name in changed or operator_name not in fresh:
+            return True
+        built_at = self._built_at.get((operator_name, period, period_start))
+        # Дашборд собран не этим процессом или давно: пересобираем (страховка от
+        # переоценки звонков, которую watermark по id не видит)
+        return built_at is None or time.monotonic() - built_at > self.max_age_sec
+
+    async def _build(
+        self,
+        semaphore: asyncio.Semaphore,
+        operator_name: str,
+        period: str,
+        date_from: date,
+        date_to: date,
+    ) -> bool:
+        async with semaphore:
+            try:
+                await self.cache_service.get_or_build(
+                    operator_name,
+                    period,
+                    date_from,
+                    date_to,
+                    lambda: self.analytics_repo.get_live_dashboard_single(operator_name, period),
+                    refresh=True,
+                )
+            except Exception as e:
+                logger.warning(f"[PREWARM] Failed to build dashboard {operator_name}/{period}: {e}")
+                return False
+        self._built_at[(operator_name, period, date_from.isoformat())] = time.monotonic()
+        return True
+
+    async def _operator_names(self) -> List[str]:
+        return await self.operator_repo.get_dashboard_operator_names()
+
+    async def _changed_operators(self) -> Optional[Set[str]]:
+        """Операторы с новыми звонками с прошлого прогона; None — первый прогон (все)."""
+        if self._watermark is None:
+            self._watermark = await self.analytics_repo.get_call_scores_watermark()
+            return None
+        changed, self._watermark = await self.analytics_repo.get_operators_with_new_calls(self._watermark)
+        return changed
@@ -0,0 +1,142 @@
+"""
+Многошаблонный поиск ключевых слов за один проход по тексту.
+
+Все списки ключевых слов собираются в одно регулярное выражение-trie внутри
+lookahead: `(?=(<trie>))`. В каждой позиции текста движок находит самое длинное
+ключевое слово; остальные совпадения в этой позиции — его префиксы из того же
+набора, они достраиваются по заранее посчитанной таблице. Результат эквивалентен
+`kw in text` / `text.find(kw)` для каждого слова, но текст сканируется один раз.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+
+class KeywordHit(NamedTuple):
+    category: str
+    keyword: str
+    start: int
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _render(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + _render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Жадный необязательный хвост: сначала пробуем более длинное слово.
+            return "(?:" + body + ")?"
+        return body
+
+    return _render(trie)
+
+
+class KeywordScan:
+    """Результат одного прохода: все вхождения ключевых слов с категориями и смещениями."""
+
+    __slots__ = ("_matcher", "_positions")
+
+    def __init__(self, matcher: "KeywordMatcher", positions: Dict[str, List[int]]):
+        self._matcher = matcher
+        self._positions = positions
+
+    def find(self, keyword: str) -> int:
+        """Смещение первого вхождения keyword или -1 (как str.find)."""
+        positions = self._positions.get(keyword)
+        return positions[0] if positions else -1
+
+    def count(self, keyword: str, *, overlapping: bool = True) -> int:
+        """
+        Число вхождений keyword. overlapping=False считает непересекающиеся
+        вхождения слева направо (как str.count).
+        """
+        positions = self._positions.get(keyword, ())
+        if overlapping or len(positions) < 2:
+            return len(positions)
+        total = 0
+        next_free = 0
+        for start in positions:
+            if start >= next_free:
+                total += 1
+                next_free = start + len(keyword)
+        return total
+
+    def has(self, category: str) -> bool:
+        return self.first(category) is not None
+
+    def first(self, category: str) -> Optional[str]:
+        """Первое по порядку списка ключевое слово категории, встретившееся в тексте."""
+        for keyword in self._matcher.keywords(category):
+            if keyword in self._positions:
+                return keyword
+        return None
+
+    def first_category(self, categories: Sequence[str]) -> Optional[str]:
+        """Первая категория из categories, у которой есть хотя бы одно совпадение."""
+        for category in categories:
+            if self.has(category):
+                return category
+        return None
+
+    def hits(self) -> Iterator[KeywordHit]:
+        """Все вхождения (категория, слово, смещение), отсортированные по смещению."""
+        flat: List[KeywordHit] = []
+        for keyword, positions in self._positions.items():
+            for category in self._matcher.categories_of(keyword):
+                flat.extend(KeywordHit(category, keyword, start) for start in positions)
+        flat.sort(key=lambda hit: hit.start)
+        return iter(flat)
+
+
+class KeywordMatcher:
+    """
+    Предкомпилированный матчер для набора категорий ключевых слов.
+
+    Текст ожидается уже приведённым к нижнему регистру (ключевые слова — тоже).
+    """
+
+    def __init__(self, groups: Mapping[str, Sequence[str]]):
+        self._groups: Dict[str, Tuple[str, ...]] = {
+            category: tuple(keyword for keyword in keywords if keyword)
+            for category, keywords in groups.items()
+        }
+        self._categories: Dict[str, Tuple[str, ...]] = {}
+        for category, keywords in self._groups.items():
+            for keyword in keywords:
+                known = self._categories.get(keyword, ())
+                if category not in known:
+                    self._categories[keyword] = known + (category,)
+        words = sorted(self._categories)
+        # Для каждого слова — все слова набора, являющиеся его префиксами (включая само слово).
+        self._prefixes: Dict[str, Tuple[str, ...]] = {
+            word: tuple(other for other in words if word.startswith(other))
+            for word in words
+        }
+        self._pattern = re.compile(f"(?=({_trie_pattern(words)}))") if words else None
+
+    def keywords(self, category: str) -> Tuple[str, ...]:
+        return self._groups.get(category, ())
+
+    def categories_of(self, keyword: str) -> Tuple[str, ...]:
+        return self._categories.get(keyword, ())
+
+    def scan(self, text: Optional[str]) -> KeywordScan:
+        positions: Dict[str, List[int]] = {}
+        if text and self._pattern is not None:
+            prefixes = self._prefixes
+            for match in self._pattern.finditer(text):
+                start = match.start()
+                for keyword in prefixes[match.group(1)]:
+                    positions.setdefault(keyword, []).append(start)
+        return KeywordScan(self, positions)
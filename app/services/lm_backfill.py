@@ -0,0 +1,239 @@
+"""
+Возобновляемый backfill LM-метрик по call_history.
+
+Звонки перебираются по ключу history_id (keyset) внутри диапазона дат. После
+каждого чанка watermark в lm_calc_state фиксирует последний обработанный
+history_id, поэтому после падения прогон продолжается с места остановки.
+Ключ watermark включает LM_VERSION: после смены версии тот же диапазон
+пересчитывается с начала. Скорость ограничивается целевым числом звонков
+в секунду, прогресс и ETA передаются в callback и пишутся в лог.
+
+В режиме incremental чанки проходят через LMIncrementalRecalculator: после
+правки словаря или матрицы весов перезаписываются только изменившиеся метрики.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from app.config import LM_BACKFILL_CONFIG
+from app.db.repositories.lm_repository import LMRepository
+from app.logging_config import get_watchdog_logger
+from app.services.lm_incremental import LMIncrementalRecalculator
+from app.services.lm_service import CallRow, LMService
+
+logger = get_watchdog_logger(__name__)
+
+
+def backfill_profile(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    *,
+    inputs_tag: Optional[str] = None,
+) -> str:
+    """
+    calc_profile watermark'а для диапазона: 'backfill:20250101-20250630' ('*' — без границы).
+
+    У инкрементального прохода свой watermark на каждую версию правил
+    (':inc-<inputs_tag>'): после правки словаря диапазон проходится заново.
+    """
+
+    def _fmt(value: Optional[datetime]) -> str:
+        return value.strftime("%Y%m%d") if value else "*"
+
+    profile = f"backfill:{_fmt(start_date)}-{_fmt(end_date)}"
+    return f"{profile}:inc-{inputs_tag}" if inputs_tag else profile
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "—"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}ч {minutes:02d}м"
+    if minutes:
+        return f"{minutes}м {secs:02d}с"
+    return f"{secs}с"
+
+
+@dataclass
+class BackfillProgress:
+    """Состояние прогона backfill."""
+
+    profile: str
+    total: int
+    done: int = 0
+    saved: int = 0
+    errors: int = 0
+    last_id: int = 0
+    elapsed_sec: float = 0.0
+    finished: bool = False
+
+    @property
+    def rate(self) -> float:
+        """Обработано звонков в секунду с начала прогона."""
+        return self.done / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+    @property
+    def percent(self) -> float:
+        if self.total <= 0:
+            return 100.0 if self.finished else 0.0
+        return min(100.0, self.done * 100.0 / self.total)
+
+    @property
+    def eta_sec(self) -> Optional[float]:
+        if self.finished:
+            return 0.0
+        if self.rate <= 0:
+            return None
+        return max(0, self.total - self.done) / self.rate
+
+    def summary(self) -> str:
+        return (
+            f"{self.profile}: {self.done}/{self.total} ({self.percent:.1f}%), "
+            f"saved={self.saved}, errors={self.errors}, last_id={self.last_id}, "
+            f"{self.rate:.1f} calls/s, elapsed={_format_duration(self.elapsed_sec)}, "
+            f"ETA={_format_duration(self.eta_sec)}"
+        )
+
+
+ProgressCallback = Callable[[BackfillProgress], Awaitable[None]]
+
+
+class LMBackfillService:
+    """Пересчет LM-метрик за произвольный период с watermark на каждый чанк."""
+
+    def __init__(
+        self,
+        lm_repo: LMRepository,
+        lm_service: LMService,
+        *,
+        chunk_size: Optional[int] = None,
+        rows_per_sec: Optional[float] = None,
+        incremental: bool = False,
+    ):
+        self.repo = lm_repo
+        self.lm_service = lm_service
+        self.incremental = LMIncrementalRecalculator(lm_repo, lm_service) if incremental else None
+        self.chunk_size = max(1, int(chunk_size or LM_BACKFILL_CONFIG["chunk_size"]))
+        if rows_per_sec is None:
+            rows_per_sec = LM_BACKFILL_CONFIG["rows_per_sec"]
+        self.rows_per_sec = max(0.0, float(rows_per_sec))
+
+    async def run(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        *,
+        restart: bool = False,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> BackfillProgress:
+        """
+        Пересчитывает метрики звонков с context_start_time в [start_date, end_date].
+
+        Args:
+            start_date: Начало периода (None — с самого первого звонка)
+            end_date: Конец периода (None — до последнего звонка)
+            restart: Игнорировать сохраненный watermark и пройти диапазон заново
+            progress_callback: Вызывается после каждого чанка
+
+        Returns:
+            Итоговый BackfillProgress
+        """
+        lm_version = self.lm_service.lm_version
+        inputs_tag = None
+        if self.incremental is not None:
+            # Профиль (и watermark) меняется при любой правке правил, включая словарь:
+            # проход идет заново, но пересчитываются только звонки с новым отпечатком
+            inputs_version = await self.lm_service.inputs_version()
+            dictionary = await self.lm_service.complaint_dictionary()
+            rules = f"{inputs_version}|terms={dictionary.fingerprint if dictionary is not None else '-'}"
+            inputs_tag = hashlib.sha1(rules.encode("utf-8")).hexdigest()[:8]
+        profile = backfill_profile(start_date, end_date, inputs_tag=inputs_tag)
+        start_ts = int(start_date.timestamp()) if start_date else None
+        end_ts = int(end_date.timestamp()) if end_date else None
+
+        after_id = 0
+        if not restart:
+            watermark = await self.repo.get_calc_watermark(lm_version, profile)
+            after_id = int(watermark.get("last_id") or 0)
+        total = await self.repo.count_history_range(
+            after_id,
+            start_timestamp=start_ts,
+            end_timestamp=end_ts,
+        )
+        progress = BackfillProgress(profile=profile, total=total, last_id=after_id)
+        logger.info(
+            "[LM][backfill] Start %s (lm_version=%s, after_id=%s, calls=%s, limit=%s calls/s)",
+            profile,
+            lm_version,
+            after_id,
+            total,
+            self.rows_per_sec or "∞",
+        )
+
+        started = time.monotonic()
+        while True:
+            rows = await self.repo.get_history_chunk(
+                after_id,
+                self.chunk_size,
+                start_timestamp=start_ts,
+                end_timestamp=end_ts,
+            )
+            if not rows:
+                break
+            scores_map = await self.repo.get_call_scores_map([row["history_id"] for row in rows])
+            batch = [(row["history_id"], row, scores_map.get(row["history_id"])) for row in rows]
+            saved = await self._process_chunk(batch)
+
+            if not await self.lm_service.flush_pending_writes():
+                raise RuntimeError("LM write-behind queue was not flushed; watermark not advanced")
+            last_row = rows[-1]
+            after_id = int(last_row["history_id"])
+            await self.repo.update_calc_watermark(
+                lm_version,
+                profile,
+                last_row.get("context_start_time_dt") or datetime.now(),
+                after_id,
+            )
+
+            progress.done += len(rows)
+            progress.saved += saved
+            progress.errors += len(rows) - saved
+            progress.last_id = after_id
+            progress.elapsed_sec = time.monotonic() - started
+            logger.info("[LM][backfill] %s", progress.summary())
+            if progress_callback is not None:
+                await progress_callback(progress)
+            await self._throttle(progress.done, started)
+
+        progress.finished = True
+        progress.elapsed_sec = time.monotonic() - started
+        logger.info("[LM][backfill] Done %s", progress.summary())
+        if progress_callback is not None:
+            await progress_callback(progress)
+        return progress
+
+    async def _process_chunk(self, batch: List[CallRow]) -> int:
+        """Считает и пишет чанк; возвращает число звонков с актуальными метриками."""
+        if self.incremental is not None:
+            stats = await self.incremental.process(batch, calc_source="backfill")
+            return stats.up_to_date
+        payloads = await self.lm_service.calculate_metrics_batch(batch, calc_source="backfill")
+        saved_by_call = await self.lm_service.save_payloads_bulk(payloads)
+        return sum(1 for count in saved_by_call.values() if count)
+
+    async def _throttle(self, done: int, started: float) -> None:
+        """Держит среднюю скорость не выше rows_per_sec, чтобы не забирать БД у бота."""
+        if self.rows_per_sec <= 0:
+            return
+        delay = done / self.rows_per_sec - (time.monotonic() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
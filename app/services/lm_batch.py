@@ -0,0 +1,156 @@
+"""
+Правила числовых LM-метрик и их поколоночный расчёт для батча звонков.
+
+Функции для одного значения (response_speed, talk_efficiency, queue_impact,
+conversion_score, scaled_score, conversion_forecast) — единственное место,
+где заданы пороги: LMService._calculate_* вызывают их для одного звонка,
+а *_column применяют к колонкам батча (входные поля извлекаются один раз).
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Пороги ожидания (сек) и результат для каждого интервала: <20, <40, <60, <120, >=120
+_WAIT_THRESHOLDS: Tuple[float, ...] = (20.0, 40.0, 60.0, 120.0)
+_WAIT_SCORES: Tuple[Tuple[float, str], ...] = (
+    (5.0, "green"),
+    (4.0, "green"),
+    (3.0, "yellow"),
+    (2.0, "red"),
+    (1.0, "red"),
+)
+_NO_TALK_SPEED: Tuple[float, str] = (1.0, "red")
+
+NUMERIC_KEYS: Tuple[str, ...] = (
+    "response_speed",
+    "talk_efficiency",
+    "queue_impact",
+    "conversion_score",
+    "checklist_coverage",
+    "normalized_score",
+    "conversion_forecast",
+)
+
+
+def _to_float(record: Optional[Mapping[str, Any]], key: str, default: float = 0.0) -> float:
+    if not record:
+        return default
+    value = record.get(key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def float_column(
+    records: Sequence[Optional[Mapping[str, Any]]],
+    key: str,
+    default: float = 0.0,
+) -> List[float]:
+    return [_to_float(record, key, default) for record in records]
+
+
+def response_speed(talk_duration: float, wait_time: float) -> Tuple[float, str]:
+    """Скорость отклика: (балл, цвет); звонок короче 1 с — (1.0, red)."""
+    if talk_duration <= 1.0:
+        return _NO_TALK_SPEED
+    return _WAIT_SCORES[bisect_right(_WAIT_THRESHOLDS, wait_time)]
+
+
+def talk_efficiency(talk_duration: float) -> float:
+    if talk_duration <= 0:
+        return 0.0
+    if talk_duration >= 60:
+        return min(100.0, talk_duration / 3)
+    return talk_duration * 2
+
+
+def queue_impact(talk_duration: float) -> float:
+    if talk_duration <= 0:
+        return 0.0
+    return min(100.0, round((talk_duration / 300) * 100, 1))
+
+
+def conversion_score(score: Optional[Mapping[str, Any]]) -> float:
+    if not score:
+        return 0.0
+    outcome = str(score.get("outcome") or "")
+    if outcome == "record":
+        return 100.0
+    if outcome == "lead_no_record":
+        return 50.0
+    if outcome == "info_only" or str(score.get("call_category") or "") == "Информационный":
+        return 20.0
+    return 0.0
+
+
+def scaled_score(score: Optional[Mapping[str, Any]], key: str) -> float:
+    """min(100, value * 10); 0 для звонков без call_scores."""
+    return min(100.0, _to_float(score, key) * 10.0) if score else 0.0
+
+
+def conversion_forecast(score: Optional[Mapping[str, Any]]) -> float:
+    if not score:
+        return 0.1
+    outcome = str(score.get("outcome") or "")
+    if outcome == "record":
+        return 1.0
+    if outcome == "lead_no_record":
+        return 0.35
+    if score.get("is_target", 0):
+        return 0.25
+    return 0.05
+
+
+def response_speed_column(talk: Sequence[float], wait: Sequence[float]) -> List[Tuple[float, str]]:
+    return [response_speed(duration, waited) for duration, waited in zip(talk, wait)]
+
+
+def talk_efficiency_column(talk: Sequence[float]) -> List[float]:
+    return [talk_efficiency(duration) for duration in talk]
+
+
+def queue_impact_column(talk: Sequence[float]) -> List[float]:
+    return [queue_impact(duration) for duration in talk]
+
+
+def conversion_score_column(scores: Sequence[Optional[Mapping[str, Any]]]) -> List[float]:
+    return [conversion_score(score) for score in scores]
+
+
+def scaled_score_column(
+    scores: Sequence[Optional[Mapping[str, Any]]],
+    key: str,
+) -> List[float]:
+    return [scaled_score(score, key) for score in scores]
+
+
+def conversion_forecast_column(scores: Sequence[Optional[Mapping[str, Any]]]) -> List[float]:
+    return [conversion_forecast(score) for score in scores]
+
+
+def numeric_columns(
+    histories: Sequence[Mapping[str, Any]],
+    scores: Sequence[Optional[Mapping[str, Any]]],
+) -> Dict[str, List[Any]]:
+    """Считает все числовые метрики батча; ключи — NUMERIC_KEYS, значения — колонки."""
+    talk = float_column(histories, "talk_duration")
+    wait = float_column(histories, "await_sec")
+    return {
+        "response_speed": response_speed_column(talk, wait),
+        "talk_efficiency": talk_efficiency_column(talk),
+        "queue_impact": queue_impact_column(talk),
+        "conversion_score": conversion_score_column(scores),
+        "checklist_coverage": scaled_score_column(scores, "number_checklist"),
+        "normalized_score": scaled_score_column(scores, "call_score"),
+        "conversion_forecast": conversion_forecast_column(scores),
+    }
+
+
+def row_view(columns: Mapping[str, List[Any]], index: int) -> Dict[str, Any]:
+    """Значения числовых метрик одного звонка из колонок."""
+    return {key: column[index] for key, column in columns.items()}
@@ -0,0 +1,175 @@
+"""
+Скомпилированный словарь LM rule-engine (lm_dictionary_terms).
+
+Словарь компилируется один раз при загрузке: regex-термины — в готовые
+re.Pattern, phrase/stem-термины — в общий KeywordMatcher, который находит все
+фразы за один проход по транскрипту. Невалидные регулярки отбрасываются с
+предупреждением на этапе компиляции, а не при каждом звонке. В отпечаток
+входов звонка для инкрементального пересчета LM входят только сработавшие на
+нем термины (matched_terms_key), а не содержимое всего словаря.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Pattern, Sequence
+
+from app.logging_config import get_watchdog_logger
+from app.services.keyword_matcher import KeywordMatcher
+
+logger = get_watchdog_logger(__name__)
+
+_PHRASES = "phrase"
+
+SnippetBuilder = Callable[[str, int, int], str]
+
+
+class CompiledTerm(NamedTuple):
+    term: str
+    match_type: str
+    weight: int
+    is_negative: bool
+    needle: Optional[str]
+    pattern: Optional[Pattern[str]]
+
+
+class CompiledDictionary:
+    """Термины одного словаря одной версии, готовые к сканированию транскрипта."""
+
+    def __init__(
+        self,
+        terms: Sequence[Dict[str, Any]],
+        *,
+        dict_code: str = "",
+        version: str = "",
+    ):
+        self.dict_code = dict_code
+        self.version = version
+        self.invalid_terms: List[str] = []
+        self.fingerprint = self._fingerprint(terms)
+        self._terms: List[CompiledTerm] = []
+        for term in terms or ():
+            compiled = self._compile_term(term)
+            if compiled is not None:
+                self._terms.append(compiled)
+        self._phrases = KeywordMatcher(
+            {_PHRASES: [term.needle for term in self._terms if term.needle]}
+        )
+
+    @staticmethod
+    def _fingerprint(terms: Optional[Sequence[Dict[str, Any]]]) -> str:
+        """sha1 значимых полей терминов: меняется при любой правке словаря."""
+        material = [
+            [term.get("term"), term.get("match_type", "phrase"), term.get("weight"), bool(term.get("is_negative"))]
+            for term in terms or ()
+        ]
+        return hashlib.sha1(
+            json.dumps(material, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _compile_term(self, term: Dict[str, Any]) -> Optional[CompiledTerm]:
+        raw = term.get("term")
+        if not raw:
+            return None
+        weight = int(term.get("weight") or 0)
+        if not weight:
+            return None
+        match_type = term.get("match_type", "phrase")
+        is_negative = bool(term.get("is_negative"))
+        if match_type == "regex":
+            try:
+                pattern = re.compile(raw, re.IGNORECASE)
+            except re.error:
+                logger.warning(
+                    "Неверное регулярное выражение в словаре %s (%s): %s",
+                    self.dict_code or "—",
+                    self.version or "—",
+                    raw,
+                )
+                self.invalid_terms.append(raw)
+                return None
+            return CompiledTerm(raw, match_type, weight, is_negative, None, pattern)
+        # Для stem/phrase ищем по подстроке
+        needle = raw.lower()
+        if not needle:
+            return None
+        return CompiledTerm(raw, match_type, weight, is_negative, needle, None)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def matched_terms_key(self, transcript: str, *, transcript_lower: Optional[str] = None) -> str:
+        """
+        sha1 терминов (с типом, весом и знаком), сработавших на транскрипте; "-" — ни одного.
+
+        Правка словаря меняет ключ только у звонков, где добавленный, удаленный
+        или измененный термин встречается.
+        """
+        if not transcript or not self._terms:
+            return "-"
+        if transcript_lower is None:
+            transcript_lower = transcript.lower()
+        phrase_scan = self._phrases.scan(transcript_lower)
+        matched = sorted(
+            [term.term, term.match_type, term.weight, term.is_negative]
+            for term in self._terms
+            if (
+                term.pattern.search(transcript) is not None
+                if term.pattern is not None
+                else phrase_scan.find(term.needle) >= 0
+            )
+        )
+        if not matched:
+            return "-"
+        return hashlib.sha1(
+            json.dumps(matched, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def scan(
+        self,
+        transcript: str,
+        snippet_builder: SnippetBuilder,
+        *,
+        transcript_lower: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Находит совпадения словаря в транскрипте (порядок — как в словаре)."""
+        if not transcript or not self._terms:
+            return []
+        if transcript_lower is None:
+            transcript_lower = transcript.lower()
+        phrase_scan = self._phrases.scan(transcript_lower)
+        matches: List[Dict[str, Any]] = []
+        detected_at = datetime.utcnow().isoformat()
+        for term in self._terms:
+            if term.pattern is not None:
+                first = None
+                occurrences = 0
+                for match in term.pattern.finditer(transcript):
+                    if first is None:
+                        first = match
+                    occurrences += 1
+                if first is None:
+                    continue
+                sample_start, sample_end = first.start(), first.end()
+            else:
+                sample_start = phrase_scan.find(term.needle)
+                if sample_start < 0:
+                    continue
+                sample_end = sample_start + len(term.needle)
+                occurrences = phrase_scan.count(term.needle, overlapping=False)
+
+            matches.append(
+                {
+                    "term": term.term,
+                    "match_type": term.match_type,
+                    "weight": term.weight,
+                    "hit_count": occurrences,
+                    "snippet": snippet_builder(transcript, sample_start, sample_end),
+                    "is_negative": term.is_negative,
+                    "detected_at": detected_at,
+                }
+            )
+        return matches
@@ -0,0 +1,43 @@
+"""
+Пул процессов для CPU-части расчета LM.
+
+Детекторы жалоб/перезвона — чистый Python поверх строк; в процессе бота они
+блокируют event loop, и обработка апдейтов Telegram встает на время backfill
+или sync_new_metrics. С LM_PROCESS_WORKERS > 0 LMService отправляет расчет
+батча в отдельные процессы (score_batch_in_worker), а в цикле остается только I/O.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.config import LM_EXECUTOR_CONFIG
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+
+def create_lm_executor(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """
+    Создает пул процессов для LMService или None, если вынос выключен (workers <= 0).
+
+    Используется spawn: форк процесса с работающим event loop и потоками небезопасен.
+    """
+    if workers is None:
+        workers = LM_EXECUTOR_CONFIG["process_workers"]
+    if workers <= 0:
+        return None
+    logger.info("LM process pool: %s worker(s)", workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def shutdown_lm_executor(executor: Optional[ProcessPoolExecutor]) -> None:
+    """Останавливает пул, не дожидаясь незапущенных задач."""
+    if executor is None:
+        return
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,126 @@
+"""
+Запись срабатываний словаря LM (lm_dictionary_hits) пачками.
+
+Без буфера (buffer_rows=0) хиты звонка или батча уходят одним multi-row upsert
+сразу. С буфером строки копятся в памяти, а повторные хиты одного ключа
+(history_id, dict_code, term, dict_version) схлопываются. Буфер сбрасывается по
+размеру или раз в flush_interval_sec фоновой задачей, а также при close().
+Для пересчитанных звонков (scopes) вместе с записью удаляются хиты термов,
+которых в новом расчете нет.
+Хиты — диагностические данные: ошибка записи логируется, расчет метрик не падает.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+from app.config import LM_HITS_CONFIG
+from app.db.repositories.lm_dictionary_repository import (
+    HitKey,
+    HitRow,
+    HitScope,
+    LMDictionaryRepository,
+    hit_key,
+    hit_scope,
+)
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+
+class DictionaryHitWriter:
+    """Пакетная идемпотентная запись хитов словаря с необязательным буфером."""
+
+    def __init__(
+        self,
+        repo: LMDictionaryRepository,
+        *,
+        buffer_rows: Optional[int] = None,
+        flush_interval_sec: Optional[float] = None,
+    ):
+        self.repo = repo
+        if buffer_rows is None:
+            buffer_rows = LM_HITS_CONFIG["buffer_rows"]
+        if flush_interval_sec is None:
+            flush_interval_sec = LM_HITS_CONFIG["flush_interval_sec"]
+        self.buffer_rows = max(0, int(buffer_rows))
+        self.flush_interval_sec = max(0.0, float(flush_interval_sec))
+        self._pending: Dict[HitKey, HitRow] = {}
+        self._scopes: Set[HitScope] = set()
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def buffered(self) -> bool:
+        return self.buffer_rows > 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def write(self, rows: Sequence[HitRow], scopes: Iterable[HitScope] = ()) -> None:
+        """
+        Пишет строки сразу или кладет в буфер (см. buffer_rows).
+
+        scopes — звонки (history_id, dict_code, dict_version), для которых rows —
+        полный новый набор хитов (в т.ч. пустой).
+        """
+        scopes = set(scopes)
+        if not rows and not scopes:
+            return
+        if not self.buffered:
+            await self._save(list(rows), scopes)
+            return
+        if scopes:
+            # Новый расчет звонка целиком заменяет его хиты, еще лежащие в буфере
+            self._pending = {key: row for key, row in self._pending.items() if hit_scope(row) not in scopes}
+            self._scopes |= scopes
+        for row in rows:
+            self._pending[hit_key(row)] = row
+        self._ensure_flusher()
+        if len(self._pending) >= self.buffer_rows:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Сбрасывает буфер; возвращает число записанных строк."""
+        async with self._lock:
+            if not self._pending and not self._scopes:
+                return 0
+            rows = list(self._pending.values())
+            scopes = self._scopes
+            self._pending.clear()
+            self._scopes = set()
+            return await self._save(rows, scopes)
+
+    async def close(self) -> None:
+        """Останавливает фоновый сброс и дописывает остаток буфера."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _save(self, rows: Sequence[HitRow], scopes: Set[HitScope]) -> int:
+        try:
+            if scopes:
+                return await self.repo.save_hit_rows(rows, replace_scopes=scopes)
+            return await self.repo.save_hit_rows(rows)
+        except Exception:
+            logger.exception("Не удалось сохранить словарные хиты (rows=%s)", len(rows))
+            return 0
+
+    def _ensure_flusher(self) -> None:
+        if self.flush_interval_sec <= 0:
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_sec)
+            # shield: отмена при close() не прерывает уже начатую запись
+            await asyncio.shield(self.flush())
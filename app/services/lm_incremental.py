@@ -0,0 +1,252 @@
+"""
+Инкрементальный пересчет LM-метрик по отпечаткам входных данных.
+
+Для каждого звонка считается sha1 от полей call_history/call_scores, которые
+читают калькуляторы LMService, от версии правил (LM_VERSION, версия словаря,
+матрица весов) и от терминов словаря жалоб, сработавших на транскрипте. Правка
+словаря поэтому пересчитывает только звонки, где встречаются добавленные,
+удаленные или измененные термины. Звонки с неизменным отпечатком пропускаются
+без расчета.
+Для остальных новые строки lm_value сравниваются с сохраненными, и записываются
+только отличающиеся; метрики, которые больше не рассчитываются, удаляются.
+Отпечаток сохраняется, только когда все строки звонка записаны; у звонка с
+ошибкой расчета или записи сохраненный отпечаток удаляется.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.db.repositories.lm_repository import LMRepository
+from app.logging_config import get_watchdog_logger
+from app.services.lm_dictionary import CompiledDictionary
+from app.services.lm_service import CallRow, LMService
+
+logger = get_watchdog_logger(__name__)
+
+# Поля, от которых зависит расчет (см. LMService._calculate_call_metrics и CallAnalysis)
+LM_INPUT_HISTORY_FIELDS: Tuple[str, ...] = (
+    "talk_duration",
+    "await_sec",
+    "call_type",
+    "call_date",
+)
+LM_INPUT_SCORE_FIELDS: Tuple[str, ...] = (
+    "id",
+    "call_scores_id",
+    "transcript",
+    "outcome",
+    "call_category",
+    "call_success",
+    "is_target",
+    "refusal_category_code",
+    "refusal_reason",
+    "refusal_group",
+    "result",
+    "call_score",
+    "number_checklist",
+    "utm_source_by_number",
+    "call_type",
+    "talk_duration",
+)
+# Ключи value_json, которые меняются при каждом расчете и не означают изменения метрики
+VOLATILE_JSON_KEYS = frozenset({"detected_at"})
+
+MetricState = Tuple[Any, ...]
+
+
+def input_fingerprint(
+    inputs_version: str,
+    history_record: Dict[str, Any],
+    score_record: Optional[Dict[str, Any]],
+    dictionary_key: str = "-",
+) -> str:
+    """sha1 входов расчета одного звонка (dictionary_key — CompiledDictionary.matched_terms_key)."""
+    material = [
+        inputs_version,
+        dictionary_key,
+        {field: history_record.get(field) for field in LM_INPUT_HISTORY_FIELDS},
+        {field: score_record.get(field) for field in LM_INPUT_SCORE_FIELDS} if score_record else None,
+    ]
+    return hashlib.sha1(
+        json.dumps(material, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _dictionary_key(dictionary: Optional[CompiledDictionary], score_record: Optional[Dict[str, Any]]) -> str:
+    if dictionary is None or not score_record:
+        return "-"
+    return dictionary.matched_terms_key(str(score_record.get("transcript") or ""))
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_volatile(item) for key, item in value.items() if key not in VOLATILE_JSON_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    return value
+
+
+def _canonical_json(value: Any) -> Optional[str]:
+    """value_json в виде, одинаковом для строки из БД и только что рассчитанного dict."""
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value) if isinstance(value, (str, bytes)) else json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        # Несериализуемое значение не совпадет ни с чем сохраненным — строка будет записана
+        return f"<unserializable:{id(value)}>"
+    if not parsed:
+        return None
+    return json.dumps(_strip_volatile(parsed), sort_keys=True, ensure_ascii=False)
+
+
+def metric_state(row: Dict[str, Any]) -> MetricState:
+    """Сравнимое состояние строки lm_value (без calc_source и временных меток)."""
+    history_id = row.get("history_id") or 0
+    metric_code = row.get("metric_code") or ""
+    call_score_id = row.get("call_score_id")
+    return (
+        row.get("metric_group"),
+        int(call_score_id) if call_score_id is not None else None,
+        LMRepository.normalize_value_numeric(row.get("value_numeric"), metric_code, history_id),
+        row.get("value_label"),
+        _canonical_json(row.get("value_json")),
+        row.get("lm_version"),
+        row.get("calc_profile"),
+        row.get("calc_method"),
+    )
+
+
+@dataclass
+class IncrementalStats:
+    """Итоги инкрементального прогона."""
+
+    checked: int = 0
+    unchanged: int = 0
+    recomputed: int = 0
+    rows_written: int = 0
+    rows_skipped: int = 0
+    rows_deleted: int = 0
+    errors: int = 0
+
+    @property
+    def up_to_date(self) -> int:
+        """Звонки, метрики которых после прогона соответствуют входам."""
+        return self.checked - self.errors
+
+    def merge(self, other: "IncrementalStats") -> None:
+        for item in fields(self):
+            setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+
+    def summary(self) -> str:
+        return (
+            f"checked={self.checked}, unchanged={self.unchanged}, recomputed={self.recomputed}, "
+            f"rows_written={self.rows_written}, rows_skipped={self.rows_skipped}, "
+            f"rows_deleted={self.rows_deleted}, errors={self.errors}"
+        )
+
+
+class LMIncrementalRecalculator:
+    """Пересчет LM только для звонков с изменившимися входами и только изменившихся метрик."""
+
+    def __init__(self, lm_repo: LMRepository, lm_service: LMService):
+        self.repo = lm_repo
+        self.lm_service = lm_service
+
+    async def process(
+        self,
+        rows: Iterable[CallRow],
+        *,
+        calc_source: str = "incremental",
+        force: bool = False,
+    ) -> IncrementalStats:
+        """
+        Пересчитывает батч звонков.
+
+        Args:
+            rows: (history_id, call_history, call_score | None)
+            calc_source: Значение calc_source для записанных строк
+            force: Пересчитать все звонки, не сверяя отпечатки (запись — все равно по diff)
+
+        Returns:
+            IncrementalStats батча
+        """
+        batch = [row for row in rows if row[1] is not None]
+        stats = IncrementalStats(checked=len(batch))
+        if not batch:
+            return stats
+
+        inputs_version = await self.lm_service.inputs_version()
+        dictionary = await self.lm_service.complaint_dictionary()
+        fingerprints = {
+            history_id: input_fingerprint(inputs_version, h_rec, s_rec, _dictionary_key(dictionary, s_rec))
+            for history_id, h_rec, s_rec in batch
+        }
+        stored: Dict[int, str] = {}
+        if not force:
+            stored = await self.repo.get_input_fingerprints(list(fingerprints))
+        changed = [row for row in batch if stored.get(row[0]) != fingerprints[row[0]]]
+        stats.unchanged = len(batch) - len(changed)
+        if not changed:
+            return stats
+
+        payloads = await self.lm_service.calculate_metrics_batch(changed, calc_source=calc_source)
+        stats.recomputed = len(payloads)
+        stats.errors += len(changed) - len(payloads)
+        if not payloads:
+            await self.repo.delete_input_fingerprints([row[0] for row in changed])
+            return stats
+
+        snapshot = await self.repo.get_lm_value_snapshot(list(payloads))
+        to_write: List[Dict[str, Any]] = []
+        stale: Dict[int, List[str]] = {}
+        for history_id, payload in payloads.items():
+            current = {row["metric_code"]: metric_state(row) for row in snapshot.get(history_id, [])}
+            # При повторе metric_code в upsert побеждает последняя строка — сравниваем её
+            fresh = {row["metric_code"]: row for row in payload}
+            for metric_code, row in fresh.items():
+                if current.get(metric_code) == metric_state(row):
+                    stats.rows_skipped += 1
+                else:
+                    to_write.append(row)
+            obsolete = sorted(set(current) - set(fresh))
+            if obsolete:
+                stale[history_id] = obsolete
+
+        failed = await self._write(to_write, stats)
+        for history_id, metric_codes in stale.items():
+            if history_id in failed:
+                continue
+            try:
+                stats.rows_deleted += await self.repo.delete_lm_metrics(history_id, metric_codes)
+            except Exception as exc:
+                logger.error("[LM][incremental] Failed to delete stale metrics for history_id=%s: %s", history_id, exc)
+                failed.add(history_id)
+
+        stats.errors += len(failed)
+        done = {history_id: fingerprints[history_id] for history_id in payloads if history_id not in failed}
+        if done:
+            await self.repo.save_input_fingerprints(done, self.lm_service.lm_version)
+        # Старый отпечаток недописанного звонка мог совпадать с текущим (force):
+        # сбрасываем его, чтобы следующий прогон пересчитал звонок
+        incomplete = [row[0] for row in changed if row[0] not in done]
+        if incomplete:
+            await self.repo.delete_input_fingerprints(incomplete)
+        return stats
+
+    async def _write(self, rows: Sequence[Dict[str, Any]], stats: IncrementalStats) -> Set[int]:
+        """Пишет изменившиеся строки; возвращает history_id с неудачной записью."""
+        failed: Set[int] = set()
+        if not rows:
+            return failed
+        statuses = await self.repo.save_lm_values_bulk(list(rows))
+        for status in statuses:
+            if status.get("status") == "saved":
+                stats.rows_written += 1
+            elif status.get("status") == "failed":
+                failed.add(status.get("history_id"))
+        return failed
@@ -8,20 +8,38 @@ LM (Learning/Logic Model) - аналитический слой для расч
 Рассчитывает 6 категорий метрик: операционные, конверсионные, качество, риски, прогнозы, вспомогательные.
 """
 
-from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING, Union
 from datetime import datetime
+from functools import cached_property
+import asyncio
+import logging
+import pickle
 import re
 
+from app.db.repositories.lm_dictionary_repository import HitRow, build_hit_rows
 from app.db.repositories.lm_repository import LMRepository
 from app.db.models import CallRecord, CallHistoryRecord
 from app.logging_config import get_watchdog_logger
+from app.services import lm_batch
+from app.services.keyword_matcher import KeywordMatcher, KeywordScan
+from app.services.lm_dictionary import CompiledDictionary
+from app.services.lm_hits_writer import DictionaryHitWriter
 from app.services.lm_weights import ComplaintWeightMatrix
+from app.services.subscores import parse_subscores
 
 if TYPE_CHECKING:
     from app.db.repositories.lm_dictionary_repository import LMDictionaryRepository
+    from app.services.lm_write_behind import LMWriteBehind
 
 logger = get_watchdog_logger(__name__)
 
+DictionaryTerms = Union[CompiledDictionary, List[Dict[str, Any]]]
+CallRow = Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]
+ComplaintContext = Tuple[float, bool, Dict[str, Any]]
+ScoredBatch = Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, ComplaintContext]]
+
 # LM Configuration
 LM_VERSION = "v1912"
 DEFAULT_CALC_METHOD = "rule"
@@ -428,6 +446,134 @@ FOLLOWUP_KEYWORD_MAP = {
     ),
 }
 
+# Все списки ключевых слов по транскрипту собраны в один матчер: детекторы
+# (гейт, технический звонок, core-сигналы, категории триггеров, перезвон)
+# читают результат одного прохода вместо отдельного поиска по каждому списку.
+TRANSCRIPT_KEYWORD_MATCHER = KeywordMatcher(
+    {
+        "legal": COMPLAINT_LEGAL_KEYWORDS,
+        "refund": COMPLAINT_REFUND_KEYWORDS,
+        "behavior": COMPLAINT_BEHAVIOR_KEYWORDS,
+        "process": COMPLAINT_PROCESS_KEYWORDS,
+        "info_request": INFO_REQUEST_KEYWORDS,
+        "spam": FOLLOWUP_SPAM_KEYWORDS,
+        "auto_response": FOLLOWUP_AUTO_RESPONSES,
+        "threat": COMPLAINT_THREAT_KEYWORDS,
+        "blame": COMPLAINT_BLAME_KEYWORDS,
+        "irritation": COMPLAINT_IRRITATION_KEYWORDS,
+        "emotion": COMPLAINT_EMOTION_KEYWORDS,
+        "conflict": COMPLAINT_CONFLICT_ESCALATION,
+        "expectation": COMPLAINT_EXPECTATION_KEYWORDS,
+        "technical": TECHNICAL_CALL_KEYWORDS,
+        "passive": COMPLAINT_PASSIVE_PHRASES,
+        "intent": FOLLOWUP_INTENT_KEYWORDS,
+    }
+)
+# Порядок проверки категорий триггера жалобы (первая найденная побеждает).
+COMPLAINT_CATEGORY_ORDER = ("legal", "refund", "behavior", "process", "info_request")
+
+FOLLOWUP_REASON_MATCHER = KeywordMatcher(FOLLOWUP_KEYWORD_MAP)
+FOLLOWUP_REASON_ORDER = tuple(FOLLOWUP_KEYWORD_MAP)
+
+
+class CallAnalysis:
+    """
+    Производные входы одного звонка, общие для всех калькуляторов LMService.
+
+    Поля считаются лениво при первом обращении и запоминаются: транскрипт
+    приводится к нижнему регистру, сканируется по ключевым словам и
+    классифицируется один раз на звонок, сколько бы метрик его ни читали.
+    """
+
+    def __init__(
+        self,
+        service: "LMService",
+        call_history: Optional[CallHistoryRecord],
+        call_score: Optional[CallRecord],
+    ):
+        self._service = service
+        self.call_history = call_history
+        self.call_score = call_score
+
+    @cached_property
+    def transcript(self) -> str:
+        return str(self.call_score.get("transcript") or "") if self.call_score else ""
+
+    @cached_property
+    def transcript_lower(self) -> str:
+        return self.transcript.lower()
+
+    @cached_property
+    def keyword_scan(self) -> KeywordScan:
+        return self._service._scan_transcript(self.transcript_lower)
+
+    @cached_property
+    def replica_count(self) -> int:
+        return self._service._count_transcript_replicas(self.transcript)
+
+    @cached_property
+    def talk_duration(self) -> float:
+        source = self.call_history if self.call_history else self.call_score
+        return self._service._get_float(source, "talk_duration", 0.0)
+
+    @cached_property
+    def refusal_code(self) -> str:
+        if not self.call_score:
+            return ""
+        return str(self.call_score.get("refusal_category_code") or "").strip().upper()
+
+    @cached_property
+    def reason_text(self) -> str:
+        """refusal_reason и result из call_scores одной строкой."""
+        if not self.call_score:
+            return ""
+        return " ".join(
+            part
+            for part in (
+                str(self.call_score.get("refusal_reason") or "").strip(),
+                str(self.call_score.get("result") or "").strip(),
+            )
+            if part
+        )
+
+    @cached_property
+    def text_reason(self) -> Optional[str]:
+        """Причина отказа, определённая только по тексту (без refusal_category_code)."""
+        return self._service._classify_followup_reason(
+            "",
+            self.reason_text or None,
+            transcript=self.transcript,
+        )
+
+    @property
+    def classified_reason(self) -> Optional[str]:
+        """Код причины отказа: из refusal_category_code, иначе по тексту."""
+        return self.refusal_code or self.text_reason
+
+    @cached_property
+    def service_not_provided(self) -> bool:
+        """Клиенту отказали из-за отсутствия услуги."""
+        if not self.call_score:
+            return False
+        return "SERVICE_NOT_PROVIDED" in (self.refusal_code, self.text_reason)
+
+    @cached_property
+    def technical_call(self) -> bool:
+        return self._service._is_technical_call(
+            self.call_history,
+            self.call_score,
+            self.transcript_lower,
+            self.keyword_scan,
+        )
+
+    @cached_property
+    def gate_result(self) -> Optional[Tuple[str, str]]:
+        return self._service._complaint_gate_reason(self)
+
+    @cached_property
+    def followup(self) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        return self._service._calculate_followup_needed(self.call_history, self.call_score, self)
+
 
 class LMService:
     """Сервис расчета метрик LM."""
@@ -438,12 +584,19 @@ class LMService:
         lm_version: str = LM_VERSION,
         dictionary_repository: Optional["LMDictionaryRepository"] = None,
         dictionary_version: str = "v1",
+        executor: Optional[Executor] = None,
+        write_behind: Optional["LMWriteBehind"] = None,
     ):
         self.repo = lm_repository
+        # Отложенная запись lm_value с кешем свежих результатов (app/services/lm_write_behind.py)
+        self.write_behind = write_behind
+        # Пул процессов для CPU-части батча (см. app/services/lm_executor.py); None — считаем в event loop
+        self.executor = executor
         self.lm_version = lm_version
         self.dictionary_repo = dictionary_repository
         self.dictionary_version = dictionary_version
-        self._dictionary_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._dictionary_cache: Dict[str, CompiledDictionary] = {}
+        self.hit_writer = DictionaryHitWriter(dictionary_repository) if dictionary_repository else None
         self.complaint_matrix = ComplaintWeightMatrix()
 
     # ============================================================================
@@ -471,13 +624,9 @@ class LMService:
         except (TypeError, ValueError):
             return 0
 
-    def _find_keyword(self, text: str, keywords: List[str]) -> Optional[str]:
-        if not text:
-            return None
-        for kw in keywords:
-            if kw in text:
-                return kw
-        return None
+    def _scan_transcript(self, transcript_lower: str) -> KeywordScan:
+        """Один проход по транскрипту (в нижнем регистре) по всем спискам ключевых слов."""
+        return TRANSCRIPT_KEYWORD_MATCHER.scan(transcript_lower)
 
     def _count_transcript_replicas(self, transcript: str) -> int:
         if not transcript:
@@ -489,24 +638,12 @@ class LMService:
         sentences = [seg.strip() for seg in re.split(r"[.!?]", transcript) if seg.strip()]
         return len(sentences)
 
-    def _is_service_not_provided(self, call_score: Optional[CallRecord], transcript: str) -> bool:
-        """Определяет, что клиенту отказали из-за отсутствия услуги."""
-        if not call_score:
-            return False
-        refusal_code = str(call_score.get("refusal_category_code") or "").strip().upper()
-        if refusal_code == "SERVICE_NOT_PROVIDED":
-            return True
-        refusal_reason = str(call_score.get("refusal_reason") or "").strip()
-        ai_result = str(call_score.get("result") or "").strip()
-        reason_text = " ".join(part for part in (refusal_reason, ai_result) if part)
-        normalized = self._classify_followup_reason("", reason_text or None, transcript=transcript)
-        return normalized == "SERVICE_NOT_PROVIDED"
-
     def _is_technical_call(
         self,
         call_history: Optional[CallHistoryRecord],
         call_score: Optional[CallRecord],
         transcript_lower: str,
+        scan: Optional[KeywordScan] = None,
     ) -> bool:
         """Определяет, что звонок относится к техническим сбоям."""
         def _normalize(value: Optional[str]) -> str:
@@ -517,19 +654,16 @@ class LMService:
         if "сбой" in call_type or "сбой" in category or "техн" in call_type:
             return True
         if transcript_lower:
-            if any(keyword in transcript_lower for keyword in TECHNICAL_CALL_KEYWORDS):
+            if scan is None:
+                scan = self._scan_transcript(transcript_lower)
+            if scan.has("technical"):
                 return True
         return False
 
-    def _complaint_gate_reason(
-        self,
-        call_history: Optional[CallHistoryRecord],
-        call_score: Optional[CallRecord],
-        transcript: str,
-        transcript_lower: str,
-        talk_duration: float,
-        replica_count: int,
-    ) -> Optional[Tuple[str, str]]:
+    def _complaint_gate_reason(self, analysis: CallAnalysis) -> Optional[Tuple[str, str]]:
+        call_history = analysis.call_history
+        call_score = analysis.call_score
+        talk_duration = analysis.talk_duration
         outcome = str(call_score.get("outcome") or "").lower() if call_score else ""
         call_category = str(call_score.get("call_category") or "").lower() if call_score else ""
         call_type = ""
@@ -537,35 +671,18 @@ class LMService:
             call_type = str(call_history.get("call_type") or "").lower()
         if not call_type and call_score:
             call_type = str(call_score.get("call_type") or "").lower()
-        refusal_code = str(call_score.get("refusal_category_code") or "").upper() if call_score else ""
 
         if "сбой" in call_type or call_category == "сбой":
             return "gate_call_fail", "Гейт жалоб: звонок классифицирован как «Сбой»."
-        if not transcript_lower or replica_count < COMPLAINT_GATE_MIN_REPLICAS:
+        if not analysis.transcript_lower or analysis.replica_count < COMPLAINT_GATE_MIN_REPLICAS:
             return "gate_short_dialog", "Гейт жалоб: нет живого диалога (меньше двух реплик)."
         if talk_duration and talk_duration < COMPLAINT_GATE_MIN_TALK_SEC:
             return "gate_short_duration", f"Гейт жалоб: короткий разговор ({talk_duration:.0f} с)."
-        if refusal_code == "SERVICE_NOT_PROVIDED":
+        if call_score and analysis.classified_reason == "SERVICE_NOT_PROVIDED":
             return "gate_service_missing", "Гейт жалоб: услуга отсутствует (SERVICE_NOT_PROVIDED)."
-        if call_score:
-            textual_reason = " ".join(
-                part
-                for part in (
-                    str(call_score.get("refusal_reason") or "").strip(),
-                    str(call_score.get("result") or "").strip(),
-                )
-                if part
-            ).strip()
-            classified_reason = self._classify_followup_reason(
-                refusal_code,
-                textual_reason or None,
-                transcript=transcript,
-            )
-            if classified_reason == "SERVICE_NOT_PROVIDED":
-                return "gate_service_missing", "Гейт жалоб: услуга отсутствует (SERVICE_NOT_PROVIDED)."
         if outcome == "info_only" or call_category == "информационный":
             return "gate_info_call", "Гейт жалоб: информационный звонок без конфликта."
-        if any(stop in transcript_lower for stop in FOLLOWUP_AUTO_RESPONSES):
+        if analysis.keyword_scan.has("auto_response"):
             return "gate_auto", "Гейт жалоб: автоответчик или робот."
         spam_markers = ("спам", "auto", "робот")
         if any(marker in call_category for marker in spam_markers):
@@ -578,6 +695,7 @@ class LMService:
         transcript_lower: str,
         formatted_hits: List[Dict[str, Any]],
         call_score: Optional[CallRecord],
+        scan: Optional[KeywordScan] = None,
     ) -> Dict[str, Dict[str, Any]]:
         signals: Dict[str, Dict[str, Any]] = {
             "negative_emotion": {"hit": False},
@@ -596,19 +714,22 @@ class LMService:
             if snippet:
                 slot["snippet"] = snippet
 
-        def _check_keywords(key: str, keywords: List[str], label: str) -> None:
-            kw = self._find_keyword(transcript_lower, keywords)
+        if scan is None:
+            scan = self._scan_transcript(transcript_lower)
+
+        def _check_keywords(key: str, keyword_category: str, label: str) -> None:
+            kw = scan.first(keyword_category)
             if kw:
-                idx = transcript_lower.find(kw)
+                idx = scan.find(kw)
                 snippet = self._extract_snippet(transcript, idx, idx + len(kw))
                 _mark(key, f"{label}: «{kw}»", snippet)
 
-        _check_keywords("complaint_phrase", COMPLAINT_THREAT_KEYWORDS, "Прямая угроза/жалоба")
-        _check_keywords("complaint_phrase", COMPLAINT_BLAME_KEYWORDS, "Претензия клиента")
-        _check_keywords("negative_emotion", COMPLAINT_IRRITATION_KEYWORDS, "Эмоциональный негатив")
-        _check_keywords("negative_emotion", COMPLAINT_EMOTION_KEYWORDS, "Эмоциональный маркер")
-        _check_keywords("dialog_conflict", COMPLAINT_CONFLICT_ESCALATION, "Эскалация диалога")
-        _check_keywords("expectation_violation", COMPLAINT_EXPECTATION_KEYWORDS, "Нарушение ожиданий")
+        _check_keywords("complaint_phrase", "threat", "Прямая угроза/жалоба")
+        _check_keywords("complaint_phrase", "blame", "Претензия клиента")
+        _check_keywords("negative_emotion", "irritation", "Эмоциональный негатив")
+        _check_keywords("negative_emotion", "emotion", "Эмоциональный маркер")
+        _check_keywords("dialog_conflict", "conflict", "Эскалация диалога")
+        _check_keywords("expectation_violation", "expectation", "Нарушение ожиданий")
 
         outcome = str(call_score.get("outcome") or "").lower() if call_score else ""
         category = str(call_score.get("call_category") or "").lower() if call_score else ""
@@ -635,39 +756,39 @@ class LMService:
     def _parse_result_subscores(self, result_text: Optional[str]) -> Dict[str, float]:
         """
         Парсит текст результата для извлечения суб-скоров (Вариант Б).
-        Ожидаемый формат: 'Название: X/10'
+        Ожидаемый формат: 'Название: X/10', результат приводится к 0-100.
         """
-        if not result_text:
-            return {}
-            
-        patterns = {
-            'initiative_score': r'(?:Инициативность|ведение диалога)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10',
-            'politeness_score': r'(?:Вежливость|эмпатия)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10',
-            'info_score': r'(?:Информативность)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10',
-            'script_score': r'(?:Соблюдение скрипта)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10',
-            'satisfaction_score': r'(?:Удовлетворенность)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10',
-        }
-        
-        scores = {}
-        for key, pattern in patterns.items():
-            match = re.search(pattern, result_text, re.IGNORECASE)
-            if match:
-                try:
-                    scores[key] = float(match.group(1)) * 10.0 # Приводим к 0-100
-                except (ValueError, TypeError):
-                    pass
-        return scores
-
-    async def _get_dictionary_terms(self, dict_code: str) -> Optional[List[Dict[str, Any]]]:
-        """Ленивая загрузка словаря с кешированием по версии."""
+        return parse_subscores(result_text, scale=10.0)
+
+    async def _get_dictionary_terms(self, dict_code: str) -> Optional[CompiledDictionary]:
+        """Ленивая загрузка и компиляция словаря с кешированием по версии."""
         if not self.dictionary_repo:
             return None
         cache_key = f"{dict_code}:{self.dictionary_version}"
         if cache_key in self._dictionary_cache:
             return self._dictionary_cache[cache_key]
         terms = await self.dictionary_repo.get_terms(dict_code, version=self.dictionary_version)
-        self._dictionary_cache[cache_key] = terms
-        return terms
+        compiled = CompiledDictionary(terms, dict_code=dict_code, version=self.dictionary_version)
+        self._dictionary_cache[cache_key] = compiled
+        return compiled
+
+    async def complaint_dictionary(self) -> Optional[CompiledDictionary]:
+        """Скомпилированный словарь жалоб текущей версии (None — словарь не подключен)."""
+        return await self._get_dictionary_terms("complaint_risk")
+
+    async def inputs_version(self) -> str:
+        """
+        Общая для всех звонков версия правил: LM_VERSION, версия словаря и матрица весов.
+
+        Входит в отпечаток входов звонка (app/services/lm_incremental.py): смена
+        LM_VERSION или матрицы делает все отпечатки устаревшими. Содержимое словаря
+        сюда не входит — в отпечаток попадают только сработавшие на звонке термины.
+        """
+        self.complaint_matrix.maybe_reload()
+        return (
+            f"{self.lm_version}|dict={self.dictionary_version}"
+            f"|weights={self.complaint_matrix.fingerprint}"
+        )
 
     def _extract_snippet(self, text: str, start: int, end: int, window: int = 30) -> str:
         """Возвращает фрагмент текста вокруг совпадения."""
@@ -681,95 +802,42 @@ class LMService:
     def _scan_dictionary_terms(
         self,
         transcript: str,
-        terms: Optional[List[Dict[str, Any]]],
+        terms: Optional[DictionaryTerms],
+        transcript_lower: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """Находит совпадения словаря в транскрипте."""
         if not transcript or not terms:
             return []
-        transcript_lower = transcript.lower()
-        matches: List[Dict[str, Any]] = []
-        detected_at = datetime.utcnow().isoformat()
-        for term in terms:
-            raw = term.get("term")
-            if not raw:
-                continue
-            match_type = term.get("match_type", "phrase")
-            weight = int(term.get("weight") or 0)
-            if not weight:
-                continue
-            is_negative = bool(term.get("is_negative"))
-            occurrences = 0
-            sample_start = -1
-            sample_end = -1
-
-            if match_type == "regex":
-                pattern = raw
-                try:
-                    compiled = re.compile(pattern, re.IGNORECASE)
-                except re.error:
-                    logger.warning("Неверное регулярное выражение в словаре: %s", pattern)
-                    continue
-                all_matches = list(compiled.finditer(transcript))
-                occurrences = len(all_matches)
-                if occurrences:
-                    sample_start = all_matches[0].start()
-                    sample_end = all_matches[0].end()
-            else:
-                # Для stem/phrase ищем по подстроке
-                needle = raw.lower()
-                if not needle:
-                    continue
-                index = transcript_lower.find(needle)
-                if index >= 0:
-                    sample_start = index
-                    sample_end = index + len(needle)
-                    occurrences = transcript_lower.count(needle)
-
-            if occurrences <= 0:
-                continue
-
-            snippet = self._extract_snippet(transcript, sample_start, sample_end)
-            matches.append(
-                {
-                    "term": raw,
-                    "match_type": match_type,
-                    "weight": weight,
-                    "hit_count": occurrences,
-                    "snippet": snippet,
-                    "is_negative": is_negative,
-                    "detected_at": detected_at,
-                }
-            )
-        return matches
+        if not isinstance(terms, CompiledDictionary):
+            terms = CompiledDictionary(terms, version=self.dictionary_version)
+        return terms.scan(transcript, self._extract_snippet, transcript_lower=transcript_lower)
 
     def _classify_complaint_category(
         self,
         term: Optional[str],
         snippet: Optional[str],
         transcript_lower: str,
+        transcript_scan: Optional[KeywordScan] = None,
     ) -> Optional[str]:
-        """Определяет категорию триггера жалобы."""
-        haystacks = [
-            str(term or "").lower(),
-            str(snippet or "").lower(),
-            transcript_lower,
-        ]
+        """
+        Определяет категорию триггера жалобы.
 
-        def _contains(keywords: List[str]) -> bool:
-            return any(any(kw in text for text in haystacks) for kw in keywords)
-
-        if _contains(COMPLAINT_LEGAL_KEYWORDS):
-            return "legal"
-        if _contains(COMPLAINT_REFUND_KEYWORDS):
-            return "refund"
-        if _contains(COMPLAINT_BEHAVIOR_KEYWORDS):
-            return "behavior"
-        if _contains(COMPLAINT_PROCESS_KEYWORDS):
-            return "process"
-        if _contains(INFO_REQUEST_KEYWORDS):
-            return "info_request"
-        spam_keywords = FOLLOWUP_SPAM_KEYWORDS + FOLLOWUP_AUTO_RESPONSES
-        if _contains(spam_keywords):
+        transcript_scan — готовый проход по транскрипту, чтобы не сканировать его
+        заново для каждого словарного попадания.
+        """
+        scans = (
+            self._scan_transcript(str(term or "").lower()),
+            self._scan_transcript(str(snippet or "").lower()),
+            transcript_scan if transcript_scan is not None else self._scan_transcript(transcript_lower),
+        )
+
+        def _contains(*categories: str) -> bool:
+            return any(scan.has(category) for scan in scans for category in categories)
+
+        for category in COMPLAINT_CATEGORY_ORDER:
+            if _contains(category):
+                return category
+        if _contains("spam", "auto_response"):
             return "spam"
         return None
 
@@ -786,22 +854,10 @@ class LMService:
         Рассчитывает скорость отклика оператора (SST v1912).
         """
         # В call_history время ожидания обычно в поле await_sec
-        wait_time = self._get_float(call_history, 'await_sec')
-        talk_duration = self._get_float(call_history, 'talk_duration')
-        
-        if talk_duration <= 1.0: # Звонок не состоялся или очень короткий
-            return (1.0, 'red')
-            
-        if wait_time < 20:
-            return (5.0, 'green')
-        elif wait_time < 40:
-            return (4.0, 'green')
-        elif wait_time < 60:
-            return (3.0, 'yellow')
-        elif wait_time < 120:
-            return (2.0, 'red')
-        else:
-            return (1.0, 'red')
+        return lm_batch.response_speed(
+            self._get_float(call_history, 'talk_duration'),
+            self._get_float(call_history, 'await_sec'),
+        )
 
     def _calculate_talk_efficiency(
         self,
@@ -811,15 +867,7 @@ class LMService:
         """
         Рассчитывает эффективность разговора по длительности.
         """
-        talk_duration = self._get_float(call_history, 'talk_duration')
-        
-        if talk_duration <= 0:
-            return 0.0
-        
-        if talk_duration >= 60:
-            return min(100.0, talk_duration / 3)
-        
-        return talk_duration * 2
+        return lm_batch.talk_efficiency(self._get_float(call_history, 'talk_duration'))
 
     def _calculate_queue_impact(
         self,
@@ -829,12 +877,7 @@ class LMService:
         """
         Рассчитывает влияние на очередь.
         """
-        talk_duration = self._get_float(call_history, 'talk_duration')
-        if talk_duration <= 0:
-            return 0.0
-        
-        impact = (talk_duration / 300) * 100
-        return min(100.0, round(impact, 1))
+        return lm_batch.queue_impact(self._get_float(call_history, 'talk_duration'))
 
     # ============================================================================
     # PRIVATE CALCULATION METHODS - CONVERSION
@@ -847,20 +890,7 @@ class LMService:
         """
         Рассчитывает скор конверсии.
         """
-        if not call_score:
-            return 0.0
-        
-        outcome = str(call_score.get('outcome') or '')
-        category = str(call_score.get('call_category') or '')
-        
-        if outcome == 'record':
-            return 100.0
-        elif outcome == 'lead_no_record':
-            return 50.0
-        elif outcome == 'info_only' or category == 'Информационный':
-            return 20.0
-        else:
-            return 0.0
+        return lm_batch.conversion_score(call_score)
 
     def _calculate_cross_sell_potential(
         self,
@@ -924,11 +954,7 @@ class LMService:
             return code
         reason_text_raw = " ".join(filter(None, [refusal_reason, transcript])).lower()
         reason_text = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", reason_text_raw))
-        for category, keywords in FOLLOWUP_KEYWORD_MAP.items():
-            for kw in keywords:
-                if kw and kw in reason_text:
-                    return category
-        return None
+        return FOLLOWUP_REASON_MATCHER.scan(reason_text).first_category(FOLLOWUP_REASON_ORDER)
 
     def _calculate_lost_opportunity(
         self,
@@ -1020,8 +1046,7 @@ class LMService:
         """
         Рассчитывает покрытие чек-листа.
         """
-        checklist = self._get_float(call_score, 'number_checklist', 0.0) if call_score else 0.0
-        return min(100.0, checklist * 10.0)
+        return lm_batch.scaled_score(call_score, 'number_checklist')
 
     def _calculate_normalized_score(
         self,
@@ -1030,8 +1055,7 @@ class LMService:
         """
         Нормализует оценку звонка к шкале 0-100.
         """
-        score = self._get_float(call_score, 'call_score', 0.0) if call_score else 0.0
-        return min(100.0, score * 10.0)
+        return lm_batch.scaled_score(call_score, 'call_score')
 
     def _calculate_script_risk(
         self,
@@ -1087,26 +1111,24 @@ class LMService:
     def _calculate_followup_needed(
         self,
         call_history: Optional[CallHistoryRecord],
-        call_score: Optional[CallRecord]
+        call_score: Optional[CallRecord],
+        analysis: Optional[CallAnalysis] = None,
     ) -> Tuple[bool, Optional[Dict[str, Any]]]:
         """
         Определяет, нужно ли перезванивать, и возвращает детализированный контекст.
         """
         if not call_score:
             return False, None
+        if analysis is None:
+            analysis = CallAnalysis(self, call_history, call_score)
 
         category_raw = str(call_score.get('call_category') or '')
         category = category_raw.lower()
         if any(tag in category for tag in FOLLOWUP_SPAM_KEYWORDS):
             return False, None
 
-        transcript = str(call_score.get('transcript') or '')
-        transcript_lower = transcript.lower()
-        has_live_voice = bool(transcript.strip()) and not any(
-            stop in transcript_lower for stop in FOLLOWUP_AUTO_RESPONSES
-        )
-
-        talk_duration = self._get_float(call_history, 'talk_duration', 0.0) if call_history else self._get_float(call_score, 'talk_duration', 0.0)
+        transcript = analysis.transcript
+        talk_duration = analysis.talk_duration
         if talk_duration < FOLLOWUP_MIN_TALK_SEC:
             return False, None
 
@@ -1120,15 +1142,7 @@ class LMService:
         if is_target != 1:
             return False, None
 
-        refusal_code = str(call_score.get('refusal_category_code') or '').upper()
-        refusal_reason = str(call_score.get('refusal_reason') or '').strip()
-        ai_reason = str(call_score.get('result') or '').strip()
-        combined_reason = " ".join(part for part in (refusal_reason, ai_reason) if part).strip()
-        classified_reason = self._classify_followup_reason(
-            refusal_code,
-            combined_reason or None,
-            transcript=transcript,
-        )
+        classified_reason = analysis.classified_reason
         if classified_reason in FOLLOWUP_DENY_CODES:
             return False, None
 
@@ -1177,9 +1191,11 @@ class LMService:
                 context["sla_hours"] = 24
 
         # Ищем намерения в транскрипте
-        intent_keyword = self._find_keyword(transcript_lower, FOLLOWUP_INTENT_KEYWORDS)
+        scan = analysis.keyword_scan
+        has_live_voice = bool(transcript.strip()) and not scan.has("auto_response")
+        intent_keyword = scan.first("intent")
         if intent_keyword and outcome != 'record':
-            idx = transcript_lower.find(intent_keyword)
+            idx = scan.find(intent_keyword)
             snippet = self._extract_snippet(transcript, idx, idx + len(intent_keyword))
             reason = f"Клиент выразил намерение («{intent_keyword}»), но итог не зафиксирован."
             _add_reason(reason, "intent", snippet=snippet)
@@ -1210,19 +1226,20 @@ class LMService:
         self,
         call_history: Optional[CallHistoryRecord],
         call_score: Optional[CallRecord],
-        dictionary_terms: Optional[List[Dict[str, Any]]] = None,
+        dictionary_terms: Optional[DictionaryTerms] = None,
+        analysis: Optional[CallAnalysis] = None,
     ) -> Tuple[float, bool, Dict[str, Any]]:
         """
         Определяет риск жалобы и возвращает (score 0..100, flag, контекст).
         """
-        transcript = ""
-        if call_score:
-            transcript = str(call_score.get("transcript") or "")
-        transcript_lower = transcript.lower()
-        talk_duration = self._get_float(call_history, "talk_duration", 0.0) if call_history else self._get_float(call_score, "talk_duration", 0.0)
-        replica_count = self._count_transcript_replicas(transcript)
-        service_not_provided_flag = self._is_service_not_provided(call_score, transcript)
-        technical_call_flag = self._is_technical_call(call_history, call_score, transcript_lower)
+        if analysis is None:
+            analysis = CallAnalysis(self, call_history, call_score)
+        transcript = analysis.transcript
+        transcript_lower = analysis.transcript_lower
+        talk_duration = analysis.talk_duration
+        keyword_scan = analysis.keyword_scan
+        service_not_provided_flag = analysis.service_not_provided
+        technical_call_flag = analysis.technical_call
 
         def _attach_flags(context: Dict[str, Any]) -> Dict[str, Any]:
             if service_not_provided_flag:
@@ -1231,14 +1248,7 @@ class LMService:
                 context["technical_call_flag"] = True
             return context
 
-        gate_result = self._complaint_gate_reason(
-            call_history,
-            call_score,
-            transcript,
-            transcript_lower,
-            talk_duration,
-            replica_count,
-        )
+        gate_result = analysis.gate_result
         if gate_result:
             code, message = gate_result
             return 0.0, False, _attach_flags({"reasons": [message], "gate": True, "gate_code": code})
@@ -1264,7 +1274,9 @@ class LMService:
         dictionary_hits_summary: List[str] = []
         score = 0.0
 
-        dictionary_hits = self._scan_dictionary_terms(transcript, dictionary_terms)
+        dictionary_hits = self._scan_dictionary_terms(transcript, dictionary_terms, transcript_lower)
+        # Одна версия весов на весь звонок, даже если матрицу перечитают посреди расчета
+        weights = self.complaint_matrix.snapshot
         formatted_hits: List[Dict[str, Any]] = []
         category_breakdown: Dict[str, float] = {}
         for hit in dictionary_hits:
@@ -1272,8 +1284,13 @@ class LMService:
             if impact <= 0:
                 continue
             marker = f"«{hit['term']}»"
-            category = self._classify_complaint_category(hit.get("term"), hit.get("snippet"), transcript_lower)
-            adjusted = self.complaint_matrix.apply_multiplier(category, impact)
+            category = self._classify_complaint_category(
+                hit.get("term"),
+                hit.get("snippet"),
+                transcript_lower,
+                keyword_scan,
+            )
+            adjusted = weights.apply_multiplier(category, impact)
             if hit.get("is_negative"):
                 adjusted = -abs(adjusted)
             formatted_hits.append(
@@ -1298,7 +1315,13 @@ class LMService:
             if category:
                 msg += f" [{category}]"
             dictionary_hits_summary.append(msg)
-        signals = self._detect_complaint_core_signals(transcript, transcript_lower, formatted_hits, call_score)
+        signals = self._detect_complaint_core_signals(
+            transcript,
+            transcript_lower,
+            formatted_hits,
+            call_score,
+            keyword_scan,
+        )
         core_hits = [key for key, payload in signals.items() if payload.get("hit")]
         if not core_hits:
             return 0.0, False, {
@@ -1307,7 +1330,7 @@ class LMService:
                 "dictionary_hits_summary": dictionary_hits_summary[:5],
             }
 
-        anti_phrase = self._find_keyword(transcript_lower, COMPLAINT_PASSIVE_PHRASES)
+        anti_phrase = keyword_scan.first("passive")
         if anti_phrase and "complaint_phrase" not in core_hits and "expectation_violation" not in core_hits:
             return 0.0, False, {"reasons": [f"Диалог завершён нейтрально («{anti_phrase}») — жалобы нет."], "core_signals": signals}
 
@@ -1381,6 +1404,17 @@ class LMService:
             context["result_excerpt"] = result_excerpt[:500]
         return score, True, _attach_flags(context)
 
+    def _dictionary_hit_rows(
+        self,
+        history_id: int,
+        complaint_context: ComplaintContext,
+        dict_code: str = "complaint_risk",
+    ) -> List[HitRow]:
+        """Строки lm_dictionary_hits из контекста жалобы."""
+        context_meta = complaint_context[2] if len(complaint_context) > 2 else {}
+        hits = (context_meta or {}).get("dictionary_hits")
+        return build_hit_rows(history_id, dict_code, hits, self.dictionary_version)
+
     async def _persist_dictionary_hits(
         self,
         history_id: int,
@@ -1388,13 +1422,12 @@ class LMService:
         dict_code: str = "complaint_risk",
     ) -> None:
         """Сохраняет словарные хиты из контекста жалобы."""
-        if not self.dictionary_repo:
+        if self.hit_writer is None:
             return
-        context_meta = complaint_context[2] if len(complaint_context) > 2 else {}
-        hits = (context_meta or {}).get("dictionary_hits")
-        if not hits:
-            return
-        await self.dictionary_repo.save_hits(history_id, dict_code, hits, self.dictionary_version)
+        await self.hit_writer.write(
+            self._dictionary_hit_rows(history_id, complaint_context, dict_code),
+            scopes=[(history_id, dict_code, self.dictionary_version)],
+        )
 
     # ============================================================================
     # PRIVATE CALCULATION METHODS - FORECAST
@@ -1407,16 +1440,7 @@ class LMService:
         """
         Forecasts conversion probability (0.0-1.0).
         """
-        if not call_score:
-            return 0.1
-        
-        outcome = str(call_score.get('outcome') or '')
-        is_target = call_score.get('is_target', 0)
-        
-        if outcome == 'record': return 1.0
-        if outcome == 'lead_no_record': return 0.35
-        if is_target: return 0.25
-        return 0.05
+        return lm_batch.conversion_forecast(call_score)
 
     def _forecast_second_call_probability(
         self,
@@ -1471,18 +1495,32 @@ class LMService:
             if call_date.weekday() >= 5: return 'weekend_v1'
         return 'default_v1'
 
-    def calculate_operational_metrics(self, h_rec, s_rec):
-        speed, label = self._calculate_response_speed(h_rec, s_rec)
+    def _numeric_values(self, h_rec, s_rec) -> Dict[str, Any]:
+        """Числовые метрики одного звонка (те же ключи, что у lm_batch.numeric_columns)."""
+        return {
+            'response_speed': self._calculate_response_speed(h_rec, s_rec),
+            'talk_efficiency': self._calculate_talk_efficiency(h_rec, s_rec),
+            'queue_impact': self._calculate_queue_impact(h_rec, s_rec),
+            'conversion_score': self._calculate_conversion_score(s_rec),
+            'checklist_coverage': self._calculate_checklist_coverage(s_rec),
+            'normalized_score': self._calculate_normalized_score(s_rec),
+            'conversion_forecast': self._forecast_conversion_probability(s_rec),
+        }
+
+    def calculate_operational_metrics(self, h_rec, s_rec, numeric: Optional[Dict[str, Any]] = None):
+        numeric = numeric or self._numeric_values(h_rec, s_rec)
+        speed, label = numeric['response_speed']
         return [
             {'metric_code': 'response_speed_score', 'metric_group': 'operational', 'value_numeric': speed, 'value_label': label},
-            {'metric_code': 'talk_time_efficiency', 'metric_group': 'operational', 'value_numeric': self._calculate_talk_efficiency(h_rec, s_rec)},
-            {'metric_code': 'queue_impact_index', 'metric_group': 'operational', 'value_numeric': self._calculate_queue_impact(h_rec, s_rec)}
+            {'metric_code': 'talk_time_efficiency', 'metric_group': 'operational', 'value_numeric': numeric['talk_efficiency']},
+            {'metric_code': 'queue_impact_index', 'metric_group': 'operational', 'value_numeric': numeric['queue_impact']}
         ]
 
-    def calculate_conversion_metrics(self, h_rec, s_rec):
+    def calculate_conversion_metrics(self, h_rec, s_rec, numeric: Optional[Dict[str, Any]] = None):
+        numeric = numeric or self._numeric_values(h_rec, s_rec)
         lost_score, lost_meta = self._calculate_lost_opportunity(h_rec, s_rec)
         return [
-            {'metric_code': 'conversion_score', 'metric_group': 'conversion', 'value_numeric': self._calculate_conversion_score(s_rec)},
+            {'metric_code': 'conversion_score', 'metric_group': 'conversion', 'value_numeric': numeric['conversion_score']},
             {
                 'metric_code': 'lost_opportunity_score', 
                 'metric_group': 'conversion', 
@@ -1492,20 +1530,29 @@ class LMService:
             {'metric_code': 'cross_sell_potential', 'metric_group': 'conversion', 'value_numeric': self._calculate_cross_sell_potential(h_rec, s_rec)}
         ]
 
-    def calculate_quality_metrics(self, h_rec, s_rec):
+    def calculate_quality_metrics(self, h_rec, s_rec, numeric: Optional[Dict[str, Any]] = None):
+        numeric = numeric or self._numeric_values(h_rec, s_rec)
         return [
-            {'metric_code': 'checklist_coverage_ratio', 'metric_group': 'quality', 'value_numeric': self._calculate_checklist_coverage(s_rec)},
-            {'metric_code': 'normalized_call_score', 'metric_group': 'quality', 'value_numeric': self._calculate_normalized_score(s_rec)},
+            {'metric_code': 'checklist_coverage_ratio', 'metric_group': 'quality', 'value_numeric': numeric['checklist_coverage']},
+            {'metric_code': 'normalized_call_score', 'metric_group': 'quality', 'value_numeric': numeric['normalized_score']},
             {'metric_code': 'script_risk_index', 'metric_group': 'quality', 'value_numeric': self._calculate_script_risk(s_rec)}
         ]
 
-    def calculate_risk_metrics(self, h_rec, s_rec, complaint_context: Optional[Tuple[float, bool, Dict[str, Any]]] = None):
+    def calculate_risk_metrics(
+        self,
+        h_rec,
+        s_rec,
+        complaint_context: Optional[Tuple[float, bool, Dict[str, Any]]] = None,
+        analysis: Optional[CallAnalysis] = None,
+    ):
+        if analysis is None:
+            analysis = CallAnalysis(self, h_rec, s_rec)
         churn_lbl, churn_val = self._calculate_churn_risk(s_rec)
         if complaint_context is None:
-            complaint_context = self._calculate_complaint_risk(h_rec, s_rec)
+            complaint_context = self._calculate_complaint_risk(h_rec, s_rec, analysis=analysis)
         compl_score, compl_flag, compl_meta = complaint_context
         compl_reasons = (compl_meta or {}).get("reasons", [])
-        flw_flag, flw_context = self._calculate_followup_needed(h_rec, s_rec)
+        flw_flag, flw_context = analysis.followup
         followup_payload = None
         if flw_flag:
             followup_payload = dict(flw_context or {})
@@ -1548,13 +1595,22 @@ class LMService:
         )
         return risk_metrics
 
-    def calculate_forecast_metrics(self, h_rec, s_rec, complaint_context: Optional[Tuple[float, bool, Dict[str, Any]]] = None):
+    def calculate_forecast_metrics(
+        self,
+        h_rec,
+        s_rec,
+        complaint_context: Optional[Tuple[float, bool, Dict[str, Any]]] = None,
+        numeric: Optional[Dict[str, Any]] = None,
+    ):
         if complaint_context is None:
             complaint_context = self._calculate_complaint_risk(h_rec, s_rec)
         complaint_score = complaint_context[0]
         complaint_prob = min(max(complaint_score, 0.0), 100.0) / 100.0
+        conversion_forecast = (
+            numeric['conversion_forecast'] if numeric else self._forecast_conversion_probability(s_rec)
+        )
         return [
-            {'metric_code': 'conversion_prob_forecast', 'metric_group': 'forecast', 'value_numeric': self._forecast_conversion_probability(s_rec)},
+            {'metric_code': 'conversion_prob_forecast', 'metric_group': 'forecast', 'value_numeric': conversion_forecast},
             {'metric_code': 'second_call_prob', 'metric_group': 'forecast', 'value_numeric': self._forecast_second_call_probability(h_rec, s_rec)},
             {'metric_code': 'complaint_prob', 'metric_group': 'forecast', 'value_numeric': complaint_prob}
         ]
@@ -1566,6 +1622,204 @@ class LMService:
             {'metric_code': 'calc_profile', 'metric_group': 'aux', 'value_label': profile}
         ]
 
+    def _calculate_call_metrics(
+        self,
+        history_id: int,
+        history_record: Dict[str, Any],
+        score_record: Optional[Dict[str, Any]],
+        dictionary_terms: Optional[DictionaryTerms],
+        calc_source: str,
+        numeric: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Tuple[float, bool, Dict[str, Any]]]:
+        """Все метрики одного звонка (без записи) + контекст жалобы для словарных хитов."""
+        numeric = numeric or self._numeric_values(history_record, score_record)
+        analysis = CallAnalysis(self, history_record, score_record)
+        metrics = []
+        metrics.extend(self.calculate_operational_metrics(history_record, score_record, numeric))
+        metrics.extend(self.calculate_conversion_metrics(history_record, score_record, numeric))
+        metrics.extend(self.calculate_quality_metrics(history_record, score_record, numeric))
+        complaint_context = self._calculate_complaint_risk(history_record, score_record, dictionary_terms, analysis)
+        metrics.extend(self.calculate_risk_metrics(history_record, score_record, complaint_context, analysis))
+        metrics.extend(self.calculate_forecast_metrics(history_record, score_record, complaint_context, numeric))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            flw_flag_dbg, flw_context_dbg = analysis.followup
+            logger.debug(
+                "[LM][calc] history_id=%s "
+                "conversion_score=%.2f quality_score=%.2f complaint_score=%.2f reasons=%s followup=%s",
+                history_id,
+                metrics[3].get('value_numeric', 0) if len(metrics) > 3 else 0,
+                metrics[6].get('value_numeric', 0) if len(metrics) > 6 else 0,
+                complaint_context[0],
+                (complaint_context[2] or {}).get("reasons"),
+                {'flag': flw_flag_dbg, 'context': flw_context_dbg},
+            )
+        metrics.extend(self.calculate_auxiliary_metrics(history_record, score_record, calc_source))
+        
+        # Вариант Б: Парсим суб-скоры из result
+        if score_record and score_record.get('result'):
+            subscores = self._parse_result_subscores(score_record['result'])
+            for m_code, val in subscores.items():
+                metrics.append({
+                    'metric_code': m_code,
+                    'metric_group': 'subscore',
+                    'value_numeric': val
+                })
+        return metrics, complaint_context
+
+    def _to_payload_rows(
+        self,
+        history_id: int,
+        metrics: List[Dict[str, Any]],
+        history_record: Dict[str, Any],
+        score_record: Optional[Dict[str, Any]],
+        calc_source: str,
+    ) -> List[Dict[str, Any]]:
+        profile = self._determine_calc_profile(history_record, score_record)
+        score_id = score_record.get('call_scores_id') or score_record.get('id') if score_record else None
+        
+        payload = []
+        for m in metrics:
+            payload.append({
+                'history_id': history_id,
+                'call_score_id': score_id,
+                'metric_code': m['metric_code'],
+                'metric_group': m['metric_group'],
+                'value_numeric': m.get('value_numeric'),
+                'value_label': m.get('value_label'),
+                'value_json': m.get('value_json'),
+                'lm_version': self.lm_version,
+                'calc_profile': profile,
+                'calc_method': DEFAULT_CALC_METHOD,
+                'calc_source': calc_source
+            })
+        return payload
+
+    async def build_metrics_payload(
+        self,
+        history_id: int,
+        history_record: Dict[str, Any],
+        score_record: Optional[Dict[str, Any]],
+        calc_source: str = "batch",
+    ) -> List[Dict[str, Any]]:
+        """Рассчитывает все метрики звонка и возвращает строки для записи в lm_value."""
+        self.complaint_matrix.maybe_reload()
+        dictionary_terms = await self._get_dictionary_terms("complaint_risk")
+        metrics, complaint_context = self._calculate_call_metrics(
+            history_id,
+            history_record,
+            score_record,
+            dictionary_terms,
+            calc_source,
+        )
+        await self._persist_dictionary_hits(history_id, complaint_context)
+        return self._to_payload_rows(history_id, metrics, history_record, score_record, calc_source)
+
+    async def calculate_metrics_batch(
+        self,
+        rows: Iterable[Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]],
+        calc_source: str = "batch",
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Рассчитывает метрики для батча звонков.
+
+        Числовые метрики считаются поколоночно (lm_batch.numeric_columns), текстовый
+        анализ — один раз на звонок, словарь жалоб загружается один раз на батч.
+        Сам расчет при заданном executor уходит в пул процессов; event loop
+        занимается только чтением словаря и записью срабатываний. Новые веса из
+        config/lm_weight_matrix.json подхватываются перед батчем (maybe_reload).
+        Звонок, на котором расчёт упал, пропускается (ошибка логируется).
+
+        Args:
+            rows: (history_id, call_history, call_score | None)
+
+        Returns:
+            {history_id: строки lm_value} — вход для save_payloads_bulk()
+        """
+        batch = [(history_id, h_rec, s_rec) for history_id, h_rec, s_rec in rows if h_rec is not None]
+        if not batch:
+            return {}
+        self.complaint_matrix.maybe_reload()
+        dictionary_terms = await self._get_dictionary_terms("complaint_risk")
+        payloads, complaint_contexts = await self._score_batch_offloaded(batch, dictionary_terms, calc_source)
+
+        if self.hit_writer is not None:
+            # Хиты всего батча — одной пачкой (или в буфер писателя)
+            hit_rows = [
+                row
+                for history_id, complaint_context in complaint_contexts.items()
+                for row in self._dictionary_hit_rows(history_id, complaint_context)
+            ]
+            await self.hit_writer.write(
+                hit_rows,
+                scopes=[(history_id, "complaint_risk", self.dictionary_version) for history_id in complaint_contexts],
+            )
+        return payloads
+
+    def _score_batch(
+        self,
+        batch: List[CallRow],
+        dictionary_terms: Optional[DictionaryTerms],
+        calc_source: str,
+    ) -> ScoredBatch:
+        """Чистый расчет батча без обращений к БД: строки lm_value и контексты жалоб."""
+        columns = lm_batch.numeric_columns(
+            [h_rec for _, h_rec, _ in batch],
+            [s_rec for _, _, s_rec in batch],
+        )
+        payloads: Dict[int, List[Dict[str, Any]]] = {}
+        complaint_contexts: Dict[int, ComplaintContext] = {}
+        for index, (history_id, h_rec, s_rec) in enumerate(batch):
+            try:
+                metrics, complaint_context = self._calculate_call_metrics(
+                    history_id,
+                    h_rec,
+                    s_rec,
+                    dictionary_terms,
+                    calc_source,
+                    numeric=lm_batch.row_view(columns, index),
+                )
+            except Exception as e:
+                logger.error(f"Failed to calculate LM metrics for history_id={history_id}: {e}", exc_info=True)
+                continue
+            payloads[history_id] = self._to_payload_rows(history_id, metrics, h_rec, s_rec, calc_source)
+            complaint_contexts[history_id] = complaint_context
+        return payloads, complaint_contexts
+
+    async def _score_batch_offloaded(
+        self,
+        batch: List[CallRow],
+        dictionary_terms: Optional[DictionaryTerms],
+        calc_source: str,
+    ) -> ScoredBatch:
+        """
+        Запускает _score_batch в пуле процессов, если он задан, иначе — в текущем цикле.
+
+        Если пул сломан или данные не сериализуются, пул отключается и расчет
+        выполняется в текущем процессе.
+        """
+        if self.executor is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    self.executor,
+                    score_batch_in_worker,
+                    self.lm_version,
+                    self.dictionary_version,
+                    self.complaint_matrix,
+                    batch,
+                    dictionary_terms,
+                    calc_source,
+                )
+            except (BrokenProcessPool, pickle.PicklingError, RuntimeError) as exc:
+                logger.error(
+                    "LM process pool unavailable, falling back to in-loop scoring: %s",
+                    exc,
+                    exc_info=True,
+                )
+                self.executor = None
+        return self._score_batch(batch, dictionary_terms, calc_source)
+
     async def calculate_all_metrics(
         self,
         history_id: int,
@@ -1580,63 +1834,49 @@ class LMService:
             score_record = s_rec or call_score
             if history_record is None:
                 raise ValueError("call_history (h_rec) is required for LM calculation")
-            metrics = []
-            metrics.extend(self.calculate_operational_metrics(history_record, score_record))
-            metrics.extend(self.calculate_conversion_metrics(history_record, score_record))
-            metrics.extend(self.calculate_quality_metrics(history_record, score_record))
-            dictionary_terms = await self._get_dictionary_terms("complaint_risk")
-            complaint_context = self._calculate_complaint_risk(history_record, score_record, dictionary_terms)
-            metrics.extend(self.calculate_risk_metrics(history_record, score_record, complaint_context))
-            metrics.extend(self.calculate_forecast_metrics(history_record, score_record, complaint_context))
-            if self.dictionary_repo:
-                await self._persist_dictionary_hits(history_id, complaint_context)
-
-            flw_flag_dbg, flw_context_dbg = self._calculate_followup_needed(history_record, score_record)
-            logger.debug(
-                "[LM][calc] history_id=%s "
-                "conversion_score=%.2f quality_score=%.2f complaint_score=%.2f reasons=%s followup=%s",
-                history_id,
-                metrics[3].get('value_numeric', 0) if len(metrics) > 3 else 0,
-                metrics[6].get('value_numeric', 0) if len(metrics) > 6 else 0,
-                complaint_context[0],
-                (complaint_context[2] or {}).get("reasons"),
-                {'flag': flw_flag_dbg, 'context': flw_context_dbg},
-            )
-            metrics.extend(self.calculate_auxiliary_metrics(history_record, score_record, calc_source))
-            
-            # Вариант Б: Парсим суб-скоры из result
-            if score_record and score_record.get('result'):
-                subscores = self._parse_result_subscores(score_record['result'])
-                for m_code, val in subscores.items():
-                    metrics.append({
-                        'metric_code': m_code,
-                        'metric_group': 'subscore',
-                        'value_numeric': val
-                    })
-            
-            profile = self._determine_calc_profile(history_record, score_record)
-            score_id = score_record.get('call_scores_id') or score_record.get('id') if score_record else None
-            
-            payload = []
-            for m in metrics:
-                payload.append({
-                    'history_id': history_id,
-                    'call_score_id': score_id,
-                    'metric_code': m['metric_code'],
-                    'metric_group': m['metric_group'],
-                    'value_numeric': m.get('value_numeric'),
-                    'value_label': m.get('value_label'),
-                    'value_json': m.get('value_json'),
-                    'lm_version': self.lm_version,
-                    'calc_profile': profile,
-                    'calc_method': DEFAULT_CALC_METHOD,
-                    'calc_source': calc_source
-                })
-            return await self.repo.save_lm_values_batch(payload)
+            payload = await self.build_metrics_payload(history_id, history_record, score_record, calc_source)
+            if self.write_behind is not None:
+                accepted = await self.write_behind.submit({history_id: payload})
+                return accepted.get(history_id, 0)
+            return await self.repo.save_lm_values_batch(payload, bulk=True)
         except Exception as e:
             logger.error(f"Failed to calculate metrics for history_id={history_id}: {e}", exc_info=True)
             return 0
 
+    async def save_payloads_bulk(self, payloads: Dict[int, List[Dict[str, Any]]]) -> Dict[int, int]:
+        """
+        Пишет метрики нескольких звонков одним bulk upsert.
+
+        С write_behind строки ставятся в очередь отложенной записи.
+
+        Returns:
+            {history_id: количество сохраненных (принятых в очередь) метрик}
+        """
+        if self.write_behind is not None:
+            return await self.write_behind.submit(payloads)
+        rows = [row for payload in payloads.values() for row in payload]
+        saved_by_call: Dict[int, int] = {history_id: 0 for history_id in payloads}
+        if not rows:
+            return saved_by_call
+        statuses = await self.repo.save_lm_values_bulk(rows)
+        for status in statuses:
+            if status.get("status") == "saved" and status.get("history_id") in saved_by_call:
+                saved_by_call[status["history_id"]] += 1
+        return saved_by_call
+
+    def cached_metrics(self, history_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Свежие метрики звонка из кеша write-behind (None — читать из lm_value)."""
+        if self.write_behind is None:
+            return None
+        return self.write_behind.get_cached(history_id)
+
+    async def flush_pending_writes(self) -> bool:
+        """Дописывает очередь write-behind; True, если все строки уже в lm_value."""
+        if self.write_behind is None:
+            return True
+        await self.write_behind.flush()
+        return self.write_behind.pending == 0
+
     async def sync_new_metrics(self, days: int = 1, limit: int = 100) -> Dict[str, Any]:
         profile = "default_v1"
         watermark = await self.repo.get_calc_watermark(self.lm_version, profile)
@@ -1653,17 +1893,50 @@ class LMService:
             
         processed = 0
         new_id, new_date = last_id, watermark.get('last_score_date')
-        
+        batch = [
+            (
+                row['history_id'],
+                {'history_id': row['history_id'], 'talk_duration': row.get('talk_duration'), 'await_sec': row.get('await_sec'), 'call_date': row.get('call_date')},
+                dict(row),
+            )
+            for row in rows
+        ]
+        payloads = await self.calculate_metrics_batch(batch, calc_source="sync")
+
+        saved_by_call = await self.save_payloads_bulk(payloads)
         for row in rows:
-            try:
-                h_rec = {'history_id': row['history_id'], 'talk_duration': row.get('talk_duration'), 'await_sec': row.get('await_sec'), 'call_date': row.get('call_date')}
-                await self.calculate_all_metrics(row['history_id'], h_rec, dict(row), calc_source="sync")
-                processed += 1
-                new_id = row['id']
-                new_date = row.get('synced_at') or row.get('call_date') or new_date
-            except Exception as e:
-                logger.error(f"Sync error for row {row.get('id')}: {e}")
+            if not saved_by_call.get(row['history_id']):
+                continue
+            processed += 1
+            new_id = row['id']
+            new_date = row.get('synced_at') or row.get('call_date') or new_date
 
-        if processed > 0:
+        # Watermark двигаем только после фактической записи метрик
+        if processed > 0 and await self.flush_pending_writes():
             await self.repo.update_calc_watermark(self.lm_version, profile, new_date, new_id)
         return {"processed": processed, "last_id": new_id}
+
+
+# Сервисы дочерних процессов пула: создаются один раз на процесс и версию
+_WORKER_SERVICES: Dict[Tuple[str, str], LMService] = {}
+
+
+def score_batch_in_worker(
+    lm_version: str,
+    dictionary_version: str,
+    complaint_matrix: ComplaintWeightMatrix,
+    batch: List[CallRow],
+    dictionary_terms: Optional[DictionaryTerms],
+    calc_source: str,
+) -> ScoredBatch:
+    """Точка входа для ProcessPoolExecutor: все аргументы и результат сериализуемы."""
+    key = (lm_version, dictionary_version)
+    service = _WORKER_SERVICES.get(key)
+    if service is None:
+        service = _WORKER_SERVICES[key] = LMService(
+            None,  # type: ignore[arg-type]
+            lm_version=lm_version,
+            dictionary_version=dictionary_version,
+        )
+    service.complaint_matrix = complaint_matrix
+    return service._score_batch(batch, dictionary_terms, calc_source)
@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
-"""Управление матрицей весов для классификации жалоб."""
+"""
+Управление матрицей весов для классификации жалоб.
+
+Расчет читает не словарь конфигурации, а скомпилированный снимок WeightSnapshot:
+плоские (multiplier, bias) по категориям и пороги уже в float, плюс номер версии.
+Снимок неизменяемый и заменяется целиком одной ссылкой, поэтому звонок, начавший
+расчет, дочитывает одну версию весов. Новый снимок публикуется при изменении
+файла (проверка mtime не чаще reload_interval_sec), по reload() и после правок
+через set_*.
+"""
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, Optional, Tuple
 import copy
+import hashlib
+import json
+import os
+import time
 
+from app.config import LM_WEIGHTS_CONFIG
 from app.logging_config import get_watchdog_logger
 
 
@@ -27,35 +41,73 @@ DEFAULT_MATRIX: Dict[str, Any] = {
 
 logger = get_watchdog_logger(__name__)
 
+FileStamp = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class WeightSnapshot:
+    """Скомпилированная версия матрицы: только чтение, без преобразований на расчете."""
+
+    version: int
+    fingerprint: str
+    thresholds: Dict[str, float]
+    # категория -> (multiplier, bias)
+    coefficients: Dict[str, Tuple[float, float]]
+
+    def apply_multiplier(self, category: Optional[str], base_value: float) -> float:
+        coefficients = self.coefficients.get(category) if category else None
+        if coefficients is None:
+            return base_value
+        return base_value * coefficients[0] + coefficients[1]
+
+    def resolve_threshold(self, key: str, fallback: float) -> float:
+        return self.thresholds.get(key, fallback)
+
 
 class ComplaintWeightMatrix:
     """Читает/хранит локальную матрицу весов для категорий жалоб."""
 
-    def __init__(self, path: Optional[str] = None):
+    def __init__(self, path: Optional[str] = None, *, reload_interval_sec: Optional[float] = None):
         self.path = Path(path or "config/lm_weight_matrix.json")
+        if reload_interval_sec is None:
+            reload_interval_sec = LM_WEIGHTS_CONFIG["reload_interval_sec"]
+        self.reload_interval_sec = max(0.0, float(reload_interval_sec))
         self._config: Dict[str, Any] = copy.deepcopy(DEFAULT_MATRIX)
+        self._stamp: Optional[FileStamp] = None
+        self._checked_at = time.monotonic()
         self._load()
-
-    def _load(self) -> None:
-        if not self.path.exists():
-            return
+        self._snapshot = self._compile(self._config, version=1)
+
+    def _load(self) -> bool:
+        """Перечитывает файл поверх DEFAULT_MATRIX. False — файла нет или он не читается."""
+        stamp = self._file_stamp()
+        self._stamp = stamp
+        if stamp is None:
+            return False
         try:
             with self.path.open("r", encoding="utf-8") as fp:
                 data = json.load(fp)
-            self._deep_update(self._config, data)
-        except (OSError, json.JSONDecodeError, ValueError) as exc:
-            # Ожидаемые проблемы чтения/парсинга — остаёмся на дефолтах.
+            config = copy.deepcopy(DEFAULT_MATRIX)
+            self._deep_update(config, data)
+        except (OSError, json.JSONDecodeError, ValueError, TypeError, AttributeError) as exc:
+            # Ожидаемые проблемы чтения/парсинга — остаёмся на текущих весах.
             logger.warning("LM weights: не удалось прочитать матрицу (%s)", exc)
-            return
+            return False
         except Exception:
             logger.exception("LM weights: непредвиденная ошибка чтения матрицы")
             raise
+        self._config = config
+        return True
 
     def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
         try:
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            with self.path.open("w", encoding="utf-8") as fp:
+            with tmp_path.open("w", encoding="utf-8") as fp:
                 json.dump(self._config, fp, ensure_ascii=False, indent=2)
+            # Атомарная замена: перечитывающий процесс не увидит недописанный файл
+            os.replace(tmp_path, self.path)
+            self._stamp = self._file_stamp()
         except (OSError, TypeError, ValueError) as exc:
             # Ожидаемые проблемы записи/сериализации — не валим приложение.
             logger.warning("LM weights: не удалось сохранить матрицу (%s)", exc)
@@ -64,18 +116,52 @@ class ComplaintWeightMatrix:
             logger.exception("LM weights: непредвиденная ошибка сохранения матрицы")
             raise
 
+    @property
+    def snapshot(self) -> WeightSnapshot:
+        """Текущая версия весов; для согласованного расчета берите ее один раз на звонок."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    @property
+    def fingerprint(self) -> str:
+        """sha1 текущей конфигурации матрицы (часть отпечатка входов LM)."""
+        return self._snapshot.fingerprint
+
+    def reload(self, *, force: bool = False) -> bool:
+        """
+        Перечитывает файл, если изменились его mtime/размер (force — всегда).
+
+        Returns:
+            True, если опубликована новая версия весов.
+        """
+        self._checked_at = time.monotonic()
+        if not force and self._file_stamp() == self._stamp:
+            return False
+        if not self._load():
+            return False
+        return self._publish()
+
+    def maybe_reload(self) -> bool:
+        """reload() не чаще reload_interval_sec; дешевый вызов на горячем пути расчета."""
+        if not self.reload_interval_sec:
+            return False
+        if time.monotonic() - self._checked_at < self.reload_interval_sec:
+            return False
+        return self.reload()
+
     @property
     def thresholds(self) -> Dict[str, float]:
         return self._config.get("thresholds", {})
 
     def resolve_threshold(self, key: str, fallback: float) -> float:
-        try:
-            return float(self.thresholds.get(key, fallback))
-        except (TypeError, ValueError):
-            return fallback
+        return self._snapshot.resolve_threshold(key, fallback)
 
     def set_threshold(self, key: str, value: float) -> None:
         self._config.setdefault("thresholds", {})[key] = float(value)
+        self._publish()
 
     def set_category_params(
         self,
@@ -89,16 +175,52 @@ class ComplaintWeightMatrix:
             bucket["multiplier"] = float(multiplier)
         if bias is not None:
             bucket["bias"] = float(bias)
+        self._publish()
 
     def apply_multiplier(self, category: Optional[str], base_value: float) -> float:
-        if not category:
-            return base_value
-        cat_conf = self._config.get("categories", {}).get(category)
-        if not cat_conf:
-            return base_value
-        multiplier = self._safe_float(cat_conf.get("multiplier"), 1.0)
-        bias = self._safe_float(cat_conf.get("bias"), 0.0)
-        return base_value * multiplier + bias
+        return self._snapshot.apply_multiplier(category, base_value)
+
+    def _publish(self) -> bool:
+        """Компилирует текущую конфигурацию; версия растет, только если веса изменились."""
+        current = self._snapshot
+        snapshot = self._compile(self._config, version=current.version + 1)
+        if snapshot.fingerprint == current.fingerprint:
+            return False
+        self._snapshot = snapshot
+        logger.info(
+            "LM weights: опубликована версия %s (fingerprint=%s)",
+            snapshot.version,
+            snapshot.fingerprint[:12],
+        )
+        return True
+
+    @classmethod
+    def _compile(cls, config: Dict[str, Any], *, version: int) -> WeightSnapshot:
+        fingerprint = hashlib.sha1(
+            json.dumps(config, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        thresholds: Dict[str, float] = {}
+        for key, value in (config.get("thresholds") or {}).items():
+            try:
+                thresholds[key] = float(value)
+            except (TypeError, ValueError):
+                continue
+        coefficients = {
+            category: (
+                cls._safe_float(conf.get("multiplier"), 1.0),
+                cls._safe_float(conf.get("bias"), 0.0),
+            )
+            for category, conf in (config.get("categories") or {}).items()
+            if isinstance(conf, dict) and conf
+        }
+        return WeightSnapshot(version, fingerprint, thresholds, coefficients)
+
+    def _file_stamp(self) -> Optional[FileStamp]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     @staticmethod
     def _safe_float(value: Any, fallback: float) -> float:
@@ -116,4 +238,4 @@ class ComplaintWeightMatrix:
                 target[key] = value
 
 
-__all__ = ["ComplaintWeightMatrix", "DEFAULT_MATRIX"]
+__all__ = ["ComplaintWeightMatrix", "DEFAULT_MATRIX", "WeightSnapshot"]
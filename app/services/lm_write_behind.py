@@ -0,0 +1,219 @@
+"""
+Write-behind очередь результатов LM.
+
+Рассчитанные строки lm_value сразу публикуются в кеш в памяти: карточка звонка
+в админке рендерится из него, не дожидаясь записи. Фоновая задача собирает
+накопившиеся строки и пишет их одним bulk upsert раз в flush_interval_ms или
+при накоплении flush_rows строк. Повторный расчет той же метрики до записи
+заменяет строку в очереди. Строки, которые не удалось записать, возвращаются
+в очередь, но не больше max_attempts раз — дальше строка отбрасывается с ошибкой
+в логе (worker пересчитает звонок). Очередь ограничена max_pending строками:
+сверх лимита submit() пишет строки сразу, минуя очередь. При остановке бота
+close() дописывает остаток. Записи кеша живут cache_ttl_sec: дальше источником
+снова служит lm_value (его мог обновить worker).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.config import LM_WRITE_BEHIND_CONFIG
+from app.db.repositories.lm_repository import LMRepository
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+MetricKey = Tuple[int, str]
+
+
+class LMWriteBehind:
+    """Кеш свежих результатов LM + отложенная пакетная запись в lm_value."""
+
+    def __init__(
+        self,
+        repo: LMRepository,
+        *,
+        flush_rows: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl_sec: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.repo = repo
+        self.flush_rows = max(1, int(flush_rows or LM_WRITE_BEHIND_CONFIG["flush_rows"]))
+        if flush_interval_ms is None:
+            flush_interval_ms = LM_WRITE_BEHIND_CONFIG["flush_interval_ms"]
+        self.flush_interval_sec = max(0, int(flush_interval_ms)) / 1000.0
+        self.cache_size = max(1, int(cache_size or LM_WRITE_BEHIND_CONFIG["cache_size"]))
+        if cache_ttl_sec is None:
+            cache_ttl_sec = LM_WRITE_BEHIND_CONFIG["cache_ttl_sec"]
+        self.cache_ttl_sec = max(0.0, float(cache_ttl_sec))
+        self.max_attempts = max(1, int(max_attempts or LM_WRITE_BEHIND_CONFIG["max_attempts"]))
+        self.max_pending = max(1, int(max_pending or LM_WRITE_BEHIND_CONFIG["max_pending"]))
+        self._pending: Dict[MetricKey, Dict[str, Any]] = {}
+        # Неудачные попытки записи строки, которая сейчас в очереди
+        self._attempts: Dict[MetricKey, int] = {}
+        # history_id -> (monotonic-время публикации, строки)
+        self._cache: "OrderedDict[int, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, payloads: Mapping[int, Sequence[Dict[str, Any]]]) -> Dict[int, int]:
+        """
+        Публикует метрики звонков в кеш и ставит их в очередь на запись.
+
+        Returns:
+            {history_id: количество принятых строк}
+        """
+        accepted: Dict[int, int] = {}
+        overflow: List[Tuple[int, Dict[str, Any]]] = []
+        for history_id, rows in payloads.items():
+            rows = list(rows)
+            accepted[history_id] = len(rows)
+            if not rows:
+                continue
+            self._publish(history_id, rows)
+            for row in rows:
+                key = (history_id, row["metric_code"])
+                if key not in self._pending and len(self._pending) >= self.max_pending:
+                    overflow.append((history_id, row))
+                    continue
+                self._pending[key] = row
+                # Новый расчет метрики — новый счет попыток
+                self._attempts.pop(key, None)
+        if overflow:
+            await self._write_direct(overflow, accepted)
+        if self._closed:
+            # После close() фонового сброса нет — пишем сразу
+            await self.flush()
+            return accepted
+        self._ensure_flusher()
+        if len(self._pending) >= self.flush_rows:
+            await self.flush()
+        return accepted
+
+    def get_cached(self, history_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Последние рассчитанные метрики звонка в формате get_lm_values_by_call (или None)."""
+        entry = self._cache.get(history_id)
+        if entry is None:
+            return None
+        published, rows = entry
+        if time.monotonic() - published > self.cache_ttl_sec:
+            del self._cache[history_id]
+            return None
+        self._cache.move_to_end(history_id)
+        return [dict(row) for row in rows]
+
+    async def flush(self) -> int:
+        """Пишет все накопленные строки; возвращает число сохраненных."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch = self._pending
+            self._pending = {}
+            rows = list(batch.values())
+            try:
+                statuses = await self.repo.save_lm_values_bulk(rows)
+            except Exception:
+                logger.exception("[LM][write-behind] Bulk upsert failed (rows=%s), requeued", len(rows))
+                self._requeue(batch)
+                return 0
+            saved = 0
+            failed: Dict[MetricKey, Dict[str, Any]] = {}
+            for (key, row), status in zip(batch.items(), statuses):
+                if status.get("status") == "failed":
+                    failed[key] = row
+                    continue
+                if status.get("status") == "saved":
+                    saved += 1
+                if key not in self._pending:
+                    self._attempts.pop(key, None)
+            if failed:
+                logger.warning("[LM][write-behind] %s rows failed, requeued", len(failed))
+                self._requeue(failed)
+            return saved
+
+    async def close(self) -> None:
+        """Останавливает фоновый сброс и дописывает очередь (вызывается при остановке бота)."""
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._pending:
+            logger.error("[LM][write-behind] %s rows were not written on shutdown", len(self._pending))
+
+    def _requeue(self, rows: Dict[MetricKey, Dict[str, Any]]) -> None:
+        dropped: List[MetricKey] = []
+        for key, row in rows.items():
+            # Более свежий расчет той же метрики, пришедший во время записи, важнее
+            if key in self._pending:
+                continue
+            attempts = self._attempts.pop(key, 0) + 1
+            if attempts >= self.max_attempts or len(self._pending) >= self.max_pending:
+                dropped.append(key)
+                continue
+            self._attempts[key] = attempts
+            self._pending[key] = row
+        if dropped:
+            logger.error(
+                "[LM][write-behind] Dropped %s rows after up to %s failed attempts (e.g. history_id=%s, metric=%s)",
+                len(dropped),
+                self.max_attempts,
+                dropped[0][0],
+                dropped[0][1],
+            )
+
+    async def _write_direct(self, rows: List[Tuple[int, Dict[str, Any]]], accepted: Dict[int, int]) -> None:
+        """Запись сверх лимита очереди: сразу одним bulk upsert (ошибка уходит вызывающему)."""
+        logger.warning(
+            "[LM][write-behind] Queue is full (%s rows), writing %s rows directly",
+            len(self._pending),
+            len(rows),
+        )
+        statuses = await self.repo.save_lm_values_bulk([row for _, row in rows])
+        for (history_id, _), status in zip(rows, statuses):
+            if status.get("status") != "saved":
+                accepted[history_id] -= 1
+
+    def _publish(self, history_id: int, rows: List[Dict[str, Any]]) -> None:
+        calculated_at = datetime.utcnow()
+        self._cache[history_id] = time.monotonic(), [
+            {
+                **row,
+                "value_numeric": LMRepository.normalize_value_numeric(
+                    row.get("value_numeric"), row["metric_code"], history_id
+                ),
+                "calculated_at": calculated_at,
+            }
+            for row in rows
+        ]
+        self._cache.move_to_end(history_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _ensure_flusher(self) -> None:
+        if self.flush_interval_sec <= 0:
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_sec)
+            # shield: отмена при close() не прерывает уже начатую запись
+            await asyncio.shield(self.flush())
@@ -0,0 +1,148 @@
+# Файл: app/services/operator_rollup.py
+
+"""
+Поддержка дневных агрегатов операторов (operator_daily_rollup).
+
+- refresh_since(): инкрементальное обновление после CallAnalyticsSyncService.sync_new —
+  пересчитываются только дни звонков, которые появились/переоценены после watermark;
+- rebuild(): полный пересчет периода (python -m app.workers.operator_rollup rebuild);
+- check(): сверка сохраненных строк с расчетом по сырым call_scores.
+
+День всегда пересчитывается целиком из call_scores, поэтому повторный запуск
+безопасен и сам исправляет расхождения.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.db.manager import DatabaseManager, ROUTE_PRIMARY
+from app.db.repositories.operator_rollup import OperatorRollupRepository, contiguous_ranges
+from app.logging_config import get_watchdog_logger
+
+logger = get_watchdog_logger(__name__)
+
+DEFAULT_CHUNK_DAYS = 7
+
+
+@dataclass
+class RollupCheckReport:
+    """Результат сверки rollup с сырыми данными."""
+
+    date_from: date
+    date_to: date
+    rows_checked: int = 0
+    # (оператор, день, {поле: (в rollup, по call_scores)})
+    mismatches: List[Tuple[str, date, Dict[str, Tuple[Any, Any]]]] = field(default_factory=list)
+    # Есть звонки, но нет строки rollup
+    missing: List[Tuple[str, date]] = field(default_factory=list)
+    # Есть строка rollup, но звонков нет
+    stale: List[Tuple[str, date]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.mismatches or self.missing or self.stale)
+
+    @property
+    def affected_days(self) -> List[date]:
+        days = {day for _, day, _ in self.mismatches}
+        days.update(day for _, day in self.missing)
+        days.update(day for _, day in self.stale)
+        return sorted(days)
+
+
+def _chunks(date_from: date, date_to: date, chunk_days: int) -> Iterator[Tuple[date, date]]:
+    chunk_days = max(1, chunk_days)
+    start = date_from
+    while start <= date_to:
+        end = min(date_to, start + timedelta(days=chunk_days - 1))
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+class OperatorRollupService:
+    """Инкрементальное обновление, пересчет и сверка operator_daily_rollup."""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        repository: Optional[OperatorRollupRepository] = None,
+        *,
+        chunk_days: int = DEFAULT_CHUNK_DAYS,
+    ):
+        self.repository = repository or OperatorRollupRepository(db_manager)
+        self.chunk_days = chunk_days
+
+    async def refresh_days(self, days: Iterable[date]) -> Dict[str, int]:
+        """Пересчитывает указанные дни (подряд идущие — одним запросом на chunk_days)."""
+        stats = {'days': 0, 'rows': 0}
+        for range_from, range_to in contiguous_ranges(days):
+            await self._refresh_range(range_from, range_to, stats)
+        return stats
+
+    async def _refresh_range(self, date_from: date, date_to: date, stats: Dict[str, int]) -> None:
+        for chunk_from, chunk_to in _chunks(date_from, date_to, self.chunk_days):
+            rollup = await self.repository.compute(chunk_from, chunk_to)
+            stats['rows'] += await self.repository.replace_days(chunk_from, chunk_to, rollup)
+            stats['days'] += (chunk_to - chunk_from).days + 1
+            logger.debug("[ROLLUP] Refreshed %s — %s: rows=%s", chunk_from, chunk_to, stats['rows'])
+
+    async def refresh_since(
+        self,
+        since: datetime,
+        *,
+        history_timestamp_field: str = "ch.created_at",
+    ) -> Dict[str, int]:
+        """Обновляет rollup за дни, затронутые звонками после watermark синхронизации."""
+        days = await self.repository.touched_days_since(since, history_timestamp_field)
+        if not days:
+            logger.info("[ROLLUP] No touched days since %s", since)
+            return {'days': 0, 'rows': 0}
+        stats = await self.refresh_days(days)
+        logger.info(
+            "[ROLLUP] Incremental refresh since %s: days=%s, rows=%s (%s — %s)",
+            since,
+            stats['days'],
+            stats['rows'],
+            days[0],
+            days[-1],
+        )
+        return stats
+
+    async def rebuild(self, date_from: date, date_to: date) -> Dict[str, int]:
+        """Полный пересчет rollup за период."""
+        logger.info("[ROLLUP] Rebuild %s — %s", date_from, date_to)
+        stats = {'days': 0, 'rows': 0}
+        await self._refresh_range(date_from, date_to, stats)
+        logger.info("[ROLLUP] Rebuild done: days=%s, rows=%s", stats['days'], stats['rows'])
+        return stats
+
+    async def check(self, date_from: date, date_to: date, *, tolerance: float = 1e-6) -> RollupCheckReport:
+        """Сверяет rollup с расчетом по call_scores (основной пул, без отставания реплики)."""
+        report = RollupCheckReport(date_from, date_to)
+        for chunk_from, chunk_to in _chunks(date_from, date_to, self.chunk_days):
+            expected = await self.repository.compute(chunk_from, chunk_to)
+            stored = await self.repository.load(chunk_from, chunk_to, route=ROUTE_PRIMARY)
+            report.rows_checked += len(stored)
+            for key in sorted(set(expected) | set(stored)):
+                operator_name, call_day = key
+                if key not in stored:
+                    report.missing.append(key)
+                elif key not in expected:
+                    report.stale.append(key)
+                else:
+                    mismatch = stored[key].diff(expected[key], tolerance=tolerance)
+                    if mismatch:
+                        report.mismatches.append((operator_name, call_day, mismatch))
+        logger.info(
+            "[ROLLUP] Check %s — %s: rows=%s, mismatches=%s, missing=%s, stale=%s",
+            date_from,
+            date_to,
+            report.rows_checked,
+            len(report.mismatches),
+            len(report.missing),
+            len(report.stale),
+        )
+        return report
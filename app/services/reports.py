@@ -10,6 +10,7 @@ import json
 from typing import Optional, Tuple, Dict, Any, List
 
 from app.services.openai_service import OpenAIService
+from app.services.subscores import SUBSCORE_KEYS, parse_subscores
 from app.db.repositories.operators import OperatorRepository
 from app.db.repositories.reports_v2 import ReportsV2Repository
 from app.db.manager import DatabaseManager
@@ -21,7 +22,7 @@ logger = get_watchdog_logger(__name__)
 
 
 class ReportService:
-    SCORING_VERSION = "v2026-01-29-v4"
+    SCORING_VERSION = "v2026-10-16-v1"
     MIN_COVERAGE_FOR_STRONG = 10
 
     def __init__(self, db_manager: DatabaseManager):
@@ -243,6 +244,9 @@ class ReportService:
             "followup_captured": 0,
         }
 
+        subscore_sum = {key: 0.0 for key in SUBSCORE_KEYS}
+        subscore_cov = {key: 0 for key in SUBSCORE_KEYS}
+
         valid_scores: List[Dict[str, Any]] = []
         for row in scores:
             if not isinstance(row, dict):
@@ -278,6 +282,11 @@ class ReportService:
             if not outcome and any(x in category for x in ["инфо", "подтверж", "пропущ"]):
                 info_calls += 1
 
+            # Суб-оценки из текста анализа (0–10)
+            for key, value in parse_subscores(row.get("result")).items():
+                subscore_sum[key] += value
+                subscore_cov[key] += 1
+
             # Новые флаги
             for flag in ["objection_present", "objection_handled", "booking_attempted", "next_step_clear", "followup_captured"]:
                 val = row.get(flag)
@@ -331,6 +340,11 @@ class ReportService:
             res[f"{key}_coverage"] = cov_count
             res[f"{key}_rate"] = round((true_count / cov_count * 100), 2) if cov_count > 0 else None
 
+        for key in SUBSCORE_KEYS:
+            cov_count = subscore_cov[key]
+            res[f"avg_{key}"] = round(subscore_sum[key] / cov_count, 2) if cov_count else None
+            res[f"{key}_coverage"] = cov_count
+
         # Провалы (counts) для управления
         res["count_objection_not_handled"] = sum(
             1 for r in valid_scores if r.get("objection_present") == 1 and r.get("objection_handled") == 0
@@ -523,6 +537,14 @@ class ReportService:
             rate_text = f"{rate}%" if rate is not None else "н/д"
             facts.append(f"- {key}: {rate_text} (true={true_count}, cov={cov})")
 
+        subscore_facts = [
+            f"- {key}: {metrics.get(f'avg_{key}')}/10 (cov={metrics.get(f'{key}_coverage')})"
+            for key in SUBSCORE_KEYS
+            if metrics.get(f"{key}_coverage")
+        ]
+        if subscore_facts:
+            facts.extend(["", "СУБ-ОЦЕНКИ ИЗ АНАЛИЗА ЗВОНКОВ (СРЕДНЕЕ):", *subscore_facts])
+
         facts.extend([
             "",
             "ПРОИГРЫШНЫЕ СВЯЗКИ (COUNTS):",
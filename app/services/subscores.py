@@ -0,0 +1,67 @@
+"""
+Разбор суб-оценок из текста анализа звонка (call_scores.result).
+
+Формат строк: 'Название: X/10'. Все названия собраны в одно предкомпилированное
+выражение внутри lookahead: finditer проверяет каждую позицию текста один раз,
+поэтому пересекающиеся совпадения ('Инициативность и вежливость: 8/10') находятся
+так же, как отдельным re.search по каждой оценке. Для каждой оценки берется
+первое вхождение.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Optional, Pattern, Tuple
+
+# Ключ оценки -> варианты названия в тексте анализа (порядок = порядок колонок отчетов)
+SUBSCORE_LABELS: Dict[str, Tuple[str, ...]] = {
+    "initiative_score": ("Инициативность", "ведение диалога"),
+    "politeness_score": ("Вежливость", "эмпатия"),
+    "info_score": ("Информативность",),
+    "script_score": ("Соблюдение скрипта",),
+    "satisfaction_score": ("Удовлетворенность",),
+}
+SUBSCORE_KEYS: Tuple[str, ...] = tuple(SUBSCORE_LABELS)
+
+
+def _compile(labels: Dict[str, Tuple[str, ...]]) -> Pattern[str]:
+    names = "|".join(
+        f"(?P<{key}>{'|'.join(re.escape(label) for label in variants)})"
+        for key, variants in labels.items()
+    )
+    return re.compile(
+        rf"(?=(?:{names})[^:]*:\s*(?P<value>\d+(?:\.\d+)?)\s*/\s*10)",
+        re.IGNORECASE,
+    )
+
+
+SUBSCORE_PATTERN = _compile(SUBSCORE_LABELS)
+
+
+def parse_subscores(text: Optional[str], *, scale: float = 1.0) -> Dict[str, float]:
+    """
+    Суб-оценки из текста анализа: {ключ: X * scale}.
+
+    scale=10 переводит шкалу 0–10 в 0–100 (так хранит LM).
+    """
+    if not text or "/" not in text:
+        return {}
+    scores: Dict[str, float] = {}
+    for match in SUBSCORE_PATTERN.finditer(text):
+        key = _matched_key(match)
+        if key is None or key in scores:
+            continue
+        try:
+            scores[key] = float(match.group("value")) * scale
+        except (TypeError, ValueError):
+            continue
+        if len(scores) == len(SUBSCORE_KEYS):
+            break
+    return {key: scores[key] for key in SUBSCORE_KEYS if key in scores}
+
+
+def _matched_key(match: "re.Match[str]") -> Optional[str]:
+    for key in SUBSCORE_KEYS:
+        if match.group(key) is not None:
+            return key
+    return None
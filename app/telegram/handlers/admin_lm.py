@@ -3,11 +3,13 @@
 Обработчик LM-метрик (namespace 'lm:').
 """
 
+import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from telegram import Update
 from telegram.error import TelegramError
-from telegram.ext import ContextTypes, CallbackQueryHandler, Application
+from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler, Application
 
 from app.telegram.utils.callback_lm import LMCB
 from app.telegram.utils.callback_data import AdminCB
@@ -19,11 +21,35 @@ from app.telegram.ui.admin.screens.lm_screens import (
 from app.db.repositories.lm_repository import LMRepository
 from app.logging_config import get_watchdog_logger
 from app.utils.error_handlers import log_async_exceptions
+from app.services.lm_backfill import BackfillProgress, LMBackfillService
 from app.services.lm_service import LMService
 from app.utils.periods import calculate_period_bounds
 
 logger = get_watchdog_logger(__name__)
 
+# Не чаще одного редактирования сообщения о прогрессе backfill за интервал (сек)
+BACKFILL_PROGRESS_EDIT_INTERVAL = 15.0
+BACKFILL_USAGE = (
+    "Использование:\n"
+    "/lm_backfill ГГГГ-ММ-ДД ГГГГ-ММ-ДД [звонков/с] — пересчитать период\n"
+    "/lm_backfill restart ГГГГ-ММ-ДД ГГГГ-ММ-ДД [звонков/с] — пройти период заново\n"
+    "/lm_backfill status — прогресс текущего прогона\n"
+    "/lm_backfill stop — остановить (watermark сохранен, можно продолжить)"
+)
+
+
+WEIGHTS_USAGE = (
+    "Использование:\n"
+    "/lm_weights — текущая версия матрицы весов жалоб\n"
+    "/lm_weights reload — перечитать config/lm_weight_matrix.json без перезапуска"
+)
+
+
+def _format_backfill_progress(progress: BackfillProgress) -> str:
+    icon = "✅" if progress.finished else "🔄"
+    return f"{icon} LM backfill {progress.summary()}"
+
+
 class LMHandlers:
     """Обработка команд и callback-ов для LM метрик."""
     
@@ -31,6 +57,8 @@ class LMHandlers:
         self.repo = repo
         self.permissions = permissions
         self.lm_service = lm_service
+        self._backfill_task: Optional[asyncio.Task] = None
+        self._backfill_progress: Optional[BackfillProgress] = None
 
     @log_async_exceptions
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -100,10 +128,10 @@ class LMHandlers:
             
             # 2. Получаем данные с обработкой ошибок БД
             try:
-                metrics = await self.repo.get_lm_values_by_call(h_id)
+                metrics = await self._load_metrics(h_id)
                 if not metrics and self.lm_service:
                     await self._calculate_on_demand(h_id)
-                    metrics = await self.repo.get_lm_values_by_call(h_id)
+                    metrics = await self._load_metrics(h_id)
                 
                 # Загружаем расширенную инфо для證據 (evidence)
                 h_rec, s_rec = await self.repo.get_call_records_for_lm(h_id)
@@ -317,6 +345,147 @@ class LMHandlers:
             
         return False
 
+    def _is_lm_admin(self, user) -> bool:
+        if not self.permissions or not user:
+            return False
+        return bool(
+            self.permissions.is_supreme_admin(user.id, user.username)
+            or self.permissions.is_dev_admin(user.id, user.username)
+        )
+
+    @staticmethod
+    def _parse_backfill_args(args: List[str]) -> Tuple[datetime, datetime, Optional[float], bool]:
+        restart = bool(args) and args[0].lower() == "restart"
+        if restart:
+            args = args[1:]
+        if len(args) < 2:
+            raise ValueError("нужны даты начала и конца периода")
+        start_date = datetime.strptime(args[0], "%Y-%m-%d")
+        end_date = datetime.strptime(args[1], "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        if end_date < start_date:
+            raise ValueError("конец периода раньше начала")
+        rows_per_sec = float(args[2]) if len(args) > 2 else None
+        return start_date, end_date, rows_per_sec, restart
+
+    @log_async_exceptions
+    async def handle_backfill_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /lm_backfill — пересчет LM-метрик за период в фоне (SuperAdmin/Dev)."""
+        message = update.effective_message
+        if not message:
+            return
+        if not self._is_lm_admin(update.effective_user):
+            await message.reply_text("❌ Команда доступна только разработчикам/основателям.")
+            return
+        if not self.lm_service:
+            await message.reply_text("❌ LM сервис не инициализирован.")
+            return
+
+        args = list(context.args or [])
+        running = self._backfill_task is not None and not self._backfill_task.done()
+        command = args[0].lower() if args else ""
+        if command == "status":
+            if not self._backfill_progress:
+                await message.reply_text("Backfill не запускался.")
+                return
+            state = "" if running else "\n(не выполняется)"
+            await message.reply_text(_format_backfill_progress(self._backfill_progress) + state)
+            return
+        if command == "stop":
+            if not running:
+                await message.reply_text("Backfill не выполняется.")
+                return
+            self._backfill_task.cancel()
+            await message.reply_text("⏹ Backfill остановлен. Повторный запуск продолжит с сохраненного места.")
+            return
+        if running:
+            await message.reply_text("⚠️ Backfill уже выполняется. /lm_backfill status — прогресс.")
+            return
+        try:
+            start_date, end_date, rows_per_sec, restart = self._parse_backfill_args(args)
+        except ValueError as exc:
+            await message.reply_text(f"❌ {exc}\n\n{BACKFILL_USAGE}")
+            return
+
+        status_message = await message.reply_text(
+            f"🔄 LM backfill {start_date:%Y-%m-%d} — {end_date:%Y-%m-%d} запущен..."
+        )
+        service = LMBackfillService(self.repo, self.lm_service, rows_per_sec=rows_per_sec)
+        self._backfill_task = asyncio.create_task(
+            self._run_backfill(service, start_date, end_date, restart, status_message)
+        )
+
+    async def _run_backfill(
+        self,
+        service: LMBackfillService,
+        start_date: datetime,
+        end_date: datetime,
+        restart: bool,
+        status_message,
+    ) -> None:
+        last_edit = 0.0
+
+        async def _report(progress: BackfillProgress) -> None:
+            nonlocal last_edit
+            self._backfill_progress = progress
+            now = time.monotonic()
+            if not progress.finished and now - last_edit < BACKFILL_PROGRESS_EDIT_INTERVAL:
+                return
+            last_edit = now
+            try:
+                await status_message.edit_text(_format_backfill_progress(progress))
+            except TelegramError as exc:
+                logger.debug("[LM][backfill] Не удалось обновить прогресс: %s", exc)
+
+        try:
+            await service.run(start_date, end_date, restart=restart, progress_callback=_report)
+        except asyncio.CancelledError:
+            logger.info("[LM][backfill] Остановлен по команде")
+            raise
+        except Exception as exc:
+            logger.error("[LM][backfill] Прогон упал: %s", exc, exc_info=True)
+            try:
+                await status_message.reply_text(f"❌ LM backfill упал: {exc}. Повторный запуск продолжит с watermark.")
+            except TelegramError:
+                logger.debug("[LM][backfill] Не удалось отправить сообщение об ошибке", exc_info=True)
+
+    @log_async_exceptions
+    async def handle_weights_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /lm_weights [reload] — версия матрицы весов жалоб и ее перечитывание (SuperAdmin/Dev)."""
+        message = update.effective_message
+        if not message:
+            return
+        if not self._is_lm_admin(update.effective_user):
+            await message.reply_text("❌ Команда доступна только разработчикам/основателям.")
+            return
+        if not self.lm_service:
+            await message.reply_text("❌ LM сервис не инициализирован.")
+            return
+
+        args = list(context.args or [])
+        command = args[0].lower() if args else ""
+        if command not in ("", "reload"):
+            await message.reply_text(WEIGHTS_USAGE)
+            return
+        matrix = self.lm_service.complaint_matrix
+        prefix = ""
+        if command == "reload":
+            changed = matrix.reload(force=True)
+            prefix = "✅ Веса обновлены.\n" if changed else "ℹ️ Веса не изменились.\n"
+        snapshot = matrix.snapshot
+        threshold = snapshot.resolve_threshold("complaint_score", 0.0)
+        await message.reply_text(
+            f"{prefix}Матрица весов жалоб: версия {snapshot.version}, "
+            f"fingerprint {snapshot.fingerprint[:12]}, порог complaint_score {threshold:g}"
+        )
+
+    async def _load_metrics(self, history_id: int) -> List[Dict[str, Any]]:
+        """Метрики звонка: свежий расчет из памяти (write-behind), иначе lm_value."""
+        if self.lm_service:
+            cached = self.lm_service.cached_metrics(history_id)
+            if cached:
+                return cached
+        return await self.repo.get_lm_values_by_call(history_id)
+
     async def _calculate_on_demand(self, history_id: int) -> None:
         if not self.lm_service:
             return
@@ -343,6 +512,8 @@ def register_admin_lm_handlers(application: Application, repo: LMRepository, per
     application.add_handler(
         CallbackQueryHandler(handler.handle_callback, pattern=r"^lm:")
     )
+    application.add_handler(CommandHandler("lm_backfill", handler.handle_backfill_command))
+    application.add_handler(CommandHandler("lm_weights", handler.handle_weights_command))
     
     # Сохраняем ссылку в bot_data для доступа из других мест если нужно
     application.bot_data["lm_handler"] = handler
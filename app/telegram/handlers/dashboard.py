@@ -18,7 +18,7 @@ from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
 import traceback
 
 from app.db.manager import DatabaseManager
-from app.db.repositories.analytics import AnalyticsRepository
+from app.db.repositories.analytics import AnalyticsRepository, period_bounds
 from app.db.repositories.users import UserRepository
 from app.services.dashboard_cache import DashboardCacheService
 from app.logging_config import get_watchdog_logger
@@ -289,44 +289,16 @@ class DashboardHandler:
             )
             timestamp = self._current_msk_time()
             
-            # Пробуем получить из кеша если не refresh
-            dashboard = None
-            if not refresh:
-                from datetime import date, timedelta
-                today = date.today()
-                if period == 'day':
-                    date_from = today
-                    date_to = today
-                elif period == 'week':
-                    date_from = today - timedelta(days=today.weekday())
-                    date_to = today
-                else:  # month
-                    date_from = today.replace(day=1)
-                    date_to = today
-                
-                dashboard = await self.cache_service.get_cached_dashboard(
-                    operator_name, period, date_from, date_to
-                )
-                
-                if dashboard:
-                    logger.info(f"[DASHBOARD] Cache HIT for {operator_name} {period}")
-            
-            # Если нет в кеше или refresh - получаем свежие данные
-            if not dashboard:
-                logger.info(f"[DASHBOARD] Cache MISS or refresh - fetching fresh data")
-                dashboard = await self.analytics_repo.get_live_dashboard_single(
-                    operator_name,
-                    period
-                )
-                
-                # Сохраняем в кеш
-                try:
-                    await self.cache_service.save_dashboard_cache(dashboard)
-                    logger.debug(f"[DASHBOARD] Saved to cache: {operator_name} {period}")
-                except Exception as cache_error:
-                    logger.warning(
-                        f"[DASHBOARD] Failed to save to cache: {cache_error}"
-                    )
+            # L1 (память) → L2 (operator_dashboards) → свежий расчет; refresh пропускает кеш
+            date_from, date_to = period_bounds(period)
+            dashboard = await self.cache_service.get_or_build(
+                operator_name,
+                period,
+                date_from,
+                date_to,
+                lambda: self.analytics_repo.get_live_dashboard_single(operator_name, period),
+                refresh=refresh,
+            )
             
             # Форматируем сообщение
             message = self._format_single_dashboard(dashboard, refresh)
@@ -511,7 +483,7 @@ class DashboardHandler:
 
 <b>1️⃣ Общая статистика:</b>
    • Всего звонков: {dashboard.get('accepted_calls', 0)}
-   • Записей на услугу: {dashboard.get('records_count', 0)}
+   • Записей на услугу: {dashboard.get('records_count', dashboard.get('records', 0))}
    • Желающих записаться: {dashboard.get('wish_to_record', 0)}
    • Конверсия: <b>{dashboard.get('conversion_rate', 0)}%</b>
 
@@ -583,7 +555,7 @@ class DashboardHandler:
             for i, dash in enumerate(sorted_dashboards[:10], 1):  # Топ-10
                 operator_name = dash.get('operator_name', 'Неизвестно')
                 calls = dash.get('accepted_calls', 0)
-                records = dash.get('records_count', 0)
+                records = dash.get('records_count', dash.get('records', 0))
                 conversion = dash.get('conversion_rate', 0)
                 avg_score = dash.get('avg_score_all', 0)
                 
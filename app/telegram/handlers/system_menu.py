@@ -32,6 +32,7 @@ from telegram.ext import (
 
 from app.db.manager import DatabaseManager
 from app.db.repositories.roles import RolesRepository
+from app.db.telemetry import TELEMETRY_MODES
 from app.db.utils_schema import clear_schema_cache
 from app.logging_config import get_watchdog_logger
 from app.services.admin_logger import AdminActionLogger
@@ -205,6 +206,13 @@ class SystemMenuHandler:
             maxsize = getattr(pool, "maxsize", "?")
             minsize = getattr(pool, "minsize", "?")
             lines.append(f"ℹ️ Пул соединений: min={minsize}, max={maxsize}")
+            snapshot_fn = getattr(self.db_manager, "pool_snapshot", None)
+            if callable(snapshot_fn):
+                gauges = snapshot_fn()["pool"]
+                lines.append(
+                    f"ℹ️ Занято: {gauges['in_use']}, свободно: {gauges['free']}, "
+                    f"ждут: {gauges['waiting']} (пик занятых: {gauges['peak_in_use']})"
+                )
         else:
             lines.append("ℹ️ Пул соединений ещё не инициализирован.")
 
@@ -481,6 +489,115 @@ class SystemMenuHandler:
             parse_mode="HTML",
         )
 
+    @log_async_exceptions
+    async def handle_db_metrics_command(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        """
+        Выводит метрики пула соединений и самых тяжёлых запросов.
+
+        /db_metrics mode <off|metrics|verbose> [sample_rate] — переключает режим
+        телеметрии запросов без перезапуска.
+        """
+        message = update.effective_message
+        user = update.effective_user
+        if not message or not user:
+            return
+
+        if not (self.permissions.is_supreme_admin(user.id, user.username) or self.permissions.is_dev_admin(user.id, user.username)):
+            await message.reply_text("❌ Команда доступна только разработчикам/основателям.")
+            return
+
+        args = list(context.args or [])
+        if args and args[0].lower() == "mode":
+            text = self._set_telemetry_mode(args[1:])
+            await message.reply_text(text, parse_mode="HTML")
+            await self._log_system_action(user.id, "db_telemetry_mode", text)
+            return
+
+        await message.reply_text(self._format_db_metrics(), parse_mode="HTML")
+
+    def _set_telemetry_mode(self, args: list) -> str:
+        telemetry = getattr(self.db_manager, "telemetry", None)
+        if telemetry is None:
+            return "❌ Телеметрия БД не инициализирована."
+        usage = (
+            f"Режим: <b>{telemetry.mode}</b>, sample_rate={telemetry.sample_rate}\n"
+            f"Использование: /db_metrics mode &lt;{'|'.join(TELEMETRY_MODES)}&gt; [sample_rate]"
+        )
+        if not args:
+            return usage
+        try:
+            sample_rate = float(args[1]) if len(args) > 1 else None
+            telemetry.set_mode(args[0], sample_rate=sample_rate)
+        except ValueError:
+            return f"❌ Неверные параметры.\n{usage}"
+        logger.info(
+            "[DB] Telemetry mode switched to %s (sample_rate=%s)",
+            telemetry.mode,
+            telemetry.sample_rate,
+        )
+        return f"✅ Телеметрия БД: <b>{telemetry.mode}</b>, sample_rate={telemetry.sample_rate}"
+
+    def _format_db_metrics(self, top: int = 8) -> str:
+        snapshot = self.db_manager.pool_snapshot()
+        gauges = snapshot["pool"]
+        acquire = snapshot["acquire"]
+        lines = [
+            "📊 <b>Метрики БД</b>",
+            (
+                f"Пул: size={gauges['size']} (min={gauges['minsize']}, max={gauges['maxsize']}), "
+                f"занято={gauges['in_use']}, свободно={gauges['free']}, ждут={gauges['waiting']}"
+            ),
+            f"Пики: занято={gauges['peak_in_use']}, ждали={gauges['peak_waiting']}",
+            (
+                f"acquire: n={acquire['count']}, avg={acquire['avg_ms']} мс, "
+                f"max={acquire['max_ms']} мс, упор в maxsize={acquire['saturated']}, "
+                f"ошибок={acquire['errors']}"
+            ),
+        ]
+        waits = ", ".join(f"{label}={count}" for label, count in acquire["histogram"].items() if count)
+        if waits:
+            lines.append(f"Ожидание: {waits}")
+        replica = snapshot.get("replica") or {}
+        if replica.get("configured"):
+            state = "✅" if replica.get("healthy") else "⚠️"
+            lines.append(
+                f"Реплика {state}: size={replica.get('size')}, свободно={replica.get('free')}, "
+                f"отставание={replica.get('lag_seconds')} с, fallback={replica.get('fallbacks')}"
+            )
+
+        holds = sorted(snapshot["hold"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        if holds:
+            lines.append("")
+            lines.append("<b>Удержание соединения (сумма, мс)</b>")
+            for name, stats in holds[:top]:
+                lines.append(
+                    f"<code>{html.escape(name)}</code>: n={stats['count']}, "
+                    f"Σ={stats['total_ms']}, max={stats['max_ms']}"
+                )
+
+        telemetry = getattr(self.db_manager, "telemetry", None)
+        if telemetry is not None:
+            lines.append(f"Телеметрия запросов: {telemetry.mode}")
+            queries = sorted(
+                telemetry.snapshot().items(),
+                key=lambda item: item[1]["total_ms"],
+                reverse=True,
+            )
+            if queries:
+                lines.append("")
+                lines.append("<b>Запросы (сумма, мс)</b>")
+                for name, stats in queries[:top]:
+                    lines.append(
+                        f"<code>{html.escape(name)}</code>: n={stats['count']}, "
+                        f"avg={stats['avg_ms']}, err={stats['errors']}"
+                    )
+            slow_count = len(telemetry.slow_queries())
+            if slow_count:
+                lines.append(f"Медленных запросов в журнале: {slow_count}")
+        return "\n".join(lines)
+
     async def _run_integrity_checks(self) -> str:
         status_text = await self._collect_status()
         if status_text.startswith("⚙️ <b>Состояние системы</b>"):
@@ -529,6 +646,7 @@ def register_system_handlers(
     handler = SystemMenuHandler(db_manager, permissions_manager)
     application.add_handler(CommandHandler("system", handler.handle_system_command))
     application.add_handler(CommandHandler("last_errors", handler.handle_last_errors_command))
+    application.add_handler(CommandHandler("db_metrics", handler.handle_db_metrics_command))
     application.add_handler(
         MessageHandler(
             filters.Regex(r"(?i)^\s*(?:⚙️\s*)?система\s*$"),
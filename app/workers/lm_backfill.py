@@ -0,0 +1,89 @@
+"""
+CLI для пересчета LM-метрик за период (например, после смены LM_VERSION).
+
+    python -m app.workers.lm_backfill --from 2025-01-01 --to 2025-06-30 --rps 150
+
+Прогон можно прервать в любой момент: повторный запуск с тем же диапазоном
+продолжит с последнего сохраненного history_id (--restart — пройти заново).
+После правки словаря или матрицы весов удобен --incremental: пересчитываются
+только звонки с изменившимися входами, пишутся только изменившиеся метрики.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from app.db.manager import DatabaseManager
+from app.logging_config import get_watchdog_logger
+from app.services.lm_backfill import BackfillProgress, LMBackfillService
+from app.workers.lm_calculator_worker import LMCalculatorWorker
+
+logger = get_watchdog_logger(__name__)
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Ожидается дата YYYY-MM-DD, получено: {value}") from exc
+
+
+async def run_backfill(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    *,
+    chunk_size: Optional[int],
+    rows_per_sec: Optional[float],
+    restart: bool,
+    incremental: bool = False,
+) -> BackfillProgress:
+    db_manager = DatabaseManager()
+    await db_manager.create_pool()
+    try:
+        worker = LMCalculatorWorker(db_manager)
+        service = LMBackfillService(
+            worker.lm_repo,
+            worker.lm_service,
+            chunk_size=chunk_size,
+            rows_per_sec=rows_per_sec,
+            incremental=incremental,
+        )
+        try:
+            return await service.run(start_date, end_date, restart=restart)
+        finally:
+            if worker.lm_service.hit_writer is not None:
+                await worker.lm_service.hit_writer.close()
+    finally:
+        await db_manager.close_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resumable LM metrics backfill over call_history")
+    parser.add_argument("--from", dest="start_date", type=_parse_date, help="Начало периода, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", type=_parse_date, help="Конец периода (включительно), YYYY-MM-DD")
+    parser.add_argument("--chunk", type=int, default=None, help="Звонков в одном чанке (LM_BACKFILL_CHUNK)")
+    parser.add_argument("--rps", type=float, default=None, help="Целевая скорость, звонков/с; 0 — без ограничения")
+    parser.add_argument("--restart", action="store_true", help="Игнорировать watermark и пройти диапазон заново")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Пересчитывать только звонки с изменившимся отпечатком входов",
+    )
+    args = parser.parse_args()
+
+    end_date = args.end_date.replace(hour=23, minute=59, second=59) if args.end_date else None
+    asyncio.run(
+        run_backfill(
+            args.start_date,
+            end_date,
+            chunk_size=args.chunk,
+            rows_per_sec=args.rps,
+            restart=args.restart,
+            incremental=args.incremental,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,75 @@ Worker для фоновогорасчета LM метрик.
 Может быть запущен вручную или через cron/планировщик задач.
 """
 
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
 import os
+import time
 
+from app.config import LM_WORKER_CONFIG
 from app.db.manager import DatabaseManager
 from app.db.repositories.lm_repository import LMRepository
 from app.db.repositories.lm_dictionary_repository import LMDictionaryRepository
+from app.services.lm_backfill import LMBackfillService
+from app.services.lm_incremental import IncrementalStats, LMIncrementalRecalculator
 from app.services.lm_service import LMService
 from app.logging_config import get_watchdog_logger
 
 logger = get_watchdog_logger(__name__)
 
+CallRow = Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]
+Payloads = Dict[int, List[Dict[str, Any]]]
+
+
+@dataclass
+class PipelineStats:
+    """Итоги одного прогона конвейера: объемы и время по стадиям."""
+
+    fetched: int = 0
+    scored: int = 0
+    saved: int = 0
+    errors: int = 0
+    fetch_sec: float = 0.0
+    score_sec: float = 0.0
+    # Суммарное время писателей (при нескольких писателях может превышать total_sec)
+    write_sec: float = 0.0
+    total_sec: float = 0.0
+
+    @property
+    def calls_per_sec(self) -> float:
+        return self.saved / self.total_sec if self.total_sec > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"fetched={self.fetched}, scored={self.scored}, saved={self.saved}, errors={self.errors}, "
+            f"fetch={self.fetch_sec:.2f}s, score={self.score_sec:.2f}s, write={self.write_sec:.2f}s, "
+            f"total={self.total_sec:.2f}s, throughput={self.calls_per_sec:.1f} calls/s"
+        )
+
 
 class LMCalculatorWorker:
     """Worker для расчета LM метрик в фоновом режиме."""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        *,
+        score_chunk_size: Optional[int] = None,
+        writers: Optional[int] = None,
+        write_queue_size: Optional[int] = None,
+    ):
         self.db_manager = db_manager
         self.lm_repo = LMRepository(db_manager)
         self.dictionary_repo = LMDictionaryRepository(db_manager)
         self.lm_service = LMService(self.lm_repo, dictionary_repository=self.dictionary_repo)
+        self.incremental = LMIncrementalRecalculator(self.lm_repo, self.lm_service)
+        self.score_chunk_size = max(1, score_chunk_size or LM_WORKER_CONFIG["score_chunk_size"])
+        self.writers = max(1, writers or LM_WORKER_CONFIG["writers"])
+        self.write_queue_size = max(1, write_queue_size or LM_WORKER_CONFIG["write_queue_size"])
+        self.last_run_stats: Optional[PipelineStats] = None
+        self.last_incremental_stats: Optional[IncrementalStats] = None
     
     async def process_recent_calls(
         self,
@@ -36,111 +83,124 @@ class LMCalculatorWorker:
     ) -> int:
         """
         Обрабатывает недавние звонки и рассчитывает для них LM метрики.
+
+        Конвейер: выборка звонков без lm_value одним anti-join запросом →
+        расчет метрик чанками → запись bulk upsert'ами несколькими писателями
+        через ограниченную очередь (расчет ждет, если запись не успевает).
         
         Args:
             hours_back: Сколько часов назад искать звонки
             batch_size: Размер батча для обработки
             skip_existing: Пропускать звонки, для которых уже есть LM метрики
+                (False — инкрементальный пересчет по отпечаткам входов)
             
         Returns:
             Количество обработанных звонков
         """
-        start_time = datetime.now()
+        run_started = time.perf_counter()
+        stats = PipelineStats()
         logger.info(f"Starting LM calculation for calls from last {hours_back} hours")
         
-        # Get recent calls from call_history
         cutoff_time = datetime.now() - timedelta(hours=hours_back)
         cutoff_timestamp = int(cutoff_time.timestamp())
         
-        query = """
-        SELECT 
-            ch.*
-        FROM call_history ch
-        WHERE ch.context_start_time >= %s
-        ORDER BY ch.context_start_time DESC
-        LIMIT %s
-        """
-        
-        history_rows = await self.db_manager.execute_with_retry(
-            query,
-            (cutoff_timestamp, batch_size),
-            fetchall=True
-        ) or []
-        
+        history_rows = await self.lm_repo.get_recent_calls_for_lm(
+            cutoff_timestamp,
+            batch_size,
+            only_missing=skip_existing,
+        )
         if not history_rows:
+            stats.fetch_sec = stats.total_sec = time.perf_counter() - run_started
+            self.last_run_stats = stats
             logger.info("No recent calls found")
             return 0
-        
+
+        scores_map = await self.lm_repo.get_call_scores_map([row['history_id'] for row in history_rows])
+        stats.fetched = len(history_rows)
+        stats.fetch_sec = time.perf_counter() - run_started
         logger.info(f"Found {len(history_rows)} recent calls")
-        
-        # Get corresponding call_scores
-        history_ids = [row['history_id'] for row in history_rows]
-        history_ids_str = ','.join(map(str, history_ids))
-        
-        scores_query = f"""
-        SELECT * FROM call_scores
-        WHERE history_id IN ({history_ids_str})
-        """
-        
-        scores_rows = await self.db_manager.execute_with_retry(
-            scores_query,
-            fetchall=True
-        ) or []
-        
-        # Map scores by history_id
-        scores_map = {row['history_id']: row for row in scores_rows}
-        
-        # Process each call
-        processed_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        for history_row in history_rows:
-            history_id = history_row['history_id']
-            
-            # Skip if already has LM metrics (if requested)
-            if skip_existing:
-                existing = await self.lm_repo.get_lm_values_by_call(history_id)
-                if existing:
-                    skipped_count += 1
-                    continue
-            
-            # Get call_score if available
-            call_score = scores_map.get(history_id)
-            
-            # Calculate all metrics
+
+        rows = [(row['history_id'], row, scores_map.get(row['history_id'])) for row in history_rows]
+        if skip_existing:
+            await self._run_pipeline(rows, stats, calc_source="worker_batch")
+        else:
+            # Звонки с метриками сверяются по отпечатку входов, пишутся только изменения
+            incremental = await self.process_incremental(rows, calc_source="worker_batch")
+            stats.scored = incremental.recomputed
+            stats.saved = incremental.up_to_date
+            stats.errors = incremental.errors
+
+        stats.total_sec = time.perf_counter() - run_started
+        self.last_run_stats = stats
+        logger.info(f"LM calculation completed: {stats.summary()}")
+        return stats.saved
+
+    async def _run_pipeline(self, rows: List[CallRow], stats: PipelineStats, *, calc_source: str) -> None:
+        """Стадии расчета и записи; очередь между ними ограничена write_queue_size."""
+        queue: "asyncio.Queue[Optional[Payloads]]" = asyncio.Queue(maxsize=self.write_queue_size)
+        writers = [
+            asyncio.create_task(self._write_stage(queue, stats))
+            for _ in range(self.writers)
+        ]
+        try:
+            for offset in range(0, len(rows), self.score_chunk_size):
+                chunk = rows[offset:offset + self.score_chunk_size]
+                started = time.perf_counter()
+                # Упавшие звонки в payloads не попадут
+                payloads = await self.lm_service.calculate_metrics_batch(chunk, calc_source=calc_source)
+                stats.score_sec += time.perf_counter() - started
+                stats.scored += len(payloads)
+                stats.errors += len(chunk) - len(payloads)
+                if payloads:
+                    await queue.put(payloads)
+            for _ in writers:
+                await queue.put(None)
+            await asyncio.gather(*writers)
+        except BaseException:
+            for task in writers:
+                task.cancel()
+            await asyncio.gather(*writers, return_exceptions=True)
+            raise
+
+    async def _write_stage(self, queue: "asyncio.Queue[Optional[Payloads]]", stats: PipelineStats) -> None:
+        while True:
+            payloads = await queue.get()
+            if payloads is None:
+                return
+            started = time.perf_counter()
             try:
-                await self.lm_service.calculate_all_metrics(
-                    history_id=history_id,
-                    call_history=history_row,
-                    call_score=call_score,
-                    calc_source="worker_batch"
-                )
-                processed_count += 1
-            except Exception as e:
-                logger.error(f"Failed to calculate LM metrics for history_id={history_id}: {e}", exc_info=True)
-                error_count += 1
-        
-        duration = (datetime.now() - start_time).total_seconds()
-        
-        logger.info(
-            f"LM calculation completed in {duration:.2f}s: "
-            f"processed={processed_count}, skipped={skipped_count}, errors={error_count}"
-        )
-        
-        return processed_count
+                saved_by_call = await self.lm_service.save_payloads_bulk(payloads)
+            except Exception as exc:
+                logger.error("Failed to write LM metrics for %s calls: %s", len(payloads), exc, exc_info=True)
+                stats.errors += len(payloads)
+                continue
+            finally:
+                stats.write_sec += time.perf_counter() - started
+            for saved in saved_by_call.values():
+                if saved:
+                    stats.saved += 1
+                else:
+                    stats.errors += 1
     
     async def process_specific_calls(
         self,
         history_ids: List[int],
-        recalculate: bool = True
+        recalculate: bool = True,
+        *,
+        force: bool = False,
     ) -> int:
         """
         Обрабатывает конкретные звонки по их history_id.
+
+        При recalculate или force пересчет идет через LMIncrementalRecalculator
+        (app/services/lm_incremental.py): звонки с неизменным отпечатком входов
+        пропускаются (при force — нет), записываются только изменившиеся метрики,
+        а отпечаток обновляется лишь для звонков, записанных без ошибок.
         
         Args:
             history_ids: Список history_id для обработки
             recalculate: Пересчитать, даже если метрики уже есть
+            force: Пересчитать все звонки, не сверяя отпечатки (запись — по diff)
             
         Returns:
             Количество обработанных звонков
@@ -148,6 +208,8 @@ class LMCalculatorWorker:
         if not history_ids:
             return 0
         
+        run_started = time.perf_counter()
+        stats = PipelineStats()
         logger.info(f"Processing {len(history_ids)} specific calls")
         
         # Get call_history data
@@ -165,48 +227,47 @@ class LMCalculatorWorker:
             fetchall=True
         ) or []
         
-        # Get call_scores
-        scores_query = f"""
-        SELECT * FROM call_scores
-        WHERE history_id IN ({history_ids_str})
-        """
-        
-        scores_rows = await self.db_manager.execute_with_retry(
-            scores_query,
-            fetchall=True
-        ) or []
-        
-        scores_map = {row['history_id']: row for row in scores_rows}
-        
-        # Process each call
-        processed_count = 0
-        error_count = 0
+        scores_map = await self.lm_repo.get_call_scores_map([row['history_id'] for row in history_rows])
+        stats.fetched = len(history_rows)
+        stats.fetch_sec = time.perf_counter() - run_started
+        rows = [(row['history_id'], row, scores_map.get(row['history_id'])) for row in history_rows]
+
+        if recalculate or force:
+            incremental = await self.process_incremental(rows, calc_source="worker_specific", force=force)
+            stats.scored = incremental.recomputed
+            stats.saved = incremental.up_to_date
+            stats.errors = incremental.errors
+            stats.total_sec = time.perf_counter() - run_started
+            self.last_run_stats = stats
+            logger.info(f"Processed specific calls incrementally: {incremental.summary()}")
+            return stats.saved
+
+        await self._run_pipeline(rows, stats, calc_source="worker_specific")
         
-        for history_row in history_rows:
-            history_id = history_row['history_id']
-            
-            # Delete existing metrics if recalculating
-            if recalculate:
-                await self.lm_repo.delete_lm_values_by_call(history_id)
-            
-            # Get call_score if available
-            call_score = scores_map.get(history_id)
-            
-            # Calculate all metrics
+        stats.total_sec = time.perf_counter() - run_started
+        self.last_run_stats = stats
+        logger.info(f"Processed specific calls: {stats.summary()}")
+        return stats.saved
+
+    async def process_incremental(
+        self,
+        rows: List[CallRow],
+        *,
+        calc_source: str,
+        force: bool = False,
+    ) -> IncrementalStats:
+        """Инкрементальный пересчет звонков чанками по score_chunk_size."""
+        total = IncrementalStats()
+        for offset in range(0, len(rows), self.score_chunk_size):
+            chunk = rows[offset:offset + self.score_chunk_size]
             try:
-                await self.lm_service.calculate_all_metrics(
-                    history_id=history_id,
-                    call_history=history_row,
-                    call_score=call_score,
-                    calc_source="worker_specific"
-                )
-                processed_count += 1
-            except Exception as e:
-                logger.error(f"Failed to calculate LM metrics for history_id={history_id}: {e}", exc_info=True)
-                error_count += 1
-        
-        logger.info(f"Processed {processed_count} specific calls, errors={error_count}")
-        return processed_count
+                total.merge(await self.incremental.process(chunk, calc_source=calc_source, force=force))
+            except Exception as exc:
+                logger.error("Incremental LM chunk failed (%s calls): %s", len(chunk), exc, exc_info=True)
+                total.checked += len(chunk)
+                total.errors += len(chunk)
+        self.last_incremental_stats = total
+        return total
     
     async def backfill_all_calls(
         self,
@@ -216,6 +277,9 @@ class LMCalculatorWorker:
     ) -> int:
         """
         Заполняет LM метрики для всех звонков за период (backfill).
+
+        Keyset-проход с watermark на каждый чанк (см. app/services/lm_backfill.py):
+        прерванный backfill продолжается с места остановки.
         
         Args:
             start_date: Начало периода (опционально)
@@ -225,61 +289,9 @@ class LMCalculatorWorker:
         Returns:
             Общее количество обработанных звонков
         """
-        logger.info("Starting LM backfill process")
-        
-        # Build query with date filters
-        query = """
-        SELECT 
-            ch.*
-        FROM call_history ch
-        WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            start_ts = int(start_date.timestamp())
-            query += " AND ch.context_start_time >= %s"
-            params.append(start_ts)
-        
-        if end_date:
-            end_ts = int(end_date.timestamp())
-            query += " AND ch.context_start_time <= %s"
-            params.append(end_ts)
-        
-        query += " ORDER BY ch.context_start_time ASC"
-        
-        # Process in batches
-        total_processed = 0
-        offset = 0
-        
-        while True:
-            batch_query = query + f" LIMIT {batch_size} OFFSET {offset}"
-            
-            history_rows = await self.db_manager.execute_with_retry(
-                batch_query,
-                tuple(params),
-                fetchall=True
-            ) or []
-            
-            if not history_rows:
-                break
-            
-            batch_history_ids = [row['history_id'] for row in history_rows]
-            processed = await self.process_specific_calls(
-                history_ids=batch_history_ids,
-                recalculate=False  # Don't recalculate existing
-            )
-            
-            total_processed += processed
-            offset += batch_size
-            
-            logger.info(f"Backfill progress: {total_processed} calls processed")
-            
-            # Sleep to avoid overwhelming the database
-            await asyncio.sleep(0.5)
-        
-        logger.info(f"Backfill completed: {total_processed} total calls processed")
-        return total_processed
+        service = LMBackfillService(self.lm_repo, self.lm_service, chunk_size=batch_size)
+        progress = await service.run(start_date, end_date)
+        return progress.saved
 
 
 # Entry point for running worker manually или как сервис
@@ -325,6 +337,8 @@ async def main():
                 interval_seconds=interval_seconds,
             )
     finally:
+        if worker.lm_service.hit_writer is not None:
+            await worker.lm_service.hit_writer.close()
         await db_manager.close_pool()
 
 
@@ -0,0 +1,89 @@
+"""
+CLI для дневных агрегатов операторов (operator_daily_rollup).
+
+    python -m app.workers.operator_rollup rebuild --from 2025-01-01 --to 2025-03-31
+    python -m app.workers.operator_rollup check --from 2025-03-01 --to 2025-03-31 [--fix]
+
+check сверяет rollup с расчетом по call_scores и завершается с кодом 1 при
+расхождениях; --fix пересчитывает только дни с расхождениями.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime
+
+from app.db.manager import DatabaseManager
+from app.logging_config import get_watchdog_logger
+from app.services.operator_rollup import DEFAULT_CHUNK_DAYS, OperatorRollupService, RollupCheckReport
+
+logger = get_watchdog_logger(__name__)
+
+MAX_REPORTED_ROWS = 20
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Ожидается дата YYYY-MM-DD, получено: {value}") from exc
+
+
+def format_check_report(report: RollupCheckReport) -> str:
+    lines = [
+        f"Rollup check {report.date_from} — {report.date_to}: rows={report.rows_checked}, "
+        f"mismatches={len(report.mismatches)}, missing={len(report.missing)}, stale={len(report.stale)}"
+    ]
+    for operator_name, call_day, fields in report.mismatches[:MAX_REPORTED_ROWS]:
+        details = ", ".join(f"{name}: {stored} != {expected}" for name, (stored, expected) in fields.items())
+        lines.append(f"  MISMATCH {call_day} {operator_name}: {details}")
+    for operator_name, call_day in report.missing[:MAX_REPORTED_ROWS]:
+        lines.append(f"  MISSING  {call_day} {operator_name}")
+    for operator_name, call_day in report.stale[:MAX_REPORTED_ROWS]:
+        lines.append(f"  STALE    {call_day} {operator_name}")
+    return "\n".join(lines)
+
+
+async def run_rollup(command: str, date_from: date, date_to: date, *, fix: bool, chunk_days: int) -> int:
+    db_manager = DatabaseManager()
+    await db_manager.create_pool()
+    try:
+        service = OperatorRollupService(db_manager, chunk_days=chunk_days)
+        if command == "rebuild":
+            stats = await service.rebuild(date_from, date_to)
+            print(f"Rollup rebuilt {date_from} — {date_to}: days={stats['days']}, rows={stats['rows']}")
+            return 0
+
+        report = await service.check(date_from, date_to)
+        print(format_check_report(report))
+        if report.ok:
+            return 0
+        if fix:
+            stats = await service.refresh_days(report.affected_days)
+            print(f"Rollup fixed: days={stats['days']}, rows={stats['rows']}")
+            return 0
+        return 1
+    finally:
+        await db_manager.close_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild or verify the operator_daily_rollup table")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--from", dest="date_from", type=_parse_date, required=True, help="Первый день, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=_parse_date, required=True, help="Последний день (включительно), YYYY-MM-DD")
+    parser.add_argument("--fix", action="store_true", help="check: пересчитать дни с расхождениями")
+    parser.add_argument("--chunk-days", type=int, default=DEFAULT_CHUNK_DAYS, help="Дней в одном запросе/транзакции")
+    args = parser.parse_args()
+    if args.date_from > args.date_to:
+        parser.error("--from позже --to")
+
+    sys.exit(
+        asyncio.run(
+            run_rollup(args.command, args.date_from, args.date_to, fix=args.fix, chunk_days=args.chunk_days)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Офлайн-бенчмарки (без БД и сети).
+
+    python -m benchmarks.lm_scoring --check
+
+Модули app читают конфигурацию при импорте; для прогона без .env пакет
+включает CI-режим конфига (проверка обязательных переменных отключается).
+"""
+
+import os
+
+os.environ.setdefault("CI", "true")
@@ -0,0 +1,257 @@
+"""
+Бенчмарк расчета LM: calculate_all_metrics, детекторы ключевых слов и словарь жалоб.
+
+    python -m benchmarks.lm_scoring                    # таблица результатов
+    python -m benchmarks.lm_scoring --check            # сравнить с baseline, exit 1 при регрессии
+    python -m benchmarks.lm_scoring --update-baseline  # перезаписать baseline
+
+Работает без БД: LMService получает FakeLMRepository/FakeDictionaryRepository,
+звонки генерирует benchmarks.lm_synthetic. Для каждого сценария считаются
+calls/s, p50/p99 латентности вызова и пик памяти на вызов (tracemalloc, отдельным
+проходом — трассировка сильно замедляет код).
+
+Абсолютное время зависит от машины, поэтому в baseline латентность хранится
+в единицах калибровочной нагрузки (чистый Python, меряется в начале прогона).
+Регрессией считается рост p50 сверх --time-tolerance или памяти на вызов сверх
+--alloc-tolerance относительно baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.lm_synthetic import (
+    CallRow,
+    FakeDictionaryRepository,
+    FakeLMRepository,
+    generate_calls,
+)
+
+from app.services.lm_dictionary import CompiledDictionary
+from app.services.lm_service import LMService
+
+BASELINE_PATH = Path(__file__).with_name("baseline_lm_scoring.json")
+DEFAULT_CALLS = 2000
+DEFAULT_SEED = 1912
+DEFAULT_TIME_TOLERANCE = 0.35
+DEFAULT_ALLOC_TOLERANCE = 0.15
+
+CallStep = Callable[[CallRow], Awaitable[Any]]
+
+
+@dataclass
+class CaseResult:
+    name: str
+    calls: int
+    calls_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    # Латентность в единицах калибровочной нагрузки (сравнима между машинами)
+    p50_rel: float
+    p99_rel: float
+    alloc_kib_per_call: float
+
+
+def calibrate(rounds: int = 7) -> float:
+    """Время (мс) фиксированной нагрузки на чистом Python: медиана по rounds прогонам."""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        words = [f"звонок-{(i * 7919) % 10007}" for i in range(20000)]
+        index: Dict[str, int] = {}
+        for word in sorted(words):
+            index[word] = index.get(word, 0) + len(word)
+        "\n".join(words).lower().find("звонок-10006")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _percentile(sorted_values: Sequence[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(share * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def _measure(name: str, rows: Sequence[CallRow], step: CallStep, calibration_ms: float) -> CaseResult:
+    for row in rows[: min(50, len(rows))]:
+        await step(row)
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for row in rows:
+        call_started = time.perf_counter_ns()
+        await step(row)
+        latencies.append((time.perf_counter_ns() - call_started) / 1e6)
+    elapsed = time.perf_counter() - started
+
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        for row in rows:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await step(row)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(max(0, peak - baseline))
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    p50 = _percentile(latencies, 0.50)
+    p99 = _percentile(latencies, 0.99)
+    return CaseResult(
+        name=name,
+        calls=len(rows),
+        calls_per_sec=round(len(rows) / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(p50, 4),
+        p99_ms=round(p99, 4),
+        p50_rel=round(p50 / calibration_ms, 6),
+        p99_rel=round(p99 / calibration_ms, 6),
+        alloc_kib_per_call=round(statistics.fmean(peaks) / 1024, 2) if peaks else 0.0,
+    )
+
+
+async def run_cases(rows: Sequence[CallRow], calibration_ms: float) -> List[CaseResult]:
+    """Прогоняет все сценарии на одних и тех же звонках."""
+    dictionary_repo = FakeDictionaryRepository()
+    service = LMService(FakeLMRepository(rows), dictionary_repository=dictionary_repo)
+    compiled = CompiledDictionary(dictionary_repo.terms, dict_code="complaint_risk", version="v1")
+    scored = [row for row in rows if row[2] and row[2].get("transcript")]
+
+    async def calculate_all_metrics(row: CallRow) -> Any:
+        history_id, history, score = row
+        return await service.calculate_all_metrics(history_id, history, score, calc_source="benchmark")
+
+    async def keyword_detectors(row: CallRow) -> Any:
+        transcript = row[2]["transcript"]
+        transcript_lower = transcript.lower()
+        scan = service._scan_transcript(transcript_lower)
+        return service._detect_complaint_core_signals(transcript, transcript_lower, [], row[2], scan)
+
+    async def dictionary_scan(row: CallRow) -> Any:
+        transcript = row[2]["transcript"]
+        return service._scan_dictionary_terms(transcript, compiled, transcript.lower())
+
+    return [
+        await _measure("calculate_all_metrics", rows, calculate_all_metrics, calibration_ms),
+        await _measure("keyword_detectors", scored, keyword_detectors, calibration_ms),
+        await _measure("scan_dictionary_terms", scored, dictionary_scan, calibration_ms),
+    ]
+
+
+def run_benchmarks(calls: int = DEFAULT_CALLS, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """Полный прогон: калибровка + все сценарии. Возвращает отчет в формате baseline."""
+    rows = generate_calls(calls, seed=seed)
+    calibration_ms = calibrate()
+    results = asyncio.run(run_cases(rows, calibration_ms))
+    return {
+        "calls": calls,
+        "seed": seed,
+        "python": platform.python_version(),
+        "calibration_ms": round(calibration_ms, 3),
+        "cases": {result.name: asdict(result) for result in results},
+    }
+
+
+def compare_with_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    alloc_tolerance: float = DEFAULT_ALLOC_TOLERANCE,
+) -> List[str]:
+    """Список регрессий относительно baseline (пустой — все в пределах допуска)."""
+    regressions: List[str] = []
+    for name, expected in baseline.get("cases", {}).items():
+        actual = report["cases"].get(name)
+        if actual is None:
+            regressions.append(f"{name}: сценарий отсутствует в прогоне")
+            continue
+        for field, tolerance in (("p50_rel", time_tolerance), ("alloc_kib_per_call", alloc_tolerance)):
+            limit = expected[field] * (1 + tolerance)
+            if expected[field] and actual[field] > limit:
+                regressions.append(
+                    f"{name}.{field}: {actual[field]} > {expected[field]} (+{tolerance:.0%} допуска)"
+                )
+    return regressions
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    header = f"{'case':<24}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'KiB/call':>10}{'p50 vs base':>13}"
+    lines = [
+        f"LM scoring benchmark: calls={report['calls']} seed={report['seed']} "
+        f"python={report['python']} calibration={report['calibration_ms']} ms",
+        header,
+    ]
+    for name, case in report["cases"].items():
+        delta = ""
+        expected = (baseline or {}).get("cases", {}).get(name)
+        if expected and expected.get("p50_rel"):
+            delta = f"{(case['p50_rel'] / expected['p50_rel'] - 1):+.1%}"
+        lines.append(
+            f"{name:<24}{case['calls_per_sec']:>10.1f}{case['p50_ms']:>10.3f}"
+            f"{case['p99_ms']:>10.3f}{case['alloc_kib_per_call']:>10.2f}{delta:>13}"
+        )
+    return "\n".join(lines)
+
+
+def _load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline LM scoring benchmark (no DB)")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Number of synthetic calls")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Generator seed")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--json", type=Path, help="Write the report to this JSON file")
+    parser.add_argument("--check", action="store_true", help="Exit with code 1 on regression vs baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--alloc-tolerance", type=float, default=DEFAULT_ALLOC_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    baseline = _load_baseline(args.baseline)
+    if baseline and args.check:
+        # Сравнение корректно только на тех же входных данных
+        args.calls, args.seed = baseline["calls"], baseline["seed"]
+    report = run_benchmarks(args.calls, args.seed)
+    print(format_report(report, baseline))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if args.check:
+        if baseline is None:
+            print(f"Baseline not found: {args.baseline}", file=sys.stderr)
+            return 1
+        regressions = compare_with_baseline(
+            report,
+            baseline,
+            time_tolerance=args.time_tolerance,
+            alloc_tolerance=args.alloc_tolerance,
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
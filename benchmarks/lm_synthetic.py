@@ -0,0 +1,237 @@
+"""
+Синтетические звонки и in-memory репозитории для бенчмарков LM.
+
+Генератор детерминирован (seed): одинаковые аргументы дают одинаковые строки
+call_history/call_scores, поэтому прогоны сравнимы между собой и с baseline.
+Длина транскрипта распределена с длинным хвостом, как в проде: большинство
+разговоров короткие, часть — на десятки реплик.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CallRow = Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]
+
+OPERATOR_PHRASES = (
+    "Клиника «Здоровье», администратор Анна, здравствуйте.",
+    "Подскажите, пожалуйста, как к вам обращаться?",
+    "Давайте я посмотрю свободное время у врача.",
+    "Есть окно в четверг в 15:30 или в пятницу утром.",
+    "Стоимость первичного приема 2500 рублей.",
+    "Я записала вас, придет смс с подтверждением.",
+    "Приносите, пожалуйста, паспорт и полис.",
+    "Понимаю вас, сейчас уточню у старшего администратора.",
+    "Приносим извинения за ожидание.",
+    "Можем перезвонить вам завтра, когда появится расписание.",
+    "Хорошего дня, до свидания.",
+)
+
+CLIENT_PHRASES = (
+    "Здравствуйте, хочу записаться к терапевту.",
+    "Сколько стоит прием у кардиолога?",
+    "А в субботу вы работаете?",
+    "Удобно в четверг после обеда.",
+    "Мне нужно сдать анализы натощак?",
+    "Подумаю и перезвоню позже.",
+    "Спасибо, всего доброго.",
+    "Я уточню у мужа и наберу вас.",
+    "Мне сказали, что врач принимает по вторникам.",
+    "Уже третий раз звоню, не могу дозвониться.",
+)
+
+# Реплики, задевающие детекторы жалоб, follow-up и технических звонков
+COMPLAINT_PHRASES = (
+    "Вы меня обманули, в прошлый раз сказали другую цену.",
+    "Я буду жаловаться, это недопустимо.",
+    "Напишу жалобу в прокуратуру и в роспотребнадзор.",
+    "Верните деньги за прием, врач не приехал.",
+    "Меня это не устраивает, я возмущена.",
+    "Администратор нахамил и бросил трубку.",
+    "Почему вы не предупредили, что будет дороже?",
+    "Соедините с руководителем, это нарушение моих прав.",
+)
+
+FOLLOWUP_PHRASES = (
+    "Перезвоните мне завтра, пожалуйста.",
+    "Я подумаю и сам перезвоню.",
+    "Пришлите прайс на почту.",
+)
+
+OUTCOMES = (
+    ("record", 40),
+    ("lead_no_record", 20),
+    ("info_only", 20),
+    ("cancelled", 5),
+    ("non_target", 10),
+    ("complaint", 5),
+)
+
+CATEGORIES = {
+    "record": "Запись на услугу (успешная)",
+    "lead_no_record": "Лид (без записи)",
+    "info_only": "Информационный",
+    "cancelled": "Отмена записи",
+    "non_target": "Спам, автоответчик",
+    "complaint": "Жалоба",
+}
+
+SYNTHETIC_DICTIONARY: Tuple[Dict[str, Any], ...] = (
+    {"term": "жалоб", "match_type": "stem", "weight": 40},
+    {"term": "прокуратур", "match_type": "stem", "weight": 50},
+    {"term": "роспотребнадзор", "match_type": "phrase", "weight": 50},
+    {"term": "обманули", "match_type": "phrase", "weight": 30},
+    {"term": "верните деньги", "match_type": "phrase", "weight": 35},
+    {"term": "нахамил", "match_type": "phrase", "weight": 30},
+    {"term": "бросил трубку", "match_type": "phrase", "weight": 25},
+    {"term": r"\bдорож\w*", "match_type": "regex", "weight": 15},
+    {"term": "недопустимо", "match_type": "phrase", "weight": 20},
+    {"term": "руководител", "match_type": "stem", "weight": 15},
+    {"term": "претензий нет", "match_type": "phrase", "weight": 10, "is_negative": True},
+)
+
+RESULT_TEMPLATE = (
+    "Инициативность (ведение диалога): {0}/10\n"
+    "Вежливость и эмпатия: {1}/10\n"
+    "Информативность: {2}/10\n"
+    "Соблюдение скрипта: {3}/10\n"
+    "Удовлетворенность клиента: {4}/10\n"
+    "Итог: оператор {5}."
+)
+
+
+def _weighted(rng: random.Random, options: Sequence[Tuple[str, int]]) -> str:
+    values, weights = zip(*options)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _replica_count(rng: random.Random) -> int:
+    # Длинный хвост: медиана ~8 реплик, редкие разговоры до 120
+    return max(1, min(120, int(rng.lognormvariate(2.1, 0.7))))
+
+
+def synthetic_transcript(rng: random.Random, outcome: str, replicas: int) -> str:
+    """Диалог оператор/клиент из replicas реплик с вкраплениями маркеров по исходу."""
+    lines = []
+    for index in range(replicas):
+        if index % 2 == 0:
+            lines.append(f"Оператор: {rng.choice(OPERATOR_PHRASES)}")
+            continue
+        roll = rng.random()
+        if outcome == "complaint" and roll < 0.6:
+            phrase = rng.choice(COMPLAINT_PHRASES)
+        elif outcome in ("lead_no_record", "cancelled") and roll < 0.25:
+            phrase = rng.choice(FOLLOWUP_PHRASES)
+        elif roll < 0.03:
+            phrase = rng.choice(COMPLAINT_PHRASES)
+        else:
+            phrase = rng.choice(CLIENT_PHRASES)
+        lines.append(f"Клиент: {phrase}")
+    return "\n".join(lines)
+
+
+def generate_calls(
+    count: int,
+    *,
+    seed: int = 1912,
+    start_history_id: int = 1,
+    start_date: datetime = datetime(2025, 1, 1, 9, 0),
+) -> List[CallRow]:
+    """
+    Строки (history_id, call_history, call_scores) в формате, который LM получает из БД.
+
+    Примерно у 5% звонков нет call_scores (не прошли анализ).
+    """
+    rng = random.Random(seed)
+    rows: List[CallRow] = []
+    for offset in range(count):
+        history_id = start_history_id + offset
+        outcome = _weighted(rng, OUTCOMES)
+        replicas = _replica_count(rng)
+        talk_duration = replicas * rng.randint(4, 12)
+        call_date = start_date + timedelta(minutes=7 * offset)
+        history = {
+            "history_id": history_id,
+            "talk_duration": talk_duration,
+            "await_sec": rng.choice((0, 5, 12, 25, 45, 90, 150)),
+            "call_type": rng.choice(("входящий", "исходящий")),
+            "call_date": call_date,
+        }
+        if rng.random() < 0.05:
+            rows.append((history_id, history, None))
+            continue
+        subscores = [rng.randint(3, 10) for _ in range(5)]
+        score = {
+            "id": 100_000 + history_id,
+            "history_id": history_id,
+            "transcript": synthetic_transcript(rng, outcome, replicas),
+            "outcome": outcome,
+            "call_category": CATEGORIES[outcome],
+            "call_success": "Да" if outcome == "record" else "Нет",
+            "is_target": 0 if outcome == "non_target" else 1,
+            "refusal_category_code": "PRICE" if outcome == "lead_no_record" and rng.random() < 0.3 else None,
+            "refusal_reason": None,
+            "refusal_group": None,
+            "result": RESULT_TEMPLATE.format(*subscores, "справился" if sum(subscores) > 30 else "ошибался"),
+            "call_score": round(sum(subscores) / 5, 1),
+            "call_date": call_date,
+        }
+        rows.append((history_id, history, score))
+    return rows
+
+
+class FakeLMRepository:
+    """
+    In-memory замена LMRepository для офлайн-прогонов.
+
+    Реализует методы, которые LMService вызывает при расчете и записи; строки
+    хранятся в self.values по ключу (history_id, metric_code), как upsert в lm_value.
+    """
+
+    def __init__(self, calls: Sequence[CallRow] = ()):
+        self.values: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self.calls = {history_id: (history, score) for history_id, history, score in calls}
+        self.writes = 0
+
+    async def save_lm_values_batch(self, values: List[Dict[str, Any]], bulk: bool = True) -> int:
+        self.writes += 1
+        for row in values:
+            self.values[(row["history_id"], row["metric_code"])] = row
+        return len(values)
+
+    async def save_lm_values_bulk(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.writes += 1
+        for row in rows:
+            self.values[(row["history_id"], row["metric_code"])] = row
+        return [{"history_id": row["history_id"], "status": "saved"} for row in rows]
+
+    async def get_lm_values_by_call(self, history_id: int) -> List[Dict[str, Any]]:
+        return [dict(row) for (row_history_id, _), row in self.values.items() if row_history_id == history_id]
+
+    async def get_call_records_for_lm(
+        self, history_id: int
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        return self.calls.get(history_id, (None, None))
+
+
+class FakeDictionaryRepository:
+    """In-memory замена LMDictionaryRepository: отдает SYNTHETIC_DICTIONARY, считает хиты."""
+
+    def __init__(self, terms: Sequence[Dict[str, Any]] = SYNTHETIC_DICTIONARY):
+        self.terms = [dict(term) for term in terms]
+        self.hit_rows = 0
+
+    async def get_terms(self, dict_code: str, version: str = "v1", *, active_only: bool = True) -> List[Dict[str, Any]]:
+        return [dict(term) for term in self.terms]
+
+    async def save_hit_rows(
+        self,
+        rows: Sequence[Any],
+        *,
+        replace_scopes: Optional[Iterable[Any]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        self.hit_rows += len(rows)
+        return len(rows)
@@ -0,0 +1,16 @@
+-- Миграция 005: отпечатки входных данных LM для инкрементального пересчета
+
+-- Хеш входов расчета по звонку: поля call_scores/call_history, которые читают
+-- калькуляторы, содержимое словаря, матрица весов и LM_VERSION.
+-- Пересчитываются только звонки, у которых отпечаток изменился.
+CREATE TABLE IF NOT EXISTS lm_input_fingerprint (
+    history_id INT UNSIGNED NOT NULL COMMENT 'call_history.history_id',
+    fingerprint CHAR(40) NOT NULL COMMENT 'sha1 входов расчета',
+    lm_version VARCHAR(64) NOT NULL COMMENT 'Версия LM на момент расчета',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (history_id),
+    CONSTRAINT fk_lm_fingerprint_history
+        FOREIGN KEY (history_id) REFERENCES call_history(history_id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+COMMENT='LM: отпечатки входов для инкрементального пересчета';
@@ -0,0 +1,16 @@
+-- Миграция 006: уникальный ключ хитов словаря для идемпотентной записи
+
+-- 1. Удаление накопившихся дублей (оставляем самую свежую строку)
+DELETE older
+FROM lm_dictionary_hits older
+JOIN lm_dictionary_hits newer
+  ON newer.history_id = older.history_id
+ AND newer.dict_code = older.dict_code
+ AND newer.term = older.term
+ AND newer.dict_version = older.dict_version
+ AND newer.id > older.id;
+
+-- 2. Ключ upsert'а: повторный расчет звонка обновляет строку, а не добавляет новую.
+-- Python runner should handle "Duplicate key name" error (1061).
+CREATE UNIQUE INDEX uq_lm_hits_call_term
+    ON lm_dictionary_hits (history_id, dict_code, term, dict_version);
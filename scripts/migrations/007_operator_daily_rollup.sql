@@ -0,0 +1,61 @@
+-- Миграция 007: дневные агрегаты по операторам для дашбордов
+--
+-- Одна строка = оператор × календарный день звонка (call_scores.call_date,
+-- только принятые звонки). Все счетчики аддитивные: период дашборда считается
+-- суммой строк (не больше 31 на оператора), средние — как сумма / количество.
+-- Наполнение: OperatorRollupService (инкрементально после синхронизации аналитики,
+-- полный пересчет — python -m app.workers.operator_rollup rebuild).
+
+CREATE TABLE IF NOT EXISTS operator_daily_rollup (
+    operator_name VARCHAR(255) NOT NULL,
+    call_day DATE NOT NULL,
+
+    -- Звонки и конверсия
+    accepted_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    target_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    records INT UNSIGNED NOT NULL DEFAULT 0,
+    leads_no_record INT UNSIGNED NOT NULL DEFAULT 0,
+    wish_to_record INT UNSIGNED NOT NULL DEFAULT 0,
+
+    -- Оценки: сумма и количество оцененных звонков
+    scored_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    score_sum DOUBLE NOT NULL DEFAULT 0,
+    lead_scored_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    lead_score_sum DOUBLE NOT NULL DEFAULT 0,
+
+    -- Отмены, переносы, жалобы
+    cancel_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    cancel_scored_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    cancel_score_sum DOUBLE NOT NULL DEFAULT 0,
+    reschedule_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    complaint_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    complaint_scored_calls INT UNSIGNED NOT NULL DEFAULT 0,
+    complaint_score_sum DOUBLE NOT NULL DEFAULT 0,
+
+    -- Время разговоров (средние считаются по разговорам длиннее 10 с)
+    talk_time BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    long_talks INT UNSIGNED NOT NULL DEFAULT 0,
+    long_talk_time BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    record_long_talks INT UNSIGNED NOT NULL DEFAULT 0,
+    record_long_talk_time BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    navigation_long_talks INT UNSIGNED NOT NULL DEFAULT 0,
+    navigation_long_talk_time BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    spam_long_talks INT UNSIGNED NOT NULL DEFAULT 0,
+    spam_long_talk_time BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+    -- Разбивка количества звонков по outcome и call_category
+    outcome_counts JSON NULL,
+    category_counts JSON NULL,
+
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (operator_name, call_day),
+    INDEX idx_rollup_day (call_day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+COMMENT='Дневные агрегаты call_scores по операторам (дашборды)';
+
+-- Инкрементальное обновление ищет переоцененные звонки по call_scores.score_date
+-- (OperatorRollupRepository.touched_days_since): без индекса это полный скан.
+-- Python runner should handle "Duplicate key name" error (1061).
+CREATE INDEX idx_score_date
+    ON call_scores (score_date);
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+
+from benchmarks.lm_scoring import BASELINE_PATH, compare_with_baseline, run_cases
+from benchmarks.lm_synthetic import generate_calls
+
+
+def test_synthetic_calls_are_deterministic() -> None:
+    first = generate_calls(50, seed=7)
+    second = generate_calls(50, seed=7)
+
+    assert first == second
+    assert [row[0] for row in first] == list(range(1, 51))
+    transcripts = [row[2]["transcript"] for row in first if row[2]]
+    assert len({len(text.splitlines()) for text in transcripts}) > 3
+
+
+def test_benchmark_cases_run_offline(caplog) -> None:
+    with caplog.at_level(logging.WARNING):
+        results = asyncio.run(run_cases(generate_calls(40), calibration_ms=1.0))
+
+    # Ошибки внутри сервиса (например, расхождение сигнатур фейков) глотаются
+    # и логируются — такой прогон меряет не то, что нужно.
+    errors = [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert not errors, [record.getMessage() for record in errors]
+
+    assert [result.name for result in results] == [
+        "calculate_all_metrics",
+        "keyword_detectors",
+        "scan_dictionary_terms",
+    ]
+    for result in results:
+        assert result.calls > 0
+        assert result.calls_per_sec > 0
+        assert result.p99_ms >= result.p50_ms > 0
+        assert result.alloc_kib_per_call > 0
+
+
+def test_compare_with_baseline_flags_regressions() -> None:
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    assert compare_with_baseline(baseline, baseline) == []
+
+    slower = json.loads(json.dumps(baseline))
+    slower["cases"]["calculate_all_metrics"]["p50_rel"] *= 2
+    del slower["cases"]["scan_dictionary_terms"]
+
+    regressions = compare_with_baseline(slower, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("calculate_all_metrics.p50_rel")
@@ -0,0 +1,56 @@
+"""
+Integration test for read-replica routing.
+
+Нужны два MySQL: основной (DB_HOST/DB_PORT) и реплика (DB_REPLICA_HOST/DB_REPLICA_PORT).
+Запуск: pytest -o addopts="" -m integration tests/test_replica_routing_integration.py
+"""
+
+import os
+
+import pytest
+
+from app.db.manager import DatabaseManager
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not os.getenv("DB_REPLICA_HOST"), reason="DB_REPLICA_HOST is not set"),
+]
+
+
+@pytest.mark.asyncio
+async def test_replica_route_uses_second_server():
+    manager = DatabaseManager()
+    try:
+        await manager.create_pool()
+        assert manager.replica_pool is not None
+
+        primary = await manager.execute_query("SELECT @@port AS port, @@hostname AS host", fetchone=True)
+        replica = await manager.execute_query(
+            "SELECT @@port AS port, @@hostname AS host",
+            fetchone=True,
+            route="replica",
+        )
+
+        assert (primary["host"], primary["port"]) != (replica["host"], replica["port"])
+        assert manager.pool_snapshot()["replica"]["healthy"] is True
+    finally:
+        await manager.close_pool()
+
+
+@pytest.mark.asyncio
+async def test_replica_route_falls_back_when_replica_unreachable():
+    manager = DatabaseManager(
+        replica_config={
+            **DatabaseManager().replica_config,
+            "port": 1,
+            "max_lag_seconds": 0,
+        }
+    )
+    try:
+        await manager.create_pool()
+        assert manager.replica_pool is None
+
+        row = await manager.execute_query("SELECT 1 AS ok", fetchone=True, route="replica")
+        assert row["ok"] == 1
+    finally:
+        await manager.close_pool()
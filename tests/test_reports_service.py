@@ -110,3 +110,18 @@ def test_build_call_examples_skips_invalid_rows():
     ]
     text = svc._build_call_examples(scores, limit=1)
     assert "### Звонок" in text
+
+
+def test_calculate_metrics_averages_subscores_from_result():
+    svc = _service()
+    scores = [
+        {"outcome": "record", "result": "Вежливость: 8/10\nИнформативность: 6/10"},
+        {"outcome": "lead_no_record", "result": "Вежливость и эмпатия: 10/10"},
+        {"outcome": "info_only", "result": None},
+    ]
+    metrics = svc._calculate_metrics_from_scores(scores)
+    assert metrics["avg_politeness_score"] == 9.0
+    assert metrics["politeness_score_coverage"] == 2
+    assert metrics["avg_info_score"] == 6.0
+    assert metrics["avg_script_score"] is None
+    assert metrics["script_score_coverage"] == 0
@@ -0,0 +1,57 @@
+"""
+Unit tests for AdminActionLogger.
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.admin_logger import AdminActionLogger
+
+
+def _logger_with_tx(pk_by_telegram_id):
+    tx = Mock()
+
+    async def execute(query, params=None, fetchone=False, fetchall=False, *, query_name=None):
+        if query.strip().startswith("SELECT"):
+            pk = pk_by_telegram_id.get(params[0])
+            return {"id": pk} if pk else {}
+        return 1
+
+    tx.execute = AsyncMock(side_effect=execute)
+
+    async def run_in_transaction(work, **kwargs):
+        return await work(tx)
+
+    db = Mock()
+    db.run_in_transaction = AsyncMock(side_effect=run_in_transaction)
+    db.execute_with_retry = AsyncMock()
+    return AdminActionLogger(db), db, tx
+
+
+@pytest.mark.asyncio
+async def test_log_action_resolves_pks_inside_transaction():
+    service, db, tx = _logger_with_tx({100: 1, 200: 2})
+
+    assert await service.log_action(100, "approve", 200, {"k": "v"}) is True
+
+    db.execute_with_retry.assert_not_awaited()
+    names = [call.kwargs["query_name"] for call in tx.execute.await_args_list]
+    assert names == ["admin_action_logs.actor_pk", "admin_action_logs.target_pk", "admin_action_logs.insert"]
+    assert tx.execute.await_args.args[1][:3] == (1, 2, "approve")
+
+
+@pytest.mark.asyncio
+async def test_log_action_skips_insert_without_actor():
+    service, _, tx = _logger_with_tx({})
+
+    assert await service.log_action(100, "approve") is False
+    assert tx.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_user_pk_without_transaction_swallows_errors():
+    db = Mock()
+    db.execute_with_retry = AsyncMock(side_effect=RuntimeError("db down"))
+
+    assert await AdminActionLogger(db)._get_user_pk_by_telegram_id(100) is None
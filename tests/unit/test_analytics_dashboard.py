@@ -0,0 +1,215 @@
+"""
+Unit tests for the set-based all-operators dashboard.
+"""
+
+import asyncio
+import time
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.db.repositories.analytics import AnalyticsRepository, period_bounds
+
+SCORE_ROWS = [
+    {
+        "operator_name": "Петрова",
+        "accepted_calls": 10,
+        "records": 3,
+        "leads_no_record": 1,
+        "wish_to_record": 4,
+        "avg_score_all": Decimal("7.456"),
+        "avg_score_leads": Decimal("8.1"),
+        "avg_score_cancel": None,
+        "cancel_calls": Decimal("1"),
+        "reschedule_calls": Decimal("3"),
+        "avg_talk_all": Decimal("95.7"),
+        "total_talk_time": Decimal("900"),
+        "avg_talk_record": Decimal("120.2"),
+        "avg_talk_navigation": None,
+        "avg_talk_spam": None,
+        "complaint_calls": Decimal("0"),
+        "avg_score_complaint": None,
+    },
+    {
+        "operator_name": "Иванов",
+        "accepted_calls": 2,
+        "records": 0,
+        "leads_no_record": 0,
+        "wish_to_record": 0,
+        "avg_score_all": Decimal("5"),
+        "cancel_calls": 0,
+        "reschedule_calls": 0,
+        "total_talk_time": 40,
+        "complaint_calls": 1,
+        "avg_score_complaint": Decimal("3.333"),
+    },
+]
+ANALYTICS_ROWS = [
+    {"operator_name": "Петрова", "accepted_calls": 12, "records": 4, "leads_no_record": 1, "wish_to_record": 5},
+    {"operator_name": "Сидоров", "accepted_calls": 1, "records": 1, "leads_no_record": 0, "wish_to_record": 1},
+]
+
+
+def _repo(analytics_error=False):
+    db = Mock()
+
+    async def execute_query(query, params=None, **kwargs):
+        if "FROM call_analytics" in query:
+            if analytics_error:
+                raise RuntimeError("call_analytics is missing")
+            return ANALYTICS_ROWS
+        return SCORE_ROWS
+
+    db.execute_query = AsyncMock(side_effect=execute_query)
+    return AnalyticsRepository(db), db
+
+
+@pytest.mark.asyncio
+async def test_all_operators_dashboard_uses_two_grouped_queries():
+    repo, db = _repo()
+
+    dashboards = await repo.get_dashboards_for_period(date(2025, 3, 1), date(2025, 3, 31), "month")
+
+    assert db.execute_query.await_count == 2
+    assert [d["operator_name"] for d in dashboards] == ["Иванов", "Петрова", "Сидоров"]
+    petrova = dashboards[1]
+    assert petrova["period_start"] == "2025-03-01" and petrova["period_type"] == "month"
+    assert petrova["accepted_calls"] == 12
+    assert petrova["conversion_rate"] == 80.0
+    assert petrova["avg_score_all"] == Decimal("7.46")
+    assert petrova["avg_score_cancel"] == 0
+    assert petrova["cancel_share"] == 25.0
+    assert petrova["avg_talk_all"] == 95
+    assert petrova["total_talk_time"] == 900
+    # Нет строки в call_analytics — базовая статистика нулевая, как у get_operator_daily_stats
+    assert dashboards[0]["accepted_calls"] == 0
+    assert dashboards[0]["complaint_calls"] == 1
+    assert dashboards[0]["avg_score_complaint"] == Decimal("3.33")
+    # Только call_analytics — остальные семейства нулевые
+    assert dashboards[2]["conversion_rate"] == 100.0
+    assert dashboards[2]["avg_score_all"] == 0 and dashboards[2]["avg_talk_all"] == 0
+
+
+@pytest.mark.asyncio
+async def test_all_operators_dashboard_matches_single_operator_shape():
+    repo, _ = _repo()
+    dashboards = await repo.get_dashboards_for_period(date(2025, 3, 1), date(2025, 3, 31), "month")
+
+    single_db = Mock()
+    single_db.execute_query = AsyncMock(return_value=SCORE_ROWS[0])
+    single = AnalyticsRepository(single_db)
+    single.call_analytics_repo.get_aggregated_metrics = AsyncMock(return_value=ANALYTICS_ROWS[0])
+    expected = await single.get_live_dashboard_single("Петрова", "month")
+
+    petrova = next(d for d in dashboards if d["operator_name"] == "Петрова")
+    assert petrova.keys() == expected.keys()
+    assert {k: v for k, v in petrova.items() if not k.startswith("period_")} == {
+        k: v for k, v in expected.items() if not k.startswith("period_")
+    }
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_call_scores_stats_and_applies_limit():
+    repo, _ = _repo(analytics_error=True)
+
+    dashboards, total = await repo.get_live_dashboard_all_operators("day", limit=1)
+
+    assert total == 2
+    assert [d["operator_name"] for d in dashboards] == ["Иванов"]
+    assert dashboards[0]["accepted_calls"] == 2
+    assert dashboards[0]["period_start"] == date.today().isoformat()
+
+
+def test_period_bounds():
+    today = date(2025, 3, 13)  # четверг
+    assert period_bounds("day", today) == (today, today)
+    assert period_bounds("week", today) == (date(2025, 3, 10), today)
+    assert period_bounds("month", today) == (date(2025, 3, 1), today)
+
+
+def _slow_section(result, active, delay=0.05):
+    async def section(*_args):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(delay)
+        active["now"] -= 1
+        return result
+
+    return section
+
+
+def _patch_sections(repo, active, *, failing=None):
+    sections = {
+        "get_operator_daily_stats": {"accepted_calls": 5},
+        "get_quality_metrics": {"avg_score_all": 7.0},
+        "get_cancellation_metrics": {"cancel_calls": 1},
+        "get_time_metrics": {"avg_talk_all": 60},
+        "get_complaint_metrics": {"complaint_calls": 0},
+    }
+    for name, result in sections.items():
+        setattr(repo, name, _slow_section(result, active))
+    if failing:
+        async def boom(*_args):
+            raise RuntimeError("query failed")
+
+        setattr(repo, failing, boom)
+
+
+@pytest.mark.asyncio
+async def test_single_dashboard_runs_sections_concurrently():
+    repo, _ = _repo()
+    active = {"now": 0, "peak": 0}
+    _patch_sections(repo, active)
+
+    started = time.perf_counter()
+    dashboard = await repo.get_live_dashboard_single("Петрова", "day")
+    elapsed = time.perf_counter() - started
+
+    assert active["peak"] == 5
+    assert elapsed < 0.2
+    assert dashboard["accepted_calls"] == 5 and dashboard["complaint_calls"] == 0
+
+
+@pytest.mark.asyncio
+async def test_section_concurrency_is_bounded():
+    repo, _ = _repo()
+    repo._section_semaphore = asyncio.Semaphore(2)
+    active = {"now": 0, "peak": 0}
+    _patch_sections(repo, active)
+
+    await repo.get_live_dashboard_single("Петрова", "week")
+
+    assert active["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_section_error_propagates_after_others_finish():
+    repo, _ = _repo()
+    active = {"now": 0, "peak": 0}
+    _patch_sections(repo, active, failing="get_time_metrics")
+
+    with pytest.raises(RuntimeError, match="query failed"):
+        await repo.get_live_dashboard_single("Петрова", "day")
+    assert active["now"] == 0
+
+
+@pytest.mark.asyncio
+async def test_operators_with_new_calls_advance_watermark():
+    db = Mock()
+    db.execute_query = AsyncMock(return_value=[
+        {"operator_name": "Петрова", "max_id": 130},
+        {"operator_name": None, "max_id": 135},
+        {"operator_name": "Иванов", "max_id": 121},
+    ])
+    repo = AnalyticsRepository(db)
+
+    operators, watermark = await repo.get_operators_with_new_calls(120)
+
+    assert operators == {"Петрова", "Иванов"}
+    assert watermark == 135
+    assert db.execute_query.await_args.args[1] == (120,)
+
+    db.execute_query.return_value = []
+    assert await repo.get_operators_with_new_calls(135) == (set(), 135)
@@ -0,0 +1,176 @@
+"""
+Unit tests for the two-tier dashboard cache (in-process L1 + operator_dashboards).
+"""
+
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services import dashboard_cache
+from app.services.dashboard_cache import DashboardCacheService, DashboardL1Cache
+
+START = date(2025, 3, 10)
+END = date(2025, 3, 12)
+
+
+def _service(l2_row=None):
+    db = Mock()
+    db.execute_with_retry = AsyncMock(return_value=l2_row)
+    return DashboardCacheService(db), db
+
+
+def _builder(payload=None):
+    return AsyncMock(return_value=payload or {"operator_name": "Петрова", "records": 3})
+
+
+@pytest.mark.asyncio
+async def test_l1_hit_skips_database():
+    service, db = _service()
+    builder = _builder()
+
+    first = await service.get_or_build("Петрова", "week", START, END, builder)
+    db.execute_with_retry.reset_mock()
+    second = await service.get_or_build("Петрова", "week", START, END, builder)
+
+    assert first == second
+    builder.assert_awaited_once()
+    db.execute_with_retry.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_build_once():
+    service, _ = _service()
+    calls = 0
+
+    async def slow_builder():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"operator_name": "Петрова", "records": 5}
+
+    results = await asyncio.gather(
+        *(service.get_or_build("Петрова", "day", START, START, slow_builder) for _ in range(10))
+    )
+
+    assert calls == 1
+    assert all(result["records"] == 5 for result in results)
+    assert not service._inflight
+
+
+@pytest.mark.asyncio
+async def test_builder_error_reaches_all_waiters_and_is_not_cached():
+    service, _ = _service()
+
+    async def failing_builder():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(
+        *(service.get_or_build("Петрова", "day", START, START, failing_builder) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(service.l1) == 0
+    assert not service._inflight
+
+
+@pytest.mark.asyncio
+async def test_l2_row_is_normalized_and_promoted_to_l1():
+    row = {"operator_name": "Петрова", "records_count": 4, "period_start": START, "period_end": END}
+    service, db = _service(l2_row=row)
+    builder = _builder()
+
+    dashboard = await service.get_or_build("Петрова", "week", START, END, builder)
+
+    builder.assert_not_awaited()
+    assert dashboard["records"] == 4
+    assert dashboard["period_start"] == "2025-03-10"
+    db.execute_with_retry.reset_mock()
+    assert await service.get_cached_dashboard("Петрова", "week", START) == dashboard
+    db.execute_with_retry.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refresh_bypasses_cache():
+    service, _ = _service()
+    await service.get_or_build("Петрова", "day", START, START, _builder({"records": 1}))
+
+    builder = _builder({"records": 2})
+    dashboard = await service.get_or_build("Петрова", "day", START, START, builder, refresh=True)
+
+    builder.assert_awaited_once()
+    assert dashboard["records"] == 2
+    assert (await service.get_or_build("Петрова", "day", START, START, _builder()))["records"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_clears_both_tiers():
+    service, db = _service()
+    await service.get_or_build("Петрова", "day", START, START, _builder())
+    await service.get_or_build("Иванов", "day", START, START, _builder())
+    await service.get_or_build("Петрова", "week", START, END, _builder())
+    db.execute_with_retry.reset_mock()
+
+    await service.invalidate_cache(period_type="day")
+
+    assert len(service.l1) == 1
+    query, = db.execute_with_retry.await_args.args
+    assert "WHERE period_type = %s" in query
+    assert db.execute_with_retry.await_args.kwargs["params"] == ("day",)
+
+    await service.invalidate_cache("Петрова")
+    assert len(service.l1) == 0
+    assert db.execute_with_retry.await_args.kwargs["params"] == ("Петрова",)
+
+
+def test_l1_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dashboard_cache.time, "monotonic", lambda: now[0])
+    cache = DashboardL1Cache(ttl_sec=60, max_entries=10)
+    key = ("Петрова", "day", START.isoformat())
+    cache.put(key, {"records": 1})
+
+    now[0] += 59
+    assert cache.get(key) == {"records": 1}
+    now[0] += 2
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_l1_lru_eviction():
+    cache = DashboardL1Cache(ttl_sec=60, max_entries=2)
+    cache.put(("a", "day", "x"), {"n": 1})
+    cache.put(("b", "day", "x"), {"n": 2})
+    cache.get(("a", "day", "x"))
+    cache.put(("c", "day", "x"), {"n": 3})
+
+    assert cache.get(("b", "day", "x")) is None
+    assert cache.get(("a", "day", "x")) == {"n": 1}
+    assert cache.get(("c", "day", "x")) == {"n": 3}
+
+
+@pytest.mark.asyncio
+async def test_touch_extends_l1_and_l2_ttl():
+    db = Mock()
+    db.execute_with_retry = AsyncMock(return_value=True)
+    tx = Mock()
+    tx.execute = AsyncMock(return_value=2)
+
+    async def run_in_transaction(work, **kwargs):
+        return await work(tx)
+
+    db.run_in_transaction = AsyncMock(side_effect=run_in_transaction)
+    cache_service = DashboardCacheService(db)
+    cache_service.l1.put(("Петрова", "week", START.isoformat()), {"records": 1})
+
+    updated = await cache_service.touch(["Петрова", "Иванов", "Петрова"], "week", START)
+
+    assert updated == 2
+    query, params = tx.execute.await_args.args
+    assert "SET cached_at = NOW()" in query
+    assert params == ("week", START, "Иванов", "Петрова")
+    db.execute_with_retry.assert_not_called()
+    assert await cache_service.touch([], "week", START) == 0
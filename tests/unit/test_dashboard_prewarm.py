@@ -0,0 +1,121 @@
+"""
+Unit tests for the background dashboard pre-warm job.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.db.repositories.analytics import AnalyticsRepository, period_bounds
+from app.services.dashboard_cache import DashboardCacheService
+from app.services.dashboard_prewarm import PREWARM_PERIODS, DashboardPrewarmService
+
+OPERATORS = ["Иванов", "Петрова"]
+
+
+def _service(fresh=(), max_age_sec=1800.0, concurrency=2):
+    operator_repo = Mock()
+    operator_repo.get_dashboard_operator_names = AsyncMock(return_value=OPERATORS)
+
+    analytics_repo = AnalyticsRepository(Mock())
+    analytics_repo.get_call_scores_watermark = AsyncMock(return_value=100)
+    analytics_repo.get_operators_with_new_calls = AsyncMock(return_value=(set(), 100))
+    analytics_repo.builds = []
+
+    async def build(operator_name, period):
+        analytics_repo.builds.append((operator_name, period))
+        return {"operator_name": operator_name, "period_type": period, "records": 1}
+
+    analytics_repo.get_live_dashboard_single = AsyncMock(side_effect=build)
+
+    db = Mock()
+    db.execute_with_retry = AsyncMock(return_value=None)
+    cache_service = DashboardCacheService(db)
+    cache_service.fresh_operators = AsyncMock(return_value=set(fresh))
+    cache_service.touch = AsyncMock(side_effect=lambda names, period, start: len(names))
+
+    service = DashboardPrewarmService(
+        operator_repo,
+        analytics_repo,
+        cache_service,
+        concurrency=concurrency,
+        max_age_sec=max_age_sec,
+    )
+    return service, analytics_repo, cache_service
+
+
+@pytest.mark.asyncio
+async def test_first_run_builds_every_operator_and_period():
+    service, analytics_repo, cache_service = _service()
+
+    stats = await service.run()
+
+    assert stats == {"operators": 2, "built": 6, "touched": 0, "errors": 0}
+    assert sorted(analytics_repo.builds) == sorted(
+        (name, period) for name in ("Иванов", "Петрова") for period in PREWARM_PERIODS
+    )
+    start, _ = period_bounds("day")
+    assert cache_service.l1.get(("Петрова", "day", start.isoformat()))["records"] == 1
+    analytics_repo.get_call_scores_watermark.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_operators_without_new_calls_are_touched_not_rebuilt():
+    service, analytics_repo, cache_service = _service(fresh={"Петрова", "Иванов"})
+    await service.run()
+    analytics_repo.builds.clear()
+    analytics_repo.get_operators_with_new_calls.return_value = ({"Петрова"}, 120)
+
+    stats = await service.run()
+
+    analytics_repo.get_operators_with_new_calls.assert_awaited_once_with(100)
+    assert sorted(analytics_repo.builds) == sorted(("Петрова", period) for period in PREWARM_PERIODS)
+    assert stats["built"] == 3
+    assert stats["touched"] == 3
+    touched = {call.args[0][0] for call in cache_service.touch.await_args_list if call.args[0]}
+    assert touched == {"Иванов"}
+    assert service._watermark == 120
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_when_cache_entry_missing_or_too_old():
+    service, analytics_repo, cache_service = _service(fresh={"Петрова", "Иванов"})
+    await service.run()
+    analytics_repo.builds.clear()
+    cache_service.fresh_operators.return_value = {"Петрова"}
+    service.max_age_sec = 0.0
+
+    await service.run()
+    assert {name for name, _ in analytics_repo.builds} == {"Петрова", "Иванов"}
+
+    analytics_repo.builds.clear()
+    service.max_age_sec = 1800.0
+    await service.run()
+    assert {name for name, _ in analytics_repo.builds} == {"Иванов"}
+
+
+@pytest.mark.asyncio
+async def test_builds_are_bounded_and_failures_counted():
+    service, analytics_repo, _ = _service(concurrency=2)
+    running = 0
+    peak = 0
+
+    async def build(operator_name, period):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if operator_name == "Иванов" and period == "month":
+            raise RuntimeError("db down")
+        return {"operator_name": operator_name}
+
+    analytics_repo.get_live_dashboard_single = AsyncMock(side_effect=build)
+
+    stats = await service.run()
+
+    assert peak == 2
+    assert stats["built"] == 5
+    assert stats["errors"] == 1
+
@@ -50,6 +50,111 @@ class TestDatabaseManager:
         assert result == {"id": 1}
         mock_cursor.execute.assert_called_with("SELECT * FROM users", None)
 
+    @pytest.mark.asyncio
+    async def test_execute_query_records_telemetry_without_row_logging(self, db_manager, caplog):
+        """Запрос попадает в телеметрию, а строка результата не логируется."""
+        from app.db.telemetry import QueryTelemetry
+
+        db_manager.telemetry = QueryTelemetry("metrics")
+        mock_conn, mock_cursor = self._mock_connection(db_manager)
+        mock_cursor.fetchone.return_value = {"transcript": "секретный текст"}
+
+        with caplog.at_level("DEBUG", logger="app.db.manager"):
+            await db_manager.execute_query("SELECT 1", fetchone=True, query_name="test.select")
+
+        assert db_manager.telemetry.snapshot()["test.select"]["count"] == 1
+        assert "секретный текст" not in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_execute_query_records_pool_hold_time(self, db_manager):
+        """acquire() учитывает ожидание и удержание соединения по query_name."""
+        from app.db.pool_metrics import PoolMetrics
+
+        db_manager.pool_metrics = PoolMetrics()
+        self._mock_connection(db_manager)
+
+        await db_manager.execute_query("SELECT 1", query_name="test.hold")
+
+        snapshot = db_manager.pool_snapshot()
+        assert snapshot["acquire"]["count"] == 1
+        assert snapshot["hold"]["test.hold"]["count"] == 1
+        assert db_manager.pool_metrics.in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_warm_up_pool_pings_and_releases(self, db_manager):
+        """Прогрев открывает target соединений, пингует и возвращает их в пул."""
+        connections = [AsyncMock(), AsyncMock()]
+        db_manager.pool.acquire = AsyncMock(side_effect=connections)
+        db_manager.pool.release = Mock()
+
+        warmed = await db_manager.warm_up_pool(target=2)
+
+        assert warmed == 2
+        for conn in connections:
+            conn.ping.assert_awaited_once()
+        assert db_manager.pool.release.call_count == 2
+
+    @staticmethod
+    def _attach_replica(db_manager, **config):
+        replica_conn = AsyncMock()
+        replica_cursor = AsyncMock()
+        replica_cursor.__aenter__.return_value = replica_cursor
+        replica_cursor.__aexit__.return_value = False
+        replica_cursor.fetchall.return_value = [{"src": "replica"}]
+        replica_conn.cursor = Mock(return_value=replica_cursor)
+        db_manager.replica_pool = Mock()
+        db_manager.replica_pool.acquire = AsyncMock(return_value=replica_conn)
+        db_manager.replica_pool.release = Mock()
+        db_manager.replica_pool.wait_closed = AsyncMock()
+        db_manager.replica_config = {"host": "replica", "max_lag_seconds": 0, **config}
+        return replica_cursor
+
+    @pytest.mark.asyncio
+    async def test_replica_route_reads_from_replica(self, db_manager):
+        """route="replica" читает с реплики, запись с commit — всегда в основной пул."""
+        _, primary_cursor = self._mock_connection(db_manager)
+        replica_cursor = self._attach_replica(db_manager)
+
+        rows = await db_manager.execute_query("SELECT 1", fetchall=True, route="replica")
+        await db_manager.execute_query("UPDATE t SET v = 1", commit=True, route="replica")
+
+        assert rows == [{"src": "replica"}]
+        replica_cursor.execute.assert_awaited_once_with("SELECT 1", None)
+        primary_cursor.execute.assert_awaited_once_with("UPDATE t SET v = 1", None)
+        assert db_manager.replica_pool.release.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_replica_route_falls_back_when_lagging(self, db_manager):
+        """Отстающая реплика не используется, запрос уходит в основной пул."""
+        _, primary_cursor = self._mock_connection(db_manager)
+        replica_cursor = self._attach_replica(db_manager, max_lag_seconds=30)
+        replica_cursor.fetchone.return_value = {"Seconds_Behind_Source": 120}
+
+        await db_manager.execute_query("SELECT 1", fetchall=True, route="replica")
+
+        replica_cursor.execute.assert_awaited_once_with("SHOW REPLICA STATUS")
+        primary_cursor.execute.assert_awaited_once_with("SELECT 1", None)
+        assert db_manager.replica_fallbacks == 1
+        assert db_manager.pool_snapshot()["replica"]["lag_seconds"] == 120.0
+
+    @pytest.mark.asyncio
+    async def test_replica_connection_error_switches_to_primary(self, db_manager):
+        """Ошибка соединения с репликой выключает её, повтор идёт в основной пул."""
+        import aiomysql
+
+        _, primary_cursor = self._mock_connection(db_manager)
+        primary_cursor.fetchall.return_value = [{"src": "primary"}]
+        self._attach_replica(db_manager, check_interval_seconds=60)
+        db_manager.replica_pool.acquire = AsyncMock(
+            side_effect=aiomysql.OperationalError(2003, "Can't connect")
+        )
+
+        with patch("app.db.manager.asyncio.sleep", new_callable=AsyncMock):
+            rows = await db_manager.execute_with_retry("SELECT 1", fetchall=True, route="replica")
+
+        assert rows == [{"src": "primary"}]
+        assert db_manager.pool_snapshot()["replica"]["healthy"] is False
+
     @pytest.mark.asyncio
     async def test_execute_with_retry_success(self, db_manager):
         """Тест выполнения с ретраем (успех с первой попытки)"""
@@ -85,6 +190,68 @@ class TestDatabaseManager:
             await db_manager.execute_with_retry("SELECT 1", retries=3, base_delay=0.01)
         assert db_manager.execute_query.call_count == 1
 
+    @staticmethod
+    def _mock_connection(db_manager):
+        mock_conn = AsyncMock()
+        mock_cursor = AsyncMock()
+        mock_cursor.__aenter__.return_value = mock_cursor
+        mock_cursor.__aexit__.return_value = False
+        mock_cursor.rowcount = 2
+        mock_conn.cursor = Mock(return_value=mock_cursor)
+        db_manager.pool.acquire = AsyncMock(return_value=mock_conn)
+        return mock_conn, mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_execute_many_single_transaction(self, db_manager):
+        """execute_many: одно соединение, executemany и один COMMIT."""
+        mock_conn, mock_cursor = self._mock_connection(db_manager)
+        rows = [(1, "a"), (2, "b")]
+
+        result = await db_manager.execute_many("INSERT INTO t (id, v) VALUES (%s, %s)", rows)
+
+        assert result == 2
+        assert db_manager.pool.acquire.await_count == 1
+        mock_cursor.executemany.assert_awaited_once_with("INSERT INTO t (id, v) VALUES (%s, %s)", rows)
+        mock_conn.begin.assert_awaited_once()
+        mock_conn.commit.assert_awaited_once()
+        mock_conn.rollback.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_execute_many_empty_skips_pool(self, db_manager):
+        assert await db_manager.execute_many("INSERT INTO t VALUES (%s)", []) == 0
+        db_manager.pool.acquire.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_transaction_rollback_on_error(self, db_manager):
+        """Исключение внутри блока откатывает транзакцию."""
+        mock_conn, _ = self._mock_connection(db_manager)
+
+        with pytest.raises(RuntimeError):
+            async with db_manager.transaction() as tx:
+                await tx.execute("UPDATE t SET v = 1")
+                raise RuntimeError("boom")
+
+        mock_conn.rollback.assert_awaited_once()
+        mock_conn.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_run_in_transaction_retries_transient_error(self, db_manager):
+        """Транзакция целиком повторяется при connection_error."""
+        import aiomysql
+
+        mock_conn, mock_cursor = self._mock_connection(db_manager)
+        mock_cursor.execute.side_effect = [aiomysql.Error(2013, "Lost connection"), None]
+
+        async def work(tx):
+            return await tx.execute("UPDATE t SET v = 1")
+
+        with patch("app.db.manager.asyncio.sleep", new_callable=AsyncMock):
+            result = await db_manager.run_in_transaction(work, retries=2, base_delay=0.01)
+
+        assert result == 2
+        assert mock_conn.rollback.await_count == 1
+        assert mock_conn.commit.await_count == 1
+
     def test_sanitize_params_masks_admin_action_payload(self):
         query = """
             INSERT INTO admin_action_logs (actor_id, target_id, action, payload_json, created_at)
@@ -99,6 +266,38 @@ class TestDatabaseManager:
         assert "omitted payload_json" in str(sanitized[3])
         assert "Traceback" not in str(sanitized)
 
+    def test_sanitize_sql_rewrites_score_column_and_is_cached(self):
+        from app.db.statements import prepare_statement
+
+        query = "SELECT cs.score, call_scores.SCORE FROM call_scores cs WHERE cs.score_x = 1"
+
+        first = DatabaseManager._sanitize_sql(query)
+        second = DatabaseManager._sanitize_sql(query)
+
+        assert first == "SELECT cs.call_score, call_scores.call_score FROM call_scores cs WHERE cs.score_x = 1"
+        assert first is second
+        assert prepare_statement(query).preview == first
+        assert DatabaseManager._sanitize_sql(None) is None
+
+    def test_prepare_statement_skips_cache_for_long_queries(self):
+        from app.db.statements import STATEMENT_CACHE_MAX_LENGTH, prepare_statement
+
+        rows = ", ".join(["(%s, %s, cs.score)"] * (STATEMENT_CACHE_MAX_LENGTH // 10))
+        query = f"INSERT INTO lm_value (a, b, c) VALUES {rows}"
+        before = prepare_statement.cache_info().currsize
+
+        statement = prepare_statement(query)
+
+        assert prepare_statement.cache_info().currsize == before
+        assert "cs.call_score" in statement.sql
+        assert prepare_statement(query) is not statement
+
+    def test_prepare_statement_detects_admin_log_insert_across_lines(self):
+        from app.db.statements import prepare_statement
+
+        assert prepare_statement("INSERT\n  INTO admin_action_logs (a) VALUES (%s)").is_admin_action_log
+        assert not prepare_statement("SELECT * FROM admin_action_logs").is_admin_action_log
+
     def test_clip_for_log_flattens_multiline_values(self):
         value = "line1\nline2\rline3"
         clipped = DatabaseManager._clip_for_log(value, limit=200)
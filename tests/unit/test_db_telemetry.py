@@ -0,0 +1,48 @@
+"""
+Unit tests for QueryTelemetry.
+"""
+
+import pytest
+
+from app.db.telemetry import QueryTelemetry
+
+
+def test_record_counts_and_histogram():
+    telemetry = QueryTelemetry("metrics", slow_query_ms=1000)
+    telemetry.record("users.get", 0.003)
+    telemetry.record("users.get", 0.040)
+    telemetry.record("users.get", 0.020, error=True)
+
+    stats = telemetry.snapshot()["users.get"]
+    assert stats["count"] == 3
+    assert stats["errors"] == 1
+    assert stats["max_ms"] == pytest.approx(40.0)
+    assert stats["histogram"]["le_5ms"] == 1
+    assert stats["histogram"]["le_25ms"] == 1
+    assert stats["histogram"]["le_50ms"] == 1
+    assert telemetry.slow_queries() == []
+
+
+def test_slow_query_capture_without_params():
+    telemetry = QueryTelemetry("metrics", slow_query_ms=100)
+    telemetry.record("reports.heavy", 0.5, query="SELECT *\n  FROM call_scores\n WHERE id = %s")
+
+    slow = telemetry.slow_queries()
+    assert len(slow) == 1
+    assert slow[0]["query_name"] == "reports.heavy"
+    assert slow[0]["sql"] == "SELECT * FROM call_scores WHERE id = %s"
+
+
+def test_runtime_mode_switch():
+    telemetry = QueryTelemetry("metrics")
+    assert telemetry.should_log_query() is False
+
+    telemetry.set_mode("verbose", sample_rate=1.0)
+    assert telemetry.should_log_query() is True
+
+    telemetry.set_mode("off")
+    telemetry.record("any", 0.01)
+    assert telemetry.snapshot() == {}
+
+    with pytest.raises(ValueError):
+        telemetry.set_mode("loud")
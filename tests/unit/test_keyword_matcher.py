@@ -0,0 +1,74 @@
+"""
+Unit tests for KeywordMatcher.
+"""
+
+import random
+
+from app.services.keyword_matcher import KeywordHit, KeywordMatcher
+from app.services.lm_service import TRANSCRIPT_KEYWORD_MATCHER
+
+
+def test_scan_matches_substring_semantics_for_overlapping_keywords():
+    matcher = KeywordMatcher({"a": ["жал", "жалоба", "оба"], "b": ["лоб", ""]})
+    scan = matcher.scan("пишу жалобу, а потом жалоба")
+
+    assert scan.find("жал") == 5
+    assert scan.count("жал") == 2
+    assert scan.find("жалоба") == "пишу жалобу, а потом жалоба".find("жалоба")
+    assert scan.find("оба") == "пишу жалобу, а потом жалоба".find("оба")
+    assert scan.count("лоб") == 2
+    assert scan.find("нет") == -1
+    assert matcher.keywords("b") == ("лоб",)
+
+
+def test_first_respects_list_order_not_text_order():
+    matcher = KeywordMatcher({"x": ["второе", "первое"]})
+    scan = matcher.scan("первое, потом второе")
+
+    assert scan.first("x") == "второе"
+    assert scan.first_category(["missing", "x"]) == "x"
+    assert scan.has("missing") is False
+
+
+def test_shared_keyword_belongs_to_every_category():
+    matcher = KeywordMatcher({"a": ["суд"], "b": ["суд", "иск"]})
+    hits = list(matcher.scan("иск в суд").hits())
+
+    assert hits == [
+        KeywordHit("b", "иск", 0),
+        KeywordHit("a", "суд", 6),
+        KeywordHit("b", "суд", 6),
+    ]
+
+
+def test_empty_text_and_empty_matcher():
+    assert KeywordMatcher({}).scan("что угодно").find("что") == -1
+    assert TRANSCRIPT_KEYWORD_MATCHER.scan("").has("legal") is False
+    assert TRANSCRIPT_KEYWORD_MATCHER.scan(None).first("intent") is None
+
+
+def test_randomized_equivalence_with_naive_search():
+    rng = random.Random(42)
+    alphabet = "абвг "
+    groups = {
+        f"g{i}": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(6)]
+        for i in range(4)
+    }
+    matcher = KeywordMatcher(groups)
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        scan = matcher.scan(text)
+        for category, keywords in groups.items():
+            expected_first = next((kw for kw in keywords if kw and kw in text), None)
+            assert scan.first(category) == expected_first
+            for kw in keywords:
+                if kw:
+                    assert scan.find(kw) == text.find(kw)
+
+
+def test_transcript_matcher_categories():
+    scan = TRANSCRIPT_KEYWORD_MATCHER.scan("я буду жаловаться в суд, верните деньги")
+
+    assert scan.has("legal")
+    assert scan.has("refund")
+    assert not scan.has("technical")
@@ -0,0 +1,119 @@
+"""
+Unit tests for LMBackfillService.
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services import lm_backfill
+from app.services.lm_backfill import BackfillProgress, LMBackfillService, backfill_profile
+
+
+class FakeRepo:
+    def __init__(self, history_ids, watermark_id=0):
+        self.rows = [{"history_id": history_id} for history_id in history_ids]
+        self.watermarks = {}
+        self.watermark_id = watermark_id
+        self.fail_after = None
+
+    async def get_calc_watermark(self, lm_version, profile):
+        return {"last_id": self.watermark_id}
+
+    async def count_history_range(self, after_id, *, start_timestamp=None, end_timestamp=None):
+        return sum(1 for row in self.rows if row["history_id"] > after_id)
+
+    async def get_history_chunk(self, after_id, limit, *, start_timestamp=None, end_timestamp=None):
+        if self.fail_after is not None and after_id >= self.fail_after:
+            raise RuntimeError("connection lost")
+        return [row for row in self.rows if row["history_id"] > after_id][:limit]
+
+    async def get_call_scores_map(self, history_ids):
+        return {}
+
+    async def update_calc_watermark(self, lm_version, profile, last_date, last_id):
+        self.watermarks[(lm_version, profile)] = last_id
+        self.watermark_id = last_id
+
+
+def _service(repo, **kwargs):
+    lm_service = Mock()
+    lm_service.lm_version = "v_test"
+
+    async def fake_batch(batch, calc_source):
+        return {history_id: [{}] for history_id, _, _ in batch}
+
+    async def fake_save(payloads):
+        return {history_id: 1 for history_id in payloads}
+
+    lm_service.calculate_metrics_batch = AsyncMock(side_effect=fake_batch)
+    lm_service.save_payloads_bulk = AsyncMock(side_effect=fake_save)
+    lm_service.flush_pending_writes = AsyncMock(return_value=True)
+    return LMBackfillService(repo, lm_service, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_backfill_walks_keyset_and_commits_watermark_per_chunk():
+    repo = FakeRepo(range(1, 8))
+    seen = []
+
+    async def on_progress(progress):
+        seen.append((progress.done, progress.last_id, progress.finished))
+
+    service = _service(repo, chunk_size=3, rows_per_sec=0)
+    progress = await service.run(datetime(2025, 1, 1), datetime(2025, 1, 31), progress_callback=on_progress)
+
+    assert (progress.total, progress.done, progress.saved, progress.errors) == (7, 7, 7, 0)
+    assert seen == [(3, 3, False), (6, 6, False), (7, 7, False), (7, 7, True)]
+    assert repo.watermarks == {("v_test", "backfill:20250101-20250131"): 7}
+    assert progress.eta_sec == 0.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_watermark_after_crash():
+    repo = FakeRepo(range(1, 11))
+    repo.fail_after = 4
+    service = _service(repo, chunk_size=2, rows_per_sec=0)
+
+    with pytest.raises(RuntimeError):
+        await service.run()
+    assert repo.watermark_id == 4
+
+    repo.fail_after = None
+    progress = await service.run()
+
+    assert progress.total == 6
+    assert progress.done == 6
+    first_ids = [call.args[0][0][0] for call in service.lm_service.calculate_metrics_batch.await_args_list]
+    assert first_ids == [1, 3, 5, 7, 9]
+
+
+@pytest.mark.asyncio
+async def test_backfill_restart_ignores_watermark():
+    repo = FakeRepo(range(1, 5), watermark_id=4)
+    progress = await _service(repo, chunk_size=10, rows_per_sec=0).run(restart=True)
+
+    assert progress.done == 4
+
+
+@pytest.mark.asyncio
+async def test_backfill_throttles_to_target_rate(monkeypatch):
+    repo = FakeRepo(range(1, 5))
+    sleep = AsyncMock()
+    monkeypatch.setattr(lm_backfill.asyncio, "sleep", sleep)
+
+    await _service(repo, chunk_size=2, rows_per_sec=1).run()
+
+    delays = [call.args[0] for call in sleep.await_args_list]
+    assert len(delays) == 2
+    assert delays[0] == pytest.approx(2.0, abs=0.1)
+
+
+def test_progress_eta_and_profile():
+    progress = BackfillProgress(profile=backfill_profile(None, datetime(2025, 6, 30)), total=100, done=25, elapsed_sec=5.0)
+
+    assert progress.profile == "backfill:*-20250630"
+    assert progress.rate == pytest.approx(5.0)
+    assert progress.eta_sec == pytest.approx(15.0)
+    assert "25/100" in progress.summary()
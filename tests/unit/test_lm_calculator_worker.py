@@ -0,0 +1,86 @@
+"""
+Unit tests for the LM calculator worker pipeline.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.lm_incremental import IncrementalStats
+from app.workers.lm_calculator_worker import LMCalculatorWorker
+
+
+def _worker(**kwargs):
+    worker = LMCalculatorWorker(Mock(), **kwargs)
+    history = [{"history_id": i, "talk_duration": 60} for i in range(1, 11)]
+    worker.lm_repo.get_recent_calls_for_lm = AsyncMock(return_value=history)
+    worker.lm_repo.get_call_scores_map = AsyncMock(return_value={1: {"history_id": 1}})
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_pipeline_scores_in_chunks_and_bounds_writers():
+    worker = _worker(score_chunk_size=3, writers=2, write_queue_size=1)
+    active = 0
+    peak = 0
+
+    async def fake_batch(rows, calc_source):
+        return {history_id: [{"history_id": history_id}] for history_id, _, _ in rows if history_id != 5}
+
+    async def fake_save(payloads):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {history_id: len(rows) for history_id, rows in payloads.items()}
+
+    worker.lm_service.calculate_metrics_batch = AsyncMock(side_effect=fake_batch)
+    worker.lm_service.save_payloads_bulk = AsyncMock(side_effect=fake_save)
+
+    processed = await worker.process_recent_calls(hours_back=1, batch_size=10)
+
+    assert processed == 9
+    assert worker.lm_service.calculate_metrics_batch.await_count == 4
+    assert worker.lm_service.save_payloads_bulk.await_count == 4
+    assert peak <= 2
+    stats = worker.last_run_stats
+    assert (stats.fetched, stats.scored, stats.saved, stats.errors) == (10, 9, 9, 1)
+    assert stats.total_sec > 0 and stats.calls_per_sec > 0
+    worker.lm_repo.get_recent_calls_for_lm.assert_awaited_once()
+    assert worker.lm_repo.get_recent_calls_for_lm.await_args.kwargs == {"only_missing": True}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_counts_failed_writes_as_errors():
+    worker = _worker(score_chunk_size=5, writers=1)
+
+    async def fake_batch(rows, calc_source):
+        return {history_id: [{"history_id": history_id}] for history_id, _, _ in rows}
+
+    worker.lm_service.calculate_metrics_batch = AsyncMock(side_effect=fake_batch)
+    worker.lm_service.save_payloads_bulk = AsyncMock(
+        side_effect=[RuntimeError("db down"), {i: 1 for i in range(6, 11)}]
+    )
+
+    processed = await worker.process_recent_calls()
+
+    assert processed == 5
+    assert worker.last_run_stats.errors == 5
+
+
+@pytest.mark.asyncio
+async def test_forced_recalculation_goes_through_incremental_path():
+    worker = _worker()
+    history = [{"history_id": 1, "talk_duration": 60}, {"history_id": 2, "talk_duration": 30}]
+    worker.db_manager.execute_with_retry = AsyncMock(return_value=history)
+    worker.lm_repo.delete_lm_values_by_call = AsyncMock()
+    worker.incremental.process = AsyncMock(return_value=IncrementalStats(checked=2, recomputed=2, errors=1))
+
+    processed = await worker.process_specific_calls([1, 2], force=True)
+
+    assert processed == 1
+    worker.lm_repo.delete_lm_values_by_call.assert_not_called()
+    assert worker.incremental.process.await_args.kwargs == {"calc_source": "worker_specific", "force": True}
+    assert worker.last_incremental_stats.errors == 1
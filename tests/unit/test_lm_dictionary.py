@@ -0,0 +1,76 @@
+"""
+Unit tests for CompiledDictionary.
+"""
+
+import logging
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.db.repositories.lm_repository import LMRepository
+from app.services.lm_dictionary import CompiledDictionary
+from app.services.lm_service import LMService
+
+TERMS = [
+    {"term": "Жалоб", "match_type": "stem", "weight": 5},
+    {"term": "аа", "match_type": "phrase", "weight": 1},
+    {"term": r"верн\w+ деньги", "match_type": "regex", "weight": 7, "is_negative": 0},
+    {"term": "([", "match_type": "regex", "weight": 3},
+    {"term": "без веса", "match_type": "phrase", "weight": 0},
+    {"term": "нет такого", "match_type": "phrase", "weight": 2},
+]
+
+TRANSCRIPT = "Пишу жалобу. Аааа! Верните деньги, или снова жалоба. верну деньги"
+
+
+def _snippet(text, start, end):
+    return f"{start}:{end}"
+
+
+def test_scan_reports_hits_in_dictionary_order():
+    compiled = CompiledDictionary(TERMS, dict_code="complaint_risk", version="v1")
+    hits = compiled.scan(TRANSCRIPT, _snippet)
+
+    assert [(hit["term"], hit["hit_count"]) for hit in hits] == [
+        ("Жалоб", 2),
+        ("аа", 2),
+        (r"верн\w+ деньги", 2),
+    ]
+    lowered = TRANSCRIPT.lower()
+    assert hits[0]["snippet"] == f"{lowered.find('жалоб')}:{lowered.find('жалоб') + 5}"
+    assert hits[0]["match_type"] == "stem"
+    assert hits[2]["is_negative"] is False
+
+
+def test_invalid_regex_is_reported_once_at_compile_time(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.services.lm_dictionary"):
+        compiled = CompiledDictionary(TERMS, dict_code="complaint_risk", version="v1")
+        for _ in range(3):
+            compiled.scan(TRANSCRIPT, _snippet)
+
+    warnings = [record for record in caplog.records if "Неверное регулярное" in record.getMessage()]
+    assert len(warnings) == 1
+    assert compiled.invalid_terms == ["(["]
+    assert len(compiled) == 4
+
+
+@pytest.mark.asyncio
+async def test_service_compiles_dictionary_once_per_version():
+    dictionary_repo = Mock()
+    dictionary_repo.get_terms = AsyncMock(return_value=TERMS)
+    service = LMService(Mock(spec=LMRepository), dictionary_repository=dictionary_repo, dictionary_version="v2")
+
+    first = await service._get_dictionary_terms("complaint_risk")
+    second = await service._get_dictionary_terms("complaint_risk")
+
+    assert first is second
+    assert isinstance(first, CompiledDictionary)
+    assert first.version == "v2"
+    dictionary_repo.get_terms.assert_awaited_once_with("complaint_risk", version="v2")
+
+    def _strip_time(hits):
+        return [{key: value for key, value in hit.items() if key != "detected_at"} for hit in hits]
+
+    assert _strip_time(service._scan_dictionary_terms(TRANSCRIPT, first)) == _strip_time(
+        service._scan_dictionary_terms(TRANSCRIPT, TERMS)
+    )
@@ -0,0 +1,178 @@
+"""
+Unit tests for batched, idempotent dictionary-hit writes.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.db.repositories.lm_dictionary_repository import (
+    LMDictionaryRepository,
+    build_hit_rows,
+    stale_hit_deletes,
+)
+from app.services.lm_hits_writer import DictionaryHitWriter
+from app.services.lm_service import LMService
+
+HITS = [
+    {"term": "жалоб", "match_type": "stem", "weight": 20, "hit_count": 2, "snippet": "...", "detected_at": "2025-01-01T10:00:00"},
+    {"term": "суд", "weight": 30},
+    {"term": "", "weight": 5},
+]
+
+
+def test_build_hit_rows_skips_empty_terms():
+    rows = build_hit_rows(7, "complaint_risk", HITS, "v1")
+
+    assert [row[2] for row in rows] == ["жалоб", "суд"]
+    assert rows[0][:8] == (7, "complaint_risk", "жалоб", "stem", 20, 2, "...", "v1")
+    assert rows[1][3:6] == ("phrase", 30, 1)
+
+
+@pytest.mark.asyncio
+async def test_save_hit_rows_uses_one_upsert_per_chunk():
+    db = Mock()
+    db.execute_with_retry = AsyncMock()
+    repo = LMDictionaryRepository(db)
+    rows = build_hit_rows(1, "complaint_risk", HITS, "v1") * 3
+
+    assert await repo.save_hit_rows(rows, chunk_size=4) == 6
+
+    assert db.execute_with_retry.await_count == 2
+    query, params = db.execute_with_retry.await_args_list[0].args
+    assert "ON DUPLICATE KEY UPDATE" in query
+    assert query.count("(%s, %s, %s, %s, %s, %s, %s, %s, %s)") == 4
+    assert len(params) == 4 * 9
+
+
+@pytest.mark.asyncio
+async def test_unbuffered_writer_writes_immediately():
+    repo = Mock()
+    repo.save_hit_rows = AsyncMock(return_value=2)
+    writer = DictionaryHitWriter(repo, buffer_rows=0)
+
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS, "v1"))
+
+    repo.save_hit_rows.assert_awaited_once()
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_buffer_coalesces_keys_and_flushes_on_size_and_close():
+    repo = Mock()
+    repo.save_hit_rows = AsyncMock(side_effect=lambda rows, **kwargs: len(rows))
+    writer = DictionaryHitWriter(repo, buffer_rows=4, flush_interval_sec=0)
+
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS, "v1"))
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS, "v1"))
+    assert writer.pending == 2
+    repo.save_hit_rows.assert_not_awaited()
+
+    await writer.write(build_hit_rows(2, "complaint_risk", HITS, "v1"))
+    assert writer.pending == 0
+    assert len(repo.save_hit_rows.await_args.args[0]) == 4
+
+    await writer.write(build_hit_rows(3, "complaint_risk", HITS, "v1"))
+    await writer.close()
+    assert repo.save_hit_rows.await_count == 2
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushes_on_interval_and_survives_errors():
+    repo = Mock()
+    repo.save_hit_rows = AsyncMock(side_effect=[RuntimeError("db down"), 2])
+    writer = DictionaryHitWriter(repo, buffer_rows=100, flush_interval_sec=0.01)
+
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS, "v1"))
+    await asyncio.sleep(0.05)
+    await writer.write(build_hit_rows(2, "complaint_risk", HITS, "v1"))
+    await asyncio.sleep(0.05)
+    await writer.close()
+
+    assert repo.save_hit_rows.await_count == 2
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_calculation_writes_hits_once_per_batch():
+    dictionary_repo = Mock()
+    dictionary_repo.get_terms = AsyncMock(return_value=[{"term": "жалоб", "match_type": "stem", "weight": 40}])
+    dictionary_repo.save_hit_rows = AsyncMock(side_effect=lambda rows, **kwargs: len(rows))
+    service = LMService(Mock(), dictionary_repository=dictionary_repo)
+    service.hit_writer.buffer_rows = 0
+    transcript = (
+        "Клиент: вы меня обманули, я буду жаловаться\n"
+        "Оператор: понимаю\n"
+        "Клиент: напишу жалобу в прокуратуру"
+    )
+    rows = [
+        (history_id, {"history_id": history_id, "talk_duration": 120}, {"transcript": transcript, "outcome": "lead_no_record"})
+        for history_id in (1, 2, 3)
+    ]
+
+    await service.calculate_metrics_batch(rows)
+
+    dictionary_repo.save_hit_rows.assert_awaited_once()
+    written = dictionary_repo.save_hit_rows.await_args.args[0]
+    assert {row[0] for row in written} == {1, 2, 3}
+    assert dictionary_repo.save_hit_rows.await_args.kwargs["replace_scopes"] == {
+        (history_id, "complaint_risk", service.dictionary_version) for history_id in (1, 2, 3)
+    }
+
+
+def test_stale_hit_deletes_keep_only_new_terms():
+    rows = build_hit_rows(1, "complaint_risk", HITS, "v1")
+
+    (query, params), = stale_hit_deletes([(1, "complaint_risk", "v1"), (2, "complaint_risk", "v1")], rows)
+
+    assert query.startswith("DELETE FROM lm_dictionary_hits")
+    assert "history_id IN (%s, %s)" in query
+    assert "(history_id, term) NOT IN ((%s, %s), (%s, %s))" in query
+    assert params == ("complaint_risk", "v1", 1, 2, 1, "жалоб", 1, "суд")
+
+
+def test_stale_hit_deletes_remove_all_rows_of_call_without_hits():
+    (query, params), = stale_hit_deletes([(5, "complaint_risk", "v1")], [])
+
+    assert "NOT IN" not in query
+    assert params == ("complaint_risk", "v1", 5)
+
+
+@pytest.mark.asyncio
+async def test_save_hit_rows_with_scopes_deletes_and_upserts_in_one_transaction():
+    tx = Mock()
+    tx.execute = AsyncMock()
+
+    async def run_in_transaction(work, **kwargs):
+        return await work(tx)
+
+    db = Mock()
+    db.run_in_transaction = AsyncMock(side_effect=run_in_transaction)
+    db.execute_with_retry = AsyncMock()
+    repo = LMDictionaryRepository(db)
+    rows = build_hit_rows(1, "complaint_risk", HITS[:1], "v1")
+
+    assert await repo.save_hit_rows(rows, replace_scopes=[(1, "complaint_risk", "v1")]) == 1
+
+    db.execute_with_retry.assert_not_awaited()
+    names = [call.kwargs["query_name"] for call in tx.execute.await_args_list]
+    assert names == ["lm_dictionary.delete_stale_hits", "lm_dictionary.save_hits"]
+
+
+@pytest.mark.asyncio
+async def test_buffered_recalculation_replaces_pending_hits_of_call():
+    repo = Mock()
+    repo.save_hit_rows = AsyncMock(side_effect=lambda rows, **kwargs: len(rows))
+    writer = DictionaryHitWriter(repo, buffer_rows=100, flush_interval_sec=0)
+    scope = (1, "complaint_risk", "v1")
+
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS, "v1"), scopes=[scope])
+    await writer.write(build_hit_rows(1, "complaint_risk", HITS[1:2], "v1"), scopes=[scope])
+    await writer.write([], scopes=[(2, "complaint_risk", "v1")])
+    await writer.close()
+
+    rows = repo.save_hit_rows.await_args.args[0]
+    assert [row[2] for row in rows] == ["суд"]
+    assert repo.save_hit_rows.await_args.kwargs["replace_scopes"] == {scope, (2, "complaint_risk", "v1")}
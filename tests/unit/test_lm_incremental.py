@@ -0,0 +1,226 @@
+"""
+Unit tests for fingerprint-driven incremental LM recomputation.
+"""
+
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.lm_dictionary import CompiledDictionary
+from app.services.lm_incremental import LMIncrementalRecalculator, input_fingerprint, metric_state
+from app.services.lm_service import LMService
+
+
+class FakeLMStore:
+    """lm_value и lm_input_fingerprint в памяти; value_json хранится строкой, как в БД."""
+
+    def __init__(self):
+        self.values = {}
+        self.fingerprints = {}
+        self.written = []
+        self.deleted = []
+
+    async def get_input_fingerprints(self, history_ids):
+        return {hid: self.fingerprints[hid] for hid in history_ids if hid in self.fingerprints}
+
+    async def save_input_fingerprints(self, fingerprints, lm_version):
+        self.fingerprints.update(fingerprints)
+
+    async def delete_input_fingerprints(self, history_ids):
+        for hid in history_ids:
+            self.fingerprints.pop(hid, None)
+
+    async def get_lm_value_snapshot(self, history_ids):
+        snapshot = {}
+        for (hid, _), row in self.values.items():
+            if hid in history_ids:
+                snapshot.setdefault(hid, []).append(dict(row))
+        return snapshot
+
+    async def save_lm_values_bulk(self, rows):
+        statuses = []
+        for row in rows:
+            stored = dict(row)
+            stored["value_json"] = json.dumps(row["value_json"]) if row.get("value_json") else None
+            self.values[(row["history_id"], row["metric_code"])] = stored
+            self.written.append((row["history_id"], row["metric_code"]))
+            statuses.append({"history_id": row["history_id"], "metric_code": row["metric_code"], "status": "saved"})
+        return statuses
+
+    async def delete_lm_metrics(self, history_id, metric_codes):
+        for code in metric_codes:
+            self.values.pop((history_id, code), None)
+            self.deleted.append((history_id, code))
+        return len(metric_codes)
+
+
+def _rows(outcome="record"):
+    return [
+        (1, {"history_id": 1, "talk_duration": 90, "await_sec": 10}, {"id": 11, "outcome": outcome, "call_score": 8}),
+        (2, {"history_id": 2, "talk_duration": 30, "await_sec": 50}, {"id": 12, "outcome": "info_only", "call_score": 5}),
+    ]
+
+
+def _recalculator():
+    store = FakeLMStore()
+    service = LMService(Mock())
+    service.calculate_metrics_batch = AsyncMock(wraps=service.calculate_metrics_batch)
+    return store, service, LMIncrementalRecalculator(store, service)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_inputs_skip_recomputation():
+    store, service, recalculator = _recalculator()
+
+    first = await recalculator.process(_rows())
+    assert (first.recomputed, first.unchanged, first.errors) == (2, 0, 0)
+    assert first.rows_written == len(store.values)
+    assert set(store.fingerprints) == {1, 2}
+
+    second = await recalculator.process(_rows())
+
+    assert (second.recomputed, second.unchanged, second.rows_written) == (0, 2, 0)
+    assert service.calculate_metrics_batch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_call_writes_only_differing_rows_and_drops_stale_metrics():
+    store, service, recalculator = _recalculator()
+    await recalculator.process(_rows())
+    store.values[(1, "obsolete_metric")] = {"history_id": 1, "metric_code": "obsolete_metric", "value_numeric": 1}
+    store.written.clear()
+
+    stats = await recalculator.process(_rows(outcome="lead_no_record"))
+
+    assert (stats.recomputed, stats.unchanged) == (1, 1)
+    written = {code for hid, code in store.written}
+    assert {hid for hid, _ in store.written} == {1}
+    assert "conversion_score" in written
+    assert "talk_efficiency" not in written and "response_speed" not in written
+    assert stats.rows_skipped > 0
+    assert store.deleted == [(1, "obsolete_metric")]
+
+
+@pytest.mark.asyncio
+async def test_force_recomputes_but_still_writes_by_diff():
+    store, _, recalculator = _recalculator()
+    await recalculator.process(_rows())
+
+    stats = await recalculator.process(_rows(), force=True)
+
+    assert stats.recomputed == 2
+    assert stats.rows_written == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_forced_write_drops_fingerprint_so_next_run_recomputes():
+    store, service, recalculator = _recalculator()
+    await recalculator.process(_rows())
+    saved = store.save_lm_values_bulk
+    for key in [key for key in store.values if key[0] == 1]:
+        del store.values[key]
+
+    async def failing_for_first(rows):
+        return [
+            {"history_id": row["history_id"], "status": "failed" if row["history_id"] == 1 else "saved"}
+            for row in rows
+        ]
+
+    store.save_lm_values_bulk = failing_for_first
+    forced = await recalculator.process(_rows(), force=True)
+
+    assert forced.errors == 1
+    assert set(store.fingerprints) == {2}
+
+    store.save_lm_values_bulk = saved
+    store.written.clear()
+    again = await recalculator.process(_rows())
+
+    assert (again.recomputed, again.unchanged, again.errors) == (1, 1, 0)
+    assert {hid for hid, _ in store.written} == {1}
+    assert set(store.fingerprints) == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_failed_write_saves_no_fingerprint():
+    store, _, recalculator = _recalculator()
+
+    async def failing(rows):
+        return [{"history_id": row["history_id"], "status": "failed"} for row in rows]
+
+    store.save_lm_values_bulk = failing
+    stats = await recalculator.process(_rows())
+
+    assert stats.errors == 2 and stats.up_to_date == 0
+    assert store.fingerprints == {}
+
+
+@pytest.mark.asyncio
+async def test_dictionary_edit_recomputes_only_calls_with_affected_terms():
+    terms = [{"term": "жалоба", "match_type": "phrase", "weight": 10}]
+    dictionary_repo = Mock()
+    dictionary_repo.get_terms = AsyncMock(side_effect=lambda *args, **kwargs: [dict(term) for term in terms])
+    dictionary_repo.save_hit_rows = AsyncMock(side_effect=lambda rows, **kwargs: len(rows))
+    store = FakeLMStore()
+    service = LMService(Mock(), dictionary_repository=dictionary_repo)
+    recalculator = LMIncrementalRecalculator(store, service)
+    rows = [
+        (1, {"history_id": 1, "talk_duration": 90}, {"id": 11, "transcript": "Клиент: у меня жалоба на врача"}),
+        (2, {"history_id": 2, "talk_duration": 60}, {"id": 12, "transcript": "Клиент: хочу записаться"}),
+        (3, {"history_id": 3, "talk_duration": 45}, {"id": 13, "transcript": "Клиент: напишу в суд"}),
+    ]
+    await recalculator.process(rows)
+
+    # Новый термин встречается только в звонке 3, у "жалоба" изменился вес (звонок 1)
+    terms.append({"term": "суд", "match_type": "phrase", "weight": 20})
+    terms[0] = {**terms[0], "weight": 15}
+    service._dictionary_cache.clear()
+    service.calculate_metrics_batch = AsyncMock(wraps=service.calculate_metrics_batch)
+
+    stats = await recalculator.process(rows)
+
+    assert (stats.recomputed, stats.unchanged) == (2, 1)
+    recomputed = [row[0] for row in service.calculate_metrics_batch.await_args.args[0]]
+    assert sorted(recomputed) == [1, 3]
+
+
+def test_fingerprint_tracks_inputs_and_rules():
+    h_rec = {"talk_duration": 60, "await_sec": 5, "ignored": "x"}
+    s_rec = {"transcript": "Алло", "outcome": "record", "updated_at": "2025-01-01"}
+    base = input_fingerprint("v1|dict=a|weights=b", h_rec, s_rec)
+
+    assert input_fingerprint("v1|dict=a|weights=b", {**h_rec, "ignored": "y"}, {**s_rec, "updated_at": "z"}) == base
+    assert input_fingerprint("v1|dict=a|weights=b", h_rec, {**s_rec, "transcript": "Алло!"}) != base
+    assert input_fingerprint("v1|dict=c|weights=b", h_rec, s_rec) != base
+
+    assert input_fingerprint("v1|dict=a|weights=b", h_rec, s_rec, "terms") != base
+
+    terms = [{"term": "жалоба", "match_type": "phrase", "weight": 10}]
+    assert CompiledDictionary(terms).fingerprint == CompiledDictionary(list(terms)).fingerprint
+    assert CompiledDictionary(terms).fingerprint != CompiledDictionary([{**terms[0], "weight": 20}]).fingerprint
+
+    text = "Это жалоба"
+    key = CompiledDictionary(terms).matched_terms_key(text)
+    assert CompiledDictionary(terms).matched_terms_key("Все хорошо") == "-"
+    assert CompiledDictionary(terms + [{"term": "суд", "weight": 5}]).matched_terms_key(text) == key
+    assert CompiledDictionary([{**terms[0], "weight": 20}]).matched_terms_key(text) != key
+    assert CompiledDictionary([{"term": "жалоб[аы]", "match_type": "regex", "weight": 10}]).matched_terms_key(text) != "-"
+
+
+def test_metric_state_ignores_volatile_json_and_db_representation():
+    fresh = {
+        "history_id": 1,
+        "metric_code": "complaint_risk_flag",
+        "metric_group": "risk",
+        "value_numeric": 12.34,
+        "value_json": {"hits": [{"term": "суд", "detected_at": "2025-01-01T00:00:00"}]},
+    }
+    stored = {
+        **fresh,
+        "value_numeric": "12.3400",
+        "value_json": json.dumps({"hits": [{"term": "суд", "detected_at": "2025-02-02T00:00:00"}]}),
+    }
+
+    assert metric_state(fresh) == metric_state(stored)
+    assert metric_state(fresh) != metric_state({**stored, "value_numeric": "12.3500"})
@@ -188,6 +188,55 @@ class TestLMRepository:
         # Should succeed for 2 out of 3
         assert count == 2
 
+    @pytest.mark.asyncio
+    async def test_save_lm_values_bulk_single_statement(self, lm_repo, mock_db_manager):
+        """Bulk mode writes all rows in one multi-row upsert without SELECT id."""
+        mock_db_manager.execute_with_retry.return_value = True
+        values = [
+            {
+                'history_id': history_id,
+                'metric_code': metric_code,
+                'metric_group': 'conversion',
+                'lm_version': 'test_v1',
+                'calc_method': 'rule',
+                'value_numeric': 10.0,
+            }
+            for history_id in (1, 2)
+            for metric_code in ('conversion_score', 'cross_sell_potential')
+        ]
+        values.append({'history_id': 3, 'metric_code': 'empty', 'metric_group': 'aux',
+                       'lm_version': 'test_v1', 'calc_method': 'rule'})
+
+        statuses = await lm_repo.save_lm_values_bulk(values)
+
+        assert [s['status'] for s in statuses] == ['saved'] * 4 + ['invalid']
+        assert mock_db_manager.execute_with_retry.call_count == 1
+        query, params = mock_db_manager.execute_with_retry.call_args[0][:2]
+        assert query.count('(%s, %s') == 4
+        assert 'ON DUPLICATE KEY UPDATE' in query
+        assert len(params) == 4 * 12
+
+    @pytest.mark.asyncio
+    async def test_save_lm_values_bulk_chunk_failure(self, lm_repo, mock_db_manager):
+        """A failed chunk marks only its own rows as failed."""
+        mock_db_manager.execute_with_retry.side_effect = [Exception("DB error"), True, True]
+        values = [
+            {
+                'history_id': 123,
+                'metric_code': f'metric{i}',
+                'metric_group': 'operational',
+                'lm_version': 'test_v1',
+                'calc_method': 'rule',
+                'value_numeric': float(i),
+            }
+            for i in range(3)
+        ]
+
+        statuses = await lm_repo.save_lm_values_bulk(values, chunk_size=2)
+
+        assert [s['status'] for s in statuses] == ['failed', 'failed', 'saved']
+        assert await lm_repo.save_lm_values_batch(values[2:], bulk=True) == 1
+
     @pytest.mark.asyncio
     async def test_get_lm_values_by_call(self, lm_repo, mock_db_manager):
         """Test retrieving LM values for a specific call."""
@@ -497,6 +546,25 @@ class TestLMRepository:
         assert count == 5
         mock_db_manager.execute_with_retry.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_delete_lm_metrics_returns_rowcount(self, lm_repo, mock_db_manager):
+        """Stale metric delete reports the DELETE rowcount, not a success flag."""
+        tx = Mock()
+        tx.execute = AsyncMock(return_value=2)
+
+        async def run_in_transaction(work, **kwargs):
+            return await work(tx)
+
+        mock_db_manager.run_in_transaction = AsyncMock(side_effect=run_in_transaction)
+
+        count = await lm_repo.delete_lm_metrics(123, ["a", "b", "c"])
+
+        assert count == 2
+        query, params = tx.execute.await_args.args
+        assert "metric_code IN (%s, %s, %s)" in query
+        assert params == (123, "a", "b", "c")
+        mock_db_manager.execute_with_retry.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_get_metric_statistics(self, lm_repo, mock_db_manager):
         """Test getting statistics for a metric."""
@@ -467,3 +467,99 @@ class TestLMService:
         
         # Return value should be saved count
         assert count == 10
+
+    @pytest.mark.asyncio
+    async def test_calculate_metrics_batch_matches_single_call(self, lm_service, sample_call_history, sample_call_score):
+        """Поколоночный батч даёт те же строки, что и расчёт по одному звонку."""
+        rows = [
+            (1, sample_call_history, sample_call_score),
+            (2, {**sample_call_history, 'talk_duration': 0.5, 'await_sec': 10}, None),
+            (3, {**sample_call_history, 'talk_duration': '45', 'await_sec': 40}, {
+                **sample_call_score,
+                'outcome': 'lead_no_record',
+                'call_score': None,
+                'number_checklist': 'n/a',
+            }),
+            (4, {**sample_call_history, 'talk_duration': 900, 'await_sec': 119.5}, {
+                **sample_call_score,
+                'outcome': 'info_only',
+                'is_target': 0,
+            }),
+        ]
+
+        batch = await lm_service.calculate_metrics_batch(rows, calc_source="test")
+
+        assert list(batch) == [1, 2, 3, 4]
+        for history_id, h_rec, s_rec in rows:
+            single = await lm_service.build_metrics_payload(history_id, h_rec, s_rec, calc_source="test")
+            assert batch[history_id] == single
+
+    @pytest.mark.asyncio
+    async def test_calculate_metrics_batch_skips_failed_call(self, lm_service, sample_call_history, sample_call_score):
+        """Ошибка расчёта одного звонка не валит весь батч."""
+        original = lm_service._calculate_lost_opportunity
+
+        def flaky(h_rec, s_rec):
+            if h_rec.get('history_id') == 2:
+                raise RuntimeError("boom")
+            return original(h_rec, s_rec)
+
+        lm_service._calculate_lost_opportunity = flaky
+        rows = [
+            (1, sample_call_history, sample_call_score),
+            (2, {**sample_call_history, 'history_id': 2}, sample_call_score),
+        ]
+
+        batch = await lm_service.calculate_metrics_batch(rows)
+
+        assert list(batch) == [1]
+
+    @pytest.mark.asyncio
+    async def test_call_analysis_is_computed_once_per_call(self, lm_service, sample_call_history, sample_call_score, monkeypatch, caplog):
+        """Классификация причины и перезвон считаются один раз на звонок, даже с debug-логом."""
+        score = {**sample_call_score, 'transcript': "Оператор: здравствуйте\nКлиент: дорого, подумаю", 'outcome': 'lead_no_record'}
+        classify = Mock(wraps=lm_service._classify_followup_reason)
+        followup = Mock(wraps=lm_service._calculate_followup_needed)
+        monkeypatch.setattr(lm_service, '_classify_followup_reason', classify)
+        monkeypatch.setattr(lm_service, '_calculate_followup_needed', followup)
+
+        with caplog.at_level('DEBUG', logger='app.services.lm_service'):
+            await lm_service.build_metrics_payload(1, sample_call_history, score)
+
+        assert classify.call_count == 1
+        assert followup.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_calculate_metrics_batch_in_process_pool_matches_in_loop(self, mock_lm_repo, sample_call_history, sample_call_score):
+        """Расчет в пуле процессов дает те же строки, что и в event loop."""
+        from app.services.lm_executor import create_lm_executor, shutdown_lm_executor
+
+        rows = [
+            (1, sample_call_history, sample_call_score),
+            (2, {**sample_call_history, 'history_id': 2, 'talk_duration': 5}, None),
+        ]
+        in_loop = await LMService(mock_lm_repo, lm_version="test_v1").calculate_metrics_batch(rows)
+
+        executor = create_lm_executor(1)
+        try:
+            pooled_service = LMService(mock_lm_repo, lm_version="test_v1", executor=executor)
+            pooled = await pooled_service.calculate_metrics_batch(rows)
+        finally:
+            shutdown_lm_executor(executor)
+
+        assert pooled == in_loop
+        assert pooled_service.executor is executor
+
+    @pytest.mark.asyncio
+    async def test_calculate_metrics_batch_falls_back_when_pool_is_broken(self, mock_lm_repo, sample_call_history, sample_call_score):
+        """Сломанный пул отключается, расчет выполняется в текущем процессе."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        service = LMService(mock_lm_repo, lm_version="test_v1", executor=executor)
+
+        payloads = await service.calculate_metrics_batch([(1, sample_call_history, sample_call_score)])
+
+        assert list(payloads) == [1]
+        assert service.executor is None
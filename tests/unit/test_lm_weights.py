@@ -1,3 +1,6 @@
+import json
+import os
+import time
 from pathlib import Path
 
 from app.services.lm_weights import ComplaintWeightMatrix, DEFAULT_MATRIX
@@ -10,3 +13,77 @@ def test_lm_weights_load_invalid_json_falls_back(tmp_path):
     matrix = ComplaintWeightMatrix(path=str(bad_file))
 
     assert matrix.thresholds == DEFAULT_MATRIX["thresholds"]
+
+
+def _write(path, config):
+    path.write_text(json.dumps(config), encoding="utf-8")
+
+
+def test_snapshot_matches_config_semantics(tmp_path):
+    path = tmp_path / "lm_weight_matrix.json"
+    _write(path, {"categories": {"spam": {"multiplier": "bad", "bias": -10}, "other": {}}})
+
+    snapshot = ComplaintWeightMatrix(path=str(path)).snapshot
+
+    assert snapshot.apply_multiplier("legal", 10.0) == 13.0
+    assert snapshot.apply_multiplier("spam", 10.0) == 0.0
+    assert snapshot.apply_multiplier("other", 10.0) == 10.0
+    assert snapshot.apply_multiplier("process", 10.0) == 11.0
+    assert snapshot.apply_multiplier(None, 10.0) == 10.0
+    assert snapshot.resolve_threshold("complaint_score", 1.0) == 60.0
+    assert snapshot.resolve_threshold("missing", 1.0) == 1.0
+
+
+def test_reload_swaps_snapshot_when_file_changes(tmp_path):
+    path = tmp_path / "lm_weight_matrix.json"
+    _write(path, {"categories": {"legal": {"multiplier": 1.5}}})
+    matrix = ComplaintWeightMatrix(path=str(path), reload_interval_sec=0)
+    before = matrix.snapshot
+
+    assert matrix.reload() is False
+
+    _write(path, {"categories": {"legal": {"multiplier": 2.0}}})
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert matrix.reload() is True
+
+    assert matrix.version == before.version + 1
+    assert matrix.apply_multiplier("legal", 10.0) == 20.0
+    assert before.apply_multiplier("legal", 10.0) == 15.0
+    assert matrix.fingerprint != before.fingerprint
+
+
+def test_broken_file_keeps_current_weights(tmp_path):
+    path = tmp_path / "lm_weight_matrix.json"
+    _write(path, {"categories": {"legal": {"multiplier": 1.5}}})
+    matrix = ComplaintWeightMatrix(path=str(path))
+
+    path.write_text("{half-written", encoding="utf-8")
+
+    assert matrix.reload(force=True) is False
+    assert matrix.version == 1
+    assert matrix.apply_multiplier("legal", 10.0) == 15.0
+
+
+def test_maybe_reload_respects_interval(tmp_path):
+    path = tmp_path / "lm_weight_matrix.json"
+    _write(path, {})
+    matrix = ComplaintWeightMatrix(path=str(path), reload_interval_sec=3600)
+    _write(path, {"thresholds": {"complaint_score": 70}})
+
+    assert matrix.maybe_reload() is False
+    assert matrix.reload() is True
+    assert matrix.resolve_threshold("complaint_score", 0.0) == 70.0
+
+
+def test_setters_publish_new_version_and_save_round_trips(tmp_path):
+    path = tmp_path / "lm_weight_matrix.json"
+    matrix = ComplaintWeightMatrix(path=str(path))
+
+    matrix.set_category_params("legal", multiplier=2.0, bias=1.0)
+    matrix.set_category_params("legal", multiplier=2.0, bias=1.0)
+    matrix.save()
+
+    assert matrix.version == 2
+    assert matrix.apply_multiplier("legal", 10.0) == 21.0
+    assert matrix.reload() is False
+    assert ComplaintWeightMatrix(path=str(path)).fingerprint == matrix.fingerprint
@@ -0,0 +1,157 @@
+"""
+Unit tests for the LM write-behind queue and result cache.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.lm_service import LMService
+from app.services.lm_write_behind import LMWriteBehind
+
+
+def _row(history_id, metric_code, value):
+    return {
+        "history_id": history_id,
+        "metric_code": metric_code,
+        "metric_group": "quality",
+        "value_numeric": value,
+    }
+
+
+def _repo(fail_first=False):
+    repo = Mock()
+    calls = []
+
+    async def save(rows):
+        calls.append([(row["history_id"], row["metric_code"], row["value_numeric"]) for row in rows])
+        if fail_first and len(calls) == 1:
+            raise RuntimeError("db down")
+        return [{"history_id": row["history_id"], "status": "saved"} for row in rows]
+
+    repo.save_lm_values_bulk = AsyncMock(side_effect=save)
+    return repo, calls
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_immediately_and_coalesced_on_flush():
+    repo, calls = _repo()
+    queue = LMWriteBehind(repo, flush_rows=100, flush_interval_ms=10)
+
+    await queue.submit({1: [_row(1, "normalized_score", 10.123456)]})
+    await queue.submit({1: [_row(1, "normalized_score", 20.0)], 2: [_row(2, "normalized_score", 5)]})
+
+    cached = queue.get_cached(1)
+    assert cached[0]["value_numeric"] == 20.0
+    assert queue.get_cached(3) is None
+    repo.save_lm_values_bulk.assert_not_awaited()
+
+    await asyncio.sleep(0.05)
+
+    assert calls == [[(1, "normalized_score", 20.0), (2, "normalized_score", 5)]]
+    assert queue.pending == 0
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_row_limit_reached():
+    repo, calls = _repo()
+    queue = LMWriteBehind(repo, flush_rows=3, flush_interval_ms=0)
+
+    await queue.submit({1: [_row(1, "a", 1), _row(1, "b", 2)]})
+    assert calls == []
+    await queue.submit({2: [_row(2, "a", 3)]})
+
+    assert len(calls) == 1 and len(calls[0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_without_overwriting_newer_rows():
+    repo, calls = _repo(fail_first=True)
+    queue = LMWriteBehind(repo, flush_rows=100, flush_interval_ms=0)
+
+    await queue.submit({1: [_row(1, "a", 1), _row(1, "b", 2)]})
+    assert await queue.flush() == 0
+    assert queue.pending == 2
+
+    await queue.submit({1: [_row(1, "a", 10)]})
+    await queue.close()
+
+    assert sorted(calls[-1]) == [(1, "a", 10), (1, "b", 2)]
+    assert queue.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_expires_after_ttl():
+    repo, _ = _repo()
+    queue = LMWriteBehind(repo, flush_interval_ms=0, cache_ttl_sec=0)
+
+    await queue.submit({1: [_row(1, "a", 1)]})
+    await asyncio.sleep(0.01)
+
+    assert queue.get_cached(1) is None
+
+
+@pytest.mark.asyncio
+async def test_on_demand_calculation_goes_through_write_behind():
+    repo, calls = _repo()
+    lm_repo = Mock()
+    lm_repo.save_lm_values_batch = AsyncMock()
+    queue = LMWriteBehind(repo, flush_interval_ms=0)
+    service = LMService(lm_repo, write_behind=queue)
+
+    saved = await service.calculate_all_metrics(
+        5,
+        {"history_id": 5, "talk_duration": 90, "await_sec": 10},
+        {"id": 50, "outcome": "record", "call_score": 8},
+        calc_source="on_demand",
+    )
+
+    assert saved > 0
+    lm_repo.save_lm_values_batch.assert_not_awaited()
+    codes = {row["metric_code"] for row in service.cached_metrics(5)}
+    assert "conversion_score" in codes
+    assert calls == []
+
+    assert await service.flush_pending_writes() is True
+    assert len(calls[0]) == saved
+
+
+@pytest.mark.asyncio
+async def test_row_that_keeps_failing_is_dropped_after_max_attempts():
+    repo = Mock()
+
+    async def save(rows):
+        return [
+            {"history_id": row["history_id"], "status": "failed" if row["metric_code"] == "bad" else "saved"}
+            for row in rows
+        ]
+
+    repo.save_lm_values_bulk = AsyncMock(side_effect=save)
+    queue = LMWriteBehind(repo, flush_rows=100, flush_interval_ms=0, max_attempts=3)
+
+    await queue.submit({1: [_row(1, "bad", 1), _row(1, "good", 2)]})
+    assert await queue.flush() == 1
+    assert queue.pending == 1
+    await queue.flush()
+    assert queue.pending == 1
+    await queue.flush()
+
+    assert queue.pending == 0
+    assert repo.save_lm_values_bulk.await_count == 3
+    assert not queue._attempts
+
+
+@pytest.mark.asyncio
+async def test_submit_writes_directly_when_queue_is_full():
+    repo, calls = _repo()
+    queue = LMWriteBehind(repo, flush_rows=100, flush_interval_ms=0, max_pending=2)
+
+    await queue.submit({1: [_row(1, "a", 1), _row(1, "b", 2)]})
+    accepted = await queue.submit({1: [_row(1, "a", 3)], 2: [_row(2, "a", 4), _row(2, "b", 5)]})
+
+    assert accepted == {1: 1, 2: 2}
+    assert calls == [[(2, "a", 4), (2, "b", 5)]]
+    assert queue.pending == 2
+    assert queue.get_cached(2)[0]["value_numeric"] == 4
@@ -54,6 +54,18 @@ class _DummyDBManager:
         return values
 
 
+class _RowsDBManager(_DummyDBManager):
+    """Мок, отдающий заранее заданные строки на fetchall."""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+
+    async def execute_with_retry(self, query, params=None, fetchone=False, fetchall=False):
+        await super().execute_with_retry(query, params, fetchone, fetchall)
+        return self.rows if fetchall else None
+
+
 @pytest.mark.asyncio
 async def test_get_quality_summary_queries_are_safe():
     db = _DummyDBManager()
@@ -88,3 +100,57 @@ def test_build_call_scores_query_keeps_optional_when_unknown():
         available_columns=None,
     )
     assert "cs.objection_present" in query
+
+
+def test_build_call_scores_query_reuses_cached_text():
+    first = OperatorRepository._build_call_scores_query(
+        ["cs.id"],
+        ["objection_present"],
+        available_columns={"objection_present"},
+    )
+    second = OperatorRepository._build_call_scores_query(
+        ["cs.id"],
+        ["objection_present"],
+        available_columns={"objection_present"},
+    )
+    other = OperatorRepository._build_call_scores_query(
+        ["cs.id"],
+        ["objection_present"],
+        available_columns=set(),
+    )
+    assert first is second
+    assert "NULL AS objection_present" in other
+
+
+@pytest.mark.asyncio
+async def test_get_approved_operators_selects_only_users_columns():
+    db = _DummyDBManager()
+    repo = OperatorRepository(db)
+
+    await repo.get_approved_operators()
+
+    query = db.calls[0][0]
+    assert "FROM users" in query
+    assert "operator_name" not in query
+
+
+@pytest.mark.asyncio
+async def test_get_dashboard_operator_names_reads_bot_users():
+    db = _RowsDBManager([
+        {"telegram_id": 10, "operator_name": "Петрова"},
+        {"telegram_id": 11, "operator_name": "Иванов"},
+        {"telegram_id": 12, "operator_name": "Петрова"},
+    ])
+    repo = OperatorRepository(db)
+
+    names = await repo.get_dashboard_operator_names()
+
+    assert names == ["Иванов", "Петрова"]
+    query, _, _, fetchall = db.calls[0]
+    assert fetchall
+    assert "FROM users u" in query
+    assert "JOIN UsersTelegaBot t" in query
+    assert "t.user_id = u.user_id OR t.extension = u.extension" in query
+    assert "t.operator_name" in query
+    assert "u.operator_name" not in query
+
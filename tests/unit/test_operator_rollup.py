@@ -0,0 +1,264 @@
+"""
+Unit tests for the per-operator daily rollup.
+"""
+
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.db.repositories import analytics as analytics_module
+from app.db.repositories.analytics import AnalyticsRepository
+from app.db.repositories.operator_rollup import (
+    COUNTER_COLUMNS,
+    OperatorRollupRepository,
+    RollupCounters,
+    contiguous_ranges,
+    counters_from_row,
+    fold_cells,
+)
+from app.services.operator_rollup import OperatorRollupService
+
+DAY = date(2025, 3, 10)
+
+RAW_CALLS = [
+    # (operator, day, outcome, category, is_target, score, talk)
+    ("Петрова", DAY, "record", "Запись на услугу (успешная)", 1, 8.0, 120),
+    ("Петрова", DAY, "record", "Запись на услугу (успешная)", 1, None, 95),
+    ("Петрова", DAY, "lead_no_record", "Лид (без записи)", 1, 6.0, 60),
+    ("Петрова", DAY, None, "Отмена записи", 1, 5.0, 8),
+    ("Петрова", DAY, None, "Перенос записи", 1, 7.0, 40),
+    ("Петрова", DAY, None, "Жалоба", 1, 3.0, 200),
+    ("Петрова", DAY, None, "Навигация", 0, 9.0, 30),
+    ("Петрова", DAY, None, "Спам, реклама", 0, None, 0),
+    ("Петрова", DAY + timedelta(days=1), "record", "Запись на услугу (успешная)", 1, 10.0, 15),
+    ("Иванов", DAY, "record", "Запись на услугу (успешная)", 0, 4.0, 11),
+]
+
+
+def _avg(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _cells(calls):
+    """Группировка сырых звонков так же, как CELLS_SQL."""
+    grouped = defaultdict(list)
+    for operator, day, outcome, category, target, score, talk in calls:
+        grouped[(operator, day, outcome, category, target)].append((score, talk))
+    return [
+        {
+            "operator_name": operator,
+            "call_day": day,
+            "outcome": outcome,
+            "call_category": category,
+            "is_target": target,
+            "calls": len(rows),
+            "scored_calls": sum(1 for score, _ in rows if score is not None),
+            "score_sum": sum(score for score, _ in rows if score is not None),
+            "talk_time": sum(talk for _, talk in rows if talk > 0),
+            "long_talks": sum(1 for _, talk in rows if talk > 10),
+            "long_talk_time": sum(talk for _, talk in rows if talk > 10),
+        }
+        for (operator, day, outcome, category, target), rows in grouped.items()
+    ]
+
+
+def _raw_aggregate(calls):
+    """Те же выражения, что в GROUP BY-запросе дашборда, по сырым звонкам."""
+    target = [c for c in calls if c[4] == 1]
+    leads = [c for c in target if c[2] in ("record", "lead_no_record")]
+    long_talks = lambda rows: [c[6] for c in rows if c[6] > 10]  # noqa: E731
+    by_category = lambda rows, name: [c for c in rows if c[3] == name]  # noqa: E731
+    return {
+        "accepted_calls": len(calls),
+        "records": sum(1 for c in target if c[2] == "record"),
+        "leads_no_record": sum(1 for c in target if c[2] == "lead_no_record"),
+        "wish_to_record": len(leads),
+        "avg_score_all": _avg(c[5] for c in calls),
+        "avg_score_leads": _avg(c[5] for c in leads),
+        "avg_score_cancel": _avg(c[5] for c in by_category(target, "Отмена записи")),
+        "cancel_calls": len(by_category(target, "Отмена записи")),
+        "reschedule_calls": len(by_category(target, "Перенос записи")),
+        "avg_talk_all": _avg(long_talks(calls)),
+        "total_talk_time": sum(c[6] for c in calls if c[6] > 0),
+        "avg_talk_record": _avg(long_talks(by_category(calls, "Запись на услугу (успешная)"))),
+        "avg_talk_navigation": _avg(long_talks(by_category(calls, "Навигация"))),
+        "avg_talk_spam": _avg(long_talks(by_category(calls, "Спам, реклама"))),
+        "complaint_calls": len(by_category(target, "Жалоба")),
+        "avg_score_complaint": _avg(c[5] for c in by_category(target, "Жалоба")),
+    }
+
+
+def test_summed_daily_rows_match_raw_aggregate():
+    rollup = fold_cells(_cells(RAW_CALLS))
+
+    assert set(rollup) == {("Петрова", DAY), ("Петрова", DAY + timedelta(days=1)), ("Иванов", DAY)}
+    period = RollupCounters()
+    for (operator, _), counters in rollup.items():
+        if operator == "Петрова":
+            period.add(counters)
+
+    expected = _raw_aggregate([c for c in RAW_CALLS if c[0] == "Петрова"])
+    assert period.as_aggregate_row() == pytest.approx(expected)
+    assert period.outcome_counts == Counter({"record": 3, "lead_no_record": 1, "": 5})
+    assert period.category_counts["Запись на услугу (успешная)"] == 3
+
+
+def test_counters_round_trip_through_table_row():
+    counters = fold_cells(_cells(RAW_CALLS))[("Петрова", DAY)]
+    row = {column: getattr(counters, column) for column in COUNTER_COLUMNS}
+    row["outcome_counts"] = json.dumps(dict(counters.outcome_counts), ensure_ascii=False)
+    row["category_counts"] = dict(counters.category_counts)
+
+    restored = counters_from_row(row)
+
+    assert restored.diff(counters) == {}
+    assert restored == counters
+
+
+def test_diff_reports_changed_fields():
+    stored = fold_cells(_cells(RAW_CALLS))[("Петрова", DAY)]
+    expected = fold_cells(_cells(RAW_CALLS + [("Петрова", DAY, "record", "Запись на услугу (успешная)", 1, 9.0, 50)]))[
+        ("Петрова", DAY)
+    ]
+
+    mismatch = stored.diff(expected)
+
+    assert mismatch["records"] == (2, 3)
+    assert "reschedule_calls" not in mismatch
+    assert "outcome_counts" in mismatch
+
+
+def test_contiguous_ranges():
+    days = [DAY + timedelta(days=offset) for offset in (3, 0, 1, 1, 7, 2)]
+    assert contiguous_ranges(days) == [
+        (DAY, DAY + timedelta(days=3)),
+        (DAY + timedelta(days=7), DAY + timedelta(days=7)),
+    ]
+
+
+def _fake_repository(stored=None, cells=RAW_CALLS):
+    repository = Mock()
+    raw = fold_cells(_cells(cells))
+
+    async def compute(date_from, date_to, operator_name=None, **kwargs):
+        return {key: value for key, value in raw.items() if date_from <= key[1] <= date_to}
+
+    async def load(date_from, date_to, operator_name=None, **kwargs):
+        return {key: value for key, value in (stored or {}).items() if date_from <= key[1] <= date_to}
+
+    repository.compute = AsyncMock(side_effect=compute)
+    repository.load = AsyncMock(side_effect=load)
+    repository.replace_days = AsyncMock(side_effect=lambda date_from, date_to, rollup: len(rollup))
+    repository.touched_days_since = AsyncMock()
+    return repository
+
+
+@pytest.mark.asyncio
+async def test_refresh_since_recomputes_only_touched_days_in_chunks():
+    repository = _fake_repository()
+    repository.touched_days_since.return_value = [DAY, DAY + timedelta(days=1), DAY + timedelta(days=5)]
+    service = OperatorRollupService(Mock(), repository, chunk_days=7)
+    since = datetime(2025, 3, 12, 8, 0)
+
+    stats = await service.refresh_since(since, history_timestamp_field="ch.updated_at")
+
+    repository.touched_days_since.assert_awaited_once_with(since, "ch.updated_at")
+    ranges = [call.args[:2] for call in repository.replace_days.await_args_list]
+    assert ranges == [(DAY, DAY + timedelta(days=1)), (DAY + timedelta(days=5), DAY + timedelta(days=5))]
+    assert stats == {"days": 3, "rows": 3}
+
+
+@pytest.mark.asyncio
+async def test_touched_days_query_is_a_union_of_indexed_ranges():
+    db = Mock()
+    db.execute_query = AsyncMock(return_value=[
+        {"call_day": DAY + timedelta(days=1)},
+        {"call_day": datetime.combine(DAY, datetime.min.time())},
+    ])
+    since = datetime(2025, 3, 12, 8, 0)
+
+    days = await OperatorRollupRepository(db).touched_days_since(since)
+
+    assert days == [DAY, DAY + timedelta(days=1)]
+    query, params = db.execute_query.await_args.args
+    branches = query.split("UNION")
+    assert len(branches) == 2
+    assert "WHERE ch.created_at >= %s" in branches[0]
+    assert "WHERE cs.score_date >= %s" in branches[1]
+    assert " OR " not in query
+    assert params == (since, since)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_splits_period_into_chunks():
+    repository = _fake_repository()
+    service = OperatorRollupService(Mock(), repository, chunk_days=2)
+
+    stats = await service.rebuild(DAY, DAY + timedelta(days=4))
+
+    assert len(repository.replace_days.await_args_list) == 3
+    assert stats["days"] == 5
+
+
+@pytest.mark.asyncio
+async def test_check_reports_mismatch_missing_and_stale():
+    raw = fold_cells(_cells(RAW_CALLS))
+    stored = {("Петрова", DAY): raw[("Петрова", DAY)], ("Сидорова", DAY): RollupCounters(accepted_calls=1)}
+    wrong = RollupCounters()
+    wrong.add(raw[("Петрова", DAY + timedelta(days=1))])
+    wrong.records += 1
+    stored[("Петрова", DAY + timedelta(days=1))] = wrong
+    service = OperatorRollupService(Mock(), _fake_repository(stored))
+
+    report = await service.check(DAY, DAY + timedelta(days=1))
+
+    assert not report.ok
+    assert report.missing == [("Иванов", DAY)]
+    assert report.stale == [("Сидорова", DAY)]
+    assert [(operator, day) for operator, day, _ in report.mismatches] == [("Петрова", DAY + timedelta(days=1))]
+    assert report.affected_days == [DAY, DAY + timedelta(days=1)]
+
+
+@pytest.mark.asyncio
+async def test_dashboards_sum_rollup_rows_and_live_today(monkeypatch):
+    monkeypatch.setitem(analytics_module.DASHBOARD_CONFIG, "use_rollup", True)
+    repo = AnalyticsRepository(Mock())
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    calls_yesterday = [(c[0], yesterday) + c[2:] for c in RAW_CALLS if c[1] == DAY]
+    calls_today = [("Петрова", today, "record", "Запись на услугу (успешная)", 1, 10.0, 15)]
+    repo.rollup_repo.load = AsyncMock(return_value=fold_cells(_cells(calls_yesterday)))
+    repo.rollup_repo.compute = AsyncMock(return_value=fold_cells(_cells(calls_today)))
+
+    dashboards = await repo.get_dashboards_for_period(yesterday, today, "week")
+
+    repo.rollup_repo.load.assert_awaited_once_with(yesterday, yesterday, None)
+    assert repo.rollup_repo.compute.await_args.args[:2] == (today, today)
+    assert [d["operator_name"] for d in dashboards] == ["Иванов", "Петрова"]
+    petrova = dashboards[1]
+    expected = _raw_aggregate([c for c in calls_yesterday + calls_today if c[0] == "Петрова"])
+    assert petrova["accepted_calls"] == expected["accepted_calls"]
+    assert petrova["records"] == 3
+    assert petrova["avg_score_all"] == round(expected["avg_score_all"], 2)
+    assert petrova["avg_talk_all"] == int(expected["avg_talk_all"])
+    assert petrova["complaint_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_single_dashboard_from_rollup_for_operator_without_calls(monkeypatch):
+    monkeypatch.setitem(analytics_module.DASHBOARD_CONFIG, "use_rollup", True)
+    repo = AnalyticsRepository(Mock())
+    repo.rollup_repo.load = AsyncMock(return_value={})
+    repo.rollup_repo.compute = AsyncMock(return_value={})
+
+    dashboard = await repo.get_live_dashboard_single("Петрова", "day")
+
+    repo.rollup_repo.load.assert_not_awaited()
+    assert repo.rollup_repo.compute.await_args.args[2] == "Петрова"
+    assert dashboard["operator_name"] == "Петрова"
+    assert dashboard["accepted_calls"] == 0
+    assert dashboard["avg_score_all"] == 0
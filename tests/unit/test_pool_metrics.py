@@ -0,0 +1,45 @@
+"""
+Unit tests for PoolMetrics.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.pool_metrics import PoolMetrics, is_pool_saturated
+
+
+def test_acquire_and_hold_are_recorded():
+    metrics = PoolMetrics(slow_acquire_ms=1000)
+    metrics.acquire_started()
+    assert metrics.waiting == 1
+    metrics.acquire_finished(0.002, saturated=True)
+    metrics.released("users.get", 0.030)
+
+    pool = SimpleNamespace(minsize=1, maxsize=5, size=3, freesize=1)
+    snapshot = metrics.snapshot(pool)
+
+    assert snapshot["pool"]["in_use"] == 2
+    assert snapshot["pool"]["waiting"] == 0
+    assert snapshot["pool"]["peak_in_use"] == 1
+    assert snapshot["acquire"]["count"] == 1
+    assert snapshot["acquire"]["saturated"] == 1
+    assert snapshot["acquire"]["histogram"]["le_5ms"] == 1
+    assert snapshot["hold"]["users.get"]["max_ms"] == pytest.approx(30.0)
+
+
+def test_failed_acquire_does_not_count_in_use():
+    metrics = PoolMetrics()
+    metrics.acquire_started()
+    metrics.acquire_finished(0.001, error=True)
+
+    snapshot = metrics.snapshot(None)
+    assert snapshot["pool"]["initialized"] is False
+    assert snapshot["pool"]["in_use"] == 0
+    assert snapshot["acquire"]["errors"] == 1
+
+
+def test_is_pool_saturated():
+    assert is_pool_saturated(SimpleNamespace(size=5, maxsize=5, freesize=0))
+    assert not is_pool_saturated(SimpleNamespace(size=4, maxsize=5, freesize=0))
+    assert not is_pool_saturated(object())
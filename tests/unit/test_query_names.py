@@ -0,0 +1,56 @@
+"""
+Unit tests for cheap query-name resolution.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.db.manager import DatabaseManager
+from app.db.query_names import resolve_query_name
+from app.db.telemetry import QueryTelemetry
+
+
+def _caller():
+    return resolve_query_name()
+
+
+def test_resolves_caller_from_frame():
+    assert _caller() == f"{__name__}._caller"
+
+
+def test_explicit_name_takes_priority():
+    assert resolve_query_name("users.get") == "users.get"
+
+
+class _Repo:
+    def __init__(self, db):
+        self.db = db
+
+    async def fetch(self):
+        return await self.db.execute_query("SELECT 1", fetchone=True)
+
+    async def named(self):
+        return await self.db.execute_query("SELECT 1", fetchone=True, query_name="repo.named")
+
+
+@pytest.mark.asyncio
+async def test_manager_uses_repository_method_as_query_name():
+    manager = DatabaseManager(telemetry=QueryTelemetry("metrics"))
+    mock_conn = AsyncMock()
+    mock_cursor = AsyncMock()
+    mock_cursor.__aenter__.return_value = mock_cursor
+    mock_cursor.__aexit__.return_value = False
+    mock_cursor.fetchone.return_value = {"x": 1}
+    mock_conn.cursor = Mock(return_value=mock_cursor)
+    manager.pool = AsyncMock()
+    manager.pool.acquire = AsyncMock(return_value=mock_conn)
+    manager.pool.release = Mock()
+
+    repo = _Repo(manager)
+    await repo.fetch()
+    await repo.named()
+
+    snapshot = manager.telemetry.snapshot()
+    assert snapshot[f"{__name__}._Repo.fetch"]["count"] == 1
+    assert snapshot["repo.named"]["count"] == 1
+    assert manager.telemetry.snapshot_by_owner()[f"{__name__}._Repo"]["count"] == 1
@@ -0,0 +1,67 @@
+"""
+Unit tests for the compiled subscore parser.
+"""
+
+import random
+import re
+
+from app.services.subscores import SUBSCORE_KEYS, parse_subscores
+
+# Прежняя реализация LMService._parse_result_subscores: отдельный re.search на оценку
+REFERENCE_PATTERNS = {
+    "initiative_score": r"(?:Инициативность|ведение диалога)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10",
+    "politeness_score": r"(?:Вежливость|эмпатия)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10",
+    "info_score": r"(?:Информативность)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10",
+    "script_score": r"(?:Соблюдение скрипта)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10",
+    "satisfaction_score": r"(?:Удовлетворенность)[^:]*:\s*(\d+(?:\.\d+)?)\s*/\s*10",
+}
+
+
+def _reference(text):
+    scores = {}
+    for key, pattern in REFERENCE_PATTERNS.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            scores[key] = float(match.group(1))
+    return scores
+
+
+def test_parses_all_subscores_in_key_order():
+    text = (
+        "Удовлетворенность клиента: 6/10\n"
+        "Инициативность (ведение диалога): 7/10\n"
+        "Вежливость и эмпатия: 9.5 / 10\n"
+        "Информативность: 8/10\n"
+        "Соблюдение скрипта: 5/10\n"
+        "Информативность: 1/10"
+    )
+
+    scores = parse_subscores(text)
+
+    assert list(scores) == list(SUBSCORE_KEYS)
+    assert scores["politeness_score"] == 9.5
+    assert scores["info_score"] == 8.0
+    assert parse_subscores(text, scale=10.0)["initiative_score"] == 70.0
+
+
+def test_overlapping_labels_match_like_separate_searches():
+    text = "Инициативность и вежливость: 8/10"
+
+    assert parse_subscores(text) == {"initiative_score": 8.0, "politeness_score": 8.0}
+
+
+def test_empty_and_unrelated_text():
+    assert parse_subscores(None) == {}
+    assert parse_subscores("") == {}
+    assert parse_subscores("Клиент записан на прием") == {}
+
+
+def test_matches_reference_on_random_texts():
+    parts = [
+        "Инициативность", "ведение диалога", "ВЕЖЛИВОСТЬ", "эмпатия", "Информативность",
+        "Соблюдение скрипта", "удовлетворенность", " и ", ": ", "7", "/10", "8.5", " / 10", "\n", ":", "x", "/",
+    ]
+    rng = random.Random(7)
+    for _ in range(3000):
+        text = "".join(rng.choice(parts) for _ in range(rng.randint(0, 14)))
+        assert parse_subscores(text) == _reference(text), text
@@ -143,3 +143,26 @@ async def test_can_use_system_allows_developer_role():
     allowed = await handler._can_use_system(11, "devuser")
 
     assert allowed is True
+
+
+@pytest.mark.asyncio
+async def test_db_metrics_mode_switches_telemetry_at_runtime():
+    from app.db.telemetry import QueryTelemetry
+
+    handler = _make_handler()
+    handler.db_manager = SimpleNamespace(telemetry=QueryTelemetry("metrics"))
+    handler._log_system_action = AsyncMock()
+    message = SimpleNamespace(reply_text=AsyncMock())
+    update = SimpleNamespace(effective_message=message, effective_user=SimpleNamespace(id=1, username="dev"))
+
+    await handler.handle_db_metrics_command(update, SimpleNamespace(args=["mode", "verbose", "0.5"]))
+
+    assert handler.db_manager.telemetry.mode == "verbose"
+    assert handler.db_manager.telemetry.sample_rate == 0.5
+    assert "verbose" in message.reply_text.await_args.args[0]
+    handler._log_system_action.assert_awaited_once()
+
+    await handler.handle_db_metrics_command(update, SimpleNamespace(args=["mode", "loud"]))
+
+    assert handler.db_manager.telemetry.mode == "verbose"
+    assert "Неверные параметры" in message.reply_text.await_args.args[0]